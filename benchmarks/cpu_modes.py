@@ -0,0 +1,59 @@
+"""CPU-Inferenzmodi (int8, bf16, torch.compile, ONNX) gegen fp32 vergleichen
+
+Misst auf einer Stichprobe des Tasks Beispiele/s, Speedup und Metrik-Drift
+jeder Variante gegenüber der fp32-Referenz desselben Modells.
+
+Beispiele:
+  python -m benchmarks.cpu_modes --model configs/models/base_phi4.yaml
+  python -m benchmarks.cpu_modes --model configs/models/base_phi4.yaml --variants int8 bf16 int8+torch onnx --n 50
+  python -m benchmarks.cpu_modes --model configs/models/tiny_random.yaml --variants int8 --output cpu_modes.json
+"""
+
+import argparse
+import json
+import os
+import sys
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backends import create_adapter
+from src.comparison import default_registry
+from src.cpu_modes import compare_modes, markdown_table, parse_variant
+from src.logging_config import setup_logging
+from src.pipeline import load_yaml
+from src.tasks import load_jsonl
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="CPU-Inferenzmodi gegen fp32 vergleichen",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("\n\n", 2)[2],
+    )
+    parser.add_argument("--task", default="configs/tasks/simplify_de.yaml", help="Task-Konfiguration")
+    parser.add_argument("--config", default="configs/default.yaml", help="Haupt-Konfiguration")
+    parser.add_argument("--model", required=True, help="Modell-Konfiguration")
+    parser.add_argument("--variants", nargs="+", default=["int8", "bf16", "torch"],
+                        help="Varianten, z. B. int8 bf16 torch onnx int8+torch (default: int8 bf16 torch)")
+    parser.add_argument("--n", type=int, default=20, help="Größe der Stichprobe (default: 20)")
+    parser.add_argument("--output", "-o", help="Ergebnisse als JSON speichern")
+    args = parser.parse_args(argv)
+
+    logger = setup_logging()
+    task, cfg, model_cfg = load_yaml(args.task), load_yaml(args.config), load_yaml(args.model)
+    examples = load_jsonl(task["data"]["test_file"])[: args.n]
+    variants = [parse_variant(v) for v in args.variants]
+
+    report = compare_modes(model_cfg, variants, examples, task, cfg, create_adapter, default_registry())
+    for line in markdown_table(report):
+        logger.info(line)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(f"Ergebnisse gespeichert: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""End-to-End-Durchsatz der Pipeline (evaluate.py) mit Offline-Backends
+
+Beispiele:
+  python -m benchmarks.e2e
+  python -m benchmarks.e2e --n 5000 --backend rule
+  python -m benchmarks.e2e --n 200 --backend tiny --output e2e.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import yaml
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import evaluate
+from benchmarks.corpus import GermanLikeCorpus
+from src.logging_config import setup_logging
+
+TEMPLATE = (
+    "Vereinfache den folgenden deutschen Text in einfacher Sprache (A2-B1). "
+    "Verwende kurze Sätze und vermeide Fremdwörter.\n\nText: {source}\n\nVereinfachter Text:"
+)
+
+BACKEND_MODELS = {
+    "rule": [
+        {"model_id": "rule-echo", "backend": "rule", "rule": {"mode": "echo"}},
+        {"model_id": "rule-simplifier", "backend": "rule", "rule": {"mode": "simplify", "max_words": 12}},
+    ],
+    "tiny": [
+        {"model_id": "tiny-random-a", "backend": "tiny", "tiny": {"seed": 0}},
+        {"model_id": "tiny-random-b", "backend": "tiny", "tiny": {"seed": 1}},
+    ],
+}
+
+
+def _write_yaml(path: str, data: Dict) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(data, f, allow_unicode=True)
+    return path
+
+
+def prepare(work_dir: str, n: int, backend: str, max_new_tokens: int, seed: int = 42) -> List[str]:
+    """Schreibt Testdaten und Konfigurationen; liefert die evaluate.py-Argumente"""
+    data_path = os.path.join(work_dir, "test.jsonl")
+    with open(data_path, "w", encoding="utf-8") as f:
+        for ex in GermanLikeCorpus(seed=seed).iter_examples(n):
+            row = {"id": ex["id"], "source": ex["source"], "refs": ex["refs"]}
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    task = _write_yaml(os.path.join(work_dir, "task.yaml"), {
+        "task_name": "e2e_benchmark",
+        "data": {"test_file": data_path},
+        "prompt": {"template": TEMPLATE},
+    })
+    config = _write_yaml(os.path.join(work_dir, "config.yaml"), {
+        "seed": seed,
+        "max_new_tokens": max_new_tokens,
+        "output_dir": os.path.join(work_dir, "out"),
+        "cache_dir": os.path.join(work_dir, "cache"),
+        "decoding": {"name": "greedy", "do_sample": False, "temperature": 0.0, "top_p": 1.0},
+    })
+    models = [
+        _write_yaml(os.path.join(work_dir, f"model_{i}.yaml"), mc)
+        for i, mc in enumerate(BACKEND_MODELS[backend])
+    ]
+    return ["--task", task, "--config", config, "--models", *models,
+            "--no-plots", "--results-format", "json", "--quiet"]
+
+
+def run_e2e(n: int = 1000, backend: str = "rule", max_new_tokens: int = 64) -> Dict:
+    """Misst kalten Lauf (leerer Cache) und warmen Lauf (alles im Cache)"""
+    work_dir = tempfile.mkdtemp(prefix="bench-e2e-")
+    try:
+        args = prepare(work_dir, n, backend, max_new_tokens)
+        n_models = len(BACKEND_MODELS[backend])
+        passes = {}
+        for name in ("cold", "warm"):
+            start = time.perf_counter()
+            rc = evaluate.main(args)
+            seconds = time.perf_counter() - start
+            if rc != 0:
+                raise RuntimeError(f"evaluate.py beendet mit Exit-Code {rc}")
+            passes[name] = {
+                "seconds": round(seconds, 3),
+                "examples_per_s": round(n * n_models / seconds, 1),
+            }
+        return {
+            "meta": {
+                "backend": backend,
+                "n_examples": n,
+                "n_models": n_models,
+                "max_new_tokens": max_new_tokens,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            },
+            "passes": passes,
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="End-to-End-Durchsatz von evaluate.py mit Offline-Backends",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("\n\n", 1)[1],
+    )
+    parser.add_argument("--n", type=int, default=1000, help="Anzahl Beispiele (default: 1000)")
+    parser.add_argument("--backend", choices=sorted(BACKEND_MODELS), default="rule",
+                        help="rule (ohne torch) oder tiny (zufälliges Byte-LM, benötigt torch)")
+    parser.add_argument("--max-new-tokens", type=int, default=64,
+                        help="Maximale neue Tokens pro Generation (default: 64)")
+    parser.add_argument("--output", "-o", help="Ergebnisse als JSON speichern")
+    args = parser.parse_args(argv)
+
+    result = run_e2e(args.n, args.backend, args.max_new_tokens)
+    logger = setup_logging()
+    for name, p in result["passes"].items():
+        logger.info(f"{name:5s} {p['examples_per_s']:>10,.1f} Beispiele/s ({p['seconds']:.2f}s)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        logger.info(f"Ergebnisse gespeichert: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""Microbenchmarks für Metriken, Statistik und Cache (offline, nur CPU)
+
+Beispiele:
+  python -m benchmarks.run
+  python -m benchmarks.run --sizes 1k 10k 100k 1m --output bench.json
+  python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.3
+  python -m benchmarks.run --update-baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import GermanLikeCorpus
+from src import caching
+from src.logging_config import setup_logging
+from src.metrics.readability_de import basic_stats, flesch_de
+from src.metrics.sari import sari
+from src.stats import bootstrap_ci, paired_tests
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = ["1k", "10k", "100k"]
+CHUNK = 1000
+# Cache-Benchmarks hängen vom Dateisystem ab und schwanken stärker
+IO_TOLERANCE_FACTOR = 2.0
+
+# Pro-Text-Funktionen: Durchsatz in Texten/s
+TEXT_BENCHMARKS: Dict[str, Callable[[Dict], object]] = {
+    "sari": lambda ex: sari(ex["source"], ex["hyp"], ex["refs"]),
+    "flesch_de": lambda ex: flesch_de(ex["source"]),
+    "basic_stats": lambda ex: basic_stats(ex["source"]),
+}
+
+
+def parse_size(value: str) -> int:
+    """'10k' → 10000, '1m' → 1000000"""
+    value = value.strip().lower()
+    factor = {"k": 1000, "m": 1000000}.get(value[-1], 1)
+    return int(float(value.rstrip("km")) * factor)
+
+
+def size_label(n: int) -> str:
+    if n >= 1000000 and n % 1000000 == 0:
+        return f"{n // 1000000}m"
+    if n >= 1000 and n % 1000 == 0:
+        return f"{n // 1000}k"
+    return str(n)
+
+
+def _peak_memory_kb(fn: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def _best_of(fn: Callable[[], object], repeat: int, min_time: float = 0.2) -> float:
+    """Kürzeste Laufzeit pro Aufruf aus ``repeat`` Messungen
+
+    Sehr kurze Funktionen werden pro Messung so oft ausgeführt, dass mindestens
+    ``min_time`` Sekunden gemessen werden (wie ``timeit.autorange``).
+    """
+    start = time.perf_counter()
+    fn()
+    best = time.perf_counter() - start
+    number = max(1, int(min_time / best)) if 0 < best < min_time else 1
+    for _ in range(max(1, repeat) - (1 if number == 1 else 0)):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def bench_text(name: str, fn: Callable[[Dict], object], corpus: GermanLikeCorpus,
+               n: int, max_seconds: float, repeat: int = 3) -> Dict:
+    """Misst fn über bis zu n Texte; Korpus wird blockweise außerhalb der Messung erzeugt
+
+    Der erste Durchlauf endet nach ``max_seconds``; die dabei erzeugten Texte
+    werden für die Wiederholungen erneut verwendet.
+    """
+    examples = corpus.iter_examples(n)
+    chunks: List[List[Dict]] = []
+    processed, elapsed = 0, 0.0
+    while processed < n and elapsed < max_seconds:
+        chunk = [ex for _, ex in zip(range(CHUNK), examples)]
+        if not chunk:
+            break
+        start = time.perf_counter()
+        for ex in chunk:
+            fn(ex)
+        elapsed += time.perf_counter() - start
+        processed += len(chunk)
+        chunks.append(chunk)
+
+    def run_all():
+        for chunk in chunks:
+            for ex in chunk:
+                fn(ex)
+
+    if repeat > 1:
+        elapsed = min(elapsed, _best_of(run_all, repeat - 1))
+    sample = chunks[0][:200] if chunks else []
+    return {
+        "function": name,
+        "size": n,
+        "n_processed": processed,
+        "seconds": round(elapsed, 4),
+        "throughput_per_s": round(processed / elapsed, 1) if elapsed > 0 else None,
+        "unit": "texts",
+        # Speicher separat messen: tracemalloc verfälscht die Laufzeit
+        "peak_mem_kb": _peak_memory_kb(lambda: [fn(ex) for ex in sample]),
+    }
+
+
+def bench_array(name: str, fn: Callable[[], object], n: int, repeat: int = 3) -> Dict:
+    elapsed = _best_of(fn, repeat)
+    return {
+        "function": name,
+        "size": n,
+        "n_processed": n,
+        "seconds": round(elapsed, 4),
+        "throughput_per_s": round(n / elapsed, 1) if elapsed > 0 else None,
+        "unit": "values",
+        "peak_mem_kb": _peak_memory_kb(fn),
+    }
+
+
+def bench_cache(corpus: GermanLikeCorpus, n: int, max_ops: int, repeat: int = 3) -> List[Dict]:
+    """caching.put/get auf einem temporären Verzeichnis (max. ``max_ops`` Einträge)"""
+    n_ops = min(n, max_ops)
+    entries = [
+        (caching.make_key("bench-model", {"name": "greedy"}, ex["source"], ex["id"]), ex)
+        for ex in corpus.iter_examples(n_ops)
+    ]
+    cache_dir = tempfile.mkdtemp(prefix="bench-cache-")
+    try:
+        results = []
+        for name, fn in (
+            ("cache_put", lambda: [caching.put(cache_dir, key, ex) for key, ex in entries]),
+            ("cache_get", lambda: [caching.get(cache_dir, key) for key, _ in entries]),
+        ):
+            # Wiederholte put-Aufrufe überschreiben dieselben Dateien
+            elapsed = _best_of(fn, repeat)
+            results.append({
+                "function": name,
+                "size": n,
+                "n_processed": n_ops,
+                "seconds": round(elapsed, 4),
+                "throughput_per_s": round(n_ops / elapsed, 1) if elapsed > 0 else None,
+                "unit": "ops",
+                "peak_mem_kb": _peak_memory_kb(
+                    lambda: [caching.get(cache_dir, key) for key, _ in entries[:200]]
+                    if name == "cache_get"
+                    else [caching.put(cache_dir, key, ex) for key, ex in entries[:200]]
+                ),
+            })
+        return results
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def run_benchmarks(
+    sizes: List[int],
+    functions: Optional[List[str]] = None,
+    max_seconds: float = 5.0,
+    max_cache_ops: int = 5000,
+    bootstrap_b: int = 5000,
+    seed: int = 42,
+    repeat: int = 3,
+) -> Dict:
+    """Führt alle (oder ausgewählte) Benchmarks für jede Größe aus"""
+    corpus = GermanLikeCorpus(seed=seed)
+    rng = np.random.default_rng(seed)
+    # Einmalige Importkosten (scipy.stats) nicht mitmessen
+    paired_tests([1.0, 2.0, 3.0, 4.0], [1.5, 2.0, 3.5, 4.5])
+    selected = set(functions) if functions else None
+    results = {}
+
+    def wanted(name):
+        return selected is None or name in selected
+
+    for n in sizes:
+        label = size_label(n)
+        for name, fn in TEXT_BENCHMARKS.items():
+            if wanted(name):
+                results[f"{name}@{label}"] = bench_text(name, fn, corpus, n, max_seconds, repeat)
+
+        xs = rng.normal(50.0, 10.0, n)
+        ys = xs + rng.normal(0.5, 5.0, n)
+        if wanted("paired_tests"):
+            results[f"paired_tests@{label}"] = bench_array(
+                "paired_tests", lambda: paired_tests(xs, ys), n, repeat
+            )
+        if wanted("bootstrap_ci"):
+            diffs = ys - xs
+            results[f"bootstrap_ci@{label}"] = bench_array(
+                "bootstrap_ci", lambda: bootstrap_ci(diffs, B=bootstrap_b, rng=seed), n, repeat
+            )
+        if wanted("cache_put") or wanted("cache_get"):
+            for entry in bench_cache(corpus, n, max_cache_ops, repeat):
+                if wanted(entry["function"]):
+                    results[f"{entry['function']}@{label}"] = entry
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "max_seconds": max_seconds,
+            "max_cache_ops": max_cache_ops,
+            "bootstrap_b": bootstrap_b,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare_results(current: Dict, baseline: Dict, threshold: float = 0.3,
+                    mem_floor_kb: float = 64.0) -> List[Dict]:
+    """Vergleicht mit einer Baseline; liefert eine Zeile pro gemeinsamem Benchmark
+
+    Regression: Durchsatz < (1 - threshold) × Baseline oder Spitzenspeicher
+    > (1 + threshold) × Baseline (Unterschiede unter ``mem_floor_kb`` gelten als Rauschen).
+    Für Dateisystem-Benchmarks (Einheit ``ops``) gilt die doppelte Toleranz.
+    """
+    rows = []
+    for key, cur in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if base is None or not cur.get("throughput_per_s") or not base.get("throughput_per_s"):
+            continue
+        tol = threshold * (IO_TOLERANCE_FACTOR if cur.get("unit") == "ops" else 1.0)
+        ratio = cur["throughput_per_s"] / base["throughput_per_s"]
+        mem_ratio = (cur["peak_mem_kb"] / base["peak_mem_kb"]) if base["peak_mem_kb"] else 1.0
+        slower = ratio < 1.0 - tol
+        bigger = (
+            mem_ratio > 1.0 + tol and cur["peak_mem_kb"] - base["peak_mem_kb"] > mem_floor_kb
+        )
+        rows.append({
+            "benchmark": key,
+            "throughput_ratio": round(ratio, 3),
+            "memory_ratio": round(mem_ratio, 3),
+            "regression": slower or bigger,
+            "reason": ", ".join(
+                r for r, hit in (("Durchsatz", slower), ("Speicher", bigger)) if hit
+            ),
+        })
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Microbenchmarks für Metriken, Statistik und Cache",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("\n\n", 1)[1],
+    )
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES,
+                        help="Korpusgrößen, z. B. 1k 10k 100k 1m (default: 1k 10k 100k)")
+    parser.add_argument("--functions", nargs="+",
+                        choices=list(TEXT_BENCHMARKS) + ["paired_tests", "bootstrap_ci", "cache_put", "cache_get"],
+                        help="Nur diese Funktionen messen")
+    parser.add_argument("--max-seconds", type=float, default=5.0,
+                        help="Zeitbudget pro Text-Benchmark und Durchlauf in Sekunden (default: 5)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Durchläufe pro Benchmark, gewertet wird der schnellste (default: 3)")
+    parser.add_argument("--max-cache-ops", type=int, default=5000,
+                        help="Maximale Anzahl Cache-Einträge pro Größe (default: 5000)")
+    parser.add_argument("--output", "-o", help="Ergebnisse als JSON speichern")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="Mit Baseline vergleichen; Exit-Code 1 bei Regression")
+    parser.add_argument("--threshold", type=float, default=0.3,
+                        help="Toleranz für Regressionen (default: 0.3 = 30%%)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help=f"Ergebnisse als neue Baseline speichern ({os.path.relpath(BASELINE_PATH)})")
+    parser.add_argument("--quiet", "-q", action="store_true", help="Minimale Ausgabe")
+    args = parser.parse_args(argv)
+
+    logger = setup_logging(quiet=args.quiet)
+    sizes = [parse_size(s) for s in args.sizes]
+    logger.info(f"⏱️  Benchmarks für Größen {', '.join(size_label(n) for n in sizes)}")
+
+    current = run_benchmarks(sizes, args.functions, args.max_seconds, args.max_cache_ops,
+                             repeat=args.repeat)
+    for key, r in current["results"].items():
+        logger.info(
+            f"{key:24s} {r['throughput_per_s']:>14,.1f} {r['unit']}/s  "
+            f"({r['n_processed']} in {r['seconds']:.3f}s, Spitze {r['peak_mem_kb']:.0f} KiB)"
+        )
+
+    for path in filter(None, [args.output, BASELINE_PATH if args.update_baseline else None]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        logger.info(f"Ergebnisse gespeichert: {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare_results(current, baseline, args.threshold)
+        regressions = [row for row in rows if row["regression"]]
+        for row in rows:
+            marker = "❌" if row["regression"] else "✅"
+            logger.info(
+                f"{marker} {row['benchmark']:24s} Durchsatz ×{row['throughput_ratio']:.2f}  "
+                f"Speicher ×{row['memory_ratio']:.2f}  {row['reason']}"
+            )
+        if regressions:
+            logger.error(f"{len(regressions)} Regression(en) über {args.threshold:.0%} Toleranz")
+            return 1
+        logger.info(f"Keine Regressionen ({len(rows)} Benchmarks verglichen)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
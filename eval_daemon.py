@@ -0,0 +1,151 @@
+import argparse, os, sys
+from urllib.error import URLError
+
+from src.daemon import (
+    DEFAULT_HOST, DEFAULT_PORT, EvalDaemon, ModelPool,
+    submit_job, daemon_status, stop_daemon,
+)
+from src.logging_config import setup_logging
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description='Evaluationsdienst mit warm gehaltenen Modellen',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Beispiele:
+  python eval_daemon.py serve --memory-budget-gb 24
+  python eval_daemon.py submit --max-samples 50 --no-plots --output outputs/ci
+  python eval_daemon.py submit --ids failed_ids.txt
+  python eval_daemon.py status
+  python eval_daemon.py stop
+    """
+    )
+    parser.add_argument('--url',
+                       default=f'http://{DEFAULT_HOST}:{DEFAULT_PORT}',
+                       help=f'Adresse des Dienstes (default: http://{DEFAULT_HOST}:{DEFAULT_PORT})')
+    parser.add_argument('--verbose', '-v',
+                       action='store_true',
+                       help='Detaillierte Ausgabe')
+    parser.add_argument('--quiet', '-q',
+                       action='store_true',
+                       help='Minimale Ausgabe')
+    parser.add_argument('--log-file',
+                       help='Log-Datei spezifizieren')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve = sub.add_parser('serve', help='Dienst starten')
+    serve.add_argument('--host', default=DEFAULT_HOST,
+                       help=f'Bind-Adresse (default: {DEFAULT_HOST})')
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT,
+                       help=f'Port (default: {DEFAULT_PORT})')
+    serve.add_argument('--memory-budget-gb', type=float,
+                       help='Speicherbudget für geladene Modelle; ältere Modelle werden entladen (default: unbegrenzt)')
+
+    submit = sub.add_parser('submit', help='Evaluationsjob einreichen und Fortschritt anzeigen')
+    submit.add_argument('--task', default='configs/tasks/simplify_de.yaml',
+                        help='Task-Konfigurationsdatei (default: configs/tasks/simplify_de.yaml)')
+    submit.add_argument('--models', nargs='+',
+                        default=['configs/models/base_phi4.yaml', 'configs/models/finetuned_klexikon.yaml'],
+                        help='Liste der Modell-Konfigurationsdateien')
+    submit.add_argument('--config', default='configs/default.yaml',
+                        help='Haupt-Konfigurationsdatei (default: configs/default.yaml)')
+    submit.add_argument('--output', '-o', help='Ausgabeverzeichnis (überschreibt config)')
+    submit.add_argument('--max-samples', type=int, help='Maximale Anzahl Testbeispiele')
+    submit.add_argument('--ids', nargs='+',
+                        help='Nur diese Beispiel-IDs evaluieren (IDs oder Datei mit einer ID pro Zeile)')
+    submit.add_argument('--no-cache', action='store_true', help='Cache ignorieren')
+    submit.add_argument('--no-plots', action='store_true', help='Keine Plots erstellen')
+    submit.add_argument('--results-format', choices=['auto', 'parquet', 'json'],
+                        help='Format der Detailergebnisse (default: auto)')
+    submit.add_argument('--resume', action='store_true',
+                        help='Abgebrochenen Lauf anhand des Journals fortsetzen')
+
+    sub.add_parser('status', help='Zustand des Dienstes anzeigen')
+    sub.add_parser('stop', help='Dienst beenden')
+    return parser
+
+
+def _abspath(path):
+    # Der Dienst kann ein anderes Arbeitsverzeichnis haben
+    return os.path.abspath(path) if path else path
+
+
+def build_job(args) -> dict:
+    ids = args.ids
+    if ids and len(ids) == 1 and os.path.isfile(ids[0]):
+        ids = [_abspath(ids[0])]
+    return {
+        'task': _abspath(args.task),
+        'config': _abspath(args.config),
+        'models': [_abspath(p) for p in args.models],
+        'output': _abspath(args.output),
+        'max_samples': args.max_samples,
+        'ids': ids,
+        'use_cache': not args.no_cache,
+        'plots': not args.no_plots,
+        'results_format': args.results_format,
+        'resume': args.resume,
+    }
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logger = setup_logging(
+        level=20,  # INFO level
+        log_file=args.log_file,
+        verbose=args.verbose,
+        quiet=args.quiet
+    )
+
+    if args.command == 'serve':
+        budget = int(args.memory_budget_gb * 1e9) if args.memory_budget_gb else None
+        daemon = EvalDaemon(ModelPool(memory_budget_bytes=budget), host=args.host, port=args.port)
+        logger.info(f"🚀 Evaluationsdienst gestartet: {daemon.url}")
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            daemon.shutdown()
+        return 0
+
+    try:
+        if args.command == 'status':
+            status = daemon_status(args.url)
+            pool = status['pool']
+            logger.info(f"Dienst aktiv seit {status['uptime_seconds']}s, "
+                        f"{status['jobs_done']} Jobs, beschäftigt: {status['busy']}")
+            for model in pool['models']:
+                logger.info(f"  {model['model_id']}: {model['bytes'] / 1e9:.2f} GB")
+            return 0
+        if args.command == 'stop':
+            stop_daemon(args.url)
+            logger.info("Dienst wird beendet")
+            return 0
+
+        def on_event(event):
+            kind = event['event']
+            if kind == 'log':
+                logger.info(f"[daemon] {event['message']}")
+            elif kind == 'progress':
+                logger.debug(f"{event['stage']}: {event['done']}/{event['total']}")
+            elif kind == 'queued':
+                logger.info("⏳ Dienst beschäftigt, Job wartet")
+            elif kind == 'started':
+                logger.info(f"▶️  Job gestartet (geladene Modelle: {event['loaded_models']})")
+
+        final = submit_job(args.url, build_job(args), on_event)
+    except (URLError, ConnectionError) as e:
+        logger.error(f"Dienst nicht erreichbar unter {args.url}: {e}")
+        return 1
+
+    if final['event'] != 'done':
+        logger.error(f"Job fehlgeschlagen: {final.get('message')}")
+        return 1
+    logger.info(f"🎉 Job abgeschlossen in {final['seconds']}s")
+    logger.info(f"📄 Vollständiger Report: {final['paths']['report']}")
+    logger.info(f"📊 Detaillierte Ergebnisse: {final['paths']['results']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
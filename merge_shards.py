@@ -0,0 +1,120 @@
+import argparse, os, sys
+
+from src.comparison import (
+    default_registry, compute_metrics, compare_models, build_summary,
+    write_detailed_results, log_summary, METRIC_DIRECTIONS,
+)
+from src.reference import REF_METRICS, is_reference_mode, corpus_summary
+from src.reference import markdown_section as reference_section
+from src.sampling import sampling_summary
+from src.sampling import markdown_section as sampling_section
+from src.sharding import load_shards, ShardMergeError
+from src.results_io import resolve_results_format, write_columnar_results
+from src.report import write_markdown
+from src.logging_config import setup_logging
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Führt die Shard-Ergebnisse von evaluate.py --shard zusammen',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Beispiele:
+  python merge_shards.py outputs/run1/shards
+  python merge_shards.py outputs/run1/shards --output outputs/run1 --no-plots
+    """
+    )
+    parser.add_argument('shard_dir',
+                       help='Verzeichnis mit den Shard-Ausgaben')
+    parser.add_argument('--output', '-o',
+                       help='Ausgabeverzeichnis (default: Elternverzeichnis von shard_dir)')
+    parser.add_argument('--no-plots',
+                       action='store_true',
+                       help='Keine Plots erstellen')
+    parser.add_argument('--results-format',
+                       choices=['auto', 'parquet', 'json'],
+                       default='auto',
+                       help='Format der Detailergebnisse (default: auto)')
+    parser.add_argument('--verbose', '-v',
+                       action='store_true',
+                       help='Detaillierte Ausgabe')
+    parser.add_argument('--quiet', '-q',
+                       action='store_true',
+                       help='Minimale Ausgabe')
+    parser.add_argument('--log-file',
+                       help='Log-Datei spezifizieren')
+    args = parser.parse_args(argv)
+
+    logger = setup_logging(
+        level=20,  # INFO level
+        log_file=args.log_file,
+        verbose=args.verbose,
+        quiet=args.quiet
+    )
+
+    output_dir = args.output or os.path.dirname(os.path.abspath(args.shard_dir))
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Shards laden und auf Vollständigkeit/Duplikate prüfen
+    try:
+        manifest, results = load_shards(args.shard_dir)
+    except (OSError, ShardMergeError) as e:
+        logger.error(f"Fehler beim Zusammenführen der Shards: {e}")
+        return 1
+
+    models = manifest['models']
+    logger.info(f"{manifest['num_shards']} Shards zusammengeführt: "
+                f"{manifest['total_examples']} Beispiele, {len(models)} Modelle")
+    if len(models) < 2:
+        logger.error("Für einen Vergleich werden mindestens zwei Modelle benötigt")
+        return 1
+
+    # Metriken und Vergleiche einmalig auf den zusammengeführten Daten, wie in
+    # EvaluationPipeline.score/compare (Manifest-Feld mode: reference → REF_NLL/REF_PPL)
+    reg = default_registry()
+    reference_mode = is_reference_mode(manifest)
+    store = compute_metrics(results, reg, REF_METRICS if reference_mode else None)
+    mid_a, mid_b = models[0], models[1]
+    comparison_results, summary_stats = compare_models(store, mid_a, mid_b)
+    summary = build_summary(manifest['task'], mid_a, mid_b, manifest['total_examples'],
+                            comparison_results, summary_stats,
+                            lower_is_better=REF_METRICS if reference_mode else ())
+    if manifest.get('num_samples', 1) > 1:
+        summary['num_samples'] = manifest['num_samples']
+
+    plot_paths = []
+    if not args.no_plots:
+        try:
+            from src.visualization import create_all_visualizations
+            plot_paths = create_all_visualizations(comparison_results, store.as_metric_dict(), output_dir)
+        except Exception as e:
+            logger.error(f"Fehler beim Erstellen der Visualisierungen: {e}")
+
+    extra = []
+    sampling = sampling_summary(results, reg.names(), METRIC_DIRECTIONS)
+    if sampling:
+        extra += sampling_section(sampling)
+    references = corpus_summary(results)
+    if references:
+        extra += reference_section(references)
+    rep_path = write_markdown(output_dir, summary, comparison_results, extra_sections=extra or None)
+    run_args = {**vars(args), 'shards': manifest}
+    if resolve_results_format(args.results_format) == 'parquet':
+        results_path, _ = write_columnar_results(
+            output_dir, results, store, summary, comparison_results,
+            plot_paths, run_args
+        )
+    else:
+        results_path = write_detailed_results(
+            output_dir, summary, comparison_results, store,
+            plot_paths, run_args
+        )
+
+    log_summary(logger, summary, summary_stats)
+    logger.info(f"\n📄 Vollständiger Report: {rep_path}")
+    logger.info(f"📊 Detaillierte Ergebnisse: {results_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -89,6 +89,8 @@ setup(
         "console_scripts": [
             "evaluate=evaluate:main",
             "eval-harness=evaluate:main",
+            "eval-merge=merge_shards:main",
+            "eval-daemon=eval_daemon:main",
         ],
     },
     include_package_data=True,
@@ -0,0 +1,45 @@
+"""Evaluation Harness für Text-Vereinfachung
+
+Leichtgewichtige Oberfläche für Metriken und Statistik: die Namen werden erst
+beim ersten Zugriff aus ihren Modulen geladen (PEP 562), ``import src`` zieht
+weder torch/transformers noch matplotlib/pandas nach. Modelle und Plots
+bleiben in ``src.models`` bzw. ``src.visualization``.
+"""
+
+import importlib
+
+_EXPORTS = {
+    # Metriken
+    "sari": "metrics.sari",
+    "flesch_de": "metrics.readability_de",
+    "lix": "metrics.readability_de",
+    "wstf": "metrics.readability_de",
+    "basic_stats": "metrics.readability_de",
+    "MetricsRegistry": "metrics.registry",
+    # Statistik
+    "paired_tests": "stats",
+    "cohens_d": "stats",
+    "bootstrap_ci": "stats",
+    "holm_correction": "stats",
+    # Scoring und Vergleich
+    "ResultStore": "result_store",
+    "default_registry": "comparison",
+    "score_row": "comparison",
+    "compute_metrics": "comparison",
+    "compare_models": "comparison",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
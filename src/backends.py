@@ -0,0 +1,322 @@
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+from .logging_config import get_logger
+
+logger = get_logger("backends")
+
+PROMPT_MARKER = "Text:"
+ANSWER_MARKER = "Vereinfachter Text:"
+
+
+class GenerationBackend:
+    """Schnittstelle aller Generierungs-Backends
+
+    Ein Backend wird aus einer Modell-Konfiguration erzeugt und liefert pro
+    Prompt einen Text. ``last_stats`` enthält Token-Zahlen und Zeiten der
+    letzten Generation (für --profile), ``memory_bytes`` den geschätzten
+    Speicherbedarf (für den Modell-Pool des Dienstes). Enthält ``decoding``
+    ein Zeitbudget ``max_time`` (Sekunden), bricht das Backend danach ab und
+    meldet ``truncated: True`` in ``last_stats``.
+    """
+
+    def __init__(self, model_cfg: Dict):
+        self.model_id = model_cfg["model_id"]
+        self.last_stats: Dict = {}
+
+    def generate(self, prompt: str, max_new_tokens: int, decoding: dict) -> str:
+        raise NotImplementedError
+
+    def generate_batch(self, prompts: List[str], max_new_tokens: int, decoding: dict) -> List[str]:
+        """Standard: Prompts nacheinander; ``last_stats['items']`` enthält die Einzelwerte
+
+        Ein Zeitbudget gilt für den ganzen Batch: jeder Prompt erhält nur die Restzeit.
+        """
+        texts, items = [], []
+        max_time = decoding.get("max_time")
+        start = time.perf_counter()
+        for prompt in prompts:
+            if max_time:
+                remaining = max(1e-3, max_time - (time.perf_counter() - start))
+                decoding = {**decoding, "max_time": remaining}
+            texts.append(self.generate(prompt, max_new_tokens, decoding))
+            items.append(self.last_stats)
+        self.last_stats = {
+            key: sum(item.get(key, 0) for item in items)
+            for key in ("prompt_tokens", "completion_tokens", "generation_seconds")
+        }
+        self.last_stats["items"] = items
+        return texts
+
+    def generate_samples(self, prompt: str, max_new_tokens: int, decoding: dict, n: int) -> List[str]:
+        """Standard: n unabhängige Generationen; Backends mit einem Prefill überschreiben das"""
+        return self.generate_batch([prompt] * n, max_new_tokens, decoding)
+
+    def memory_bytes(self) -> int:
+        return 0
+
+
+def extract_source(prompt: str) -> str:
+    """Quelltext aus einem Task-Prompt ('... Text: <quelle> ... Vereinfachter Text:')"""
+    text = prompt.split(ANSWER_MARKER)[0]
+    if PROMPT_MARKER in text:
+        text = text.split(PROMPT_MARKER, 1)[1]
+    return text.strip()
+
+
+class RuleSimplifier(GenerationBackend):
+    """Deterministischer regelbasierter Vereinfacher ohne torch
+
+    ``mode: echo`` gibt die Quelle unverändert zurück. ``mode: simplify``
+    (Standard) entfernt Klammerzusätze, kürzt jeden Satz am ersten Nebensatz-
+    Komma und begrenzt ihn auf ``max_words`` Wörter. Optional simuliert
+    ``delay_ms`` die Laufzeit eines Modells.
+    """
+
+    def __init__(self, model_cfg: Dict):
+        super().__init__(model_cfg)
+        opts = model_cfg.get("rule") or {}
+        self.mode = opts.get("mode", "simplify")
+        if self.mode not in ("simplify", "echo"):
+            raise ValueError(f"Unbekannter Modus für rule-Backend: {self.mode}")
+        self.max_words = int(opts.get("max_words", 12))
+        self.delay = float(opts.get("delay_ms", 0)) / 1000.0
+
+    def _simplify(self, source: str) -> str:
+        source = re.sub(r"\s*\([^)]*\)", "", source)
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", source) if s.strip()]
+        out = []
+        for sentence in sentences:
+            clause = sentence.split(",")[0].rstrip(".!?;: ")
+            words = clause.split()[: self.max_words]
+            if words:
+                out.append(" ".join(words) + ".")
+        return " ".join(out)
+
+    def generate(self, prompt: str, max_new_tokens: int, decoding: dict) -> str:
+        start = time.perf_counter()
+        source = extract_source(prompt)
+        text = source if self.mode == "echo" else self._simplify(source)
+        words = text.split()[:max_new_tokens]
+        max_time = decoding.get("max_time")
+        truncated = bool(self.delay and max_time and self.delay > max_time)
+        if truncated:
+            # Wie ein Modell: nur der bis zum Zeitbudget erzeugte Anteil
+            time.sleep(max_time)
+            words = words[: int(len(words) * max_time / self.delay)]
+        elif self.delay:
+            time.sleep(self.delay)
+        text = " ".join(words)
+        self.last_stats = {
+            "prompt_tokens": len(prompt.split()),
+            "completion_tokens": len(words),
+            "generation_seconds": time.perf_counter() - start,
+        }
+        if truncated:
+            self.last_stats["truncated"] = True
+        return text
+
+
+class ByteTokenizer:
+    """Tokenizer auf UTF-8-Bytes (256 Byte-IDs plus pad/eos/bos), ohne Download"""
+
+    pad_token_id = 256
+    eos_token_id = 257
+    bos_token_id = 258
+    vocab_size = 259
+
+    def encode(self, text: str) -> List[int]:
+        return [self.bos_token_id] + list(text.encode("utf-8"))
+
+    def decode(self, ids) -> str:
+        return bytes(i for i in ids if i < 256).decode("utf-8", errors="ignore")
+
+
+class TinyCausalLM(GenerationBackend):
+    """Zufällig initialisiertes kleines Causal LM (GPT-2-Architektur) auf Byte-Ebene
+
+    Gedacht für Durchsatzmessungen der Pipeline ohne Modell-Download: der
+    generierte Text ist inhaltlich bedeutungslos, Laufzeitverhalten (Forward-
+    Passes, KV-Cache, Decoding) entspricht aber einem echten Modell. Größe über
+    ``tiny: {n_layer, n_embd, n_head, n_positions, seed}``; ``cpu_mode`` und
+    ``compile: torch`` wirken wie beim hf-Backend.
+    """
+
+    def __init__(self, model_cfg: Dict):
+        super().__init__(model_cfg)
+        import torch
+        from transformers import GPT2Config, GPT2LMHeadModel
+
+        opts = model_cfg.get("tiny") or {}
+        self.tok = ByteTokenizer()
+        self.n_positions = int(opts.get("n_positions", 1024))
+        config = GPT2Config(
+            vocab_size=self.tok.vocab_size,
+            n_positions=self.n_positions,
+            n_embd=int(opts.get("n_embd", 64)),
+            n_layer=int(opts.get("n_layer", 2)),
+            n_head=int(opts.get("n_head", 2)),
+            bos_token_id=self.tok.bos_token_id,
+            eos_token_id=self.tok.eos_token_id,
+            pad_token_id=self.tok.pad_token_id,
+        )
+        torch.manual_seed(int(opts.get("seed", 0)))
+        self.model = GPT2LMHeadModel(config).eval()
+        self.device = next(self.model.parameters()).device
+
+        from .cpu_modes import apply_cpu_mode, compile_model, resolve_cpu_mode
+
+        self.cpu_mode = resolve_cpu_mode(model_cfg.get("cpu_mode"))
+        self.model = apply_cpu_mode(self.model, self.cpu_mode)
+        if model_cfg.get("compile") == "torch":
+            self.model = compile_model(self.model)
+        elif model_cfg.get("compile"):
+            raise ValueError(f"tiny-Backend unterstützt nur compile: torch, nicht {model_cfg['compile']}")
+        logger.info(
+            f"Tiny-Modell erstellt: {self.model_id} "
+            f"({sum(p.numel() for p in self.model.parameters()) / 1e6:.2f}M Parameter)"
+        )
+
+    def memory_bytes(self) -> int:
+        return sum(p.numel() * p.element_size() for p in self.model.parameters())
+
+    def _generation_params(self, max_new_tokens: int, decoding: dict) -> Dict:
+        do_sample = decoding.get("do_sample", False)
+        params = {
+            "do_sample": do_sample,
+            "max_new_tokens": max_new_tokens,
+            "pad_token_id": self.tok.pad_token_id,
+            "eos_token_id": self.tok.eos_token_id,
+        }
+        if do_sample:
+            params["temperature"] = max(0.01, decoding.get("temperature", 1.0))
+            params["top_p"] = max(0.01, min(1.0, decoding.get("top_p", 1.0)))
+        if decoding.get("max_time"):
+            params["max_time"] = decoding["max_time"]
+        return params
+
+    def generate(self, prompt: str, max_new_tokens: int, decoding: dict) -> str:
+        return self.generate_batch([prompt], max_new_tokens, decoding)[0]
+
+    def generate_batch(self, prompts: List[str], max_new_tokens: int, decoding: dict) -> List[str]:
+        return self._generate(prompts, max_new_tokens, decoding)
+
+    def generate_samples(self, prompt: str, max_new_tokens: int, decoding: dict, n: int) -> List[str]:
+        """n Stichproben aus einem Prefill (num_return_sequences); greedy liefert n gleiche Texte"""
+        if not decoding.get("do_sample", False):
+            texts = self._generate([prompt], max_new_tokens, decoding)
+            self.last_stats["items"] = self.last_stats["items"] * n
+            return texts * n
+        return self._generate([prompt], max_new_tokens, decoding, num_return_sequences=n)
+
+    def score_references(self, prompts: List[str], references: List[str]) -> List[Dict]:
+        """Teacher-Forcing-Log-Likelihood der Referenzen (ein Forward-Pass, rechts aufgefüllt)"""
+        from .reference import reference_continuation, teacher_forced_logprobs
+
+        start = time.perf_counter()
+        pairs = [
+            (self.tok.encode(p), self.tok.encode(reference_continuation(p, r))[1:])
+            for p, r in zip(prompts, references)
+        ]
+        scores = teacher_forced_logprobs(
+            self.model, pairs, self.tok.pad_token_id, self.n_positions, self.device
+        )
+        self.last_stats = {
+            "prompt_tokens": sum(len(p) for p, _ in pairs),
+            "completion_tokens": sum(s["tokens"] for s in scores),
+            "generation_seconds": time.perf_counter() - start,
+            "items": [{"prompt_tokens": len(p), "completion_tokens": s["tokens"]}
+                      for (p, _), s in zip(pairs, scores)],
+        }
+        return scores
+
+    def _generate(
+        self, prompts: List[str], max_new_tokens: int, decoding: dict, num_return_sequences: int = 1
+    ) -> List[str]:
+        import torch
+
+        start = time.perf_counter()
+        max_new_tokens = min(max_new_tokens, 512)
+        # Prompts von links kürzen, damit Prompt + Generierung in n_positions passen,
+        # und links auffüllen, damit alle Prompts bündig enden
+        encoded = [self.tok.encode(p)[-(self.n_positions - max_new_tokens):] for p in prompts]
+        width = max(len(ids) for ids in encoded)
+        input_ids = torch.tensor(
+            [[self.tok.pad_token_id] * (width - len(ids)) + ids for ids in encoded],
+            device=self.device,
+        )
+        attention_mask = torch.tensor(
+            [[0] * (width - len(ids)) + [1] * len(ids) for ids in encoded], device=self.device
+        )
+        tokenize_time = time.perf_counter() - start
+
+        with torch.inference_mode():
+            out = self.model.generate(
+                input_ids,
+                attention_mask=attention_mask,
+                num_return_sequences=num_return_sequences,
+                **self._generation_params(max_new_tokens, decoding),
+            )
+        # Zeilen von generate: num_return_sequences pro Prompt hintereinander
+        encoded = [ids for ids in encoded for _ in range(num_return_sequences)]
+
+        # Ohne eos und vor max_new_tokens beendet: das Zeitbudget hat gestoppt
+        timed_out = bool(decoding.get("max_time")) and time.perf_counter() - start >= decoding["max_time"]
+        texts, items = [], []
+        for ids, row in zip(encoded, out[:, width:].tolist()):
+            finished = self.tok.eos_token_id in row
+            if finished:
+                row = row[: row.index(self.tok.eos_token_id) + 1]
+            texts.append(self.tok.decode(row).strip())
+            items.append({"prompt_tokens": len(ids), "completion_tokens": len(row)})
+            if timed_out and not finished and len(row) < max_new_tokens:
+                items[-1]["truncated"] = True
+        self.last_stats = {
+            "prompt_tokens": sum(item["prompt_tokens"] for item in items),
+            "completion_tokens": sum(item["completion_tokens"] for item in items),
+            "tokenize_seconds": tokenize_time,
+            "generation_seconds": time.perf_counter() - start,
+            "items": items,
+        }
+        return texts
+
+
+def _hf_backend(model_cfg: Dict):
+    # Basismodelle werden prozessweit geteilt, LoRA-Adapter (``adapter``) daran angehängt
+    from .lora import create_lora_model
+
+    return create_lora_model(model_cfg)
+
+
+BACKENDS: Dict[str, Callable[[Dict], object]] = {
+    "hf": _hf_backend,
+    "tiny": TinyCausalLM,
+    "rule": RuleSimplifier,
+}
+
+
+def register_backend(name: str, factory: Callable[[Dict], object]):
+    """Registriert ein weiteres Backend (Factory: Modell-Konfiguration → Adapter)"""
+    BACKENDS[name] = factory
+
+
+def create_adapter(model_cfg: Dict, backend: Optional[str] = None):
+    """Erzeugt den Adapter gemäß ``backend`` der Modell-Konfiguration (default: hf)
+
+    Mit ``workers: {n, threads, pin}`` (n > 1) generieren n Worker-Prozesse
+    mit je eigenem Modell und fest zugeordneten CPU-Kernen.
+    """
+    if int((model_cfg.get("workers") or {}).get("n", 1)) > 1:
+        from .worker_pool import create_worker_pool
+
+        return create_worker_pool({**model_cfg, "backend": backend or model_cfg.get("backend")})
+    name = backend or model_cfg.get("backend") or "hf"
+    factory = BACKENDS.get(name)
+    if factory is None:
+        raise ValueError(
+            f"Unbekanntes Backend '{name}' für {model_cfg.get('model_id')} "
+            f"(verfügbar: {', '.join(sorted(BACKENDS))})"
+        )
+    logger.debug(f"Backend {name} für {model_cfg['model_id']}")
+    return factory(model_cfg)
@@ -0,0 +1,213 @@
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .logging_config import get_logger
+from .profiling import current_rss_bytes
+
+logger = get_logger("batching")
+
+BATCH_STATE_FILE = "batch_sizes.json"
+DEFAULT_MAX_BATCH_SIZE = 64
+
+
+class OutOfMemoryError(RuntimeError):
+    """Generation mangels (GPU- oder Haupt-)Speicher fehlgeschlagen; kleinerer Batch kann helfen"""
+
+
+def is_oom_error(exc: BaseException) -> bool:
+    """Erkennt Speicherfehler, auch wenn sie als RuntimeError mit Meldung ankommen"""
+    if isinstance(exc, (OutOfMemoryError, MemoryError)):
+        return True
+    message = str(exc).lower()
+    return "out of memory" in message or "not enough memory" in message
+
+
+def hardware_key() -> str:
+    """Kennung der Hardware, für die eine gelernte Batch-Größe gilt"""
+    parts = [platform.machine() or "unknown", f"{os.cpu_count()}cpu"]
+    try:
+        total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        parts.append(f"{round(total / 2**30)}GiB")
+    except (ValueError, OSError, AttributeError):
+        pass
+    # torch nur abfragen, wenn es ohnehin schon geladen ist
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        parts.append(torch.cuda.get_device_name(0).replace(" ", "_"))
+    return "-".join(parts)
+
+
+class BatchSizeStore:
+    """Gelernte Batch-Größen pro Modell und Hardware in einer JSON-Datei"""
+
+    def __init__(self, path: str, hardware: Optional[str] = None):
+        self.path = path
+        self.hardware = hardware or hardware_key()
+
+    def _key(self, model_id: str) -> str:
+        return f"{model_id}@{self.hardware}"
+
+    def _read(self) -> Dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Batch-Größen nicht lesbar ({self.path}): {e}")
+            return {}
+
+    def get(self, model_id: str) -> Optional[Dict]:
+        return self._read().get(self._key(model_id))
+
+    def set(self, model_id: str, batch_size: int, smallest_failed: Optional[int]):
+        state = self._read()
+        state[self._key(model_id)] = {
+            "batch_size": batch_size,
+            "smallest_failed": smallest_failed,
+            "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class AdaptiveBatcher:
+    """Bearbeitet Elemente in Batches und passt die Batch-Größe an
+
+    Schlägt ein Batch mit einem Speicherfehler fehl, wird derselbe Batch mit der
+    größten bisher erfolgreichen (sonst der halben) Größe erneut versucht; die
+    fehlgeschlagene Größe gilt danach als Obergrenze. Andere Fehler in einem Batch
+    führen zu Einzelversuchen, damit ein defektes Beispiel nicht den ganzen Batch
+    kostet. Mit ``adaptive=True`` wird die Größe nach jedem erfolgreichen Batch
+    verdoppelt bzw. zwischen erfolgreicher und fehlgeschlagener Größe halbiert,
+    solange sie unter ``max_batch_size`` und dem Speicherbudget (RSS des
+    Prozesses) bleibt; die gelernte Größe wird bei jeder Änderung in ``store``
+    gespeichert, damit spätere Läufe direkt mit ihr beginnen – auch wenn der
+    Prozess wegen Speichermangels abbricht.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        batch_size: int = 1,
+        adaptive: bool = False,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        memory_budget_bytes: Optional[int] = None,
+        store: Optional[BatchSizeStore] = None,
+        rss_fn: Callable[[], Optional[int]] = current_rss_bytes,
+    ):
+        self.model_id = model_id
+        self.adaptive = adaptive
+        self.max_batch_size = max(1, max_batch_size)
+        self.memory_budget_bytes = memory_budget_bytes
+        self.store = store if adaptive else None
+        self.rss_fn = rss_fn
+        self.size = max(1, batch_size)
+        self.smallest_failed: Optional[int] = None
+        self.largest_ok: Optional[int] = None
+        self.bytes_per_item: Optional[float] = None
+        self.backoffs = 0
+
+        learned = self.store.get(model_id) if self.store else None
+        if learned:
+            self.size = max(1, int(learned["batch_size"]))
+            self.smallest_failed = learned.get("smallest_failed")
+            logger.info(f"Gelernte Batch-Größe für {model_id}: {self.size}")
+        self.size = min(self.size, self.max_batch_size)
+        self._stored = (self.size, self.smallest_failed) if learned else None
+
+    def _persist(self):
+        """Speichert Größe und kleinste fehlgeschlagene Größe, sobald sie sich ändern"""
+        state = (self.size, self.smallest_failed)
+        if self.store is None or state == self._stored:
+            return
+        self.store.set(self.model_id, self.size, self.smallest_failed)
+        self._stored = state
+
+    def _fits(self, n: int) -> bool:
+        """Schätzt, ob ein Batch der Größe n ins Speicherbudget passt"""
+        if self.memory_budget_bytes is None or self.bytes_per_item is None:
+            return True
+        rss = self.rss_fn()
+        return rss is None or rss + n * self.bytes_per_item <= self.memory_budget_bytes
+
+    def _back_off(self, n: int, reason: str):
+        self.smallest_failed = n if self.smallest_failed is None else min(self.smallest_failed, n)
+        if self.largest_ok is not None and self.largest_ok >= n:
+            # Umgebung hat sich geändert (z. B. weniger freier Speicher)
+            self.largest_ok = None
+        self.size = self.largest_ok or max(1, n // 2)
+        self.backoffs += 1
+        logger.warning(f"{reason} bei Batch-Größe {n} ({self.model_id}), verkleinere auf {self.size}")
+        self._persist()
+
+    def _observe(self, n: int, rss_before: Optional[int]):
+        """Speicherbedarf pro Element lernen, bei Überschreitung des Budgets verkleinern"""
+        rss_after = self.rss_fn()
+        if rss_before is not None and rss_after is not None:
+            per_item = max(0, rss_after - rss_before) / n
+            self.bytes_per_item = max(self.bytes_per_item or 0.0, per_item)
+        if (
+            self.memory_budget_bytes is not None
+            and rss_after is not None
+            and rss_after > self.memory_budget_bytes
+            and n > 1
+        ):
+            self._back_off(n, "Speicherbudget überschritten")
+            return
+        self.largest_ok = max(self.largest_ok or 0, n)
+        if not self.adaptive or n < self.size:
+            return
+        grown = self.size * 2
+        if self.smallest_failed is not None:
+            # Zwischen erfolgreicher und fehlgeschlagener Größe halbieren
+            grown = min(grown, (self.size + self.smallest_failed) // 2)
+        grown = min(grown, self.max_batch_size)
+        if grown > self.size and self._fits(grown):
+            logger.debug(f"Batch-Größe {self.model_id}: {self.size} → {grown}")
+            self.size = grown
+            self._persist()
+
+    def process(
+        self, items: Sequence, fn: Callable[[List], List], stop: Optional[Callable[[], bool]] = None
+    ) -> Iterator[Tuple[List, Union[List, Exception]]]:
+        """Liefert (batch, ergebnisse) bzw. (batch, fehler) für nicht wiederholbare Fehler
+
+        Liefert ``stop()`` vor einem Batch ``True``, bleiben die restlichen Elemente unbearbeitet.
+        """
+        i = 0
+        while i < len(items) and not (stop and stop()):
+            n = min(self.size, len(items) - i)
+            while n > 1 and not self._fits(n):
+                n //= 2
+            batch = list(items[i : i + n])
+            rss_before = self.rss_fn()
+            try:
+                outputs = fn(batch)
+            except Exception as e:
+                if n > 1 and is_oom_error(e):
+                    self._back_off(n, "Speicherfehler")
+                    continue
+                if n > 1:
+                    # Kein Speicherproblem: Elemente einzeln versuchen
+                    logger.warning(f"Batch fehlgeschlagen ({self.model_id}): {e}; versuche einzeln")
+                    for item in batch:
+                        try:
+                            yield [item], fn([item])
+                        except Exception as single_error:
+                            yield [item], single_error
+                else:
+                    yield batch, e
+                i += n
+                continue
+            self._observe(n, rss_before)
+            yield batch, outputs
+            i += n
+        self._persist()
@@ -0,0 +1,100 @@
+import statistics
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+
+from .logging_config import get_logger
+
+logger = get_logger("budget")
+
+DEFAULT_STRAGGLER_FACTOR = 3.0
+# Erst ab so vielen Beobachtungen ist der Median als Vergleich belastbar
+MIN_OBSERVATIONS = 10
+WINDOW = 200
+
+
+class TimeBudget:
+    """Zeitbudgets der Generierung und Erkennung von Nachzüglern
+
+    ``example_seconds`` begrenzt die Generierung eines Beispiels,
+    ``batch_seconds`` die eines Batches (Standard: ``example_seconds``); beides
+    wird als ``max_time`` an den Adapter gegeben und durch die verbleibende
+    Zeit bis ``deadline_seconds`` (ab ``start()``) gedeckelt. Generate-Aufrufe,
+    die länger als ``straggler_factor`` × Median der letzten Aufrufe gleicher
+    Größe brauchen, werden als Nachzügler protokolliert.
+    """
+
+    def __init__(
+        self,
+        example_seconds: Optional[float] = None,
+        batch_seconds: Optional[float] = None,
+        deadline_seconds: Optional[float] = None,
+        straggler_factor: float = DEFAULT_STRAGGLER_FACTOR,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.example_seconds = example_seconds
+        self.batch_seconds = batch_seconds or example_seconds
+        self.deadline_seconds = deadline_seconds
+        self.straggler_factor = straggler_factor
+        self.clock = clock
+        self.deadline: Optional[float] = None
+        self.stragglers = 0
+        self.truncated = 0
+        self._recent: Dict[Tuple[str, int], deque] = {}
+
+    @classmethod
+    def from_cfg(cls, cfg: Dict) -> "TimeBudget":
+        """Budget aus ``time_budget: {example_seconds, batch_seconds, deadline_seconds, straggler_factor}``"""
+        opts = cfg.get("time_budget") or {}
+        return cls(
+            example_seconds=opts.get("example_seconds"),
+            batch_seconds=opts.get("batch_seconds"),
+            deadline_seconds=opts.get("deadline_seconds"),
+            straggler_factor=opts.get("straggler_factor", DEFAULT_STRAGGLER_FACTOR),
+        )
+
+    def start(self):
+        """Startet die Laufzeit-Deadline (einmalig; weitere Aufrufe ändern nichts)"""
+        if self.deadline_seconds and self.deadline is None:
+            self.deadline = self.clock() + self.deadline_seconds
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - self.clock())
+
+    def expired(self) -> bool:
+        return self.deadline is not None and self.clock() >= self.deadline
+
+    def max_time(self, n: int = 1) -> Optional[float]:
+        """Zeitgrenze für eine Generation von ``n`` Beispielen (``None``: unbegrenzt)"""
+        limits = [self.example_seconds if n == 1 else self.batch_seconds, self.remaining()]
+        limits = [limit for limit in limits if limit is not None]
+        return min(limits) if limits else None
+
+    def observe(self, model_id: str, example_id: str, seconds: float, n: int = 1) -> bool:
+        """Registriert die Dauer eines Generate-Aufrufs über ``n`` Beispiele; ``True`` bei einem Nachzügler
+
+        Verglichen wird nur mit Aufrufen derselben Größe: ein langsames Beispiel
+        verlängert seinen ganzen Batch und fällt so gegenüber anderen Batches auf.
+        """
+        recent = self._recent.setdefault((model_id, n), deque(maxlen=WINDOW))
+        straggler = False
+        if len(recent) >= MIN_OBSERVATIONS:
+            median = statistics.median(recent)
+            if median > 0 and seconds > self.straggler_factor * median:
+                straggler = True
+                self.stragglers += 1
+                logger.warning(
+                    f"Nachzügler: Beispiel {example_id}, Modell {model_id} brauchte {seconds:.2f}s "
+                    f"({seconds / median:.1f}x Median)"
+                )
+        recent.append(seconds)
+        return straggler
+
+    def record_truncated(self, model_id: str, example_id: str, max_time: Optional[float]):
+        self.truncated += 1
+        logger.warning(
+            f"Zeitbudget ({max_time:.1f}s) erschöpft: Ausgabe für Beispiel {example_id}, "
+            f"Modell {model_id} abgeschnitten"
+        )
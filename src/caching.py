@@ -1,10 +1,23 @@
 import os, json, hashlib
 
 
-def make_key(model_id: str, decoding: dict, prompt: str, ex_id: str) -> str:
-    payload = json.dumps(
-        {"m": model_id, "d": decoding, "p": prompt, "id": ex_id}, sort_keys=True
-    )
+def cache_variant(model_cfg: dict) -> str:
+    """Ausführungsvariante eines Modells, die die Ausgaben verändert (CPU-Modus, Kompilierung)
+
+    Leer für fp32 ohne Kompilierung, damit bestehende Cache-Einträge gültig bleiben.
+    """
+    mode = model_cfg.get("cpu_mode") or "fp32"
+    compile_mode = model_cfg.get("compile")
+    if mode == "fp32" and not compile_mode:
+        return ""
+    return mode + (f"+{compile_mode}" if compile_mode else "")
+
+
+def make_key(model_id: str, decoding: dict, prompt: str, ex_id: str, variant: str = "") -> str:
+    fields = {"m": model_id, "d": decoding, "p": prompt, "id": ex_id}
+    if variant:
+        fields["v"] = variant
+    payload = json.dumps(fields, sort_keys=True)
     return hashlib.sha1(payload.encode()).hexdigest()
 
 
@@ -0,0 +1,227 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .metrics.registry import MetricsRegistry
+from .metrics.readability_de import flesch_de, lix, wstf, basic_stats
+from .metrics.sari import sari
+from .stats import paired_tests, cohens_d, bootstrap_ci
+from .result_store import ResultStore
+from .profiling import NULL_PROFILER
+from .sampling import mean_metrics
+
+# Richtung der Registry-Metriken: was als "besser" gilt (nicht aufgeführte: max)
+METRIC_DIRECTIONS = {"SARI": "max", "FLESCH_DE": "max", "LIX": "min", "WSTF": "min"}
+
+BASIC_STAT_NAMES = [
+    "avg_sentence_length",
+    "avg_word_length",
+    "complex_word_ratio",
+    "sentence_count",
+    "word_count",
+    "character_count",
+]
+
+
+def default_registry() -> MetricsRegistry:
+    """Registry mit den Standard-Metriken der Harness"""
+    reg = MetricsRegistry()
+    reg.register("SARI", lambda src, hyp, refs: sari(src, hyp, refs))
+    reg.register("FLESCH_DE", lambda src, hyp, refs: flesch_de(hyp))
+    reg.register("LIX", lambda src, hyp, refs: lix(hyp))
+    reg.register("WSTF", lambda src, hyp, refs: wstf(hyp))
+    return reg
+
+
+def score_row(reg: MetricsRegistry, row: Dict) -> Dict:
+    """Registry-Metriken und Basisstatistiken für ein einzelnes Ergebnis"""
+    return {
+        **reg.compute_all(row["source"], row["hyp"], row["refs"]),
+        **basic_stats(row["hyp"]),
+    }
+
+
+def score_samples(reg: MetricsRegistry, row: Dict) -> Tuple[Dict, List[Dict]]:
+    """Metriken pro Stichprobe (``row["samples"]``) und ihr Mittel pro Metrik"""
+    sample_metrics = [score_row(reg, {**row, "hyp": hyp}) for hyp in row["samples"]]
+    return mean_metrics(sample_metrics), sample_metrics
+
+
+def compute_metrics(
+    results: Dict[str, List[Dict]], reg: MetricsRegistry, metric_names: Optional[List[str]] = None
+) -> ResultStore:
+    """Berechnet Registry-Metriken und Basisstatistiken pro Modell und Beispiel
+
+    Bereits berechnete Werte (``row["metrics"]``, z.B. aus dem Journal oder
+    aus Shards) werden übernommen statt neu berechnet. ``metric_names``
+    ersetzt die Spalten des Stores (z. B. REF_NLL/REF_PPL im Referenz-Modus).
+    """
+    model_ids = list(results.keys())
+    example_ids = [r["id"] for r in results[model_ids[0]]] if model_ids else []
+    store = ResultStore(model_ids, example_ids, metric_names or reg.names() + BASIC_STAT_NAMES)
+
+    for mid, rows in results.items():
+        for pos, r in enumerate(rows):
+            metrics = r.get("metrics")
+            if not metrics and r.get("samples"):
+                # Stichproben: Mittel als Wert des Beispiels, Einzelwerte für den Report
+                metrics, r["sample_metrics"] = score_samples(reg, r)
+            store.set_scores(mid, pos, metrics or score_row(reg, r))
+
+    return store
+
+
+def compare_models(
+    store: ResultStore, mid_a: str, mid_b: str, profiler=NULL_PROFILER
+) -> Tuple[Dict, Dict]:
+    """Statistischer Vergleich Modell A vs. B für alle Metriken des Stores"""
+    comparison_results = {}
+    summary_stats = {}
+
+    for metric_name in store.metric_names:
+        # Views auf den Store, keine Kopien
+        values_a = store.column(mid_a, metric_name)
+        values_b = store.column(mid_b, metric_name)
+        n_a = int(np.count_nonzero(~np.isnan(values_a)))
+        n_b = int(np.count_nonzero(~np.isnan(values_b)))
+
+        if n_a > 0 and n_b > 0:
+            with profiler.stage("stat_tests"):
+                # Paired Tests
+                paired_result = paired_tests(values_a, values_b)
+
+                # Cohen's d
+                effect_size = cohens_d(values_a, values_b)
+
+            # Bootstrap CI für Differenzen
+            diffs = values_b - values_a
+            finite = np.isfinite(diffs)
+            with profiler.stage("bootstrap"):
+                ci_lo, ci_hi = bootstrap_ci(diffs if finite.all() else diffs[finite])
+
+            comparison_results[metric_name] = {
+                "model_a_mean": float(np.nanmean(values_a)),
+                "model_b_mean": float(np.nanmean(values_b)),
+                "paired_t_test": paired_result,
+                "cohens_d": effect_size,
+                "bootstrap_ci": [ci_lo, ci_hi],
+                "n_samples": n_a,
+            }
+
+            summary_stats[metric_name] = {
+                "model_a": mid_a,
+                "model_b": mid_b,
+                "mean_difference": comparison_results[metric_name]["model_b_mean"]
+                - comparison_results[metric_name]["model_a_mean"],
+                "p_value": paired_result["tp"],
+                "significant": (
+                    paired_result["tp"] < 0.05
+                    if not np.isnan(paired_result["tp"])
+                    else False
+                ),
+                "effect_size": effect_size,
+            }
+
+    return comparison_results, summary_stats
+
+
+def build_summary(
+    task_name: str,
+    mid_a: str,
+    mid_b: str,
+    n_examples: int,
+    comparison_results: Dict,
+    summary_stats: Dict,
+    lower_is_better: Iterable[str] = (),
+) -> Dict:
+    """Erstellt die Zusammenfassung für Report und JSON-Ausgabe
+
+    Für Metriken in ``lower_is_better`` (z. B. REF_NLL) ist eine negative
+    Differenz eine Verbesserung.
+    """
+    lower_is_better = [m for m in lower_is_better if m in comparison_results]
+
+    def gain(metric: str, stats: Dict) -> float:
+        return -stats["mean_difference"] if metric in lower_is_better else stats["mean_difference"]
+
+    summary = {
+        "task": task_name,
+        "models_compared": [mid_a, mid_b],
+        "n_examples": n_examples,
+        "metrics_evaluated": list(comparison_results.keys()),
+        "significant_improvements": [
+            m
+            for m, stats in summary_stats.items()
+            if stats["significant"] and gain(m, stats) > 0
+        ],
+        "significant_degradations": [
+            m
+            for m, stats in summary_stats.items()
+            if stats["significant"] and gain(m, stats) < 0
+        ],
+    }
+    if lower_is_better:
+        summary["lower_is_better"] = lower_is_better
+    return summary
+
+
+def write_detailed_results(
+    output_dir: str,
+    summary: Dict,
+    comparison_results: Dict,
+    store: ResultStore,
+    plot_paths: List[str],
+    args: Dict,
+) -> str:
+    """Speichert alle Ergebnisse als detailed_results.json"""
+    results_path = os.path.join(output_dir, "detailed_results.json")
+    with open(results_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "summary": summary,
+                "detailed_comparisons": comparison_results,
+                "per_model_metrics": store.to_lists(),
+                "statlog_data": store.statlog(),
+                "plot_paths": plot_paths,
+                "evaluation_time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "args": args,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+            default=str,
+        )
+    return results_path
+
+
+def log_summary(logger, summary: Dict, summary_stats: Dict):
+    """Gibt die Zusammenfassung der signifikanten Unterschiede aus"""
+    mid_a, mid_b = summary["models_compared"]
+    logger.info("=" * 60)
+    logger.info("📊 EVALUATION ZUSAMMENFASSUNG")
+    logger.info("=" * 60)
+    logger.info(f"Task: {summary['task']}")
+    logger.info(f"Modelle: {mid_a} vs {mid_b}")
+    logger.info(f"Beispiele: {summary['n_examples']}")
+    logger.info(f"Metriken: {len(summary['metrics_evaluated'])}")
+
+    if summary["significant_improvements"]:
+        logger.info("\n✅ SIGNIFIKANTE VERBESSERUNGEN:")
+        for metric in summary["significant_improvements"]:
+            diff = summary_stats[metric]["mean_difference"]
+            p_val = summary_stats[metric]["p_value"]
+            logger.info(f"  {metric}: {diff:+.3f} (p={p_val:.4f})")
+    else:
+        logger.info("\n✅ Keine signifikanten Verbesserungen")
+
+    if summary["significant_degradations"]:
+        logger.info("\n❌ SIGNIFIKANTE VERSCHLECHTERUNGEN:")
+        for metric in summary["significant_degradations"]:
+            diff = summary_stats[metric]["mean_difference"]
+            p_val = summary_stats[metric]["p_value"]
+            logger.info(f"  {metric}: {diff:+.3f} (p={p_val:.4f})")
+    else:
+        logger.info("\n❌ Keine signifikanten Verschlechterungen")
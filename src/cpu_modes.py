@@ -0,0 +1,204 @@
+import hashlib
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .caching import cache_variant
+from .decoding import get_decoding
+from .generation import build_prompt
+from .logging_config import get_logger
+
+logger = get_logger("cpu_modes")
+
+CPU_MODES = ("fp32", "int8", "bf16")
+COMPILE_MODES = ("torch", "onnx")
+DEFAULT_ONNX_DIR = os.path.join(".cache", "onnx")
+
+
+def cpu_supports_bf16() -> bool:
+    """bf16-Rechenwerke (AVX512-BF16 oder AMX) laut /proc/cpuinfo"""
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def resolve_cpu_mode(mode: Optional[str]) -> str:
+    """Prüft den CPU-Modus; bf16 fällt ohne Hardware-Unterstützung auf fp32 zurück"""
+    mode = mode or "fp32"
+    if mode not in CPU_MODES:
+        raise ValueError(f"Unbekannter CPU-Modus: {mode} (verfügbar: {', '.join(CPU_MODES)})")
+    if mode == "bf16" and not cpu_supports_bf16():
+        logger.warning("CPU ohne bf16-Unterstützung (avx512_bf16/amx_bf16), verwende fp32")
+        return "fp32"
+    return mode
+
+
+def apply_cpu_mode(model, mode: str):
+    """int8: dynamische Quantisierung aller Linear-Layer; bf16: Gewichte in bfloat16"""
+    import torch
+
+    if mode == "int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif mode == "bf16":
+        model = model.to(torch.bfloat16)
+    return model
+
+
+def compile_model(model):
+    """torch.compile des Forward-Passes (dynamische Formen wegen wachsender Sequenzen)"""
+    import torch
+
+    model.forward = torch.compile(model.forward, dynamic=True)
+    return model
+
+
+def model_hash(model_id: str) -> str:
+    """Kennung der Modellgewichte: Hub-Revision oder Dateistand eines lokalen Verzeichnisses"""
+    if os.path.isdir(model_id):
+        parts = [
+            f"{name}:{os.path.getsize(os.path.join(model_id, name))}:{int(os.path.getmtime(os.path.join(model_id, name)))}"
+            for name in sorted(os.listdir(model_id))
+            if name.endswith((".safetensors", ".bin", ".json"))
+        ]
+    else:
+        from transformers import AutoConfig
+
+        config = AutoConfig.from_pretrained(model_id)
+        parts = [model_id, str(getattr(config, "_commit_hash", None))]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def load_onnx_model(model_id: str, onnx_dir: Optional[str] = None):
+    """ONNX-Runtime-Modell; der Export wird pro Modell-Hash auf der Platte zwischengespeichert"""
+    from optimum.onnxruntime import ORTModelForCausalLM
+
+    path = os.path.join(onnx_dir or DEFAULT_ONNX_DIR, model_hash(model_id))
+    if os.path.exists(os.path.join(path, "config.json")):
+        logger.info(f"Lade ONNX-Export aus dem Cache: {path}")
+        return ORTModelForCausalLM.from_pretrained(path), path
+
+    logger.info(f"Exportiere {model_id} nach ONNX (einmalig): {path}")
+    model = ORTModelForCausalLM.from_pretrained(model_id, export=True, trust_remote_code=True)
+    model.save_pretrained(path)
+    return model, path
+
+
+def parse_variant(spec: str) -> Dict:
+    """'int8', 'bf16+torch', 'onnx' → Überschreibungen der Modell-Konfiguration"""
+    variant = {"cpu_mode": "fp32", "compile": None}
+    for part in spec.split("+"):
+        if part in CPU_MODES:
+            variant["cpu_mode"] = part
+        elif part in COMPILE_MODES:
+            variant["compile"] = part
+        else:
+            raise ValueError(
+                f"Unbekannte Variante '{part}' (CPU-Modi: {', '.join(CPU_MODES)}; "
+                f"compile: {', '.join(COMPILE_MODES)})"
+            )
+    return variant
+
+
+def mode_label(model_cfg: Dict) -> str:
+    return cache_variant(model_cfg) or "fp32"
+
+
+def compare_modes(
+    model_cfg: Dict,
+    variants: List[Dict],
+    examples: List[Dict],
+    task: Dict,
+    cfg: Dict,
+    adapter_factory: Callable[[Dict], object],
+    registry,
+) -> Dict:
+    """Geschwindigkeit und Metrik-Drift von CPU-Modi gegenüber fp32 auf einer Stichprobe
+
+    ``variants`` sind Überschreibungen der Modell-Konfiguration (z. B.
+    ``{"cpu_mode": "int8"}``). Pro Variante werden Beispiele/s, Speedup,
+    Anteil identischer Hypothesen und die mittlere Metrikdifferenz zu fp32
+    berechnet. Die erste Generation jeder Variante dient als Aufwärmlauf.
+    """
+    from .comparison import score_row
+
+    decoding = get_decoding(cfg["decoding"], seed=cfg["seed"])
+    prompts = [build_prompt(task["prompt"]["template"], ex["source"]) for ex in examples]
+
+    def run(variant_cfg: Dict) -> Dict:
+        adapter = adapter_factory(variant_cfg)
+        adapter.generate(prompts[0], cfg["max_new_tokens"], decoding)
+        start = time.perf_counter()
+        hyps = [adapter.generate(p, cfg["max_new_tokens"], decoding) for p in prompts]
+        seconds = time.perf_counter() - start
+        del adapter
+        metrics = [
+            score_row(registry, {"source": ex["source"], "hyp": hyp, "refs": ex.get("refs", [])})
+            for ex, hyp in zip(examples, hyps)
+        ]
+        return {"hyps": hyps, "seconds": seconds, "metrics": metrics}
+
+    baseline_cfg = {**model_cfg, "cpu_mode": "fp32", "compile": None}
+    logger.info(f"Referenz fp32: {model_cfg['model_id']} auf {len(examples)} Beispielen")
+    baseline = run(baseline_cfg)
+    report = {
+        "model_id": model_cfg["model_id"],
+        "n_examples": len(examples),
+        "metrics": registry.names(),
+        "baseline": {
+            "mode": "fp32",
+            "seconds": round(baseline["seconds"], 3),
+            "examples_per_s": round(len(examples) / baseline["seconds"], 3),
+        },
+        "variants": [],
+    }
+
+    for overrides in variants:
+        variant_cfg = {**model_cfg, **overrides}
+        label = mode_label(variant_cfg)
+        logger.info(f"Variante {label}")
+        result = run(variant_cfg)
+        drift = {}
+        for name in baseline["metrics"][0]:
+            ref = np.array([m[name] for m in baseline["metrics"]], dtype=float)
+            cur = np.array([m[name] for m in result["metrics"]], dtype=float)
+            drift[name] = {
+                "mean_delta": round(float(np.mean(cur - ref)), 4),
+                "mean_abs_delta": round(float(np.mean(np.abs(cur - ref))), 4),
+            }
+        report["variants"].append({
+            "mode": label,
+            "seconds": round(result["seconds"], 3),
+            "examples_per_s": round(len(examples) / result["seconds"], 3),
+            "speedup": round(baseline["seconds"] / result["seconds"], 3),
+            "identical_hyps": round(
+                float(np.mean([a == b for a, b in zip(baseline["hyps"], result["hyps"])])), 4
+            ),
+            "metric_drift": drift,
+        })
+    return report
+
+
+def markdown_table(report: Dict) -> List[str]:
+    """Tabelle Modus | Beispiele/s | Speedup | identisch | mittlere Drift pro Registry-Metrik"""
+    metrics = report["metrics"]
+    lines = [
+        f"## CPU-Modi: {report['model_id']} ({report['n_examples']} Beispiele)",
+        "",
+        "| Modus | Beispiele/s | Speedup | Identische Hypothesen | "
+        + " | ".join(f"Δ {name}" for name in metrics) + " |",
+        "|---|---|---|---|" + "---|" * len(metrics),
+        f"| fp32 | {report['baseline']['examples_per_s']} | 1.00x | 100.0% | "
+        + " | ".join("–" for _ in metrics) + " |",
+    ]
+    for v in report["variants"]:
+        lines.append(
+            f"| {v['mode']} | {v['examples_per_s']} | {v['speedup']:.2f}x | {v['identical_hyps']:.1%} | "
+            + " | ".join(f"{v['metric_drift'][name]['mean_delta']:+.3f}" for name in metrics) + " |"
+        )
+    lines.append("")
+    return lines
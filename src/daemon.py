@@ -0,0 +1,367 @@
+import gc
+import json
+import logging
+import sys
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .logging_config import get_logger
+from .pipeline import EvaluationPipeline, load_adapter, load_yaml
+from .tasks import read_id_list
+
+logger = get_logger("daemon")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def estimate_adapter_bytes(adapter) -> int:
+    """Schätzt den Speicherbedarf eines Adapters über Parameter und Buffer"""
+    memory_bytes = getattr(adapter, "memory_bytes", None)
+    if callable(memory_bytes):
+        return int(memory_bytes())
+    model = getattr(adapter, "model", None)
+    if model is None or not hasattr(model, "parameters"):
+        return 0
+    total = sum(p.numel() * p.element_size() for p in model.parameters())
+    if hasattr(model, "buffers"):
+        total += sum(b.numel() * b.element_size() for b in model.buffers())
+    return int(total)
+
+
+def pool_key(model_cfg: Dict) -> str:
+    """Schlüssel im Pool: die ganze Modell-Konfiguration (cpu_mode, compile, adapter, ...), kanonisch serialisiert"""
+    return json.dumps(model_cfg, sort_keys=True, default=str)
+
+
+def _release_memory():
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+class ModelPool:
+    """Hält geladene Adapter mit LRU-Entladung unter einem Speicherbudget
+
+    Nach jedem Laden werden die am längsten ungenutzten Modelle entladen, bis
+    das Budget wieder eingehalten wird. Modelle in ``pinned`` (z. B. die des
+    laufenden Jobs) werden dabei nie entladen. Adapter sind nach der ganzen
+    Modell-Konfiguration geschlüsselt: dieselbe ``model_id`` mit anderem
+    ``cpu_mode`` oder LoRA-Adapter ist ein eigener Eintrag.
+    """
+
+    def __init__(
+        self,
+        memory_budget_bytes: Optional[int] = None,
+        adapter_factory: Optional[Callable[[Dict], object]] = None,
+        size_fn: Callable[[object], int] = estimate_adapter_bytes,
+    ):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.adapter_factory = adapter_factory or load_adapter
+        self.size_fn = size_fn
+        # pool_key → Adapter, Speicherbedarf und model_id
+        self._adapters: "OrderedDict[str, object]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._model_ids: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.evictions = 0
+
+    def __contains__(self, model_id: str) -> bool:
+        return model_id in self._model_ids.values()
+
+    def loaded(self) -> List[str]:
+        """Geladene Modelle, zuletzt benutztes zuletzt"""
+        with self._lock:
+            return [self._model_ids[key] for key in self._adapters]
+
+    @property
+    def used_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def get(self, model_cfg: Dict, pinned: Iterable[str] = ()):
+        """Liefert den Adapter für ``model_cfg`` und lädt ihn bei Bedarf"""
+        model_id = model_cfg["model_id"]
+        key = pool_key(model_cfg)
+        with self._lock:
+            if key in self._adapters:
+                self._adapters.move_to_end(key)
+                logger.debug(f"Modell aus Pool: {model_id}")
+                return self._adapters[key]
+
+            start = time.time()
+            adapter = self.adapter_factory(model_cfg)
+            self._adapters[key] = adapter
+            self._sizes[key] = self.size_fn(adapter)
+            self._model_ids[key] = model_id
+            self.loads += 1
+            logger.info(
+                f"Modell in Pool geladen: {model_id} "
+                f"({self._sizes[key] / 1e9:.2f} GB, {time.time() - start:.1f}s)"
+            )
+            pinned = set(pinned)
+            self._evict(keep={k for k, mid in self._model_ids.items() if mid in pinned} | {key})
+            return adapter
+
+    def unload(self, key: str) -> bool:
+        """Entlädt den Eintrag ``key`` (siehe ``pool_key``)"""
+        with self._lock:
+            if key not in self._adapters:
+                return False
+            del self._adapters[key]
+            self._sizes.pop(key, None)
+            model_id = self._model_ids.pop(key, key)
+            self.evictions += 1
+            logger.info(f"Modell entladen: {model_id}")
+        _release_memory()
+        with self._lock:
+            # Geteilte Basisgewichte (LoRA) gehen auf eine verbleibende Sicht über
+            self._sizes = {k: self.size_fn(adapter) for k, adapter in self._adapters.items()}
+        return True
+
+    def _evict(self, keep: set):
+        if self.memory_budget_bytes is None:
+            return
+        for key in list(self._adapters):
+            if self.used_bytes <= self.memory_budget_bytes:
+                return
+            if key not in keep:
+                self.unload(key)
+        if self.used_bytes > self.memory_budget_bytes:
+            logger.warning(
+                f"Speicherbudget überschritten: {self.used_bytes / 1e9:.2f} GB "
+                f"> {self.memory_budget_bytes / 1e9:.2f} GB (alle Modelle im laufenden Job benötigt)"
+            )
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "models": [
+                    {
+                        "model_id": self._model_ids[key],
+                        "model_cfg": json.loads(key),
+                        "bytes": self._sizes.get(key, 0),
+                    }
+                    for key in self._adapters
+                ],
+                "used_bytes": self.used_bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+def _load(value):
+    # Konfigurationen dürfen als Pfad oder bereits als Dict übergeben werden
+    return load_yaml(value) if isinstance(value, str) else value
+
+
+def run_job(pool: ModelPool, job: Dict, on_event: Callable[[Dict], None]) -> Dict:
+    """Führt einen Evaluationsjob mit den Adaptern aus dem Pool aus
+
+    Felder von ``job``: task, config, models (Pfade oder Dicts), optional ids,
+    max_samples, output, plots, use_cache, results_format, resume.
+    """
+    task = _load(job["task"])
+    cfg = dict(_load(job["config"]))
+    model_cfgs = [_load(m) for m in job["models"]]
+    if job.get("output"):
+        cfg["output_dir"] = job["output"]
+    if job.get("max_samples"):
+        cfg["max_samples"] = job["max_samples"]
+
+    model_ids = [mc["model_id"] for mc in model_cfgs]
+    pipeline = EvaluationPipeline(
+        task,
+        cfg,
+        model_cfgs,
+        adapter_factory=lambda mc: pool.get(mc, pinned=model_ids),
+        use_cache=job.get("use_cache", True),
+        results_format=job.get("results_format"),
+        run_args={"daemon_job": job},
+        on_progress=lambda stage, done, total: on_event(
+            {"event": "progress", "stage": stage, "done": done, "total": total}
+        ),
+    )
+    ids = read_id_list(job["ids"]) if job.get("ids") else None
+    paths = pipeline.run(ids=ids, resume=job.get("resume", False), plots=job.get("plots", True))
+    return {"paths": paths, "summary": pipeline.summary, "summary_stats": pipeline.summary_stats}
+
+
+class _EventLogHandler(logging.Handler):
+    """Leitet Log-Einträge des Job-Threads als Ereignisse an den Client weiter"""
+
+    def __init__(self, on_event: Callable[[Dict], None]):
+        super().__init__(logging.INFO)
+        self.on_event = on_event
+        self.thread_id = threading.get_ident()
+
+    def emit(self, record):
+        if record.thread != self.thread_id:
+            return
+        self.on_event({"event": "log", "level": record.levelname, "message": record.getMessage()})
+
+
+class _DaemonHandler(BaseHTTPRequestHandler):
+    server_version = "EvalDaemon/1.0"
+
+    def log_message(self, fmt, *args):
+        logger.debug("HTTP " + fmt % args)
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("", "/status"):
+            self._send_json(200, self.server.daemon.status())
+        else:
+            self._send_json(404, {"error": f"Unbekannter Pfad: {self.path}"})
+
+    def do_POST(self):
+        daemon = self.server.daemon
+        if self.path == "/shutdown":
+            self._send_json(200, {"status": "stopping"})
+            threading.Thread(target=daemon.shutdown, daemon=True).start()
+            return
+        if self.path != "/jobs":
+            self._send_json(404, {"error": f"Unbekannter Pfad: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = json.loads(self.rfile.read(length) or b"{}")
+            missing = [k for k in ("task", "config", "models") if not job.get(k)]
+            if missing:
+                raise ValueError(f"Fehlende Felder: {', '.join(missing)}")
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        # Antwort als JSON-Lines-Stream; das Ende markiert der Verbindungsabbau
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        client = {"connected": True}
+
+        def on_event(event: Dict):
+            if not client["connected"]:
+                return
+            try:
+                self.wfile.write((json.dumps(event, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            except OSError:
+                # Client weg: Job läuft weiter, Ergebnisse landen trotzdem im Cache
+                client["connected"] = False
+
+        daemon.submit(job, on_event)
+
+
+class EvalDaemon:
+    """Langlebiger lokaler Evaluationsdienst über HTTP auf localhost
+
+    ``POST /jobs`` nimmt einen Job entgegen und streamt Fortschritt als JSON-Lines,
+    ``GET /status`` liefert den Pool-Zustand, ``POST /shutdown`` beendet den Dienst.
+    Jobs laufen nacheinander, da sie sich die Modelle im Pool teilen.
+    """
+
+    def __init__(self, pool: ModelPool, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.pool = pool
+        self.httpd = ThreadingHTTPServer((host, port), _DaemonHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.daemon = self
+        self._job_lock = threading.Lock()
+        self.started = time.time()
+        self.jobs_done = 0
+        self.jobs_failed = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def status(self) -> Dict:
+        return {
+            "status": "ok",
+            "busy": self._job_lock.locked(),
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "jobs_done": self.jobs_done,
+            "jobs_failed": self.jobs_failed,
+            "pool": self.pool.status(),
+        }
+
+    def submit(self, job: Dict, on_event: Callable[[Dict], None]):
+        if self._job_lock.locked():
+            on_event({"event": "queued"})
+        with self._job_lock:
+            on_event({"event": "started", "loaded_models": self.pool.loaded()})
+            handler = _EventLogHandler(on_event)
+            harness_logger = get_logger()
+            harness_logger.addHandler(handler)
+            start = time.time()
+            try:
+                result = run_job(self.pool, job, on_event)
+                self.jobs_done += 1
+                on_event({"event": "done", "seconds": round(time.time() - start, 2), **result})
+            except Exception as e:
+                self.jobs_failed += 1
+                logger.error(f"Job fehlgeschlagen: {e}")
+                on_event({"event": "error", "message": str(e)})
+            finally:
+                harness_logger.removeHandler(handler)
+
+    def serve_forever(self):
+        logger.info(f"Evaluationsdienst läuft auf {self.url}")
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        logger.info("Evaluationsdienst beendet")
+
+
+# ----------------------------------------------------------------------
+# Client
+# ----------------------------------------------------------------------
+def submit_job(url: str, job: Dict, on_event: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Sendet einen Job an den Dienst und liefert das abschließende Ereignis"""
+    request = urllib.request.Request(
+        url.rstrip("/") + "/jobs",
+        data=json.dumps(job).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    final = {"event": "error", "message": "Verbindung ohne Ergebnis beendet"}
+    with urllib.request.urlopen(request) as response:
+        for line in response:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if on_event is not None:
+                on_event(event)
+            if event["event"] in ("done", "error"):
+                final = event
+    return final
+
+
+def _request_json(url: str, method: str = "GET", timeout: float = 10.0) -> Dict:
+    request = urllib.request.Request(url, data=b"" if method == "POST" else None, method=method)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def daemon_status(url: str) -> Dict:
+    return _request_json(url.rstrip("/") + "/status")
+
+
+def stop_daemon(url: str) -> Dict:
+    return _request_json(url.rstrip("/") + "/shutdown", method="POST")
@@ -0,0 +1,338 @@
+import time
+from typing import Dict, List, Optional
+
+from .budget import TimeBudget
+from .caching import make_key, get as cache_get, put as cache_put
+from .decoding import get_decoding
+from .logging_config import get_logger
+from .profiling import NULL_PROFILER
+from .sampling import num_samples, sample_decoding
+from .telemetry import NULL_TELEMETRY
+
+logger = get_logger("generation")
+
+
+def build_prompt(template: str, source: str) -> str:
+    return template.format(source=source)
+
+
+def cache_key(model_id: str, ex: Dict, task: Dict, cfg: Dict, variant: str = "") -> str:
+    """Cache-Key eines (Modell, Beispiel)-Paares; ``variant`` siehe ``caching.cache_variant``"""
+    prompt = build_prompt(task["prompt"]["template"], ex["source"])
+    decoding = get_decoding(cfg["decoding"], seed=cfg["seed"])
+    return make_key(model_id, sample_decoding(decoding, 0), prompt, ex["id"], variant)
+
+
+def cached_row(
+    cache_dir: str, model_id: str, ex: Dict, task: Dict, cfg: Dict, variant: str = ""
+) -> Optional[Dict]:
+    """Ergebnis aus dem Cache, bei ``num_samples`` mit allen Stichproben (``None``, falls unvollständig)"""
+    prompt = build_prompt(task["prompt"]["template"], ex["source"])
+    decoding = get_decoding(cfg["decoding"], seed=cfg["seed"])
+    rows = [
+        cache_get(cache_dir, make_key(model_id, sample_decoding(decoding, k), prompt, ex["id"], variant))
+        for k in range(num_samples(decoding))
+    ]
+    if any(row is None for row in rows):
+        return None
+    if len(rows) == 1:
+        return rows[0]
+    return {**rows[0], "samples": [row["hyp"] for row in rows]}
+
+
+def with_time_limit(decoding: Dict, max_time: Optional[float]) -> Dict:
+    """Decoding für den Adapter, ergänzt um ``max_time`` (nicht Teil des Cache-Keys)"""
+    return {**decoding, "max_time": max_time} if max_time else decoding
+
+
+def failed_row(ex: Dict) -> Dict:
+    """Dummy-Eintrag für eine fehlgeschlagene Generation"""
+    return {"id": ex["id"], "source": ex["source"], "hyp": "", "refs": ex.get("refs", [])}
+
+
+def generate_cached(
+    adapter,
+    model_id: str,
+    ex: Dict,
+    task: Dict,
+    cfg: Dict,
+    use_cache: bool = True,
+    profiler=NULL_PROFILER,
+    telemetry=NULL_TELEMETRY,
+    budget: Optional[TimeBudget] = None,
+    variant: str = "",
+) -> Dict:
+    """Generiert die Hypothese für ein Beispiel, mit Cache-Lookup und -Speicherung
+
+    Mit ``budget`` wird die Generation zeitlich begrenzt; abgeschnittene
+    Ausgaben werden mit ``truncated`` markiert und nicht gecacht. ``variant``
+    (CPU-Modus/Kompilierung des Modells) ist Teil des Cache-Keys.
+    """
+    prompt = build_prompt(task["prompt"]["template"], ex["source"])
+    decoding = get_decoding(cfg["decoding"], seed=cfg["seed"])
+    if num_samples(decoding) > 1:
+        return generate_samples_cached(
+            adapter, model_id, ex, task, cfg, use_cache, profiler, telemetry, budget, variant
+        )
+    key = make_key(model_id, sample_decoding(decoding, 0), prompt, ex["id"], variant)
+    task_name = task.get("task_name")
+
+    # Cache prüfen (außer wenn --no-cache gesetzt)
+    cached: Optional[Dict] = None
+    if use_cache:
+        with profiler.stage("cache_io"):
+            cached = cache_get(cfg["cache_dir"], key)
+
+    if cached is None:
+        logger.debug(f"Generiere für {model_id}, Beispiel {ex['id']}")
+        profiler.count("cache_miss" if use_cache else "cache_bypass")
+        if use_cache:
+            telemetry.record_cache(model_id, hit=False, task=task_name)
+        max_time = budget.max_time(1) if budget else None
+        start = time.perf_counter()
+        hyp = adapter.generate(prompt, cfg["max_new_tokens"], with_time_limit(decoding, max_time))
+        seconds = time.perf_counter() - start
+        # Adapter können Token-Zahlen der letzten Generation bereitstellen
+        stats = getattr(adapter, "last_stats", None) or {}
+        telemetry.record_generation(
+            model_id, seconds, stats.get("completion_tokens"), task=task_name
+        )
+        profiler.record_generation(
+            model_id,
+            seconds,
+            stats.get("prompt_tokens"),
+            stats.get("completion_tokens"),
+            stats.get("tokenize_seconds"),
+        )
+        if "draft_proposed" in stats:
+            profiler.record_draft(model_id, stats)
+        cached = {"id": ex["id"], "source": ex["source"], "hyp": hyp, "refs": ex.get("refs", [])}
+        if budget:
+            budget.observe(model_id, ex["id"], seconds)
+            if stats.get("truncated"):
+                budget.record_truncated(model_id, ex["id"], max_time)
+                profiler.count("truncated")
+                cached["truncated"] = True
+
+        # Cache speichern (außer wenn --no-cache gesetzt oder abgeschnitten)
+        if use_cache and not cached.get("truncated"):
+            with profiler.stage("cache_io"):
+                cache_put(cfg["cache_dir"], key, cached)
+    else:
+        logger.debug(f"Cache-Hit für {model_id}, Beispiel {ex['id']}")
+        profiler.count("cache_hit")
+        telemetry.record_cache(model_id, hit=True, task=task_name)
+
+    return cached
+
+
+def generate_samples_cached(
+    adapter,
+    model_id: str,
+    ex: Dict,
+    task: Dict,
+    cfg: Dict,
+    use_cache: bool = True,
+    profiler=NULL_PROFILER,
+    telemetry=NULL_TELEMETRY,
+    budget: Optional[TimeBudget] = None,
+    variant: str = "",
+) -> Dict:
+    """K Stichproben (``num_samples``) für ein Beispiel, jede unter eigenem Cache-Key
+
+    Fehlende Stichproben entstehen in einem Aufruf von ``generate_samples``
+    (ein Prefill für alle); ``hyp`` ist Stichprobe 0, ``samples`` enthält alle.
+    """
+    prompt = build_prompt(task["prompt"]["template"], ex["source"])
+    decoding = get_decoding(cfg["decoding"], seed=cfg["seed"])
+    task_name = task.get("task_name")
+    k = num_samples(decoding)
+    keys = [make_key(model_id, sample_decoding(decoding, i), prompt, ex["id"], variant) for i in range(k)]
+
+    rows: List[Optional[Dict]] = [None] * k
+    if use_cache:
+        with profiler.stage("cache_io"):
+            rows = [cache_get(cfg["cache_dir"], key) for key in keys]
+    for row in rows:
+        if row is not None:
+            profiler.count("cache_hit")
+            telemetry.record_cache(model_id, hit=True, task=task_name)
+
+    missing = [i for i, row in enumerate(rows) if row is None]
+    if missing:
+        logger.debug(f"Generiere {len(missing)} Stichproben für {model_id}, Beispiel {ex['id']}")
+        profiler.count("cache_miss" if use_cache else "cache_bypass", len(missing))
+        max_time = budget.max_time(1) if budget else None
+        run_decoding = with_time_limit(decoding, max_time)
+        start = time.perf_counter()
+        if hasattr(adapter, "generate_samples"):
+            hyps = adapter.generate_samples(prompt, cfg["max_new_tokens"], run_decoding, len(missing))
+            stats = getattr(adapter, "last_stats", None) or {}
+            items = stats.get("items") or [{}] * len(missing)
+        else:
+            hyps, items = [], []
+            for _ in missing:
+                hyps.append(adapter.generate(prompt, cfg["max_new_tokens"], run_decoding))
+                items.append(dict(getattr(adapter, "last_stats", None) or {}))
+        elapsed = time.perf_counter() - start
+        seconds = elapsed / len(missing)
+        if budget:
+            budget.observe(model_id, ex["id"], elapsed)
+
+        for i, hyp, item in zip(missing, hyps, items):
+            if use_cache:
+                telemetry.record_cache(model_id, hit=False, task=task_name)
+            telemetry.record_generation(model_id, seconds, item.get("completion_tokens"), task=task_name)
+            profiler.record_generation(
+                model_id, seconds, item.get("prompt_tokens"), item.get("completion_tokens")
+            )
+            rows[i] = {"id": ex["id"], "source": ex["source"], "hyp": hyp, "refs": ex.get("refs", [])}
+            if budget and item.get("truncated"):
+                budget.record_truncated(model_id, f"{ex['id']} (Stichprobe {i})", max_time)
+                profiler.count("truncated")
+                rows[i]["truncated"] = True
+            elif use_cache:
+                with profiler.stage("cache_io"):
+                    cache_put(cfg["cache_dir"], keys[i], rows[i])
+
+    result = {**rows[0], "samples": [row["hyp"] for row in rows]}
+    if any(row.get("truncated") for row in rows):
+        result["truncated"] = True
+    return result
+
+
+def generate_cached_batch(
+    adapter,
+    model_id: str,
+    examples: List[Dict],
+    task: Dict,
+    cfg: Dict,
+    use_cache: bool = True,
+    profiler=NULL_PROFILER,
+    telemetry=NULL_TELEMETRY,
+    budget: Optional[TimeBudget] = None,
+    variant: str = "",
+) -> List[Dict]:
+    """Wie generate_cached für mehrere Beispiele; Cache-Fehlschläge in einem Aufruf von ``generate_batch``"""
+    # Mit num_samples erzeugt jedes Beispiel seine Stichproben in einem eigenen Aufruf
+    if (
+        len(examples) == 1
+        or not hasattr(adapter, "generate_batch")
+        or num_samples(get_decoding(cfg["decoding"], seed=cfg["seed"])) > 1
+    ):
+        return [
+            generate_cached(adapter, model_id, ex, task, cfg, use_cache, profiler, telemetry, budget, variant)
+            for ex in examples
+        ]
+
+    decoding = get_decoding(cfg["decoding"], seed=cfg["seed"])
+    task_name = task.get("task_name")
+    prompts = [build_prompt(task["prompt"]["template"], ex["source"]) for ex in examples]
+    keys = [
+        make_key(model_id, sample_decoding(decoding, 0), p, ex["id"], variant)
+        for p, ex in zip(prompts, examples)
+    ]
+
+    rows: List[Optional[Dict]] = [None] * len(examples)
+    if use_cache:
+        with profiler.stage("cache_io"):
+            rows = [cache_get(cfg["cache_dir"], key) for key in keys]
+    for row in rows:
+        if row is not None:
+            profiler.count("cache_hit")
+            telemetry.record_cache(model_id, hit=True, task=task_name)
+
+    missing = [i for i, row in enumerate(rows) if row is None]
+    if not missing:
+        return rows
+
+    logger.debug(f"Generiere Batch von {len(missing)} Beispielen für {model_id}")
+    profiler.count("cache_miss" if use_cache else "cache_bypass", len(missing))
+    profiler.count("batches")
+    max_time = budget.max_time(len(missing)) if budget else None
+    start = time.perf_counter()
+    hyps = adapter.generate_batch(
+        [prompts[i] for i in missing], cfg["max_new_tokens"], with_time_limit(decoding, max_time)
+    )
+    elapsed = time.perf_counter() - start
+    # Latenz gleichmäßig auf die Beispiele verteilen, damit Tokens/s den Batch-Durchsatz zeigen
+    seconds = elapsed / len(missing)
+    stats = getattr(adapter, "last_stats", None) or {}
+    items = stats.get("items") or [{}] * len(missing)
+    if budget:
+        # Wie bei Einzelbeispielen die Dauer des ganzen Aufrufs; genannt wird das längste Beispiel
+        longest = max(range(len(missing)), key=lambda j: items[j].get("completion_tokens") or 0)
+        label = f"{examples[missing[longest]]['id']} (Batch von {len(missing)})"
+        budget.observe(model_id, label, elapsed, n=len(missing))
+
+    for i, hyp, item in zip(missing, hyps, items):
+        ex = examples[i]
+        if use_cache:
+            telemetry.record_cache(model_id, hit=False, task=task_name)
+        telemetry.record_generation(model_id, seconds, item.get("completion_tokens"), task=task_name)
+        profiler.record_generation(
+            model_id, seconds, item.get("prompt_tokens"), item.get("completion_tokens")
+        )
+        if "draft_proposed" in item:
+            profiler.record_draft(model_id, item)
+        rows[i] = {"id": ex["id"], "source": ex["source"], "hyp": hyp, "refs": ex.get("refs", [])}
+        if budget and item.get("truncated"):
+            budget.record_truncated(model_id, ex["id"], max_time)
+            profiler.count("truncated")
+            rows[i]["truncated"] = True
+        elif use_cache:
+            with profiler.stage("cache_io"):
+                cache_put(cfg["cache_dir"], keys[i], rows[i])
+    return rows
+
+
+def generate_profiles_cached(
+    adapter,
+    model_id: str,
+    ex: Dict,
+    task: Dict,
+    cfgs: List[Dict],
+    use_cache: bool = True,
+    profiler=NULL_PROFILER,
+    telemetry=NULL_TELEMETRY,
+    variant: str = "",
+) -> List[Dict]:
+    """Ein Beispiel unter mehreren Konfigurationen eines Decoding-Sweeps
+
+    Fehlende Profile entstehen in einem Aufruf von ``generate_profiles``
+    (Prompt einmal tokenisiert, Prefix geteilt) und werden unter dem
+    Cache-Key ihres Profils gespeichert; die Pipelines der Profile übernehmen
+    sie danach als Cache-Treffer.
+    """
+    prompt = build_prompt(task["prompt"]["template"], ex["source"])
+    decodings = [get_decoding(cfg["decoding"], seed=cfg["seed"]) for cfg in cfgs]
+    keys = [make_key(model_id, sample_decoding(d, 0), prompt, ex["id"], variant) for d in decodings]
+    task_name = task.get("task_name")
+
+    rows: List[Optional[Dict]] = [None] * len(cfgs)
+    if use_cache:
+        with profiler.stage("cache_io"):
+            rows = [cache_get(cfg["cache_dir"], key) for cfg, key in zip(cfgs, keys)]
+    missing = [i for i, row in enumerate(rows) if row is None]
+    if not missing:
+        return rows
+
+    logger.debug(f"Generiere {len(missing)} Decoding-Profile für {model_id}, Beispiel {ex['id']}")
+    start = time.perf_counter()
+    hyps = adapter.generate_profiles(
+        prompt, [(cfgs[i]["max_new_tokens"], decodings[i]) for i in missing]
+    )
+    seconds = (time.perf_counter() - start) / len(missing)
+    stats = getattr(adapter, "last_stats", None) or {}
+    items = stats.get("items") or [{}] * len(missing)
+
+    for i, hyp, item in zip(missing, hyps, items):
+        telemetry.record_generation(model_id, seconds, item.get("completion_tokens"), task=task_name)
+        profiler.record_generation(
+            model_id, seconds, item.get("prompt_tokens"), item.get("completion_tokens")
+        )
+        rows[i] = {"id": ex["id"], "source": ex["source"], "hyp": hyp, "refs": ex.get("refs", [])}
+        if use_cache and not item.get("truncated"):
+            with profiler.stage("cache_io"):
+                cache_put(cfgs[i]["cache_dir"], keys[i], rows[i])
+    return rows
@@ -0,0 +1,116 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from .logging_config import get_logger
+
+logger = get_logger("journal")
+
+JOURNAL_FILE = "journal.jsonl"
+
+
+class JournalMismatchError(ValueError):
+    """Das vorhandene Journal gehört zu einem anderen Lauf"""
+
+
+def _truncate_partial_line(path: str) -> int:
+    """Schneidet eine unvollständige letzte Zeile (Absturz beim Schreiben) ab; liefert die neue Größe"""
+    with open(path, "rb+") as f:
+        size = end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            pos = f.read(end - start).rfind(b"\n")
+            if pos >= 0:
+                keep = start + pos + 1
+                break
+            end = start
+        else:
+            keep = 0
+        if keep < size:
+            f.truncate(keep)
+            logger.warning(f"Unvollständige letzte Journal-Zeile entfernt ({size - keep} Bytes): {path}")
+    return keep
+
+
+class ProgressJournal:
+    """Append-only Fortschrittsjournal eines Laufs (eine JSON-Zeile pro Einheit)
+
+    Einträge werden gepuffert und alle ``flush_every`` Einträge gemeinsam
+    geschrieben und per fsync gesichert. Bei einem Absturz gehen höchstens
+    die gepufferten Einträge verloren; eine abgeschnittene letzte Zeile wird
+    beim Wiedereinlesen ignoriert und beim Fortsetzen vor dem ersten neuen
+    Eintrag entfernt.
+    """
+
+    def __init__(self, path: str, header: Dict, flush_every: int = 20, resume: bool = False):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self._buffer: List[str] = []
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fresh = not (resume and os.path.exists(path) and _truncate_partial_line(path) > 0)
+        self._file = open(path, "w" if fresh else "a", encoding="utf-8")
+        if fresh:
+            self._buffer.append(json.dumps({"type": "header", **header}, ensure_ascii=False))
+            self.flush()
+
+    def append(self, record: Dict):
+        self._buffer.append(json.dumps({"type": "unit", **record}, ensure_ascii=False))
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        self._file.write("\n".join(self._buffer) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._buffer = []
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def replay_journal(path: str, header: Optional[Dict] = None) -> Dict[Tuple[str, str], Dict]:
+    """Liest ein Journal ein; liefert erfolgreiche Einträge pro (Modell, Beispiel-ID)
+
+    Fehlgeschlagene Generationen werden nicht übernommen, damit sie beim
+    Fortsetzen erneut versucht werden.
+    """
+    done: Dict[Tuple[str, str], Dict] = {}
+    if not os.path.exists(path):
+        return done
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Unvollständige Journal-Zeile {line_no} ignoriert")
+                continue
+
+            kind = record.pop("type", None)
+            if kind == "header":
+                if header is not None and record != header:
+                    raise JournalMismatchError(
+                        f"Journal {path} gehört zu einem anderen Lauf: {record}"
+                    )
+            elif kind == "unit":
+                if record.get("failed"):
+                    done.pop((record["model_id"], record["id"]), None)
+                else:
+                    done[(record["model_id"], record["id"])] = record
+
+    logger.info(f"Journal eingelesen: {len(done)} abgeschlossene Einheiten aus {path}")
+    return done
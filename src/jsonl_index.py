@@ -0,0 +1,148 @@
+import json
+import mmap
+import os
+import tempfile
+from typing import Dict, Iterable, List, Optional
+
+from .logging_config import get_logger
+
+logger = get_logger("jsonl_index")
+
+INDEX_SUFFIX = ".idx.json"
+INDEX_VERSION = 1
+
+
+def index_path(path: str) -> str:
+    """Pfad der Sidecar-Indexdatei zu einer JSONL-Datei"""
+    return path + INDEX_SUFFIX
+
+
+def build_index(path: str, id_field: str = "id") -> Dict:
+    """Erstellt den Byte-Offset-Index einer JSONL-Datei und speichert ihn als Sidecar"""
+    st = os.stat(path)
+    ids: List[str] = []
+    offsets: List[int] = []
+    lengths: List[int] = []
+    seen = set()
+
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                ex_id = str(json.loads(line)[id_field])
+                if ex_id in seen:
+                    raise ValueError(f"Doppelte ID '{ex_id}' in {path}")
+                seen.add(ex_id)
+                ids.append(ex_id)
+                offsets.append(offset)
+                lengths.append(len(line))
+            offset += len(line)
+
+    index = {
+        "version": INDEX_VERSION,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "id_field": id_field,
+        "ids": ids,
+        "offsets": offsets,
+        "lengths": lengths,
+    }
+
+    # Atomar schreiben, da mehrere Worker den Index gleichzeitig erstellen können
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, index_path(path))
+
+    logger.info(f"Index erstellt: {len(ids)} Einträge für {path}")
+    return index
+
+
+def load_index(path: str, id_field: str = "id") -> Optional[Dict]:
+    """Lädt den Sidecar-Index, falls er zur aktuellen Datei (Größe, mtime) passt"""
+    ipath = index_path(path)
+    if not os.path.exists(ipath):
+        return None
+    try:
+        with open(ipath, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Index {ipath} nicht lesbar: {e}")
+        return None
+
+    st = os.stat(path)
+    if (
+        index.get("version") != INDEX_VERSION
+        or index.get("size") != st.st_size
+        or index.get("mtime_ns") != st.st_mtime_ns
+        or index.get("id_field") != id_field
+    ):
+        logger.debug(f"Index {ipath} veraltet")
+        return None
+    return index
+
+
+class JsonlIndex:
+    """Wahlfreier Zugriff auf JSONL-Beispiele über einen memory-mapped Byte-Offset-Index"""
+
+    def __init__(self, path: str, id_field: str = "id", rebuild: bool = False):
+        self.path = path
+        self.id_field = id_field
+
+        index = None if rebuild else load_index(path, id_field)
+        if index is None:
+            index = build_index(path, id_field)
+
+        self._ids: List[str] = index["ids"]
+        self._offsets: List[int] = index["offsets"]
+        self._lengths: List[int] = index["lengths"]
+        self._pos = {ex_id: i for i, ex_id in enumerate(self._ids)}
+
+        self._file = open(path, "rb")
+        # mmap auf leere Dateien ist nicht erlaubt
+        self._mm = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if index["size"] > 0
+            else None
+        )
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, ex_id) -> bool:
+        return str(ex_id) in self._pos
+
+    def __getitem__(self, pos: int) -> Dict:
+        start = self._offsets[pos]
+        return json.loads(self._mm[start : start + self._lengths[pos]])
+
+    @property
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    def position(self, ex_id) -> int:
+        """Position eines Beispiels in der Datei"""
+        try:
+            return self._pos[str(ex_id)]
+        except KeyError:
+            raise KeyError(f"ID '{ex_id}' nicht in {self.path}")
+
+    def get(self, ex_id) -> Dict:
+        """Lädt ein Beispiel anhand seiner ID"""
+        return self[self.position(ex_id)]
+
+    def fetch_many(self, ids: Iterable) -> List[Dict]:
+        """Lädt mehrere Beispiele in der angegebenen Reihenfolge"""
+        return [self.get(ex_id) for ex_id in ids]
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,226 @@
+import json
+import os
+import re
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from .logging_config import get_logger
+
+logger = get_logger("lora")
+
+ADAPTER_CONFIG = "adapter_config.json"
+DEFAULT_DRAFT_VERIFY = 8
+
+
+def lora_name(model_id: str) -> str:
+    """Adapter-Name für peft (keine Punkte oder Schrägstriche erlaubt)"""
+    return re.sub(r"\W", "_", model_id)
+
+
+def read_adapter_base(adapter_path: str) -> Optional[str]:
+    """Basismodell aus der adapter_config.json eines LoRA-Adapters"""
+    path = os.path.join(adapter_path, ADAPTER_CONFIG)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("base_model_name_or_path")
+
+
+BASE_OPTIONS = ("cpu_mode", "compile", "onnx_dir", "weights", "weights_dir")
+
+
+def _load_base(base_id: str, **options):
+    from .models import ModelAdapter
+
+    return ModelAdapter(base_id, **options)
+
+
+def _base_key(base_id: str, options: Dict) -> str:
+    return base_id + "".join(f"|{k}={v}" for k, v in sorted(options.items()))
+
+
+def _base_ref(model_cfg: Dict):
+    """(Basismodell, Ladeoptionen) einer Modell-Konfiguration"""
+    adapter_path = model_cfg.get("adapter")
+    if adapter_path:
+        base_id = model_cfg.get("base") or read_adapter_base(adapter_path)
+        if not base_id:
+            raise ValueError(
+                f"LoRA-Adapter {adapter_path} ohne Basismodell: 'base' in der Modell-Konfiguration angeben"
+            )
+    else:
+        base_id = model_cfg.get("base") or model_cfg["model_id"]
+    return base_id, {k: model_cfg[k] for k in BASE_OPTIONS if model_cfg.get(k)}
+
+
+def shared_base_key(model_cfg: Dict) -> Optional[str]:
+    """Schlüssel des geteilten Basismodells einer Konfiguration (``None``: nicht geteilt)
+
+    Nur das hf-Backend ohne Worker-Prozesse lädt über ``SHARED_BASES``.
+    """
+    if (model_cfg.get("backend") or "hf") != "hf" or int((model_cfg.get("workers") or {}).get("n", 1)) > 1:
+        return None
+    try:
+        return _base_key(*_base_ref(model_cfg))
+    except (ValueError, OSError):
+        return None
+
+
+class SharedBases:
+    """Basismodelle, die pro Prozess nur einmal geladen werden
+
+    Hält die Basismodelle nur schwach: sobald keine Sicht (LoraModel) mehr auf
+    ein Basismodell verweist, wird es freigegeben, z. B. wenn der Modell-Pool
+    des Dienstes alle zugehörigen Modelle entlädt.
+    """
+
+    def __init__(self, loader: Optional[Callable[[str], object]] = None):
+        self.loader = loader or _load_base
+        self._bases: "weakref.WeakValueDictionary[str, object]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, base_id: str, **options):
+        """Basismodell laden oder wiederverwenden; ``options`` (z. B. cpu_mode) sind Teil des Schlüssels"""
+        key = _base_key(base_id, options)
+        with self._lock:
+            base = self._bases.get(key)
+            if base is None:
+                base = self.loader(base_id, **options)
+                self._bases[key] = base
+            else:
+                logger.info(f"Verwende bereits geladenes Basismodell: {key}")
+            return base
+
+    def loaded(self) -> List[str]:
+        return list(self._bases.keys())
+
+
+# Basismodell → lebende Sichten in Ladereihenfolge; der ältesten wird der Basisspeicher angerechnet
+_VIEWS: "weakref.WeakKeyDictionary[object, List[weakref.ref]]" = weakref.WeakKeyDictionary()
+
+
+class LoraModel:
+    """Sicht auf ein geteiltes Basismodell, optional mit eigenem LoRA-Adapter
+
+    Der Adapter bleibt ungemergt am Basismodell und wird vor jeder Generation
+    (pro Batch) aktiviert; ohne Adapter wird mit deaktivierten Adaptern
+    generiert. So kosten Basismodell und N Fine-Tunes zusammen nur den Speicher
+    eines Modells plus der LoRA-Gewichte. Mit ``draft_model_id`` nutzt die Sicht
+    bei Greedy-Dekodierung ein Entwurfsmodell für assistierte Generierung.
+    """
+
+    def __init__(
+        self,
+        base,
+        model_id: str,
+        adapter_path: Optional[str] = None,
+        draft_model_id: Optional[str] = None,
+        draft_verify: int = DEFAULT_DRAFT_VERIFY,
+    ):
+        self.base = base
+        self.model_id = model_id
+        self.adapter_path = adapter_path
+        self.adapter_name = lora_name(model_id) if adapter_path else None
+        self.draft_model_id = draft_model_id
+        _VIEWS.setdefault(base, []).append(weakref.ref(self))
+        if adapter_path:
+            base.attach_lora(self.adapter_name, adapter_path)
+        if draft_model_id:
+            base.attach_draft(draft_model_id, verify=draft_verify)
+
+    @contextmanager
+    def _selected(self):
+        # Das Basismodell ist geteilt: Adapter und Entwurfsmodell vor jeder Generation wählen
+        if hasattr(self.base, "select_draft"):
+            self.base.select_draft(self.draft_model_id)
+        with self.base.lora_scope(self.adapter_name):
+            yield
+
+    @property
+    def last_stats(self) -> Dict:
+        return self.base.last_stats
+
+    @property
+    def max_prompt_length(self) -> int:
+        return self.base.max_prompt_length
+
+    def tokenizer_fingerprint(self) -> Optional[str]:
+        # None: Basismodell ohne Tokenizer-Vorstufe
+        if not hasattr(self.base, "tokenizer_fingerprint"):
+            return None
+        return self.base.tokenizer_fingerprint()
+
+    def tokenize_prompts(self, prompts: List[str]) -> List[List[int]]:
+        return self.base.tokenize_prompts(prompts)
+
+    def use_prompt_tokens(self, cache):
+        self.base.use_prompt_tokens(cache)
+
+    def generate(self, prompt: str, max_new_tokens: int, decoding: dict) -> str:
+        with self._selected():
+            return self.base.generate(prompt, max_new_tokens, decoding)
+
+    def generate_batch(self, prompts: List[str], max_new_tokens: int, decoding: dict) -> List[str]:
+        with self._selected():
+            return self.base.generate_batch(prompts, max_new_tokens, decoding)
+
+    def generate_samples(self, prompt: str, max_new_tokens: int, decoding: dict, n: int) -> List[str]:
+        with self._selected():
+            return self.base.generate_samples(prompt, max_new_tokens, decoding, n)
+
+    def generate_profiles(self, prompt: str, runs: List) -> List[str]:
+        with self._selected():
+            return self.base.generate_profiles(prompt, runs)
+
+    def score_references(self, prompts: List[str], references: List[str]) -> List[Dict]:
+        with self._selected():
+            return self.base.score_references(prompts, references)
+
+    def _owns_base(self) -> bool:
+        live = [ref() for ref in _VIEWS.get(self.base, [])]
+        live = [view for view in live if view is not None]
+        return bool(live) and live[0] is self
+
+    def memory_bytes(self) -> int:
+        """LoRA-Gewichte der Sicht; das geteilte Basismodell zählt genau einmal, bei der ältesten Sicht
+
+        Wird diese geschlossen, übernimmt die nächste Sicht den Basisspeicher
+        (der Modell-Pool misst nach dem Entladen neu).
+        """
+        total = self.base.lora_bytes(self.adapter_name) if self.adapter_name else 0
+        if self._owns_base():
+            total += self.base.memory_bytes()
+        return total
+
+    def close(self):
+        """Löst den Adapter vom Basismodell"""
+        if self.base is not None and self.base in _VIEWS:
+            _VIEWS[self.base] = [ref for ref in _VIEWS[self.base] if ref() not in (None, self)]
+        if self.adapter_name and self.base is not None:
+            self.base.detach_lora(self.adapter_name)
+            self.adapter_name = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass  # Ignoriere Cleanup-Fehler
+
+
+# Prozessweite Registry für das hf-Backend
+SHARED_BASES = SharedBases()
+
+
+def create_lora_model(model_cfg: Dict, bases: SharedBases = SHARED_BASES) -> LoraModel:
+    """Sicht für eine Modell-Konfiguration (``base`` + ``adapter`` oder nur ``model_id``,
+    optional ``draft_model_id`` und ``draft_verify``)"""
+    base_id, options = _base_ref(model_cfg)
+    return LoraModel(
+        bases.get(base_id, **options),
+        model_cfg["model_id"],
+        model_cfg.get("adapter"),
+        draft_model_id=model_cfg.get("draft_model_id"),
+        draft_verify=int(model_cfg.get("draft_verify", DEFAULT_DRAFT_VERIFY)),
+    )
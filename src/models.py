@@ -1,15 +1,56 @@
 from transformers import AutoTokenizer, AutoModelForCausalLM
 import torch
+import os
+import copy
 import time
+from contextlib import contextmanager
+from .batching import OutOfMemoryError
+from .cpu_modes import apply_cpu_mode, compile_model, load_onnx_model, resolve_cpu_mode
 from .logging_config import get_logger
+from .reference import reference_continuation, teacher_forced_logprobs
+from .token_cache import tokenizer_fingerprint
+from .weights import WEIGHTS_MODES, load_mmap_model
 
 logger = get_logger("models")
 
+# Längere Prompts werden gekürzt (die Pipeline zählt sie, siehe tokenize_prompts)
+MAX_PROMPT_LENGTH = 2048
+
 
 class ModelAdapter:
-    def __init__(self, model_id: str):
-        """Initialisiert das Modell mit Fehlerbehandlung"""
+    def __init__(
+        self,
+        model_id: str,
+        cpu_mode: str = None,
+        compile: str = None,
+        onnx_dir: str = None,
+        weights: str = None,
+        weights_dir: str = None,
+    ):
+        """Initialisiert das Modell mit Fehlerbehandlung
+
+        Auf CPU wählt ``cpu_mode`` fp32 (Standard), int8 (dynamische
+        Quantisierung der Linear-Layer) oder bf16; ``compile`` ist ``torch``
+        (torch.compile) oder ``onnx`` (ONNX-Runtime-Export, gecacht in ``onnx_dir``).
+        ``weights: mmap`` legt die Gewichte auf einen einmalig konvertierten
+        safetensors-Cache in ``weights_dir``, den sich alle Prozesse des Hosts teilen.
+        """
         self.model_id = model_id
+        self.cpu_mode = "fp32"
+        self.compile = None
+        self.onnx_path = None
+        self.weights = "copy"
+        self.weights_path = None
+        # Kennzahlen der letzten Generation (für --profile)
+        self.last_stats = {}
+        # Entwurfsmodelle für assistierte Dekodierung (draft_model_id → Modell)
+        self.drafts = {}
+        self.draft_verify = {}
+        self.draft_model_id = None
+        self._forward_calls = {"target": 0, "draft": 0}
+        # Vorab tokenisierte Prompts (PromptTokenCache), siehe use_prompt_tokens
+        self.prompt_tokens = None
+        self.max_prompt_length = MAX_PROMPT_LENGTH
         logger.info(f"Lade Modell: {model_id}")
 
         try:
@@ -21,26 +62,105 @@ class ModelAdapter:
             # Modell laden mit Memory-Management
             device_map = "auto" if torch.cuda.is_available() else None
             torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
+            if weights and weights not in WEIGHTS_MODES:
+                raise ValueError(f"Unbekannter weights-Modus: {weights} (verfügbar: {', '.join(WEIGHTS_MODES)})")
+            if not torch.cuda.is_available():
+                self.cpu_mode = resolve_cpu_mode(cpu_mode)
+                self.compile = compile
+                self.weights = weights or "copy"
+            elif cpu_mode or compile or weights:
+                logger.info("CUDA verfügbar: cpu_mode/compile/weights werden ignoriert")
 
-            logger.debug(f"Device: {device_map}, dtype: {torch_dtype}")
+            logger.debug(f"Device: {device_map}, dtype: {torch_dtype}, CPU-Modus: {self.cpu_mode}")
 
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_id,
-                device_map=device_map,
-                torch_dtype=torch_dtype,
-                low_cpu_mem_usage=True,
-                trust_remote_code=True,
-            )
+            if self.compile == "onnx":
+                if self.cpu_mode != "fp32":
+                    raise ValueError("compile: onnx unterstützt nur cpu_mode fp32")
+                self.model, self.onnx_path = load_onnx_model(model_id, onnx_dir)
+                self.device = torch.device("cpu")
+            else:
+                if self.weights == "mmap":
+                    # bf16 direkt im Cache ablegen, damit apply_cpu_mode nichts kopiert
+                    self.model, self.weights_path = load_mmap_model(
+                        model_id, "bf16" if self.cpu_mode == "bf16" else "fp32", weights_dir
+                    )
+                    if self.cpu_mode == "int8":
+                        logger.info("int8 quantisiert in private Kopien: mmap spart nur die Ladezeit")
+                else:
+                    self.model = AutoModelForCausalLM.from_pretrained(
+                        model_id,
+                        device_map=device_map,
+                        torch_dtype=torch_dtype,
+                        low_cpu_mem_usage=True,
+                        trust_remote_code=True,
+                    )
+                self.model = apply_cpu_mode(self.model, self.cpu_mode)
+                if self.compile == "torch":
+                    self.model = compile_model(self.model)
+                elif self.compile:
+                    raise ValueError(f"Unbekannter compile-Modus: {self.compile} (torch oder onnx)")
 
-            self.device = next(self.model.parameters()).device
-            logger.info(f"Modell erfolgreich geladen auf {self.device}")
+                self.device = next(self.model.parameters()).device
+                self.model.register_forward_pre_hook(self._count_forward("target"))
+            # Für Batch-Generierung links auffüllen, damit alle Prompts bündig enden
+            self.tok.padding_side = "left"
+            logger.info(
+                f"Modell erfolgreich geladen auf {self.device}"
+                + (f" ({self.cpu_mode}{'+' + self.compile if self.compile else ''}"
+                   f"{', mmap' if self.weights_path else ''})" if self.device.type == "cpu" else "")
+            )
 
         except Exception as e:
             logger.error(f"Fehler beim Laden des Modells {model_id}: {e}")
             raise RuntimeError(f"Modell {model_id} konnte nicht geladen werden: {e}")
 
+    # ------------------------------------------------------------------
+    # Tokenisierte Prompts (Vorstufe der Pipeline, geteilt pro Tokenizer)
+    # ------------------------------------------------------------------
+    def tokenizer_fingerprint(self) -> str:
+        return tokenizer_fingerprint(self.tok)
+
+    def tokenize_prompts(self, prompts: list) -> list:
+        """Ungekürzte Token-IDs (mit Sondertokens), wie sie ``generate`` verwendet"""
+        return self.tok(list(prompts), add_special_tokens=True)["input_ids"]
+
+    def use_prompt_tokens(self, cache):
+        """Vorab tokenisierte Prompts verwenden; fehlende werden weiterhin tokenisiert"""
+        self.prompt_tokens = cache
+
+    def _prompt_ids(self, prompts: list) -> list:
+        cached = [self.prompt_tokens.ids(p) if self.prompt_tokens is not None else None for p in prompts]
+        if any(ids is None for ids in cached):
+            return self.tokenize_prompts(prompts)
+        return [ids.tolist() for ids in cached]
+
+    def _encode(self, prompts: list) -> dict:
+        """Eingaben für generate: gekürzt auf ``max_prompt_length``, links aufgefüllt"""
+        if self.prompt_tokens is None:
+            return self.tok(
+                prompts, return_tensors="pt", padding=True, truncation=True,
+                max_length=self.max_prompt_length,
+            ).to(self.device)
+        ids = self._prompt_ids(prompts)
+        # Wie truncation=True des Tokenizers (truncation_side, default: rechts)
+        limit = self.max_prompt_length
+        if getattr(self.tok, "truncation_side", "right") == "left":
+            ids = [row[-limit:] for row in ids]
+        else:
+            ids = [row[:limit] for row in ids]
+        width = max(len(row) for row in ids)
+        pad = self.tok.pad_token_id
+        return {
+            "input_ids": torch.tensor(
+                [[pad] * (width - len(row)) + row for row in ids], device=self.device
+            ),
+            "attention_mask": torch.tensor(
+                [[0] * (width - len(row)) + [1] * len(row) for row in ids], device=self.device
+            ),
+        }
+
     def generate(self, prompt: str, max_new_tokens: int, decoding: dict) -> str:
-        """Generiert Text mit Fehlerbehandlung und Timeout"""
+        """Generiert Text mit Fehlerbehandlung und Timeout (``max_time`` in ``decoding``)"""
         try:
             start_time = time.time()
 
@@ -49,44 +169,51 @@ class ModelAdapter:
                 logger.warning("Leerer Prompt erhalten")
                 return ""
 
-            inputs = self.tok(
-                prompt, return_tensors="pt", truncation=True, max_length=2048
-            ).to(self.device)
-
-            # Generation-Parameter validieren
-            generation_params = {
-                "do_sample": decoding.get("do_sample", False),
-                "temperature": max(0.01, decoding.get("temperature", 0.0)),
-                "top_p": max(0.01, min(1.0, decoding.get("top_p", 1.0))),
-                "max_new_tokens": min(max_new_tokens, 512),  # Limit für Stabilität
-                "pad_token_id": self.tok.eos_token_id,
-                "eos_token_id": self.tok.eos_token_id,
-            }
+            inputs = self._encode([prompt])
+            tokenize_time = time.time() - start_time
 
+            generation_params = self._generation_params(max_new_tokens, decoding)
             logger.debug(f"Generiere mit Parametern: {generation_params}")
 
+            draft = self._active_draft(decoding)
+            calls_before = dict(self._forward_calls)
             with torch.inference_mode():
                 out = self.model.generate(
                     **inputs,
                     **generation_params,
+                    **({"assistant_model": draft} if draft is not None else {}),
                 )
+            prompt_tokens = inputs["input_ids"].shape[1]
+            draft_stats = {}
+            if draft is not None:
+                draft_stats = self._draft_stats(calls_before, out.shape[1] - prompt_tokens)
+                out = self._verify_draft(inputs, generation_params, out, draft_stats)
 
-            text = self.tok.decode(out[0], skip_special_tokens=True)
-
-            # Text extrahieren
-            if "Vereinfachter Text:" in text:
-                result = text.split("Vereinfachter Text:")[-1].strip()
-            else:
-                result = text[len(prompt) :].strip()  # Nur den generierten Teil
+            result = self._decode_completions(out, prompt_tokens)[0]
 
             generation_time = time.time() - start_time
+            completion_tokens = out.shape[1] - prompt_tokens
+            self.last_stats = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "tokenize_seconds": tokenize_time,
+                "generation_seconds": generation_time,
+                **draft_stats,
+            }
+            if (
+                self._timed_out(generation_params, generation_time)
+                and completion_tokens < generation_params["max_new_tokens"]
+                and int(out[0, -1]) != self.tok.eos_token_id
+            ):
+                self.last_stats["truncated"] = True
             logger.debug(f"Generation abgeschlossen in {generation_time:.2f}s")
 
             return result
 
         except torch.cuda.OutOfMemoryError as e:
             logger.error(f"CUDA Out of Memory: {e}")
-            raise RuntimeError(
+            torch.cuda.empty_cache()
+            raise OutOfMemoryError(
                 "Modell benötigt zu viel GPU-Speicher. Versuchen Sie CPU-Modus oder reduzieren Sie die Batch-Size."
             )
 
@@ -94,6 +221,363 @@ class ModelAdapter:
             logger.error(f"Fehler bei der Generation: {e}")
             raise RuntimeError(f"Text-Generation fehlgeschlagen: {e}")
 
+    def _decode_completions(self, out, prompt_width: int) -> list:
+        """Nur die generierten Tokens jeder Zeile dekodieren (für alle Generierungspfade gleich)
+
+        So hängt die Hypothese (und damit der Cache-Eintrag) nicht davon ab,
+        ob ein Beispiel einzeln, im Batch oder im Profil-Sweep erzeugt wurde.
+        """
+        completions = out[:, prompt_width:]
+        return [t.strip() for t in self.tok.batch_decode(completions, skip_special_tokens=True)]
+
+    def _generation_params(self, max_new_tokens: int, decoding: dict) -> dict:
+        """Generation-Parameter validieren"""
+        return {
+            "do_sample": decoding.get("do_sample", False),
+            "temperature": max(0.01, decoding.get("temperature", 0.0)),
+            "top_p": max(0.01, min(1.0, decoding.get("top_p", 1.0))),
+            "max_new_tokens": min(max_new_tokens, 512),  # Limit für Stabilität
+            "pad_token_id": self.tok.eos_token_id,
+            "eos_token_id": self.tok.eos_token_id,
+            # Zeitbudget pro Generation (MaxTimeCriteria), siehe TimeBudget
+            **({"max_time": decoding["max_time"]} if decoding.get("max_time") else {}),
+        }
+
+    def _timed_out(self, generation_params: dict, seconds: float) -> bool:
+        return "max_time" in generation_params and seconds >= generation_params["max_time"]
+
+    def generate_batch(self, prompts: list, max_new_tokens: int, decoding: dict) -> list:
+        """Generiert für mehrere Prompts in einem Forward-Pass (links aufgefüllt)
+
+        Speicherfehler (CUDA-OOM oder fehlgeschlagene CPU-Allokation) werden als
+        OutOfMemoryError gemeldet, damit der Aufrufer den Batch verkleinern kann.
+        """
+        if len(prompts) > 1 and self._active_draft(decoding) is not None:
+            # Assistierte Generierung unterstützt nur einzelne Sequenzen
+            return self._generate_each(prompts, max_new_tokens, decoding)
+        return self._generate_rows(prompts, max_new_tokens, decoding)
+
+    def generate_samples(self, prompt: str, max_new_tokens: int, decoding: dict, n: int) -> list:
+        """n Stichproben für einen Prompt aus einem Prefill (num_return_sequences)
+
+        Ohne ``do_sample`` wären alle Stichproben gleich: dann wird einmal
+        generiert und das Ergebnis n-mal geliefert.
+        """
+        if not decoding.get("do_sample", False):
+            text = self.generate(prompt, max_new_tokens, decoding)
+            self.last_stats["items"] = [dict(self.last_stats)] * n
+            return [text] * n
+        return self._generate_rows([prompt], max_new_tokens, decoding, num_return_sequences=n)
+
+    def generate_profiles(self, prompt: str, runs: list) -> list:
+        """Ein Prompt unter mehreren Decoding-Profilen (``runs``: Liste von (max_new_tokens, decoding))
+
+        Der Prompt wird einmal tokenisiert und einmal vorberechnet; jede
+        Generation startet von einer Kopie dieses Prefix-KV-Caches. Mit
+        Entwurfsmodell oder ONNX-Modell wird pro Profil einzeln generiert.
+        """
+        if self.onnx_path or any(self._active_draft(decoding) is not None for _, decoding in runs):
+            return self._generate_each_profile(prompt, runs)
+        try:
+            start_time = time.time()
+            inputs = self._encode([prompt])
+            tokenize_time = time.time() - start_time
+            prompt_tokens = inputs["input_ids"].shape[1]
+            if prompt_tokens < 2:
+                return self._generate_each_profile(prompt, runs)
+
+            # Prefill ohne das letzte Token: generate verarbeitet nur die nicht gecachten Positionen
+            with torch.inference_mode():
+                prefix = self.model(
+                    input_ids=inputs["input_ids"][:, :-1],
+                    attention_mask=inputs["attention_mask"][:, :-1],
+                    use_cache=True,
+                ).past_key_values
+
+            texts, items = [], []
+            for max_new_tokens, decoding in runs:
+                run_start = time.time()
+                generation_params = self._generation_params(max_new_tokens, decoding)
+                with torch.inference_mode():
+                    out = self.model.generate(
+                        **inputs, **generation_params, past_key_values=copy.deepcopy(prefix)
+                    )
+                completion = out[0, prompt_tokens:]
+                texts.extend(self._decode_completions(out, prompt_tokens))
+                is_eos = completion == self.tok.eos_token_id
+                finished = bool(is_eos.any())
+                item = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": int(is_eos.int().argmax()) + 1 if finished else completion.shape[0],
+                    "generation_seconds": time.time() - run_start,
+                }
+                if (
+                    self._timed_out(generation_params, item["generation_seconds"])
+                    and not finished
+                    and completion.shape[0] < generation_params["max_new_tokens"]
+                ):
+                    item["truncated"] = True
+                items.append(item)
+
+            self.last_stats = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": sum(item["completion_tokens"] for item in items),
+                "tokenize_seconds": tokenize_time,
+                "generation_seconds": time.time() - start_time,
+                "items": items,
+            }
+            return texts
+
+        except torch.cuda.OutOfMemoryError as e:
+            logger.warning(f"CUDA Out of Memory beim Profil-Sweep: {e}")
+            torch.cuda.empty_cache()
+            raise OutOfMemoryError(f"{len(runs)} Decoding-Profile passen nicht in den GPU-Speicher")
+
+        except MemoryError as e:
+            raise OutOfMemoryError(f"{len(runs)} Decoding-Profile passen nicht in den Speicher: {e}")
+
+    def score_references(self, prompts: list, references: list) -> list:
+        """Log-Likelihood jeder Referenz gegeben ihren Prompt (Teacher-Forcing, ohne Generierung)
+
+        Prompt und Referenz werden getrennt tokenisiert und aneinandergehängt,
+        alle Paare laufen rechts aufgefüllt durch einen Forward-Pass. Liefert
+        pro Paar ``{"logprob": Summe, "tokens": Anzahl Referenz-Tokens}``.
+        """
+        try:
+            start_time = time.time()
+            prompt_ids = self._prompt_ids(prompts)
+            ref_ids = self.tok(
+                [reference_continuation(p, r) for p, r in zip(prompts, references)],
+                add_special_tokens=False,
+            )["input_ids"]
+            tokenize_time = time.time() - start_time
+            scores = teacher_forced_logprobs(
+                self.model, list(zip(prompt_ids, ref_ids)), self.tok.pad_token_id,
+                self.max_prompt_length, self.device,
+            )
+            self.last_stats = {
+                "prompt_tokens": sum(len(ids) for ids in prompt_ids),
+                "completion_tokens": sum(s["tokens"] for s in scores),
+                "tokenize_seconds": tokenize_time,
+                "generation_seconds": time.time() - start_time,
+                "items": [{"prompt_tokens": len(p), "completion_tokens": s["tokens"]}
+                          for p, s in zip(prompt_ids, scores)],
+            }
+            return scores
+
+        except torch.cuda.OutOfMemoryError as e:
+            logger.warning(f"CUDA Out of Memory beim Referenz-Scoring von {len(prompts)} Paaren: {e}")
+            torch.cuda.empty_cache()
+            raise OutOfMemoryError(f"{len(prompts)} Referenzen passen nicht in den GPU-Speicher")
+
+        except MemoryError as e:
+            raise OutOfMemoryError(f"{len(prompts)} Referenzen passen nicht in den Speicher: {e}")
+
+    def _generate_each_profile(self, prompt: str, runs: list) -> list:
+        texts, items = [], []
+        for max_new_tokens, decoding in runs:
+            texts.append(self.generate(prompt, max_new_tokens, decoding))
+            items.append(self.last_stats)
+        self.last_stats = {
+            key: sum(item.get(key, 0) for item in items)
+            for key in ("prompt_tokens", "completion_tokens", "tokenize_seconds", "generation_seconds")
+        }
+        self.last_stats["items"] = items
+        return texts
+
+    def _generate_rows(
+        self, prompts: list, max_new_tokens: int, decoding: dict, num_return_sequences: int = 1
+    ) -> list:
+        try:
+            start_time = time.time()
+            inputs = self._encode(prompts)
+            tokenize_time = time.time() - start_time
+
+            generation_params = self._generation_params(max_new_tokens, decoding)
+            with torch.inference_mode():
+                out = self.model.generate(
+                    **inputs, **generation_params, num_return_sequences=num_return_sequences
+                )
+            timed_out = self._timed_out(generation_params, time.time() - start_time)
+
+            completions = out[:, inputs["input_ids"].shape[1]:]
+            texts = self._decode_completions(out, inputs["input_ids"].shape[1])
+
+            # pad == eos: Tokens bis einschließlich des ersten eos zählen
+            is_eos = completions == self.tok.eos_token_id
+            first_eos = torch.where(
+                is_eos.any(dim=1), is_eos.int().argmax(dim=1) + 1, completions.shape[1]
+            )
+            # Zeilen von generate: num_return_sequences pro Prompt hintereinander
+            prompt_tokens = inputs["attention_mask"].sum(dim=1).repeat_interleave(num_return_sequences)
+            self.last_stats = {
+                "prompt_tokens": int(prompt_tokens.sum()),
+                "completion_tokens": int(first_eos.sum()),
+                "tokenize_seconds": tokenize_time,
+                "generation_seconds": time.time() - start_time,
+                "items": [
+                    {"prompt_tokens": int(p), "completion_tokens": int(c)}
+                    for p, c in zip(prompt_tokens, first_eos)
+                ],
+            }
+            if timed_out:
+                unfinished = ~is_eos.any(dim=1)
+                if completions.shape[1] < generation_params["max_new_tokens"]:
+                    for item, flag in zip(self.last_stats["items"], unfinished.tolist()):
+                        if flag:
+                            item["truncated"] = True
+            return texts
+
+        except torch.cuda.OutOfMemoryError as e:
+            logger.warning(f"CUDA Out of Memory bei Batch-Größe {len(prompts)}: {e}")
+            torch.cuda.empty_cache()
+            raise OutOfMemoryError(f"Batch von {len(prompts)} Prompts passt nicht in den GPU-Speicher")
+
+        except MemoryError as e:
+            raise OutOfMemoryError(f"Batch von {len(prompts)} Prompts passt nicht in den Speicher: {e}")
+
+    def _generate_each(self, prompts: list, max_new_tokens: int, decoding: dict) -> list:
+        texts, items = [], []
+        for prompt in prompts:
+            texts.append(self.generate(prompt, max_new_tokens, decoding))
+            items.append(self.last_stats)
+        self.last_stats = {
+            key: sum(item.get(key, 0) for item in items)
+            for key in ("prompt_tokens", "completion_tokens", "tokenize_seconds", "generation_seconds")
+        }
+        self.last_stats["items"] = items
+        return texts
+
+    # ------------------------------------------------------------------
+    # Assistierte (spekulative) Dekodierung mit kleinem Entwurfsmodell
+    # ------------------------------------------------------------------
+    def attach_draft(self, draft_model_id: str, verify: int = 0):
+        """Lädt ein Entwurfsmodell derselben Tokenizer-Familie
+
+        Die ersten ``verify`` Generationen werden zusätzlich ohne Entwurfsmodell
+        erzeugt und Token für Token verglichen; bei einer Abweichung wird das
+        Entwurfsmodell deaktiviert und das Greedy-Ergebnis verwendet.
+        """
+        if draft_model_id in self.drafts:
+            return
+        draft_tok = AutoTokenizer.from_pretrained(draft_model_id)
+        if draft_tok.get_vocab() != self.tok.get_vocab():
+            raise ValueError(
+                f"Entwurfsmodell {draft_model_id} nutzt einen anderen Tokenizer als {self.model_id}"
+            )
+        if self.onnx_path:
+            raise ValueError("Entwurfsmodelle werden mit compile: onnx nicht unterstützt")
+        draft = AutoModelForCausalLM.from_pretrained(
+            draft_model_id,
+            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+            low_cpu_mem_usage=True,
+            trust_remote_code=True,
+        ).to(self.device)
+        draft = apply_cpu_mode(draft, self.cpu_mode).eval()
+        draft.register_forward_pre_hook(self._count_forward("draft"))
+        self.drafts[draft_model_id] = draft
+        self.draft_verify[draft_model_id] = verify
+        logger.info(f"Entwurfsmodell geladen: {draft_model_id} für {self.model_id}")
+
+    def select_draft(self, draft_model_id):
+        """Entwurfsmodell für die folgenden Generationen (``None``: ohne)"""
+        self.draft_model_id = draft_model_id
+
+    def _active_draft(self, decoding: dict):
+        # Nur Greedy: dort ist das Ergebnis identisch zur Generierung ohne Entwurf
+        if self.draft_model_id is None or decoding.get("do_sample", False):
+            return None
+        return self.drafts.get(self.draft_model_id)
+
+    def _count_forward(self, kind: str):
+        def hook(module, args):
+            self._forward_calls[kind] += 1
+        return hook
+
+    def _draft_stats(self, calls_before: dict, completion_tokens: int) -> dict:
+        """Vorgeschlagene/akzeptierte Entwurfs-Tokens anhand der Forward-Pässe"""
+        target_passes = self._forward_calls["target"] - calls_before["target"]
+        proposed = self._forward_calls["draft"] - calls_before["draft"]
+        # Jeder Verifikationspass des Zielmodells liefert genau ein eigenes Token
+        accepted = min(proposed, max(0, completion_tokens - target_passes))
+        return {
+            "draft_proposed": proposed,
+            "draft_accepted": accepted,
+            "target_passes": target_passes,
+        }
+
+    def _verify_draft(self, inputs, generation_params: dict, out, draft_stats: dict):
+        remaining = self.draft_verify.get(self.draft_model_id, 0)
+        if remaining <= 0:
+            return out
+        self.draft_verify[self.draft_model_id] = remaining - 1
+        with torch.inference_mode():
+            plain = self.model.generate(**inputs, **generation_params)
+        draft_stats["draft_verified"] = 1
+        if plain.shape != out.shape or not torch.equal(plain, out):
+            logger.error(
+                f"Assistierte Dekodierung mit {self.draft_model_id} weicht von Greedy ab; "
+                f"Entwurfsmodell für {self.model_id} deaktiviert"
+            )
+            self.drafts.pop(self.draft_model_id, None)
+            draft_stats["draft_mismatch"] = 1
+            return plain
+        return out
+
+    def memory_bytes(self) -> int:
+        if self.onnx_path:
+            return sum(
+                os.path.getsize(os.path.join(self.onnx_path, name))
+                for name in os.listdir(self.onnx_path)
+                if name.endswith((".onnx", ".onnx_data"))
+            )
+        models = [self.model, *self.drafts.values()]
+        return sum(p.numel() * p.element_size() for m in models for p in m.parameters())
+
+    # ------------------------------------------------------------------
+    # LoRA-Adapter (peft), ungemergt auf dem geladenen Basismodell
+    # ------------------------------------------------------------------
+    def attach_lora(self, name: str, adapter_path: str):
+        """Hängt einen LoRA-Adapter unter ``name`` an (Basisgewichte bleiben unverändert)"""
+        from peft import PeftModel
+
+        if self.cpu_mode == "int8" or self.compile == "onnx":
+            raise ValueError(
+                f"LoRA-Adapter benötigen ein nicht quantisiertes torch-Modell ({self.model_id}: "
+                f"{self.cpu_mode}{'+' + self.compile if self.compile else ''})"
+            )
+
+        if not hasattr(self.model, "peft_config"):
+            self.model = PeftModel.from_pretrained(self.model, adapter_path, adapter_name=name)
+        elif name not in self.model.peft_config:
+            self.model.load_adapter(adapter_path, adapter_name=name)
+        self.model.eval()
+        logger.info(f"LoRA-Adapter angehängt: {name} ({adapter_path}) auf {self.model_id}")
+
+    def detach_lora(self, name: str):
+        if hasattr(self.model, "peft_config") and name in self.model.peft_config:
+            self.model.delete_adapter(name)
+            logger.info(f"LoRA-Adapter entfernt: {name}")
+
+    def lora_bytes(self, name: str) -> int:
+        return sum(
+            p.numel() * p.element_size()
+            for n, p in self.model.named_parameters()
+            if f".{name}." in n
+        )
+
+    @contextmanager
+    def lora_scope(self, name):
+        """Aktiviert den Adapter ``name``; ``None`` generiert mit dem reinen Basismodell"""
+        if not hasattr(self.model, "peft_config"):
+            yield
+        elif name is None:
+            with self.model.disable_adapter():
+                yield
+        else:
+            self.model.set_adapter(name)
+            yield
+
     def __del__(self):
         """Cleanup beim Löschen des Objekts"""
         try:
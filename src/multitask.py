@@ -0,0 +1,230 @@
+import gc
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .budget import TimeBudget
+from .logging_config import get_logger
+from .lora import shared_base_key
+from .pipeline import EvaluationPipeline, load_adapter, load_yaml
+
+logger = get_logger("multitask")
+
+CROSS_TASK_JSON = "cross_task_summary.json"
+CROSS_TASK_MD = "cross_task_summary.md"
+
+
+class MultiTaskEvaluation:
+    """Mehrere Tasks in einem Lauf mit einmalig geladenen Modellen
+
+    Jeder Task erhält eine eigene ``EvaluationPipeline`` mit Ausgabeverzeichnis
+    ``output_dir/<task_name>``. Generiert wird modellweise: ein Modell wird
+    geladen, bearbeitet alle Tasks und wird danach wieder freigegeben, bevor
+    das nächste Modell geladen wird – außer es teilt sein Basismodell mit
+    einem späteren Modell (LoRA), dann erst nach dem letzten davon.
+    """
+
+    def __init__(
+        self,
+        tasks: List[Dict],
+        cfg: Dict,
+        model_cfgs: List[Dict],
+        adapters: Optional[Dict[str, object]] = None,
+        adapter_factory: Optional[Callable[[Dict], object]] = None,
+        **pipeline_kwargs,
+    ):
+        names = [task["task_name"] for task in tasks]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(
+                f"Task-Namen müssen eindeutig sein (task_name): {', '.join(duplicates)}"
+            )
+
+        self.cfg = cfg
+        self.model_cfgs = model_cfgs
+        self.model_ids = [mc["model_id"] for mc in model_cfgs]
+        self.adapters: Dict[str, object] = dict(adapters or {})
+        self._external = set(self.adapters)
+        self.adapter_factory = adapter_factory or load_adapter
+        # Eine gemeinsame Deadline für alle Tasks
+        pipeline_kwargs.setdefault("budget", TimeBudget.from_cfg(cfg))
+        self.pipelines = [
+            EvaluationPipeline(
+                task,
+                {**cfg, "output_dir": os.path.join(cfg["output_dir"], task["task_name"])},
+                model_cfgs,
+                adapter_factory=self._adapter_for,
+                **pipeline_kwargs,
+            )
+            for task in tasks
+        ]
+        self.paths: Dict[str, Dict] = {}
+
+    @property
+    def output_dir(self) -> str:
+        return self.cfg["output_dir"]
+
+    @property
+    def task_names(self) -> List[str]:
+        return [p.task["task_name"] for p in self.pipelines]
+
+    @classmethod
+    def from_files(
+        cls, task_paths: Iterable[str], config_path: str, model_paths: Iterable[str], **kwargs
+    ) -> "MultiTaskEvaluation":
+        """Erstellt den Lauf aus YAML-Konfigurationsdateien"""
+        logger.info(f"Lade Konfiguration aus: {config_path}")
+        cfg = load_yaml(config_path)
+        task_paths = list(task_paths)
+        logger.info(f"Lade Tasks aus: {task_paths}")
+        tasks = [load_yaml(p) for p in task_paths]
+        model_paths = list(model_paths)
+        logger.info(f"Lade Modell-Konfigurationen: {model_paths}")
+        model_cfgs = [load_yaml(p) for p in model_paths]
+        return cls(tasks, cfg, model_cfgs, **kwargs)
+
+    def _adapter_for(self, model_cfg: Dict):
+        model_id = model_cfg["model_id"]
+        if model_id not in self.adapters:
+            self.adapters[model_id] = self.adapter_factory(model_cfg)
+        return self.adapters[model_id]
+
+    def _release(self, model_id: str):
+        # Übergebene Adapter gehören dem Aufrufer und bleiben geladen
+        if model_id in self._external:
+            return
+        self.adapters.pop(model_id, None)
+        for pipeline in self.pipelines:
+            pipeline.adapters.pop(model_id, None)
+
+    def _release_finished(self, index: int):
+        """Gibt die Modelle bis ``index`` frei, deren Basismodell kein späteres Modell mehr nutzt
+
+        Die Sichten halten das geteilte Basismodell, das ``SHARED_BASES`` nur schwach
+        referenziert; würden sie sofort freigegeben, lüde das nächste Modell es neu.
+        """
+        later = {shared_base_key(mc) for mc in self.model_cfgs[index + 1 :]} - {None}
+        for model_cfg in self.model_cfgs[: index + 1]:
+            if shared_base_key(model_cfg) not in later:
+                self._release(model_cfg["model_id"])
+        gc.collect()
+
+    def load_data(
+        self, ids: Optional[List[str]] = None, shard: Optional[Tuple[int, int]] = None
+    ):
+        for pipeline in self.pipelines:
+            pipeline.load_data(ids=ids, shard=shard)
+
+    def generate(self, resume: bool = False):
+        """Modellweise Generierung über alle Tasks (jedes Modell wird einmal geladen)"""
+        for i, model_id in enumerate(self.model_ids):
+            logger.info(
+                f"Modell {i+1}/{len(self.model_ids)}: {model_id} für {len(self.pipelines)} Tasks"
+            )
+            for pipeline in self.pipelines:
+                # Ab dem zweiten Modell wird an das Journal dieses Laufs angehängt
+                pipeline.generate(resume=resume or i > 0, models=[model_id])
+            self._release_finished(i)
+
+    def write_shards(self) -> List[str]:
+        return [pipeline.write_shard() for pipeline in self.pipelines]
+
+    def score(self):
+        for pipeline in self.pipelines:
+            pipeline.score()
+
+    def compare(self, mid_a: Optional[str] = None, mid_b: Optional[str] = None):
+        for pipeline in self.pipelines:
+            pipeline.compare(mid_a, mid_b)
+
+    def report(self, plots: bool = True) -> Dict[str, Dict]:
+        """Reports pro Task plus aufgabenübergreifende Zusammenfassung"""
+        for pipeline in self.pipelines:
+            logger.info(f"Report für Task {pipeline.task['task_name']}")
+            self.paths[pipeline.task["task_name"]] = pipeline.report(plots=plots)
+        self.paths["cross_task"] = self.write_cross_task_summary()
+        return self.paths
+
+    def cross_task_summary(self) -> Dict:
+        """Mittelwerte, Differenzen und Signifikanz pro Task und Metrik"""
+        tasks = {}
+        for pipeline in self.pipelines:
+            metrics = {}
+            for metric, stats in pipeline.comparison_results.items():
+                summary_stats = pipeline.summary_stats.get(metric, {})
+                metrics[metric] = {
+                    "model_a_mean": stats["model_a_mean"],
+                    "model_b_mean": stats["model_b_mean"],
+                    "mean_difference": summary_stats.get("mean_difference"),
+                    "p_value": summary_stats.get("p_value"),
+                    "significant": summary_stats.get("significant", False),
+                    "n_samples": stats["n_samples"],
+                }
+            tasks[pipeline.task["task_name"]] = {
+                "n_examples": pipeline.summary.get("n_examples"),
+                "models_compared": pipeline.summary.get("models_compared"),
+                "significant_improvements": pipeline.summary.get("significant_improvements", []),
+                "significant_degradations": pipeline.summary.get("significant_degradations", []),
+                "metrics": metrics,
+            }
+        return {
+            "tasks": tasks,
+            "models": self.model_ids,
+            "evaluation_time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    def write_cross_task_summary(self) -> Dict[str, str]:
+        """Schreibt cross_task_summary.json und cross_task_summary.md"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        summary = self.cross_task_summary()
+
+        json_path = os.path.join(self.output_dir, CROSS_TASK_JSON)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+
+        lines = ["# Aufgabenübergreifende Zusammenfassung", ""]
+        lines.append(f"- **Modelle**: {', '.join(self.model_ids)}")
+        lines.append(f"- **Tasks**: {', '.join(summary['tasks'])}")
+        lines.append("")
+        lines.append("| Task | Metrik | Modell A | Modell B | Differenz (B - A) | p-Wert | Signifikant |")
+        lines.append("|---|---|---|---|---|---|---|")
+        for task_name, task in summary["tasks"].items():
+            for metric, stats in task["metrics"].items():
+                p_value = stats["p_value"]
+                p_text = "n/a" if p_value is None or p_value != p_value else f"{p_value:.4f}"
+                lines.append(
+                    f"| {task_name} | {metric} | {stats['model_a_mean']:.4f} | "
+                    f"{stats['model_b_mean']:.4f} | {stats['mean_difference']:+.4f} | "
+                    f"{p_text} | {'ja' if stats['significant'] else 'nein'} |"
+                )
+        lines.append("")
+        lines.append("Einzelreports: " + ", ".join(f"`{name}/report.md`" for name in summary["tasks"]))
+        lines.append("")
+
+        md_path = os.path.join(self.output_dir, CROSS_TASK_MD)
+        with open(md_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+        logger.info(f"Aufgabenübergreifende Zusammenfassung: {md_path}")
+        return {"json": json_path, "markdown": md_path}
+
+    def log_summary(self):
+        for pipeline in self.pipelines:
+            logger.info(f"Task {pipeline.task['task_name']}:")
+            pipeline.log_summary()
+
+    def run(
+        self,
+        ids: Optional[List[str]] = None,
+        resume: bool = False,
+        plots: bool = True,
+    ) -> Dict[str, Dict]:
+        """Führt alle Stufen für alle Tasks aus"""
+        self.load_data(ids=ids)
+        self.generate(resume=resume)
+        self.score()
+        self.compare()
+        paths = self.report(plots=plots)
+        self.log_summary()
+        return paths
@@ -0,0 +1,604 @@
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import yaml
+from tqdm import tqdm
+
+from .backends import create_adapter
+from .batching import AdaptiveBatcher, BatchSizeStore, BATCH_STATE_FILE, DEFAULT_MAX_BATCH_SIZE
+from .budget import TimeBudget
+from .caching import cache_variant
+from .comparison import (
+    METRIC_DIRECTIONS,
+    default_registry,
+    score_row,
+    score_samples,
+    compute_metrics,
+    compare_models,
+    build_summary,
+    write_detailed_results,
+    log_summary,
+)
+from .generation import build_prompt, generate_cached_batch, cached_row, failed_row
+from .journal import ProgressJournal, replay_journal, JOURNAL_FILE
+from .logging_config import get_logger
+from .metrics.registry import MetricsRegistry
+from .profiling import NULL_PROFILER, Profiler, markdown_section
+from .reference import (
+    REF_METRICS,
+    corpus_summary,
+    is_reference_mode,
+    markdown_section as reference_section,
+    reference_metrics,
+    score_references_cached,
+)
+from .sampling import markdown_section as sampling_section, num_samples, sampling_summary
+from .report import write_markdown
+from .results_io import resolve_results_format, write_columnar_results
+from .sharding import select_shard, write_shard, shard_name
+from .tasks import load_jsonl, load_jsonl_by_ids
+from .telemetry import NULL_TELEMETRY, Telemetry
+from .token_cache import PromptTokenCache, TOKENS_DIR
+from .workqueue import WorkQueue, make_units
+
+logger = get_logger("pipeline")
+
+
+def load_yaml(path: str) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def load_adapter(model_cfg: Dict):
+    """Lädt den Adapter für eine Modell-Konfiguration (Backend über ``backend``, default: hf)"""
+    return create_adapter(model_cfg)
+
+
+class EvaluationPipeline:
+    """Evaluation als Folge expliziter Stufen
+
+    Daten laden → Modelle laden → Generieren → Scoren → Vergleichen → Report.
+    Bereits geladene Adapter können übergeben werden, damit mehrere
+    Evaluationen in einem Prozess dieselben Modelle nutzen::
+
+        pipe = EvaluationPipeline(task, cfg, model_cfgs, adapters=loaded)
+        pipe.run()
+    """
+
+    def __init__(
+        self,
+        task: Dict,
+        cfg: Dict,
+        model_cfgs: List[Dict],
+        adapters: Optional[Dict[str, object]] = None,
+        adapter_factory: Optional[Callable[[Dict], object]] = None,
+        registry: Optional[MetricsRegistry] = None,
+        use_cache: bool = True,
+        results_format: Optional[str] = None,
+        run_args: Optional[Dict] = None,
+        on_progress: Optional[Callable[[str, int, int], None]] = None,
+        profiler: Optional[Profiler] = None,
+        telemetry: Optional[Telemetry] = None,
+        budget: Optional[TimeBudget] = None,
+    ):
+        self.task = task
+        self.cfg = cfg
+        self.model_cfgs = model_cfgs
+        self.model_ids = [mc["model_id"] for mc in model_cfgs]
+        # CPU-Modus/Kompilierung pro Modell: Teil der Cache-Keys
+        self.variants = {mc["model_id"]: cache_variant(mc) for mc in model_cfgs}
+        self.adapters: Dict[str, object] = dict(adapters or {})
+        self.adapter_factory = adapter_factory or load_adapter
+        self.reg = registry or default_registry()
+        self.use_cache = use_cache
+        self.results_format = resolve_results_format(
+            results_format or cfg.get("results_format", "auto")
+        )
+        self.run_args = run_args or {}
+        self.on_progress = on_progress
+        self.profiler = profiler or NULL_PROFILER
+        self.telemetry = telemetry or NULL_TELEMETRY
+        # Zeitbudgets; ohne Vorgabe erst bei generate() aus der (ggf. überschriebenen) Konfiguration
+        self.budget = budget
+
+        # Zustand der Stufen
+        self.examples: List[Dict] = []
+        self.positions: List[int] = []
+        self.total_examples = 0
+        self.shard: Optional[Tuple[int, int]] = None
+        self.results: Dict[str, List[Dict]] = {}
+        self.store = None
+        self.comparison_results: Dict = {}
+        self.summary_stats: Dict = {}
+        self.summary: Dict = {}
+        self.coverage: Dict[str, Tuple[int, int]] = {}
+        # Ungekürzte Prompt-Längen pro Modell (Reihenfolge wie examples) und Zahl gekürzter Prompts
+        self.prompt_lengths: Dict[str, np.ndarray] = {}
+        self.truncated_prompts: Dict[str, Tuple[int, int, int]] = {}
+
+    def _progress(self, stage: str, done: int, total: int):
+        if self.on_progress is not None:
+            self.on_progress(stage, done, total)
+
+    @property
+    def output_dir(self) -> str:
+        return self.cfg["output_dir"]
+
+    @classmethod
+    def from_files(
+        cls, task_path: str, config_path: str, model_paths: Iterable[str], **kwargs
+    ) -> "EvaluationPipeline":
+        """Erstellt die Pipeline aus YAML-Konfigurationsdateien"""
+        logger.info(f"Lade Konfiguration aus: {config_path}")
+        cfg = load_yaml(config_path)
+        logger.info(f"Lade Task aus: {task_path}")
+        task = load_yaml(task_path)
+        model_paths = list(model_paths)
+        logger.info(f"Lade Modell-Konfigurationen: {model_paths}")
+        model_cfgs = [load_yaml(p) for p in model_paths]
+        return cls(task, cfg, model_cfgs, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Stufe 1: Daten
+    # ------------------------------------------------------------------
+    def load_data(
+        self, ids: Optional[List[str]] = None, shard: Optional[Tuple[int, int]] = None
+    ) -> List[Dict]:
+        """Lädt die Testdaten (optional per ID, begrenzt und/oder als Shard)"""
+        test_file = self.task["data"]["test_file"]
+        logger.info(f"Lade Test-Daten aus: {test_file}")
+        with self.profiler.stage("load_data"):
+            if ids:
+                # Gezielter Zugriff über den Byte-Offset-Index statt vollständigem Scan
+                examples = load_jsonl_by_ids(test_file, ids)
+                logger.info(f"{len(examples)} Testbeispiele per ID geladen")
+            else:
+                examples = load_jsonl(test_file)
+                logger.info(f"{len(examples)} Testbeispiele geladen")
+
+        # Maximale Anzahl Samples begrenzen
+        max_samples = self.cfg.get("max_samples")
+        if max_samples and max_samples < len(examples):
+            examples = examples[:max_samples]
+            logger.info(f"Begrenzt auf {len(examples)} Beispiele")
+
+        # Statisches Sharding über stabilen Hash der Beispiel-ID
+        self.total_examples = len(examples)
+        self.positions = list(range(len(examples)))
+        self.shard = shard
+        if shard:
+            selected = select_shard(examples, *shard)
+            self.positions = [pos for pos, _ in selected]
+            examples = [ex for _, ex in selected]
+            logger.info(
+                f"Shard {shard[0]}/{shard[1]}: {len(examples)} von {self.total_examples} Beispielen"
+            )
+
+        self.examples = examples
+        return examples
+
+    # ------------------------------------------------------------------
+    # Stufe 2: Modelle
+    # ------------------------------------------------------------------
+    def load_models(
+        self, skip: Iterable[str] = (), models: Optional[Iterable[str]] = None
+    ) -> Dict[str, object]:
+        """Lädt alle noch nicht übergebenen Adapter (nur ``models``, außer ``skip``)"""
+        logger.info("Lade Modelle...")
+        skip = set(skip)
+        selected = set(models) if models is not None else set(self.model_ids)
+        for i, mc in enumerate(self.model_cfgs):
+            model_id = mc["model_id"]
+            if model_id in self.adapters or model_id not in selected:
+                continue
+            if model_id in skip:
+                logger.info(f"Modell {i+1}/{len(self.model_cfgs)} vollständig im Journal: {model_id}")
+                continue
+            logger.info(f"Lade Modell {i+1}/{len(self.model_cfgs)}: {model_id}")
+            try:
+                with self.profiler.stage("load_models"):
+                    self.adapters[model_id] = self.adapter_factory(mc)
+            except Exception as e:
+                logger.error(f"Fehler beim Laden von Modell {model_id}: {e}")
+                raise
+
+        logger.info(f"{len(self.adapters)} Modelle geladen")
+        return self.adapters
+
+    # ------------------------------------------------------------------
+    # Stufe 3: Generierung
+    # ------------------------------------------------------------------
+    def journal_path(self) -> str:
+        # Shards, die in dasselbe Ausgabeverzeichnis schreiben, erhalten eigene Journale
+        name = f"journal-{shard_name(*self.shard)}.jsonl" if self.shard else JOURNAL_FILE
+        return os.path.join(self.output_dir, name)
+
+    def journal_header(self) -> Dict:
+        header = {
+            "task": self.task["task_name"],
+            "models": self.model_ids,
+            "decoding": self.cfg["decoding"],
+            "seed": self.cfg["seed"],
+            "max_new_tokens": self.cfg["max_new_tokens"],
+        }
+        if is_reference_mode(self.cfg):
+            header["mode"] = self.cfg["mode"]
+        if any(self.variants.values()):
+            header["variants"] = self.variants
+        return header
+
+    def tokenize_prompts(self, model_id: str, adapter) -> Optional[PromptTokenCache]:
+        """Vorstufe: Prompts einmal pro Tokenizer tokenisieren und in ``<cache_dir>/tokens`` ablegen
+
+        Modelle mit demselben Tokenizer (und spätere Läufe) übernehmen die
+        gespeicherten IDs. Liefert die Längen ohne zweiten Tokenizer-Lauf und
+        zählt Prompts, die ``max_prompt_length`` überschreiten und gekürzt werden.
+        """
+        fingerprint = adapter.tokenizer_fingerprint() if hasattr(adapter, "tokenizer_fingerprint") else None
+        if fingerprint is None:
+            return None
+        template = self.task["prompt"]["template"]
+        prompts = [build_prompt(template, ex["source"]) for ex in self.examples]
+        root = os.path.join(self.cfg["cache_dir"], TOKENS_DIR) if self.use_cache else None
+        cache = PromptTokenCache(root, fingerprint, template)
+        missing = cache.missing(prompts)
+        if missing:
+            with self.profiler.stage("tokenize"):
+                cache.add(missing, adapter.tokenize_prompts(missing))
+            logger.info(f"{len(missing)} Prompts tokenisiert ({model_id}), {len(prompts) - len(missing)} aus dem Cache")
+        lengths = cache.lengths(prompts)
+        max_length = adapter.max_prompt_length
+        n_truncated = int(np.count_nonzero(lengths > max_length))
+        self.prompt_lengths[model_id] = lengths
+        self.truncated_prompts[model_id] = (n_truncated, len(prompts), max_length)
+        if n_truncated:
+            logger.warning(
+                f"✂️ {n_truncated} von {len(prompts)} Prompts länger als {max_length} Tokens "
+                f"({model_id}, längster: {int(lengths.max())}); sie werden gekürzt"
+            )
+        adapter.use_prompt_tokens(cache)
+        return cache
+
+    def batcher(self, model_id: str, adapter) -> AdaptiveBatcher:
+        """Batch-Steuerung für ein Modell gemäß ``batch_size`` und ``adaptive_batching``
+
+        Adapter ohne ``generate_batch`` arbeiten immer mit Batch-Größe 1; ein
+        Worker-Pool erhält mindestens einen Teil-Batch pro Worker.
+        """
+        if not hasattr(adapter, "generate_batch"):
+            return AdaptiveBatcher(model_id)
+        opts = self.cfg.get("adaptive_batching") or {}
+        budget_gb = opts.get("memory_budget_gb")
+        state_file = opts.get("state_file") or os.path.join(self.cfg["cache_dir"], BATCH_STATE_FILE)
+        return AdaptiveBatcher(
+            model_id,
+            batch_size=max(self.cfg.get("batch_size", 1), getattr(adapter, "preferred_batch_size", 1)),
+            adaptive=opts.get("enabled", False),
+            max_batch_size=opts.get("max_batch_size", DEFAULT_MAX_BATCH_SIZE),
+            memory_budget_bytes=int(budget_gb * 1e9) if budget_gb else None,
+            store=BatchSizeStore(state_file),
+        )
+
+    def generate(
+        self, resume: bool = False, models: Optional[Iterable[str]] = None
+    ) -> Dict[str, List[Dict]]:
+        """Generiert (oder übernimmt aus Journal/Cache) alle Hypothesen
+
+        Modelle werden erst geladen, wenn für sie noch Einheiten offen sind.
+        Mit ``models`` wird nur für diese Modelle generiert; Ergebnisse anderer
+        Modelle aus früheren Aufrufen bleiben erhalten. Mit ``mode: reference``
+        wird statt zu generieren die Likelihood der Referenzen bestimmt.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        journal_path = self.journal_path()
+        header = self.journal_header()
+        models = list(models) if models is not None else self.model_ids
+        if self.budget is None:
+            self.budget = TimeBudget.from_cfg(self.cfg)
+        self.budget.start()
+        decoding = self.cfg["decoding"]
+        reference_mode = is_reference_mode(self.cfg)
+        if reference_mode:
+            logger.info("Referenz-Modus: Teacher-Forcing-Likelihood der Referenzen, keine Generierung")
+        elif num_samples(decoding) > 1 and not decoding.get("do_sample", False):
+            logger.warning("num_samples ohne do_sample: alle Stichproben sind identisch")
+
+        # Fortschrittsjournal: abgeschlossene Einheiten beim Fortsetzen übernehmen
+        done = replay_journal(journal_path, header) if resume else {}
+        complete = [
+            mid for mid in models
+            if all((mid, ex["id"]) in done for ex in self.examples)
+        ]
+        self.load_models(skip=complete, models=models)
+
+        logger.info("Starte Evaluation...")
+        results = {model_id: [] for model_id in models}
+        total_tasks = len(self.examples) * len(models)
+        n_done = sum(1 for mid, _ in done if mid in results)
+
+        # Progress Bar für gesamte Evaluation; modellweise, damit jedes Modell in Batches arbeiten kann
+        with self.profiler.stage("generate"), ProgressJournal(
+            journal_path, header, self.cfg.get("journal_flush_every", 20), resume=resume
+        ) as journal, tqdm(
+            total=total_tasks, initial=n_done, desc="Evaluation", unit="Beispiel"
+        ) as pbar:
+            for model_id in models:
+                pending = [ex for ex in self.examples if (model_id, ex["id"]) not in done]
+                new_records: Dict[str, Dict] = {}
+                if pending:
+                    adapter = self.adapters[model_id]
+                    self.tokenize_prompts(model_id, adapter)
+                    batcher = self.batcher(model_id, adapter)
+
+                    def run_batch(batch, adapter=adapter, model_id=model_id):
+                        if reference_mode:
+                            return score_references_cached(
+                                adapter, model_id, batch, self.task, self.cfg,
+                                use_cache=self.use_cache, profiler=self.profiler,
+                                telemetry=self.telemetry, variant=self.variants[model_id],
+                            )
+                        return generate_cached_batch(
+                            adapter, model_id, batch, self.task, self.cfg,
+                            use_cache=self.use_cache, profiler=self.profiler,
+                            telemetry=self.telemetry, budget=self.budget,
+                            variant=self.variants[model_id],
+                        )
+
+                    for batch, rows in batcher.process(pending, run_batch, stop=self.budget.expired):
+                        failed = isinstance(rows, Exception)
+                        if failed:
+                            ex = batch[0]
+                            logger.error(f"Fehler bei Beispiel {ex['id']}, Modell {model_id}: {rows}")
+                            # Dummy-Eintrag für fehlgeschlagene Generation
+                            rows = [failed_row(ex) for ex in batch]
+
+                        for row in rows:
+                            with self.profiler.stage("metrics"):
+                                if reference_mode:
+                                    metrics = reference_metrics(row.get("ref_scores") or [])
+                                    sample_metrics = None
+                                elif row.get("samples"):
+                                    metrics, sample_metrics = score_samples(self.reg, row)
+                                else:
+                                    metrics, sample_metrics = score_row(self.reg, row), None
+                            record = {
+                                "model_id": model_id,
+                                **row,
+                                "metrics": metrics,
+                                "failed": failed,
+                            }
+                            if sample_metrics is not None:
+                                record["sample_metrics"] = sample_metrics
+                            journal.append(record)
+                            new_records[row["id"]] = record
+                            self.telemetry.record_example(
+                                model_id, self.task.get("task_name"), failed=failed
+                            )
+                            pbar.update(1)
+                            self._progress("generate", pbar.n, total_tasks)
+
+                # Nach Ablauf der Deadline bleiben Beispiele offen (für --resume)
+                results[model_id] = [
+                    done.get((model_id, ex["id"])) or new_records[ex["id"]]
+                    for ex in self.examples
+                    if (model_id, ex["id"]) in done or ex["id"] in new_records
+                ]
+                self.coverage[model_id] = (len(results[model_id]), len(self.examples))
+
+        if any(n < total for n, total in self.coverage.values()):
+            results = self._restrict_to_common(results)
+        logger.info("Evaluation abgeschlossen")
+        self.results = {
+            mid: results[mid] if mid in results else self.results.get(mid, [])
+            for mid in self.model_ids
+        }
+        return self.results
+
+    def _restrict_to_common(self, results: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+        """Nach Ablauf der Deadline: nur Beispiele, die alle Modelle abgeschlossen haben"""
+        common = set.intersection(*({r["id"] for r in rows} for rows in results.values()))
+        for model_id, (n, total) in self.coverage.items():
+            logger.warning(f"⏱️ Deadline erreicht: {model_id} hat {n}/{total} Beispiele abgeschlossen")
+        logger.warning(f"Vergleich auf {len(common)} von {len(self.examples)} Beispielen beschränkt")
+        return {
+            model_id: [r for r in rows if r["id"] in common]
+            for model_id, rows in results.items()
+        }
+
+    def coverage_lines(self) -> List[str]:
+        """Abdeckung pro Modell, falls die Deadline Beispiele übersprungen hat"""
+        if all(n == total for n, total in self.coverage.values()):
+            return []
+        return [
+            f"{model_id}: {n}/{total} ({n / total:.1%})" if total else f"{model_id}: 0/0"
+            for model_id, (n, total) in self.coverage.items()
+        ]
+
+    def generate_via_queue(
+        self, queue_dir: str, lease_seconds: float = 600.0, poll_interval: float = 5.0
+    ) -> Dict[str, List[Dict]]:
+        """Koordinator: Einheiten einstellen, auf Worker warten, Ergebnisse aus dem Cache holen"""
+        if not self.use_cache:
+            raise ValueError("Die Warteschlange benötigt den geteilten Cache (kein --no-cache)")
+        if is_reference_mode(self.cfg):
+            raise ValueError("Der Referenz-Modus läuft nur lokal (ohne Warteschlange)")
+
+        queue = WorkQueue(queue_dir, lease_seconds=lease_seconds)
+        queue.write_spec({"task": self.task, "config": self.cfg, "model_cfgs": self.model_cfgs})
+        units = make_units(
+            self.model_ids, [ex["id"] for ex in self.examples], self.cfg.get("queue_batch_size", 16)
+        )
+        logger.info(f"{queue.publish(units)} von {len(units)} Einheiten eingestellt: {queue_dir}")
+
+        with tqdm(total=len(units), desc="Warteschlange", unit="Einheit") as pbar:
+            while True:
+                queue.reclaim_expired()
+                status = queue.status()
+                pbar.n = status["done"]
+                pbar.refresh()
+                if status["pending"] == 0 and status["leased"] == 0:
+                    break
+                time.sleep(poll_interval)
+
+        results = {model_id: [] for model_id in self.model_ids}
+        for model_id in self.model_ids:
+            for ex in self.examples:
+                cached = cached_row(
+                    self.cfg["cache_dir"], model_id, ex, self.task, self.cfg, self.variants[model_id]
+                )
+                results[model_id].append(cached if cached is not None else failed_row(ex))
+
+        logger.info("Evaluation abgeschlossen")
+        self.results = results
+        return results
+
+    def write_shard(self) -> str:
+        """Shard-Modus: nur Rohergebnisse schreiben, Statistik erfolgt beim Zusammenführen"""
+        # Nach einer Deadline fehlen Beispiele: Position über die ID, nicht über die Reihenfolge
+        position = {ex["id"]: pos for ex, pos in zip(self.examples, self.positions)}
+        rows = [
+            {**row, "model_id": model_id, "index": position[row["id"]]}
+            for model_id, model_rows in self.results.items()
+            for row in model_rows
+        ]
+        manifest = {
+            "task": self.task["task_name"],
+            "models": self.model_ids,
+            "shard": self.shard[0],
+            "num_shards": self.shard[1],
+            "total_examples": self.total_examples,
+            "n_examples": len({row["id"] for row in rows}),
+            # merge_shards wählt danach Metriken, Richtung und Report-Abschnitte wie score/compare
+            "mode": self.cfg.get("mode", "generate"),
+            "num_samples": num_samples(self.cfg["decoding"]),
+        }
+        return write_shard(os.path.join(self.output_dir, "shards"), manifest, rows)
+
+    # ------------------------------------------------------------------
+    # Stufe 4–6: Scoring, Vergleich, Report
+    # ------------------------------------------------------------------
+    def score(self):
+        """Metriken berechnen (Array-basierter ResultStore als einzige Quelle)"""
+        with self.profiler.stage("score"):
+            metric_names = REF_METRICS if is_reference_mode(self.cfg) else None
+            self.store = compute_metrics(self.results, self.reg, metric_names)
+        return self.store
+
+    def compare(self, mid_a: Optional[str] = None, mid_b: Optional[str] = None) -> Dict:
+        """Statistischer Vergleich zweier Modelle (default: Modell 0 vs. 1)"""
+        mid_a = mid_a or self.model_ids[0]
+        mid_b = mid_b or self.model_ids[1]
+        with self.profiler.stage("compare"):
+            self.comparison_results, self.summary_stats = compare_models(
+                self.store, mid_a, mid_b, profiler=self.profiler
+            )
+        self.summary = build_summary(
+            self.task["task_name"], mid_a, mid_b, len(self.results[mid_a]),
+            self.comparison_results, self.summary_stats,
+            lower_is_better=REF_METRICS if is_reference_mode(self.cfg) else (),
+        )
+        if self.coverage_lines():
+            self.summary["coverage"] = self.coverage_lines()
+        truncated_prompts = [
+            f"{model_id}: {n}/{total} (> {max_length} Tokens)"
+            for model_id, (n, total, max_length) in self.truncated_prompts.items()
+            if n
+        ]
+        if truncated_prompts:
+            self.summary["truncated_prompts"] = truncated_prompts
+        if self.budget is not None and self.budget.truncated:
+            self.summary["truncated_outputs"] = self.budget.truncated
+        if num_samples(self.cfg["decoding"]) > 1:
+            self.summary["num_samples"] = num_samples(self.cfg["decoding"])
+        return self.comparison_results
+
+    def report(self, plots: bool = True) -> Dict[str, Optional[str]]:
+        """Schreibt Plots, Detailergebnisse, Markdown-Report und ggf. profile.json"""
+        output_dir = self.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Visualisierungen erstellen
+        plot_paths = []
+        if plots:
+            logger.info("Erstelle Visualisierungen...")
+            try:
+                with self.profiler.stage("plots"):
+                    from .visualization import create_all_visualizations
+
+                    plot_paths = create_all_visualizations(
+                        self.comparison_results, self.store.as_metric_dict(), output_dir
+                    )
+                logger.info(f"Visualisierungen erstellt: {len(plot_paths)} Plots")
+            except Exception as e:
+                logger.error(f"Fehler beim Erstellen der Visualisierungen: {e}")
+
+        # Ergebnisse speichern: spaltenbasiert (Parquet + Manifest) oder als JSON
+        results_path = None
+        try:
+            with self.profiler.stage("write_results"):
+                if self.results_format == "parquet":
+                    results_path, manifest_path = write_columnar_results(
+                        output_dir, self.results, self.store, self.summary,
+                        self.comparison_results, plot_paths, self.run_args,
+                        row_group_size=self.cfg.get("results_row_group_size", 1000),
+                    )
+                    logger.info(f"Manifest gespeichert: {manifest_path}")
+                else:
+                    results_path = write_detailed_results(
+                        output_dir, self.summary, self.comparison_results, self.store,
+                        plot_paths, self.run_args,
+                    )
+            logger.info(f"Detaillierte Ergebnisse gespeichert: {results_path}")
+        except Exception as e:
+            logger.error(f"Fehler beim Speichern der Ergebnisse: {e}")
+
+        # Report generieren (mit Laufzeitprofil bis hierher, falls aktiviert)
+        logger.info("Generiere Reports...")
+        try:
+            with self.profiler.stage("report"):
+                extra = []
+                sampling = sampling_summary(self.results, self.reg.names(), METRIC_DIRECTIONS)
+                if sampling:
+                    extra += sampling_section(sampling)
+                references = corpus_summary(self.results)
+                if references:
+                    extra += reference_section(references)
+                if self.profiler.enabled:
+                    extra += markdown_section(self.profiler.summary())
+                rep_path = write_markdown(
+                    output_dir, self.summary, self.comparison_results, extra_sections=extra or None
+                )
+            logger.info(f"Markdown-Report erstellt: {rep_path}")
+        except Exception as e:
+            logger.error(f"Fehler beim Erstellen des Markdown-Reports: {e}")
+            rep_path = None
+
+        paths = {"report": rep_path, "results": results_path, "plots": plot_paths}
+        if self.profiler.enabled:
+            paths["profile"] = self.profiler.write(output_dir)
+        return paths
+
+    def log_summary(self):
+        log_summary(logger, self.summary, self.summary_stats)
+
+    # ------------------------------------------------------------------
+    def run(
+        self,
+        ids: Optional[List[str]] = None,
+        resume: bool = False,
+        plots: bool = True,
+    ) -> Dict[str, Optional[str]]:
+        """Führt alle Stufen nacheinander aus"""
+        self.load_data(ids=ids)
+        self._progress("load_data", 1, 1)
+        self.generate(resume=resume)
+        self.score()
+        self._progress("score", 1, 1)
+        self.compare()
+        self._progress("compare", 1, 1)
+        paths = self.report(plots=plots)
+        self._progress("report", 1, 1)
+        self.log_summary()
+        return paths
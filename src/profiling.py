@@ -0,0 +1,330 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .logging_config import get_logger
+
+try:
+    import resource
+except ImportError:  # nicht auf Windows verfügbar
+    resource = None
+
+logger = get_logger("profiling")
+
+PROFILE_FILE = "profile.json"
+CPROFILE_DIR = "cprofile"
+HOT_STAGES = ("generate", "metrics", "compare", "plots")
+# Abtastintervall des RSS während aktiver Stufen
+RSS_SAMPLE_SECONDS = 0.05
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Aktueller Resident Set Size des Prozesses (nur Linux)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Maximaler RSS des Prozesses seit Start (Hochwassermarke, nicht pro Stufe)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux liefert KiB, macOS Bytes
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def _mb(value: Optional[int]) -> Optional[float]:
+    return None if value is None else round(value / 2**20, 1)
+
+
+class Profiler:
+    """Laufzeitprofil eines Evaluationslaufs
+
+    Misst Wall- und CPU-Zeit pro Stufe (mehrfach betretene Stufen werden
+    aufsummiert, verschachtelte Stufen zählen auch in der äußeren), RSS-Zuwachs
+    und Spitzen-RSS jeder Stufe, Cache-Treffer und Latenz/Tokens pro Sekunde
+    jeder Generation. Der Spitzen-RSS einer Stufe wird während der Stufe alle
+    ``rss_interval`` Sekunden in einem Hintergrund-Thread abgetastet (nur
+    Linux); ``ru_maxrss`` erscheint nur als Prozess-Spitze bisher.
+    Deaktiviert kosten alle Aufrufe praktisch nichts.
+    Mit ``cprofile=True`` wird für ``cprofile_stages`` zusätzlich ein
+    cProfile-Dump nach ``<output_dir>/cprofile/<stage>.prof`` geschrieben.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        cprofile: bool = False,
+        cprofile_stages: Iterable[str] = HOT_STAGES,
+        rss_interval: float = RSS_SAMPLE_SECONDS,
+    ):
+        self.enabled = enabled
+        self.cprofile_stages = set(cprofile_stages) if enabled and cprofile else set()
+        self.stages: Dict[str, Dict] = {}
+        self.counters: Dict[str, int] = {}
+        self.generations: Dict[str, Dict[str, List[float]]] = {}
+        self.drafts: Dict[str, Dict[str, int]] = {}
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._active: List[str] = []
+        self.rss_interval = rss_interval
+        # Bisheriger Spitzen-RSS je aktiver Stufe (parallel zu _active)
+        self._rss_peaks: List[int] = []
+        self._rss_lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._sampler_stop = threading.Event()
+        self.started = time.time()
+
+    def _sample_rss(self):
+        while not self._sampler_stop.wait(self.rss_interval):
+            rss = current_rss_bytes()
+            if rss is None:
+                return
+            with self._rss_lock:
+                self._rss_peaks[:] = [max(peak, rss) for peak in self._rss_peaks]
+
+    def _start_sampler(self):
+        self._sampler_stop.clear()
+        self._sampler = threading.Thread(target=self._sample_rss, name="rss-sampler", daemon=True)
+        self._sampler.start()
+
+    def _stop_sampler(self):
+        self._sampler_stop.set()
+        self._sampler.join()
+        self._sampler = None
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        profile = None
+        # cProfile nur auf der äußersten Ebene einer Hot-Stage (kein verschachteltes enable)
+        if name in self.cprofile_stages and not any(s in self.cprofile_stages for s in self._active):
+            profile = self._profiles.setdefault(name, cProfile.Profile())
+            profile.enable()
+
+        self._active.append(name)
+        rss_start = current_rss_bytes()
+        with self._rss_lock:
+            self._rss_peaks.append(rss_start or 0)
+        if rss_start is not None and self._sampler is None:
+            self._start_sampler()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            self._active.pop()
+            with self._rss_lock:
+                rss_peak = self._rss_peaks.pop()
+            if not self._active and self._sampler is not None:
+                self._stop_sampler()
+            if profile is not None:
+                profile.disable()
+
+            entry = self.stages.setdefault(
+                name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0}
+            )
+            entry["calls"] += 1
+            entry["wall_seconds"] += wall
+            entry["cpu_seconds"] += cpu
+            rss_end = current_rss_bytes()
+            if rss_start is not None and rss_end is not None:
+                entry["rss_delta_mb"] = round(
+                    entry.get("rss_delta_mb", 0.0) + (rss_end - rss_start) / 2**20, 1
+                )
+                # Höchster RSS während (irgendeines Aufrufs) der Stufe
+                entry["peak_rss_mb"] = max(
+                    entry.get("peak_rss_mb", 0.0), _mb(max(rss_peak, rss_start, rss_end))
+                )
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_generation(
+        self,
+        model_id: str,
+        seconds: float,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        tokenize_seconds: Optional[float] = None,
+    ):
+        """Eine (nicht gecachte) Generation mit Latenz und Token-Zahlen"""
+        if not self.enabled:
+            return
+        stats = self.generations.setdefault(
+            model_id,
+            {"seconds": [], "prompt_tokens": [], "completion_tokens": [], "tokenize_seconds": []},
+        )
+        stats["seconds"].append(seconds)
+        if tokenize_seconds is not None:
+            stats["tokenize_seconds"].append(tokenize_seconds)
+        if prompt_tokens is not None:
+            stats["prompt_tokens"].append(prompt_tokens)
+        if completion_tokens is not None:
+            stats["completion_tokens"].append(completion_tokens)
+
+    def record_draft(self, model_id: str, stats: Dict):
+        """Kennzahlen einer assistierten Generation (Entwurfsmodell)"""
+        if not self.enabled:
+            return
+        totals = self.drafts.setdefault(
+            model_id,
+            {"generations": 0, "proposed": 0, "accepted": 0, "target_passes": 0,
+             "completion_tokens": 0, "verified": 0, "mismatches": 0},
+        )
+        totals["generations"] += 1
+        totals["proposed"] += stats.get("draft_proposed", 0)
+        totals["accepted"] += stats.get("draft_accepted", 0)
+        totals["target_passes"] += stats.get("target_passes", 0)
+        totals["completion_tokens"] += stats.get("completion_tokens", 0)
+        totals["verified"] += stats.get("draft_verified", 0)
+        totals["mismatches"] += stats.get("draft_mismatch", 0)
+
+    def draft_summary(self) -> Dict[str, Dict]:
+        summary = {}
+        for model_id, totals in self.drafts.items():
+            entry = dict(totals)
+            if totals["proposed"]:
+                entry["acceptance_rate"] = round(totals["accepted"] / totals["proposed"], 4)
+            if totals["target_passes"]:
+                entry["tokens_per_target_pass"] = round(
+                    totals["completion_tokens"] / totals["target_passes"], 2
+                )
+            summary[model_id] = entry
+        return summary
+
+    def generation_summary(self) -> Dict[str, Dict]:
+        summary = {}
+        for model_id, stats in self.generations.items():
+            seconds = np.asarray(stats["seconds"], dtype=float)
+            total = float(seconds.sum())
+            entry = {
+                "n": int(seconds.size),
+                "total_seconds": round(total, 3),
+                "latency_mean_s": round(float(seconds.mean()), 4),
+                "latency_p50_s": round(float(np.percentile(seconds, 50)), 4),
+                "latency_p95_s": round(float(np.percentile(seconds, 95)), 4),
+                "latency_max_s": round(float(seconds.max()), 4),
+            }
+            if stats["tokenize_seconds"]:
+                entry["tokenize_seconds"] = round(sum(stats["tokenize_seconds"]), 4)
+            # Tokens/s nur, wenn der Adapter Token-Zahlen liefert
+            for kind in ("prompt", "completion"):
+                tokens = stats[f"{kind}_tokens"]
+                if tokens and len(tokens) == seconds.size and total > 0:
+                    entry[f"{kind}_tokens"] = int(sum(tokens))
+                    entry[f"{kind}_tokens_per_s"] = round(sum(tokens) / total, 1)
+            summary[model_id] = entry
+        return summary
+
+    def summary(self) -> Dict:
+        hits = self.counters.get("cache_hit", 0)
+        misses = self.counters.get("cache_miss", 0)
+        return {
+            "stages": {
+                name: {
+                    **entry,
+                    "wall_seconds": round(entry["wall_seconds"], 4),
+                    "cpu_seconds": round(entry["cpu_seconds"], 4),
+                }
+                for name, entry in self.stages.items()
+            },
+            "counters": dict(self.counters),
+            "cache_hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            "generation": self.generation_summary(),
+            "draft": self.draft_summary(),
+            "process_peak_rss_so_far_mb": _mb(peak_rss_bytes()),
+            "elapsed_seconds": round(time.time() - self.started, 3),
+        }
+
+    def dump_cprofile(self, output_dir: str) -> List[str]:
+        """Schreibt die gesammelten cProfile-Daten (<stage>.prof, lesbar mit pstats/snakeviz)"""
+        if not self._profiles:
+            return []
+        cprofile_dir = os.path.join(output_dir, CPROFILE_DIR)
+        os.makedirs(cprofile_dir, exist_ok=True)
+        paths = []
+        for name, profile in self._profiles.items():
+            path = os.path.join(cprofile_dir, f"{name}.prof")
+            profile.dump_stats(path)
+            paths.append(path)
+        logger.info(f"cProfile-Dumps geschrieben: {cprofile_dir}")
+        return paths
+
+    def write(self, output_dir: str) -> str:
+        """Schreibt profile.json (und ggf. cProfile-Dumps)"""
+        os.makedirs(output_dir, exist_ok=True)
+        summary = self.summary()
+        summary["cprofile"] = self.dump_cprofile(output_dir)
+        path = os.path.join(output_dir, PROFILE_FILE)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        logger.info(f"Laufzeitprofil gespeichert: {path}")
+        return path
+
+
+# Geteilte, deaktivierte Instanz für Aufrufer ohne Profiling
+NULL_PROFILER = Profiler(enabled=False)
+
+
+def markdown_section(profile: Dict) -> List[str]:
+    """Markdown-Abschnitt 'Laufzeitprofil' für den Report"""
+    lines = ["## Laufzeitprofil", ""]
+    lines.append("| Stufe | Aufrufe | Wall (s) | CPU (s) | RSS-Zuwachs (MB) | Spitzen-RSS der Stufe (MB) |")
+    lines.append("|---|---|---|---|---|---|")
+    for name, entry in profile["stages"].items():
+        delta = entry.get("rss_delta_mb")
+        peak = entry.get("peak_rss_mb")
+        lines.append(
+            f"| {name} | {entry['calls']} | {entry['wall_seconds']:.3f} | "
+            f"{entry['cpu_seconds']:.3f} | {'n/a' if delta is None else f'{delta:+.1f}'} | "
+            f"{'n/a' if peak is None else peak} |"
+        )
+    lines.append("")
+    process_peak = profile.get("process_peak_rss_so_far_mb")
+    if process_peak is not None:
+        lines.append(f"- **Prozess-Spitzen-RSS bisher** (ru_maxrss, über alle Stufen): {process_peak} MB")
+
+    counters = profile.get("counters", {})
+    if "cache_hit" in counters or "cache_miss" in counters:
+        rate = profile.get("cache_hit_rate")
+        lines.append(
+            f"- **Cache**: {counters.get('cache_hit', 0)} Treffer, "
+            f"{counters.get('cache_miss', 0)} Fehlschläge"
+            + (f" ({rate:.1%} Trefferquote)" if rate is not None else "")
+        )
+    for model_id, gen in profile.get("generation", {}).items():
+        line = (
+            f"- **{model_id}**: {gen['n']} Generationen, Latenz Ø {gen['latency_mean_s']:.3f}s "
+            f"(p95 {gen['latency_p95_s']:.3f}s)"
+        )
+        if "prompt_tokens_per_s" in gen:
+            line += f", {gen['prompt_tokens_per_s']} Prompt-Tokens/s"
+        if "completion_tokens_per_s" in gen:
+            line += f", {gen['completion_tokens_per_s']} generierte Tokens/s"
+        lines.append(line)
+    for model_id, draft in profile.get("draft", {}).items():
+        line = f"- **{model_id}** (Entwurfsmodell): {draft['generations']} assistierte Generationen"
+        if "acceptance_rate" in draft:
+            line += f", Akzeptanzrate {draft['acceptance_rate']:.1%}"
+        if "tokens_per_target_pass" in draft:
+            line += f", {draft['tokens_per_target_pass']} Tokens pro Zielmodell-Pass"
+        if draft["verified"]:
+            line += f", {draft['verified']} gegen Greedy geprüft ({draft['mismatches']} Abweichungen)"
+        lines.append(line)
+    lines.append("")
+    return lines
@@ -0,0 +1,185 @@
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .caching import make_key, get as cache_get, put as cache_put
+from .generation import build_prompt
+from .logging_config import get_logger
+from .profiling import NULL_PROFILER
+from .telemetry import NULL_TELEMETRY
+
+logger = get_logger("reference")
+
+REFERENCE_MODE = "reference"
+# Pro Beispiel: mittlere negative Log-Likelihood pro Referenz-Token und Perplexität (niedriger ist besser)
+REF_METRICS = ["REF_NLL", "REF_PPL"]
+
+
+def is_reference_mode(cfg: Dict) -> bool:
+    return cfg.get("mode", "generate") == REFERENCE_MODE
+
+
+def reference_continuation(prompt: str, ref: str) -> str:
+    """Referenz so, wie sie als Fortsetzung des Prompts generiert würde (mit Leerzeichen)"""
+    return ref if not prompt or prompt[-1].isspace() else " " + ref
+
+
+def teacher_forced_logprobs(
+    model, pairs: Sequence[Tuple[List[int], List[int]]], pad_token_id: int, max_length: int, device
+) -> List[Dict]:
+    """Log-Likelihood der Referenz-Tokens gegeben die Prompt-Tokens, ein Forward-Pass für alle Paare
+
+    ``pairs`` enthält (Prompt-IDs, Referenz-IDs). Zu lange Sequenzen werden
+    links (im Prompt) gekürzt, die Referenz bleibt erhalten; aufgefüllt wird
+    rechts. Liefert pro Paar ``{"logprob": Summe, "tokens": Anzahl}``.
+    """
+    import torch
+
+    sequences, n_ref = [], []
+    for prompt_ids, ref_ids in pairs:
+        seq = (list(prompt_ids) + list(ref_ids))[-max_length:]
+        sequences.append(seq)
+        # Das erste Token hat keinen Vorgänger und kann nicht gewertet werden
+        n_ref.append(min(len(ref_ids), len(seq) - 1))
+    width = max(len(seq) for seq in sequences)
+    input_ids = torch.tensor(
+        [seq + [pad_token_id] * (width - len(seq)) for seq in sequences], device=device
+    )
+    attention_mask = torch.tensor(
+        [[1] * len(seq) + [0] * (width - len(seq)) for seq in sequences], device=device
+    )
+    # Ziel-Position t (Token t aus Logits t-1) zählt, wenn sie in der Referenz liegt
+    positions = torch.arange(1, width, device=device)
+    lengths = torch.tensor([len(seq) for seq in sequences], device=device)
+    starts = lengths - torch.tensor(n_ref, device=device)
+    mask = (positions[None, :] >= starts[:, None]) & (positions[None, :] < lengths[:, None])
+
+    with torch.inference_mode():
+        logits = model(input_ids=input_ids, attention_mask=attention_mask).logits
+        # Nur die Referenz-Positionen normalisieren: (Tokens × Vokabular) statt B × T × V in float32
+        selected = logits[:, :-1][mask].float()
+        targets = input_ids[:, 1:][mask]
+        token_logprobs = selected.gather(-1, targets[:, None]).squeeze(-1) - torch.logsumexp(selected, dim=-1)
+        rows = mask.nonzero()[:, 0]
+        sums = torch.zeros(len(sequences), device=device).index_add_(0, rows, token_logprobs)
+    return [
+        {"logprob": float(total), "tokens": int(n)}
+        for total, n in zip(sums.tolist(), mask.sum(dim=1).tolist())
+    ]
+
+
+def reference_metrics(ref_scores: List[Dict]) -> Dict:
+    """REF_NLL/REF_PPL eines Beispiels über alle Referenzen (gewichtet nach Token-Zahl)"""
+    tokens = sum(s["tokens"] for s in ref_scores)
+    if not tokens:
+        return {}
+    nll = -sum(s["logprob"] for s in ref_scores) / tokens
+    return {"REF_NLL": nll, "REF_PPL": math.exp(nll)}
+
+
+def reference_key(model_id: str, ex: Dict, prompt: str, variant: str = "") -> str:
+    """Cache-Key des Referenz-Scorings; die Referenzen sind Teil des Keys"""
+    return make_key(
+        model_id, {"score": "reference_nll", "refs": ex.get("refs", [])}, prompt, ex["id"], variant
+    )
+
+
+def score_references_cached(
+    adapter,
+    model_id: str,
+    examples: List[Dict],
+    task: Dict,
+    cfg: Dict,
+    use_cache: bool = True,
+    profiler=NULL_PROFILER,
+    telemetry=NULL_TELEMETRY,
+    variant: str = "",
+) -> List[Dict]:
+    """Teacher-Forcing-Scoring der Referenzen mehrerer Beispiele, mit Cache wie bei Generationen
+
+    Alle (Prompt, Referenz)-Paare der Cache-Fehlschläge gehen in einen Aufruf
+    von ``score_references``; ``ref_scores`` enthält pro Referenz Summe der
+    Log-Wahrscheinlichkeiten und Token-Zahl.
+    """
+    if not hasattr(adapter, "score_references"):
+        raise ValueError(f"Backend von {model_id} unterstützt kein Referenz-Scoring (score_references)")
+    task_name = task.get("task_name")
+    prompts = [build_prompt(task["prompt"]["template"], ex["source"]) for ex in examples]
+    keys = [reference_key(model_id, ex, p, variant) for ex, p in zip(examples, prompts)]
+
+    rows: List[Optional[Dict]] = [None] * len(examples)
+    if use_cache:
+        with profiler.stage("cache_io"):
+            rows = [cache_get(cfg["cache_dir"], key) for key in keys]
+    for row in rows:
+        if row is not None:
+            profiler.count("cache_hit")
+            telemetry.record_cache(model_id, hit=True, task=task_name)
+
+    missing = [i for i, row in enumerate(rows) if row is None]
+    if not missing:
+        return rows
+
+    pair_prompts, pair_refs, owners = [], [], []
+    for i in missing:
+        for ref in examples[i].get("refs", []):
+            pair_prompts.append(prompts[i])
+            pair_refs.append(ref)
+            owners.append(i)
+    logger.debug(f"Score {len(pair_refs)} Referenzen von {len(missing)} Beispielen für {model_id}")
+    profiler.count("cache_miss" if use_cache else "cache_bypass", len(missing))
+    start = time.perf_counter()
+    scores = adapter.score_references(pair_prompts, pair_refs) if pair_refs else []
+    seconds = (time.perf_counter() - start) / len(missing)
+
+    per_example: Dict[int, List[Dict]] = {i: [] for i in missing}
+    for i, score in zip(owners, scores):
+        per_example[i].append(score)
+    for i in missing:
+        ex = examples[i]
+        if use_cache:
+            telemetry.record_cache(model_id, hit=False, task=task_name)
+        n_tokens = sum(s["tokens"] for s in per_example[i])
+        telemetry.record_generation(model_id, seconds, n_tokens, task=task_name)
+        profiler.record_generation(model_id, seconds, None, n_tokens)
+        rows[i] = {
+            "id": ex["id"], "source": ex["source"], "hyp": "", "refs": ex.get("refs", []),
+            "ref_scores": per_example[i],
+        }
+        if use_cache:
+            with profiler.stage("cache_io"):
+                cache_put(cfg["cache_dir"], keys[i], rows[i])
+    return rows
+
+
+def corpus_summary(results: Dict[str, List[Dict]]) -> Dict:
+    """Korpus-Perplexität pro Modell: exp(Σ NLL / Σ Referenz-Tokens)"""
+    summary = {}
+    for model_id, rows in results.items():
+        scores = [s for r in rows for s in r.get("ref_scores") or []]
+        tokens = sum(s["tokens"] for s in scores)
+        if not tokens:
+            continue
+        nll = -sum(s["logprob"] for s in scores) / tokens
+        summary[model_id] = {
+            "n_examples": sum(1 for r in rows if r.get("ref_scores")),
+            "n_references": len(scores),
+            "tokens": tokens,
+            "nll": nll,
+            "perplexity": math.exp(nll),
+        }
+    return summary
+
+
+def markdown_section(summary: Dict) -> List[str]:
+    """Markdown-Abschnitt 'Referenz-Likelihood' für den Report"""
+    lines = ["## Referenz-Likelihood (Teacher-Forcing)", ""]
+    lines.append("| Modell | Beispiele | Referenzen | Tokens | NLL/Token | Perplexität |")
+    lines.append("|---|---|---|---|---|---|")
+    for model_id, entry in summary.items():
+        lines.append(
+            f"| {model_id} | {entry['n_examples']} | {entry['n_references']} | {entry['tokens']} | "
+            f"{entry['nll']:.4f} | {entry['perplexity']:.4f} |"
+        )
+    lines.append("")
+    return lines
@@ -2,8 +2,12 @@ import os, json
 from typing import Dict, Any
 
 
-def write_markdown(out_dir: str, summary: dict, per_metric: dict):
-    """Generiert einen detaillierten Markdown-Report der Evaluation"""
+def write_markdown(out_dir: str, summary: dict, per_metric: dict, extra_sections=None):
+    """Generiert einen detaillierten Markdown-Report der Evaluation
+
+    ``extra_sections`` sind fertige Markdown-Zeilen (z. B. das Laufzeitprofil),
+    die vor dem Zeitstempel eingefügt werden.
+    """
     os.makedirs(out_dir, exist_ok=True)
     path = os.path.join(out_dir, "report.md")
 
@@ -87,11 +91,19 @@ def write_markdown(out_dir: str, summary: dict, per_metric: dict):
     lines.append(
         "- **Signifikante Verschlechterungen**: Metriken mit p < 0.05 und negativer Differenz"
     )
+    if summary.get("lower_is_better"):
+        lines.append(
+            f"- **Niedriger ist besser** ({', '.join(summary['lower_is_better'])}): "
+            "Verbesserung bei negativer Differenz"
+        )
     lines.append(
         "- **Cohen's d**: 0.2 = kleiner Effekt, 0.5 = mittlerer Effekt, 0.8 = großer Effekt"
     )
     lines.append("")
 
+    if extra_sections:
+        lines.extend(extra_sections)
+
     # Timestamp
     from datetime import datetime
 
@@ -0,0 +1,97 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class ResultStore:
+    """Kompakter Ergebnisspeicher: ein float64-Array (Modelle × Beispiele × Metriken)
+
+    Fehlende Werte sind NaN. ``column`` liefert Views ohne Kopie, die direkt an
+    ``paired_tests``/``bootstrap_ci`` übergeben werden können.
+    """
+
+    def __init__(
+        self,
+        model_ids: List[str],
+        example_ids: List[str],
+        metric_names: List[str],
+        dtype=np.float64,
+    ):
+        self.model_ids = list(model_ids)
+        self.example_ids = [str(ex_id) for ex_id in example_ids]
+        self.metric_names = list(metric_names)
+        self._model_idx = {mid: i for i, mid in enumerate(self.model_ids)}
+        self._example_idx = {ex_id: i for i, ex_id in enumerate(self.example_ids)}
+        self._metric_idx = {name: i for i, name in enumerate(self.metric_names)}
+        self.values = np.full(
+            (len(self.model_ids), len(self.example_ids), len(self.metric_names)),
+            np.nan,
+            dtype=dtype,
+        )
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def model_index(self, model_id: str) -> int:
+        return self._model_idx[model_id]
+
+    def example_index(self, ex_id) -> int:
+        return self._example_idx[str(ex_id)]
+
+    def metric_index(self, name: str) -> int:
+        return self._metric_idx[name]
+
+    def has_metric(self, name: str) -> bool:
+        return name in self._metric_idx
+
+    def set_scores(self, model_id: str, example_pos: int, scores: Dict):
+        """Trägt die Metriken eines Beispiels ein (unbekannte Namen werden ignoriert)"""
+        row = self.values[self._model_idx[model_id], example_pos]
+        for name, value in scores.items():
+            k = self._metric_idx.get(name)
+            if k is not None and value is not None:
+                row[k] = value
+
+    def column(self, model_id: str, metric: str) -> np.ndarray:
+        """View auf alle Beispielwerte einer Metrik für ein Modell (keine Kopie)"""
+        return self.values[self._model_idx[model_id], :, self._metric_idx[metric]]
+
+    def scores(self, model_id: str, example_pos: int) -> Dict[str, float]:
+        """Metriken eines Beispiels als Dict (NaN wird zu None)"""
+        row = self.values[self._model_idx[model_id], example_pos]
+        return {
+            name: (None if np.isnan(v) else float(v))
+            for name, v in zip(self.metric_names, row)
+        }
+
+    def as_metric_dict(self, model_ids: Optional[Iterable[str]] = None) -> Dict:
+        """{model_id: {metric: View}} für Visualisierung"""
+        return {
+            mid: {name: self.column(mid, name) for name in self.metric_names}
+            for mid in (model_ids or self.model_ids)
+        }
+
+    def to_lists(self) -> Dict[str, Dict[str, List]]:
+        """JSON-taugliche Darstellung {model_id: {metric: [Werte]}}"""
+        return {
+            mid: {
+                name: [None if np.isnan(v) else float(v) for v in self.column(mid, name)]
+                for name in self.metric_names
+            }
+            for mid in self.model_ids
+        }
+
+    def statlog(self) -> Dict[str, List[Dict]]:
+        """Zeilenweise Darstellung {model_id: [{"id": ..., metric: Wert}]}"""
+        return {
+            mid: [
+                {"id": ex_id, **self.scores(mid, pos)}
+                for pos, ex_id in enumerate(self.example_ids)
+            ]
+            for mid in self.model_ids
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
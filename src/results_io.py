@@ -0,0 +1,163 @@
+import importlib.util
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .logging_config import get_logger
+
+# pyarrow (optional) wird erst beim Schreiben/Lesen importiert
+pa = None
+pq = None
+
+logger = get_logger("results_io")
+
+RESULTS_FILE = "results.parquet"
+MANIFEST_FILE = "results_manifest.json"
+
+
+def columnar_available() -> bool:
+    return pa is not None or importlib.util.find_spec("pyarrow") is not None
+
+
+def resolve_results_format(fmt: str = "auto") -> str:
+    """'auto' wählt Parquet, sofern pyarrow installiert ist, sonst JSON"""
+    if fmt == "auto":
+        return "parquet" if columnar_available() else "json"
+    if fmt == "parquet":
+        _require_pyarrow()
+    return fmt
+
+
+def _require_pyarrow():
+    global pa, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(
+            "Spaltenbasierte Ergebnisse benötigen pyarrow: pip install pyarrow"
+        )
+    pa, pq = pyarrow, pyarrow.parquet
+
+
+class ColumnarResultsWriter:
+    """Schreibt Ergebnisse zeilengruppenweise als Parquet
+
+    Eine Zeile pro (Modell, Beispiel) mit einer float64-Spalte pro Metrik.
+    Gepufferte Zeilen werden alle ``row_group_size`` Zeilen als eigene
+    Row Group geschrieben, der Speicherbedarf bleibt dadurch begrenzt.
+    """
+
+    def __init__(self, path: str, metric_names: List[str], row_group_size: int = 1000):
+        _require_pyarrow()
+        self.path = path
+        self.metric_names = list(metric_names)
+        self.row_group_size = max(1, row_group_size)
+        self.n_rows = 0
+
+        fields = [
+            pa.field("model_id", pa.string()),
+            pa.field("example_id", pa.string()),
+            pa.field("index", pa.int64()),
+            pa.field("source", pa.string()),
+            pa.field("hyp", pa.string()),
+            pa.field("refs", pa.list_(pa.string())),
+            pa.field("failed", pa.bool_()),
+            pa.field("truncated", pa.bool_()),
+            pa.field("samples", pa.list_(pa.string())),
+        ] + [pa.field(name, pa.float64()) for name in self.metric_names]
+        self.schema = pa.schema(fields)
+        self._buffer: Dict[str, list] = {name: [] for name in self.schema.names}
+        self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def add(self, model_id: str, index: int, row: Dict, metrics: Dict):
+        buf = self._buffer
+        buf["model_id"].append(model_id)
+        buf["example_id"].append(str(row["id"]))
+        buf["index"].append(index)
+        buf["source"].append(row["source"])
+        buf["hyp"].append(row["hyp"])
+        buf["refs"].append(list(row.get("refs") or []))
+        buf["failed"].append(bool(row.get("failed", False)))
+        buf["truncated"].append(bool(row.get("truncated", False)))
+        buf["samples"].append(list(row.get("samples") or []))
+        for name in self.metric_names:
+            value = metrics.get(name)
+            buf[name].append(None if value is None else float(value))
+
+        if len(buf["model_id"]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        n = len(self._buffer["model_id"])
+        if n == 0:
+            return
+        table = pa.Table.from_pydict(self._buffer, schema=self.schema)
+        self._writer.write_table(table)
+        self.n_rows += n
+        self._buffer = {name: [] for name in self.schema.names}
+
+    def close(self):
+        if self._writer is not None:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_columnar_results(
+    output_dir: str,
+    results: Dict[str, List[Dict]],
+    store,
+    summary: Dict,
+    comparison_results: Dict,
+    plot_paths: List[str],
+    args: Dict,
+    row_group_size: int = 1000,
+) -> Tuple[str, str]:
+    """Schreibt results.parquet und ein kleines JSON-Manifest mit Zusammenfassung"""
+    metric_names = store.metric_names
+
+    results_path = os.path.join(output_dir, RESULTS_FILE)
+    with ColumnarResultsWriter(results_path, metric_names, row_group_size) as writer:
+        for model_id, rows in results.items():
+            for pos, row in enumerate(rows):
+                writer.add(model_id, row.get("index", pos), row, store.scores(model_id, pos))
+    n_rows = writer.n_rows
+
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "summary": summary,
+                "detailed_comparisons": comparison_results,
+                "results_file": RESULTS_FILE,
+                "n_rows": n_rows,
+                "models": list(results.keys()),
+                "metric_columns": metric_names,
+                "plot_paths": plot_paths,
+                "evaluation_time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "args": args,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+            default=str,
+        )
+
+    logger.info(f"Spaltenbasierte Ergebnisse: {results_path} ({n_rows} Zeilen)")
+    return results_path, manifest_path
+
+
+def read_results(path: str, columns: Optional[List[str]] = None):
+    """Liest (ausgewählte Spalten von) results.parquet als pyarrow-Tabelle"""
+    _require_pyarrow()
+    return pq.read_table(path, columns=columns)
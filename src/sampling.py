@@ -0,0 +1,87 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def num_samples(decoding: Dict) -> int:
+    """Anzahl Stichproben pro Prompt laut Decoding-Profil (``num_samples``, default 1)"""
+    return max(1, int(decoding.get("num_samples", 1)))
+
+
+def sample_decoding(decoding: Dict, k: int) -> Dict:
+    """Decoding-Teil des Cache-Keys für Stichprobe ``k``
+
+    Stichprobe 0 hat denselben Key wie ein Lauf ohne ``num_samples``; ein
+    späterer Lauf mit größerem K verwendet die vorhandenen Stichproben weiter.
+    """
+    d = {key: value for key, value in decoding.items() if key != "num_samples"}
+    if k > 0:
+        d["sample"] = k
+    return d
+
+
+def mean_metrics(sample_metrics: List[Dict]) -> Dict:
+    """Mittelwert pro Metrik über die Stichproben eines Beispiels"""
+    return {
+        name: float(np.nanmean([m[name] for m in sample_metrics]))
+        for name in sample_metrics[0]
+    }
+
+
+def sampling_summary(
+    results: Dict[str, List[Dict]], metric_names: List[str], directions: Optional[Dict[str, str]] = None
+) -> Dict:
+    """Aggregate über K Stichproben pro Modell und Metrik
+
+    ``mean``: Mittel über alle Stichproben; ``best_of_k``: Mittel der besten
+    Stichprobe pro Beispiel (Maximum, bei Richtung ``min`` laut ``directions``
+    das Minimum); ``within_std``: mittlere Standardabweichung innerhalb eines
+    Beispiels; ``run_std``: Standardabweichung des Gesamtmittels zwischen den
+    K Stichproben-Läufen (entspricht K wiederholten Evaluationen).
+    """
+    directions = directions or {}
+    summary = {}
+    for model_id, rows in results.items():
+        rows = [r for r in rows if r.get("sample_metrics")]
+        if not rows:
+            continue
+        k = min(len(r["sample_metrics"]) for r in rows)
+        per_model = {"k": k, "n_examples": len(rows), "metrics": {}}
+        for name in metric_names:
+            # Beispiele × Stichproben
+            values = np.array(
+                [[m.get(name, np.nan) for m in r["sample_metrics"][:k]] for r in rows], dtype=float
+            )
+            if np.isnan(values).all():
+                continue
+            direction = directions.get(name, "max")
+            best = np.nanmin(values, axis=1) if direction == "min" else np.nanmax(values, axis=1)
+            per_model["metrics"][name] = {
+                "direction": direction,
+                "mean": float(np.nanmean(values)),
+                "best_of_k": float(np.nanmean(best)),
+                "within_std": float(np.nanmean(np.nanstd(values, axis=1, ddof=1))) if k > 1 else 0.0,
+                "run_std": float(np.nanstd(np.nanmean(values, axis=0), ddof=1)) if k > 1 else 0.0,
+            }
+        summary[model_id] = per_model
+    return summary
+
+
+def markdown_section(summary: Dict) -> List[str]:
+    """Markdown-Abschnitt 'Stichproben' für den Report"""
+    lines = ["## Stichproben (num_samples)", ""]
+    lines.append("Best-of-K: beste Stichprobe pro Beispiel (↓: niedriger ist besser, Minimum).")
+    lines.append("")
+    for model_id, entry in summary.items():
+        lines.append(f"### {model_id} (K = {entry['k']}, {entry['n_examples']} Beispiele)")
+        lines.append("")
+        lines.append("| Metrik | Mittel | Best-of-K | Streuung im Beispiel (σ) | Streuung zwischen Läufen (σ) |")
+        lines.append("|---|---|---|---|---|")
+        for name, m in entry["metrics"].items():
+            label = f"{name} ↓" if m.get("direction") == "min" else name
+            lines.append(
+                f"| {label} | {m['mean']:.4f} | {m['best_of_k']:.4f} | "
+                f"{m['within_std']:.4f} | {m['run_std']:.4f} |"
+            )
+        lines.append("")
+    return lines
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Tuple
+
+from .logging_config import get_logger
+
+logger = get_logger("sharding")
+
+
+class ShardMergeError(ValueError):
+    """Shard-Ausgaben sind unvollständig oder widersprüchlich"""
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parst eine Shard-Angabe der Form 'i/N' (0-basiert)"""
+    try:
+        index, num_shards = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Ungültige Shard-Angabe '{spec}', erwartet 'i/N'")
+    if num_shards < 1 or not 0 <= index < num_shards:
+        raise ValueError(f"Shard {index}/{num_shards} außerhalb des gültigen Bereichs")
+    return index, num_shards
+
+
+def shard_of(ex_id, num_shards: int) -> int:
+    """Stabile Shard-Zuordnung über den SHA1-Hash der Beispiel-ID"""
+    digest = hashlib.sha1(str(ex_id).encode("utf-8")).hexdigest()
+    return int(digest[:16], 16) % num_shards
+
+
+def select_shard(
+    examples: List[Dict], index: int, num_shards: int
+) -> List[Tuple[int, Dict]]:
+    """Wählt die Beispiele eines Shards samt ihrer Position im Gesamtdatensatz"""
+    return [
+        (pos, ex)
+        for pos, ex in enumerate(examples)
+        if shard_of(ex["id"], num_shards) == index
+    ]
+
+
+def shard_name(index: int, num_shards: int) -> str:
+    return f"shard-{index:05d}-of-{num_shards:05d}"
+
+
+def write_shard(shard_dir: str, manifest: Dict, rows: List[Dict]) -> str:
+    """Schreibt die Ergebnisse eines Shards; das Manifest markiert den Shard als fertig"""
+    os.makedirs(shard_dir, exist_ok=True)
+    name = shard_name(manifest["shard"], manifest["num_shards"])
+    rows_path = os.path.join(shard_dir, f"{name}.jsonl")
+
+    with open(rows_path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    # Manifest zuletzt und atomar schreiben, damit halbfertige Shards erkennbar sind
+    manifest_path = os.path.join(shard_dir, f"{name}.json")
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({**manifest, "n_rows": len(rows)}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+    logger.info(f"Shard geschrieben: {rows_path} ({len(rows)} Zeilen)")
+    return rows_path
+
+
+def load_shards(shard_dir: str) -> Tuple[Dict, Dict[str, List[Dict]]]:
+    """Lädt und prüft alle Shards; liefert Gesamt-Manifest und Zeilen pro Modell"""
+    manifests = []
+    for name in sorted(os.listdir(shard_dir)):
+        if name.startswith("shard-") and name.endswith(".json"):
+            with open(os.path.join(shard_dir, name), "r", encoding="utf-8") as f:
+                manifests.append(json.load(f))
+
+    if not manifests:
+        raise ShardMergeError(f"Keine Shards in {shard_dir} gefunden")
+
+    first = manifests[0]
+    num_shards = first["num_shards"]
+    for m in manifests:
+        for field in ("num_shards", "task", "models", "total_examples"):
+            if m[field] != first[field]:
+                raise ShardMergeError(
+                    f"Shard {m['shard']} passt nicht zu Shard {first['shard']} ({field})"
+                )
+        # Ältere Manifeste ohne mode/num_samples stammen aus dem Generierungsmodus
+        for field, default in (("mode", "generate"), ("num_samples", 1)):
+            if m.get(field, default) != first.get(field, default):
+                raise ShardMergeError(
+                    f"Shard {m['shard']} passt nicht zu Shard {first['shard']} ({field})"
+                )
+
+    present = {m["shard"] for m in manifests}
+    missing = sorted(set(range(num_shards)) - present)
+    if missing:
+        raise ShardMergeError(f"Fehlende Shards: {missing} von {num_shards}")
+
+    models = first["models"]
+    rows_per_model: Dict[str, List[Dict]] = {mid: [] for mid in models}
+    seen = set()
+    for m in manifests:
+        rows_path = os.path.join(
+            shard_dir, f"{shard_name(m['shard'], num_shards)}.jsonl"
+        )
+        n_rows = 0
+        with open(rows_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                key = (row["model_id"], row["id"])
+                if key in seen:
+                    raise ShardMergeError(
+                        f"Doppeltes Ergebnis für Modell {key[0]}, Beispiel {key[1]}"
+                    )
+                if row["model_id"] not in rows_per_model:
+                    raise ShardMergeError(f"Unbekanntes Modell {row['model_id']}")
+                seen.add(key)
+                rows_per_model[row["model_id"]].append(row)
+                n_rows += 1
+        if n_rows != m["n_rows"]:
+            raise ShardMergeError(
+                f"Shard {m['shard']} unvollständig: {n_rows} von {m['n_rows']} Zeilen"
+            )
+
+    # Vollständigkeit: jedes Modell muss jedes Beispiel genau einmal haben
+    total = first["total_examples"]
+    for mid, rows in rows_per_model.items():
+        if len(rows) != total:
+            raise ShardMergeError(
+                f"Modell {mid}: {len(rows)} von {total} Beispielen vorhanden"
+            )
+        rows.sort(key=lambda r: r["index"])
+
+    id_lists = [[r["id"] for r in rows] for rows in rows_per_model.values()]
+    if any(ids != id_lists[0] for ids in id_lists):
+        raise ShardMergeError("Modelle decken unterschiedliche Beispiele ab")
+
+    manifest = {k: v for k, v in first.items() if k not in ("shard", "n_rows")}
+    return manifest, rows_per_model
@@ -1,8 +1,10 @@
 import numpy as np
-from scipy.stats import ttest_rel, wilcoxon
 
 
 def paired_tests(xs, ys):
+    # scipy.stats kostet rund eine Sekunde Importzeit; erst bei Bedarf laden
+    from scipy.stats import ttest_rel, wilcoxon
+
     xs = np.asarray(xs)
     ys = np.asarray(ys)
     mask = np.isfinite(xs) & np.isfinite(ys)
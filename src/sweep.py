@@ -0,0 +1,339 @@
+import itertools
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import yaml
+from tqdm import tqdm
+
+from .budget import TimeBudget
+from .caching import cache_variant
+from .comparison import METRIC_DIRECTIONS
+from .generation import cached_row, generate_profiles_cached
+from .logging_config import get_logger
+from .multitask import MultiTaskEvaluation
+from .pipeline import EvaluationPipeline, load_yaml
+from .sampling import num_samples
+
+logger = get_logger("sweep")
+
+SWEEP_JSON = "sweep_summary.json"
+SWEEP_MD = "sweep_summary.md"
+
+# Kürzel für abgeleitete Profilnamen (z. B. t0.7_p0.9)
+SHORT_NAMES = {"temperature": "t", "top_p": "p", "top_k": "k", "max_new_tokens": "n", "do_sample": "s"}
+
+
+def profile_name(params: Dict) -> str:
+    """Name eines Profils aus seinen Parametern, als Verzeichnisname verwendbar"""
+    return "_".join(f"{SHORT_NAMES.get(key, key)}{value}" for key, value in params.items()) or "base"
+
+
+def expand_profiles(sweep: Dict) -> List[Dict]:
+    """Profile aus ``profiles`` (Liste) und ``grid`` (alle Kombinationen)
+
+    Jedes Profil enthält ``name`` und die Parameter, die das Basis-Decoding
+    überschreiben (z. B. ``temperature``, ``top_p``, ``max_new_tokens``).
+    """
+    profiles = [dict(p) for p in sweep.get("profiles") or []]
+    grid = sweep.get("grid") or {}
+    keys = list(grid)
+    if keys:
+        for values in itertools.product(*(grid[key] for key in keys)):
+            profiles.append(dict(zip(keys, values)))
+    if not profiles:
+        raise ValueError("decoding_sweep enthält keine Profile (profiles oder grid)")
+
+    named = []
+    for params in profiles:
+        name = params.pop("name", None) or profile_name(params)
+        named.append({"name": str(name), **params})
+    names = [p["name"] for p in named]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Profil-Namen müssen eindeutig sein: {', '.join(duplicates)}")
+    return named
+
+
+def parse_grid(items: Iterable[str]) -> Dict[str, List]:
+    """Grid aus der Kommandozeile: ``temperature=0.3,0.7 top_p=0.9,1.0``"""
+    grid = {}
+    for item in items:
+        if "=" not in item:
+            raise ValueError(f"Ungültige Sweep-Angabe (erwartet KEY=WERT,WERT): {item}")
+        key, values = item.split("=", 1)
+        grid[key.strip()] = [yaml.safe_load(v) for v in values.split(",")]
+    return grid
+
+
+def profile_cfg(cfg: Dict, profile: Dict) -> Dict:
+    """Konfiguration eines Profils mit Ausgabeverzeichnis ``output_dir/<name>``
+
+    ``max_new_tokens`` eines Profils steht zusätzlich im Decoding, weil es
+    sonst nicht Teil des Cache-Keys wäre. Profile mit ``temperature > 0`` oder
+    ``top_p < 1`` sampeln, sofern sie ``do_sample`` nicht selbst setzen.
+    """
+    params = {key: value for key, value in profile.items() if key != "name"}
+    if "do_sample" not in params and (params.get("temperature", 0) > 0 or params.get("top_p", 1) < 1):
+        params["do_sample"] = True
+    out = {
+        **cfg,
+        "decoding": {**cfg["decoding"], **params},
+        "output_dir": os.path.join(cfg["output_dir"], profile["name"]),
+    }
+    if "max_new_tokens" in params:
+        out["max_new_tokens"] = params["max_new_tokens"]
+    return out
+
+
+def _mean(values: np.ndarray) -> float:
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if values.size else float("nan")
+
+
+class DecodingSweep(MultiTaskEvaluation):
+    """Ein Task unter mehreren Decoding-Profilen mit einmal geladenen Modellen
+
+    Jedes Profil erhält eine eigene ``EvaluationPipeline`` (eigener Cache-Key,
+    Journal und Report in ``output_dir/<profil>``). Die Testdaten werden
+    einmal geladen; generiert wird modellweise. Unterstützt der Adapter
+    ``generate_profiles``, werden vor den Pipelines alle Profile eines
+    Beispiels aus einem Prefill erzeugt und in den Cache geschrieben.
+    """
+
+    def __init__(
+        self,
+        task: Dict,
+        cfg: Dict,
+        model_cfgs: List[Dict],
+        profiles: Optional[List[Dict]] = None,
+        adapters: Optional[Dict[str, object]] = None,
+        adapter_factory: Optional[Callable[[Dict], object]] = None,
+        **pipeline_kwargs,
+    ):
+        self.task = task
+        self.profiles = profiles or expand_profiles(cfg.get("decoding_sweep") or {})
+        # Eine gemeinsame Deadline für alle Profile
+        self.budget = pipeline_kwargs.setdefault("budget", TimeBudget.from_cfg(cfg))
+        self.use_cache = pipeline_kwargs.get("use_cache", True)
+        # Pipelines pro Profil statt pro Task
+        super().__init__([], cfg, model_cfgs, adapters, adapter_factory, **pipeline_kwargs)
+        self.pipelines = [
+            EvaluationPipeline(
+                task, profile_cfg(cfg, profile), model_cfgs,
+                adapter_factory=self._adapter_for, **pipeline_kwargs,
+            )
+            for profile in self.profiles
+        ]
+
+    @property
+    def profile_names(self) -> List[str]:
+        return [p["name"] for p in self.profiles]
+
+    @property
+    def task_names(self) -> List[str]:
+        return [self.task["task_name"]]
+
+    @classmethod
+    def from_files(
+        cls, task_path: str, config_path: str, model_paths: Iterable[str], **kwargs
+    ) -> "DecodingSweep":
+        """Erstellt den Sweep aus YAML-Konfigurationsdateien (Profile aus ``decoding_sweep``)"""
+        logger.info(f"Lade Konfiguration aus: {config_path}")
+        cfg = load_yaml(config_path)
+        logger.info(f"Lade Task aus: {task_path}")
+        task = load_yaml(task_path)
+        model_paths = list(model_paths)
+        logger.info(f"Lade Modell-Konfigurationen: {model_paths}")
+        return cls(task, cfg, [load_yaml(p) for p in model_paths], **kwargs)
+
+    def load_data(
+        self, ids: Optional[List[str]] = None, shard: Optional[Tuple[int, int]] = None
+    ):
+        """Lädt die Testdaten einmal und teilt sie mit allen Profilen"""
+        first = self.pipelines[0]
+        first.load_data(ids=ids, shard=shard)
+        for pipeline in self.pipelines[1:]:
+            pipeline.examples, pipeline.positions = first.examples, first.positions
+            pipeline.total_examples, pipeline.shard = first.total_examples, first.shard
+
+    def _shared_pipelines(self) -> List[EvaluationPipeline]:
+        # Profile mit num_samples erzeugen ihre Stichproben selbst aus einem Prefill
+        return [p for p in self.pipelines if num_samples(p.cfg["decoding"]) == 1]
+
+    def prefill(self, model_cfg: Dict) -> int:
+        """Erzeugt fehlende Profile pro Beispiel aus einem gemeinsamen Prefill
+
+        Liefert die Zahl der bearbeiteten Beispiele; 0, wenn der Cache
+        deaktiviert ist, ein Zeitbudget pro Beispiel gilt, weniger als zwei
+        Profile teilbar sind oder der Adapter ``generate_profiles`` nicht kennt.
+        """
+        model_id = model_cfg["model_id"]
+        variant = cache_variant(model_cfg)
+        shared = self._shared_pipelines()
+        if not self.use_cache or len(shared) < 2 or self.budget.max_time(1) is not None:
+            return 0
+        cfgs = [p.cfg for p in shared]
+        examples = [
+            ex for ex in shared[0].examples
+            if any(cached_row(cfg["cache_dir"], model_id, ex, self.task, cfg, variant) is None for cfg in cfgs)
+        ]
+        if not examples:
+            return 0
+        adapter = self._adapter_for(model_cfg)
+        if not hasattr(adapter, "generate_profiles"):
+            return 0
+
+        profiler = shared[0].profiler
+        telemetry = shared[0].telemetry
+        self.budget.start()
+        done = 0
+        with profiler.stage("generate"), tqdm(
+            total=len(examples), desc=f"Profile {model_id}", unit="Beispiel"
+        ) as pbar:
+            for ex in examples:
+                if self.budget.expired():
+                    break
+                try:
+                    generate_profiles_cached(
+                        adapter, model_id, ex, self.task, cfgs,
+                        profiler=profiler, telemetry=telemetry, variant=variant,
+                    )
+                    done += 1
+                except Exception as e:
+                    # Die Pipelines der Profile generieren das Beispiel dann einzeln
+                    logger.warning(f"Gemeinsamer Prefill für {ex['id']} fehlgeschlagen ({model_id}): {e}")
+                pbar.update(1)
+        return done
+
+    def generate(self, resume: bool = False):
+        """Modellweise Generierung über alle Profile (jedes Modell wird einmal geladen)"""
+        for i, model_cfg in enumerate(self.model_cfgs):
+            model_id = model_cfg["model_id"]
+            logger.info(
+                f"Modell {i+1}/{len(self.model_ids)}: {model_id} für {len(self.pipelines)} Decoding-Profile"
+            )
+            n = self.prefill(model_cfg)
+            if n:
+                logger.info(f"{n} Beispiele mit gemeinsamem Prefill für {len(self._shared_pipelines())} Profile")
+            for pipeline in self.pipelines:
+                pipeline.generate(resume=resume or i > 0, models=[model_id])
+            self._release_finished(i)
+
+    def compare(self, mid_a: Optional[str] = None, mid_b: Optional[str] = None):
+        # Ein einzelnes Modell wird nur über die Profile hinweg verglichen
+        if len(self.model_ids) > 1:
+            super().compare(mid_a, mid_b)
+
+    def report(self, plots: bool = True) -> Dict[str, Dict]:
+        """Reports pro Profil (bei mindestens zwei Modellen) plus Sweep-Zusammenfassung"""
+        if len(self.model_ids) > 1:
+            for profile, pipeline in zip(self.profiles, self.pipelines):
+                logger.info(f"Report für Profil {profile['name']}")
+                self.paths[profile["name"]] = pipeline.report(plots=plots)
+        self.paths["sweep"] = self.write_sweep_summary()
+        return self.paths
+
+    def directions(self) -> Dict[str, str]:
+        """Richtung (max/min) pro Registry-Metrik; ``decoding_sweep.directions`` überschreibt"""
+        override = (self.cfg.get("decoding_sweep") or {}).get("directions") or {}
+        return {
+            name: override.get(name, METRIC_DIRECTIONS.get(name, "max"))
+            for name in self.pipelines[0].reg.names()
+        }
+
+    def sweep_summary(self) -> Dict:
+        """Mittelwerte pro Modell, Profil und Metrik sowie das beste Profil pro Metrik"""
+        directions = self.directions()
+        models = {}
+        for model_id in self.model_ids:
+            profiles = {}
+            for profile, pipeline in zip(self.profiles, self.pipelines):
+                profiles[profile["name"]] = {
+                    "n_examples": len(pipeline.results.get(model_id, [])),
+                    "metrics": {
+                        name: _mean(pipeline.store.column(model_id, name))
+                        for name in directions
+                        if pipeline.store.has_metric(name)
+                    },
+                }
+            best = {}
+            for name, direction in directions.items():
+                values = {
+                    p: entry["metrics"][name]
+                    for p, entry in profiles.items()
+                    if not np.isnan(entry["metrics"].get(name, np.nan))
+                }
+                if values:
+                    pick = min if direction == "min" else max
+                    best_profile = pick(values, key=values.get)
+                    best[name] = {"profile": best_profile, "value": values[best_profile]}
+            models[model_id] = {"profiles": profiles, "best": best}
+        return {
+            "task": self.task["task_name"],
+            "models": self.model_ids,
+            "profiles": self.profiles,
+            "directions": directions,
+            "results": models,
+            "evaluation_time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    def write_sweep_summary(self) -> Dict[str, str]:
+        """Schreibt sweep_summary.json und sweep_summary.md"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        summary = self.sweep_summary()
+
+        json_path = os.path.join(self.output_dir, SWEEP_JSON)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+
+        directions = summary["directions"]
+        arrows = {name: "↓" if d == "min" else "↑" for name, d in directions.items()}
+        lines = [f"# Decoding-Sweep: {summary['task']}", ""]
+        lines.append(f"- **Modelle**: {', '.join(self.model_ids)}")
+        lines.append(f"- **Profile**: {len(self.profiles)}")
+        lines.append("")
+        for model_id, entry in summary["results"].items():
+            lines.append(f"## {model_id}")
+            lines.append("")
+            lines.append(
+                "| Profil | Parameter | n | "
+                + " | ".join(f"{name} {arrows[name]}" for name in directions) + " |"
+            )
+            lines.append("|---|---|---|" + "---|" * len(directions))
+            for profile in self.profiles:
+                values = entry["profiles"][profile["name"]]
+                params = ", ".join(f"{k}={v}" for k, v in profile.items() if k != "name")
+                cells = []
+                for name in directions:
+                    value = values["metrics"].get(name, float("nan"))
+                    text = "n/a" if np.isnan(value) else f"{value:.4f}"
+                    if entry["best"].get(name, {}).get("profile") == profile["name"]:
+                        text = f"**{text}**"
+                    cells.append(text)
+                lines.append(
+                    f"| {profile['name']} | {params} | {values['n_examples']} | " + " | ".join(cells) + " |"
+                )
+            lines.append("")
+            lines.append("**Bestes Profil pro Metrik**:")
+            lines.append("")
+            for name, best in entry["best"].items():
+                lines.append(f"- {name} {arrows[name]}: `{best['profile']}` ({best['value']:.4f})")
+            lines.append("")
+        if len(self.model_ids) > 1:
+            lines.append("Einzelreports: " + ", ".join(f"`{name}/report.md`" for name in self.profile_names))
+            lines.append("")
+
+        md_path = os.path.join(self.output_dir, SWEEP_MD)
+        with open(md_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+        logger.info(f"Sweep-Zusammenfassung: {md_path}")
+        return {"json": json_path, "markdown": md_path}
+
+    def log_summary(self):
+        for model_id, entry in self.sweep_summary()["results"].items():
+            for name, best in entry["best"].items():
+                logger.info(f"🏆 {model_id} – {name}: bestes Profil {best['profile']} ({best['value']:.4f})")
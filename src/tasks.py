@@ -1,5 +1,8 @@
 import json
-from typing import List, Dict
+import os
+from typing import List, Dict, Iterable
+
+from .jsonl_index import JsonlIndex
 
 
 def load_jsonl(path: str) -> List[Dict]:
@@ -9,3 +12,21 @@ def load_jsonl(path: str) -> List[Dict]:
             if line.strip():
                 data.append(json.loads(line))
     return data
+
+
+def load_jsonl_by_ids(path: str, ids: Iterable[str]) -> List[Dict]:
+    """Lädt gezielt Beispiele per ID über den Byte-Offset-Index"""
+    with JsonlIndex(path) as index:
+        return index.fetch_many(ids)
+
+
+def read_id_list(values: List[str]) -> List[str]:
+    """Liest IDs aus der CLI: direkte Werte oder eine Datei mit einer ID pro Zeile"""
+    if len(values) == 1 and os.path.isfile(values[0]):
+        with open(values[0], "r", encoding="utf-8") as f:
+            return [
+                line.strip()
+                for line in f
+                if line.strip() and not line.startswith("#")
+            ]
+    return list(values)
@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .logging_config import get_logger
+from .profiling import current_rss_bytes, peak_rss_bytes
+
+logger = get_logger("telemetry")
+
+PREFIX = "eval"
+DEFAULT_INTERVAL = 15.0
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKENS_PER_S_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Histogram:
+    """Kumulatives Histogramm mit festen Bucket-Grenzen pro Label-Kombination"""
+
+    def __init__(self, buckets: Iterable[float]):
+        self.bounds = tuple(sorted(buckets)) + (float("inf"),)
+        self.series: Dict[Labels, Dict] = {}
+
+    def observe(self, labels: Labels, value: float):
+        series = self.series.setdefault(
+            labels, {"buckets": [0] * len(self.bounds), "sum": 0.0, "count": 0}
+        )
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                series["buckets"][i] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+
+class Telemetry:
+    """Laufzeit-Telemetrie als Textdatei für den node-exporter-Textfile-Collector
+
+    Zählt verarbeitete Beispiele, Cache-Treffer/-Fehlschläge und fehlgeschlagene
+    Generationen pro Modell und Task, führt Histogramme für Generationslatenz und
+    Tokens pro Sekunde und schreibt alles zusammen mit dem RSS des Prozesses alle
+    ``interval`` Sekunden atomar (temporäre Datei + rename) nach ``path``. Das
+    Format ist das Prometheus-Textformat mit abschließendem ``# EOF``; der Harness
+    selbst öffnet keinen Netzwerkport. Deaktiviert kosten alle Aufrufe praktisch nichts.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        interval: float = DEFAULT_INTERVAL,
+        enabled: bool = True,
+    ):
+        self.path = path
+        self.interval = interval
+        self.enabled = enabled
+        self.started = time.time()
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms = {
+            "generation_latency_seconds": _Histogram(LATENCY_BUCKETS),
+            "generation_tokens_per_second": _Histogram(TOKENS_PER_S_BUCKETS),
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # Erfassung
+
+    def _inc(self, name: str, labels: Labels, n: float = 1):
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + n
+
+    def record_example(self, model_id: str, task: Optional[str] = None, failed: bool = False):
+        """Ein verarbeitetes (model, Beispiel)-Paar; ``failed`` für Dummy-Einträge mit leerer Hypothese"""
+        if not self.enabled:
+            return
+        labels = _labels(model=model_id, task=task)
+        self._inc("examples_processed_total", labels)
+        if failed:
+            self._inc("generation_failures_total", labels)
+
+    def record_cache(self, model_id: str, hit: bool, task: Optional[str] = None):
+        if not self.enabled:
+            return
+        name = "cache_hits_total" if hit else "cache_misses_total"
+        self._inc(name, _labels(model=model_id, task=task))
+
+    def record_generation(
+        self,
+        model_id: str,
+        seconds: float,
+        completion_tokens: Optional[int] = None,
+        task: Optional[str] = None,
+    ):
+        """Latenz (und ggf. Tokens/s) einer nicht gecachten Generation"""
+        if not self.enabled:
+            return
+        labels = _labels(model=model_id, task=task)
+        with self._lock:
+            self.histograms["generation_latency_seconds"].observe(labels, seconds)
+            if completion_tokens is not None and seconds > 0:
+                self.histograms["generation_tokens_per_second"].observe(
+                    labels, completion_tokens / seconds
+                )
+
+    # Ausgabe
+
+    def render(self) -> str:
+        """Aktueller Stand im Prometheus-Textformat"""
+        help_texts = {
+            "examples_processed_total": "Verarbeitete Beispiele pro Modell",
+            "cache_hits_total": "Cache-Treffer bei der Generierung",
+            "cache_misses_total": "Cache-Fehlschläge (Generation nötig)",
+            "generation_failures_total": "Fehlgeschlagene Generationen (Dummy-Einträge mit leerer Hypothese)",
+            "generation_latency_seconds": "Latenz einer Generation in Sekunden",
+            "generation_tokens_per_second": "Generierte Tokens pro Sekunde einer Generation",
+        }
+        lines: List[str] = []
+        with self._lock:
+            for name in ("examples_processed_total", "cache_hits_total",
+                         "cache_misses_total", "generation_failures_total"):
+                full = f"{PREFIX}_{name}"
+                lines += [f"# HELP {full} {help_texts[name]}", f"# TYPE {full} counter"]
+                for labels, value in sorted(self.counters.get(name, {}).items()):
+                    lines.append(f"{full}{_format_labels(labels)} {_format_value(value)}")
+
+            for name, hist in self.histograms.items():
+                full = f"{PREFIX}_{name}"
+                lines += [f"# HELP {full} {help_texts[name]}", f"# TYPE {full} histogram"]
+                for labels, series in sorted(hist.series.items()):
+                    for bound, count in zip(hist.bounds, series["buckets"]):
+                        le = ("le", _format_value(bound))
+                        lines.append(f"{full}_bucket{_format_labels(labels, le)} {count}")
+                    lines.append(f"{full}_sum{_format_labels(labels)} {_format_value(series['sum'])}")
+                    lines.append(f"{full}_count{_format_labels(labels)} {series['count']}")
+
+        gauges = [
+            ("process_resident_memory_bytes", "Aktueller RSS des Evaluationsprozesses", current_rss_bytes()),
+            ("process_peak_resident_memory_bytes", "Maximaler RSS seit Prozessstart", peak_rss_bytes()),
+            ("start_time_seconds", "Startzeit der Telemetrie (Unix-Zeit)", self.started),
+            ("last_update_time_seconds", "Zeitpunkt dieses Schreibvorgangs (Unix-Zeit)", time.time()),
+        ]
+        for name, help_text, value in gauges:
+            if value is None:
+                continue
+            full = f"{PREFIX}_{name}"
+            lines += [f"# HELP {full} {help_text}", f"# TYPE {full} gauge",
+                      f"{full} {_format_value(round(value, 3))}"]
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> Optional[str]:
+        """Schreibt die Datei atomar, damit der Collector nie eine halbe Datei liest"""
+        if not self.enabled or not self.path:
+            return None
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, self.path)
+        return self.path
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning(f"Telemetrie-Datei nicht schreibbar: {e}")
+
+    def start(self) -> "Telemetry":
+        """Startet das periodische Schreiben im Hintergrund"""
+        if self.enabled and self.path and self._thread is None:
+            self.write()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="telemetry", daemon=True)
+            self._thread.start()
+            logger.info(f"Telemetrie wird alle {self.interval:g}s geschrieben: {self.path}")
+        return self
+
+    def close(self):
+        """Beendet das periodische Schreiben und schreibt den Endstand"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        if self.enabled and self.path:
+            self.write()
+
+    def __enter__(self) -> "Telemetry":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Geteilte, deaktivierte Instanz für Aufrufer ohne Telemetrie
+NULL_TELEMETRY = Telemetry(enabled=False)
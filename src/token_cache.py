@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .logging_config import get_logger
+
+logger = get_logger("token_cache")
+
+TOKENS_DIR = "tokens"
+IDS_FILE = "ids.npy"
+OFFSETS_FILE = "offsets.npy"
+KEYS_FILE = "keys.json"
+# Name des gültigen Generationsverzeichnisses; wird atomar ersetzt
+CURRENT_FILE = "CURRENT"
+# Fremde, nicht mehr aktuelle Generationen werden erst nach dieser Zeit entfernt
+STALE_GENERATION_SECONDS = 600.0
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def tokenizer_fingerprint(tok) -> str:
+    """Kennung eines Tokenizers: gleiche Kennung ⇒ gleiche Token-IDs für jeden Text
+
+    Schnelle HF-Tokenizer werden über ihre vollständige Serialisierung
+    erfasst, andere über Vokabular und Sondertokens.
+    """
+    backend = getattr(tok, "backend_tokenizer", None)
+    if backend is not None:
+        payload = backend.to_str()
+    elif hasattr(tok, "get_vocab"):
+        payload = json.dumps(sorted(tok.get_vocab().items()), ensure_ascii=False)
+    else:
+        payload = json.dumps(sorted(vars(tok).items()), default=str)
+    special = getattr(tok, "special_tokens_map", {})
+    return _sha1(json.dumps([type(tok).__name__, payload, special], sort_keys=True, default=str))
+
+
+def prompt_key(prompt: str) -> str:
+    return _sha1(prompt)[:20]
+
+
+class PromptTokenCache:
+    """Token-IDs gerenderter Prompts für einen Tokenizer und ein Prompt-Template
+
+    Liegt in ``<root>/<tokenizer>-<template>/<generation>/`` als ``ids.npy``
+    (alle IDs hintereinander, int32), ``offsets.npy`` (Zeilenanfänge, int64)
+    und ``keys.json`` (Prompt-Hash pro Zeile); gelesen wird per mmap. Jedes
+    Schreiben legt eine neue Generation an und setzt danach ``CURRENT`` atomar
+    um, sodass Leser nie Dateien verschiedener Schreiber mischen. Ein Schreiber
+    entfernt sofort nur seine eigene Vorgängerin; verwaiste Generationen
+    anderer Schreiber erst nach ``STALE_GENERATION_SECONDS``. Gespeichert
+    werden die ungekürzten IDs, sodass Längen und Kürzungen ohne erneutes
+    Tokenisieren abfragbar sind. Modelle mit demselben Tokenizer teilen sich
+    die Dateien. Ohne ``root`` bleibt der Cache im Speicher.
+    """
+
+    def __init__(self, root: Optional[str], fingerprint: str, template: str):
+        self.fingerprint = fingerprint
+        self.path = (
+            os.path.join(root, f"{fingerprint[:16]}-{_sha1(template)[:16]}") if root else None
+        )
+        self._ids = np.zeros(0, dtype=np.int32)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._rows: Dict[str, int] = {}
+        self.generation: Optional[str] = None
+        # Zuletzt von dieser Instanz geschriebene Generation
+        self._written: Optional[str] = None
+        if self.path:
+            self._load()
+
+    def _current(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.path, CURRENT_FILE), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        """Liest die aktuelle Generation (falls sie sich seit dem letzten Lesen geändert hat)"""
+        generation = self._current()
+        if generation is None or generation == self.generation:
+            return
+        gen_dir = os.path.join(self.path, generation)
+        try:
+            with open(os.path.join(gen_dir, KEYS_FILE), "r", encoding="utf-8") as f:
+                keys = json.load(f)
+            ids = np.load(os.path.join(gen_dir, IDS_FILE), mmap_mode="r")
+            offsets = np.load(os.path.join(gen_dir, OFFSETS_FILE))
+        except (OSError, ValueError) as e:
+            # z. B. gerade von einem anderen Prozess ersetzt: fehlende Prompts werden neu tokenisiert
+            logger.warning(f"Token-Cache nicht lesbar ({gen_dir}): {e}")
+            return
+        if len(offsets) != len(keys) + 1 or offsets[-1] != len(ids):
+            logger.warning(f"Token-Cache inkonsistent, wird neu aufgebaut: {gen_dir}")
+            return
+        self._ids, self._offsets = ids, offsets
+        self._rows = {key: i for i, key in enumerate(keys)}
+        self.generation = generation
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def ids(self, prompt: str) -> Optional[np.ndarray]:
+        """Ungekürzte Token-IDs eines Prompts (View), ``None`` falls nicht im Cache"""
+        row = self._rows.get(prompt_key(prompt))
+        if row is None:
+            return None
+        return self._ids[self._offsets[row] : self._offsets[row + 1]]
+
+    def lengths(self, prompts: Sequence[str]) -> np.ndarray:
+        """Ungekürzte Token-Längen (-1 für Prompts, die nicht im Cache sind)"""
+        rows = np.array([self._rows.get(prompt_key(p), -1) for p in prompts], dtype=np.int64)
+        sizes = np.diff(self._offsets)
+        lengths = np.full(len(rows), -1, dtype=np.int64)
+        known = rows >= 0
+        lengths[known] = sizes[rows[known]]
+        return lengths
+
+    def missing(self, prompts: Sequence[str]) -> List[str]:
+        """Noch nicht tokenisierte Prompts (ohne Duplikate, in Eingabereihenfolge)"""
+        seen = set()
+        out = []
+        for prompt in prompts:
+            key = prompt_key(prompt)
+            if key not in self._rows and key not in seen:
+                seen.add(key)
+                out.append(prompt)
+        return out
+
+    def add(self, prompts: Sequence[str], token_ids: Sequence[Sequence[int]]):
+        """Fügt Prompts hinzu und schreibt eine neue Generation (inklusive der Zeilen anderer Prozesse)"""
+        if self.path:
+            self._load()
+        new = [(prompt_key(p), ids) for p, ids in zip(prompts, token_ids) if prompt_key(p) not in self._rows]
+        if not new:
+            return
+        sizes = np.array([len(ids) for _, ids in new], dtype=np.int64)
+        flat = np.fromiter((t for _, ids in new for t in ids), dtype=np.int32, count=int(sizes.sum()))
+        ids = np.concatenate([np.asarray(self._ids), flat])
+        offsets = np.concatenate([self._offsets, self._offsets[-1] + np.cumsum(sizes)])
+        keys = [None] * len(self._rows)
+        for key, row in self._rows.items():
+            keys[row] = key
+        keys += [key for key, _ in new]
+
+        if self.path:
+            self._write_generation(ids, offsets, keys)
+        self._ids, self._offsets = ids, offsets
+        self._rows = {key: i for i, key in enumerate(keys)}
+
+    def _write_generation(self, ids: np.ndarray, offsets: np.ndarray, keys: List[str]):
+        previous = self._written
+        generation = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+        gen_dir = os.path.join(self.path, generation)
+        os.makedirs(gen_dir)
+        np.save(os.path.join(gen_dir, IDS_FILE), ids)
+        np.save(os.path.join(gen_dir, OFFSETS_FILE), offsets)
+        with open(os.path.join(gen_dir, KEYS_FILE), "w", encoding="utf-8") as f:
+            json.dump(keys, f)
+        # Erst wenn alle drei Dateien vollständig sind, wird die Generation sichtbar
+        tmp = os.path.join(self.path, f"{CURRENT_FILE}.{generation}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(generation)
+        os.replace(tmp, os.path.join(self.path, CURRENT_FILE))
+        self.generation = self._written = generation
+        if previous:
+            # Nur die eigene Vorgängerin: geladene fremde Generationen können noch gelesen werden
+            shutil.rmtree(os.path.join(self.path, previous), ignore_errors=True)
+        self._remove_stale()
+
+    def _remove_stale(self):
+        """Entfernt Generationen (und CURRENT-Tmp-Dateien), die nicht aktuell und älter als die Schonfrist sind
+
+        Bleiben zurück, wenn sich Schreiber überschneiden oder abstürzen.
+        """
+        deadline = time.time() - STALE_GENERATION_SECONDS
+        keep = {CURRENT_FILE, self._current(), self.generation}
+        for name in os.listdir(self.path):
+            if name in keep:
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                if os.path.getmtime(path) >= deadline:
+                    continue
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                continue  # ein anderer Schreiber war schneller
+            logger.debug(f"Verwaiste Token-Cache-Generation entfernt: {path}")
+
+    def nbytes(self) -> int:
+        return int(self._ids.nbytes + self._offsets.nbytes)
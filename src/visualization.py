@@ -1,20 +1,35 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
-import pandas as pd
 from pathlib import Path
 from typing import Dict, List, Tuple
 from .logging_config import get_logger
 
 logger = get_logger("visualization")
 
-# Setze Style für bessere Plots
-plt.style.use("seaborn-v0_8")
-sns.set_palette("husl")
+# matplotlib, seaborn und pandas werden erst beim ersten Plot importiert
+plt = None
+sns = None
+pd = None
+
+
+def _ensure_plotting():
+    """Importiert die Plot-Bibliotheken beim ersten Aufruf und setzt den Stil"""
+    global plt, sns, pd
+    if plt is not None:
+        return
+    import matplotlib.pyplot as _plt
+    import seaborn as _sns
+    import pandas as _pd
+
+    plt, sns, pd = _plt, _sns, _pd
+
+    # Setze Style für bessere Plots
+    plt.style.use("seaborn-v0_8")
+    sns.set_palette("husl")
 
 
 def create_metrics_comparison_plot(comparison_results: Dict, output_dir: str) -> str:
     """Erstellt Vergleichsdiagramme für alle Metriken"""
+    _ensure_plotting()
 
     # Ausgabeverzeichnis erstellen
     plots_dir = Path(output_dir) / "plots"
@@ -131,6 +146,7 @@ def create_metrics_comparison_plot(comparison_results: Dict, output_dir: str) ->
 
 def create_correlation_heatmap(all_metrics: Dict, output_dir: str) -> str:
     """Erstellt Korrelations-Heatmap zwischen Metriken"""
+    _ensure_plotting()
 
     plots_dir = Path(output_dir) / "plots"
     plots_dir.mkdir(parents=True, exist_ok=True)
@@ -195,6 +211,7 @@ def create_correlation_heatmap(all_metrics: Dict, output_dir: str) -> str:
 
 def create_distribution_plots(all_metrics: Dict, output_dir: str) -> str:
     """Erstellt Verteilungsplots für wichtige Metriken"""
+    _ensure_plotting()
 
     plots_dir = Path(output_dir) / "plots"
     plots_dir.mkdir(parents=True, exist_ok=True)
@@ -237,7 +254,7 @@ def create_distribution_plots(all_metrics: Dict, output_dir: str) -> str:
                     model_b_data = metrics[metric]
 
         # Plots erstellen
-        if model_a_data and model_b_data:
+        if len(model_a_data) > 0 and len(model_b_data) > 0:
             ax.hist(model_a_data, alpha=0.7, label="Modell A", bins=10, color="skyblue")
             ax.hist(
                 model_b_data, alpha=0.7, label="Modell B", bins=10, color="lightcoral"
@@ -265,6 +282,7 @@ def create_distribution_plots(all_metrics: Dict, output_dir: str) -> str:
 
 def create_effect_size_plot(comparison_results: Dict, output_dir: str) -> str:
     """Erstellt Effektgrößen-Plot"""
+    _ensure_plotting()
 
     plots_dir = Path(output_dir) / "plots"
     plots_dir.mkdir(parents=True, exist_ok=True)
@@ -350,6 +368,7 @@ def create_all_visualizations(
     comparison_results: Dict, all_metrics: Dict, output_dir: str
 ) -> List[str]:
     """Erstellt alle Visualisierungen"""
+    _ensure_plotting()
 
     logger.info("Erstelle Visualisierungen...")
 
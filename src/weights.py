@@ -0,0 +1,146 @@
+import glob
+import json
+import os
+import shutil
+import struct
+from contextlib import nullcontext
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from .cpu_modes import model_hash
+from .logging_config import get_logger
+
+logger = get_logger("weights")
+
+WEIGHTS_MODES = ("copy", "mmap")
+DEFAULT_WEIGHTS_DIR = os.path.join(".cache", "weights")
+
+# safetensors-Datentyp → numpy-Typ gleicher Breite (bf16 wird in torch umgedeutet)
+SAFETENSORS_DTYPES = {
+    "F64": np.float64, "F32": np.float32, "F16": np.float16, "BF16": np.int16,
+    "I64": np.int64, "I32": np.int32, "I16": np.int16, "I8": np.int8,
+    "U8": np.uint8, "BOOL": np.bool_,
+}
+
+
+def read_safetensors_header(path: str) -> Tuple[Dict, int]:
+    """Tensor-Beschreibungen und Beginn des Datenblocks einer safetensors-Datei"""
+    with open(path, "rb") as f:
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length))
+    header.pop("__metadata__", None)
+    return header, 8 + length
+
+
+def mmap_safetensors(path: str) -> Dict[str, Tuple[str, np.ndarray]]:
+    """Alle Tensoren einer safetensors-Datei als Sichten auf ein gemeinsames Mapping
+
+    Das Mapping ist copy-on-write: solange nicht geschrieben wird, teilen sich
+    alle Prozesse eines Hosts die Seiten im Page-Cache. Liefert ``{name: (dtype, array)}``.
+    """
+    header, data_start = read_safetensors_header(path)
+    buf = np.memmap(path, dtype=np.uint8, mode="c")
+    tensors = {}
+    for name, info in header.items():
+        start, end = info["data_offsets"]
+        dtype = SAFETENSORS_DTYPES.get(info["dtype"])
+        if dtype is None:
+            raise ValueError(f"Nicht unterstützter Datentyp {info['dtype']} für {name} in {path}")
+        array = buf[data_start + start:data_start + end].view(dtype).reshape(info["shape"])
+        tensors[name] = (info["dtype"], array)
+    return tensors
+
+
+def weights_cache_path(model_id: str, dtype_name: str, root: Optional[str] = None) -> str:
+    """Cache-Verzeichnis pro Modell-Revision und Datentyp"""
+    return os.path.join(root or DEFAULT_WEIGHTS_DIR, f"{model_hash(model_id)}-{dtype_name}")
+
+
+def prepare_weights(
+    model_id: str,
+    dtype_name: str,
+    root: Optional[str] = None,
+    convert: Optional[Callable[[str, str, str], None]] = None,
+) -> str:
+    """Konvertiert die Gewichte einmalig in den mmap-Cache und liefert dessen Pfad
+
+    Die Konvertierung schreibt in ein temporäres Verzeichnis, das atomar
+    umbenannt wird; konvertieren mehrere Prozesse gleichzeitig, gewinnt der
+    erste und die übrigen verwerfen ihr Ergebnis.
+    """
+    path = weights_cache_path(model_id, dtype_name, root)
+    if os.path.isdir(path):
+        logger.info(f"Verwende mmap-Gewichte aus dem Cache: {path}")
+        return path
+
+    logger.info(f"Konvertiere {model_id} ({dtype_name}) einmalig nach safetensors: {path}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    (convert or _convert_hf)(model_id, dtype_name, tmp_path)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Ein anderer Prozess war schneller
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return path
+
+
+def _torch_dtype(dtype_name: str):
+    import torch
+
+    return torch.bfloat16 if dtype_name == "bf16" else torch.float32
+
+
+def _convert_hf(model_id: str, dtype_name: str, out_dir: str):
+    from transformers import AutoModelForCausalLM
+
+    model = AutoModelForCausalLM.from_pretrained(
+        model_id, torch_dtype=_torch_dtype(dtype_name), low_cpu_mem_usage=True, trust_remote_code=True
+    )
+    model.save_pretrained(out_dir, safe_serialization=True)
+
+
+def _no_init_weights():
+    try:
+        from transformers.modeling_utils import no_init_weights
+    except ImportError:
+        return nullcontext()
+    return no_init_weights()
+
+
+def load_mmap_model(model_id: str, dtype_name: str = "fp32", root: Optional[str] = None):
+    """Causal LM, dessen Parameter direkt auf den gemappten Cache-Dateien liegen
+
+    Das Modell wird ohne Initialisierung aufgebaut und die Parameter per
+    ``load_state_dict(assign=True)`` durch die gemappten Tensoren ersetzt, so
+    dass weder ein vollständiges Einlesen noch eine Kopie entsteht.
+    Liefert ``(model, cache_path)``.
+    """
+    import torch
+    from transformers import AutoConfig, AutoModelForCausalLM
+
+    path = prepare_weights(model_id, dtype_name, root)
+    config = AutoConfig.from_pretrained(path, trust_remote_code=True)
+    with _no_init_weights():
+        model = AutoModelForCausalLM.from_config(
+            config, torch_dtype=_torch_dtype(dtype_name), trust_remote_code=True
+        )
+
+    state = {}
+    for file in sorted(glob.glob(os.path.join(path, "*.safetensors"))):
+        for name, (dtype, array) in mmap_safetensors(file).items():
+            tensor = torch.from_numpy(array)
+            state[name] = tensor.view(torch.bfloat16) if dtype == "BF16" else tensor
+    missing, unexpected = model.load_state_dict(state, strict=False, assign=True)
+    if unexpected:
+        raise ValueError(f"Unerwartete Gewichte im mmap-Cache {path}: {', '.join(unexpected[:5])}")
+    # Gebundene Gewichte (z. B. lm_head = Embedding) fehlen in der Datei
+    model.tie_weights()
+    loaded = {tensor.data_ptr() for tensor in state.values()}
+    current = model.state_dict()
+    uninitialized = [k for k in missing if k in current and current[k].data_ptr() not in loaded]
+    if uninitialized:
+        raise ValueError(f"Fehlende Gewichte im mmap-Cache {path}: {', '.join(uninitialized[:5])}")
+    return model.eval(), path
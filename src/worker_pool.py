@@ -0,0 +1,241 @@
+import multiprocessing as mp
+import os
+import sys
+from typing import Dict, List, Optional
+
+from .batching import OutOfMemoryError
+from .logging_config import get_logger
+
+logger = get_logger("worker_pool")
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def available_cores() -> List[int]:
+    """Für diesen Prozess freigegebene CPU-Kerne"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_cores(cores: List[int], n_workers: int, threads: Optional[int] = None) -> List[List[int]]:
+    """Teilt die Kerne in zusammenhängende Blöcke pro Worker (bei Überbuchung reihum)"""
+    threads = threads or max(1, len(cores) // n_workers)
+    return [
+        [cores[(i * threads + j) % len(cores)] for j in range(threads)]
+        for i in range(n_workers)
+    ]
+
+
+def split_evenly(items: List, n: int) -> List[List]:
+    """Zusammenhängende, möglichst gleich große Teile (leere Teile entfallen)"""
+    size, rest = divmod(len(items), n)
+    parts, start = [], 0
+    for i in range(n):
+        end = start + size + (1 if i < rest else 0)
+        if end > start:
+            parts.append(items[start:end])
+        start = end
+    return parts
+
+
+def _error_message(exc: BaseException):
+    return ("oom" if isinstance(exc, (OutOfMemoryError, MemoryError)) else "error", str(exc))
+
+
+def _worker_main(conn, model_cfg: Dict, cores: Optional[List[int]], threads: int):
+    """Worker-Prozess: Kerne binden, Threads begrenzen, Modell laden, Aufträge bearbeiten"""
+    # Vor dem Import von torch setzen, damit die Thread-Pools richtig dimensioniert werden
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+
+    try:
+        from .backends import create_adapter
+
+        adapter = create_adapter(model_cfg)
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            torch.set_num_threads(threads)
+        memory = adapter.memory_bytes() if hasattr(adapter, "memory_bytes") else 0
+        conn.send(("ready", memory))
+    except Exception as e:
+        conn.send(_error_message(e))
+        conn.close()
+        return
+
+    while True:
+        try:
+            command, payload = conn.recv()
+        except EOFError:
+            break
+        if command == "stop":
+            break
+        prompts, max_new_tokens, decoding = payload
+        try:
+            if hasattr(adapter, "generate_batch"):
+                texts = adapter.generate_batch(prompts, max_new_tokens, decoding)
+                stats = getattr(adapter, "last_stats", None) or {}
+                items = stats.get("items") or [{}] * len(prompts)
+            else:
+                texts, items = [], []
+                for prompt in prompts:
+                    texts.append(adapter.generate(prompt, max_new_tokens, decoding))
+                    items.append(dict(getattr(adapter, "last_stats", None) or {}))
+            conn.send(("ok", (texts, items)))
+        except Exception as e:
+            conn.send(_error_message(e))
+    conn.close()
+
+
+class GenerationWorkerPool:
+    """Generierung in mehreren Worker-Prozessen mit festen CPU-Kernen
+
+    Jeder Worker lädt das Modell selbst, bindet sich an einen eigenen Block von
+    Kernen und begrenzt torch/OpenMP auf ``threads_per_worker`` Threads. Ein
+    Batch wird in zusammenhängende Teile zerlegt, parallel generiert und in der
+    ursprünglichen Reihenfolge zusammengesetzt. Nach außen verhält sich der
+    Pool wie ein Adapter (``generate``, ``generate_batch``, ``last_stats``).
+    Bricht die Verbindung zu einem Worker ab, werden alle Worker beendet und
+    jeder weitere Aufruf schlägt fehl (``broken``).
+    """
+
+    def __init__(
+        self,
+        model_cfg: Dict,
+        n_workers: int,
+        threads_per_worker: Optional[int] = None,
+        pin: bool = True,
+        start_method: str = "spawn",
+    ):
+        self.model_id = model_cfg["model_id"]
+        self.n_workers = n_workers
+        self.last_stats: Dict = {}
+        # Grund, falls der Pool nach einem abgebrochenen Worker unbrauchbar ist
+        self.broken: Optional[str] = None
+        self._conns = []
+        self._procs = []
+        # Mindestens ein Teil pro Worker, sonst bleiben Worker ungenutzt
+        self.preferred_batch_size = n_workers
+        # mmap-Gewichte liegen nur einmal im Page-Cache (int8 quantisiert in private Kopien)
+        self.shared_weights = model_cfg.get("weights") == "mmap" and model_cfg.get("cpu_mode") != "int8"
+
+        cores = available_cores()
+        plan = plan_cores(cores, n_workers, threads_per_worker)
+        self.threads_per_worker = len(plan[0])
+        worker_cfg = {k: v for k, v in model_cfg.items() if k != "workers"}
+        ctx = mp.get_context(start_method)
+
+        logger.info(
+            f"Starte {n_workers} Generierungs-Worker für {self.model_id} "
+            f"({self.threads_per_worker} Threads je Worker, {len(cores)} Kerne verfügbar)"
+        )
+        for i, worker_cores in enumerate(plan):
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker_main,
+                args=(child_conn, worker_cfg, worker_cores if pin else None, self.threads_per_worker),
+                name=f"gen-worker-{i}",
+                daemon=True,
+            )
+            proc.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._procs.append(proc)
+
+        self.worker_memory_bytes = 0
+        errors = []
+        for i, conn in enumerate(self._conns):
+            status, payload = conn.recv()
+            if status == "ready":
+                self.worker_memory_bytes = max(self.worker_memory_bytes, payload)
+            else:
+                errors.append(f"Worker {i}: {payload}")
+        if errors:
+            self.close()
+            raise RuntimeError(f"Generierungs-Worker für {self.model_id} nicht gestartet: {'; '.join(errors)}")
+        logger.info(f"{n_workers} Worker bereit")
+
+    def generate_batch(self, prompts: List[str], max_new_tokens: int, decoding: dict) -> List[str]:
+        if self.broken is not None:
+            raise RuntimeError(f"Generierungs-Worker für {self.model_id} unbrauchbar: {self.broken}")
+        parts = split_evenly(list(prompts), self.n_workers)
+
+        # Alle Antworten abholen, auch wenn ein Worker fehlschlägt, damit die Pipes synchron bleiben
+        texts, items, failure = [], [], None
+        try:
+            for conn, part in zip(self._conns, parts):
+                conn.send(("generate", (part, max_new_tokens, decoding)))
+            for conn in self._conns[: len(parts)]:
+                status, payload = conn.recv()
+                if status == "ok":
+                    texts.extend(payload[0])
+                    items.extend(payload[1])
+                elif failure is None:
+                    failure = OutOfMemoryError(payload) if status == "oom" else RuntimeError(payload)
+        except (EOFError, OSError) as e:
+            # Ein Worker ist weg (z. B. vom OOM-Killer beendet): ungelesene Antworten der
+            # anderen würden beim nächsten Aufruf falschen Prompts zugeordnet
+            self._abandon(f"Verbindung zu einem Worker abgebrochen ({type(e).__name__})")
+            raise RuntimeError(f"Generierungs-Worker für {self.model_id} unbrauchbar: {self.broken}") from e
+        if failure is not None:
+            raise failure
+
+        self.last_stats = {
+            key: sum(item.get(key, 0) for item in items)
+            for key in ("prompt_tokens", "completion_tokens")
+        }
+        self.last_stats["items"] = items
+        return texts
+
+    def generate(self, prompt: str, max_new_tokens: int, decoding: dict) -> str:
+        return self.generate_batch([prompt], max_new_tokens, decoding)[0]
+
+    def memory_bytes(self) -> int:
+        if self.shared_weights:
+            return self.worker_memory_bytes
+        return self.worker_memory_bytes * self.n_workers
+
+    def _abandon(self, reason: str):
+        """Beendet alle Worker ohne Rückfrage und markiert den Pool als unbrauchbar"""
+        self.broken = reason
+        logger.error(f"Generierungs-Worker für {self.model_id}: {reason}; Pool wird beendet")
+        for proc in self._procs:
+            if proc.is_alive():
+                proc.terminate()
+            proc.join(timeout=10)
+        for conn in self._conns:
+            conn.close()
+        self._conns, self._procs = [], []
+
+    def close(self):
+        """Beendet alle Worker"""
+        for conn in self._conns:
+            try:
+                conn.send(("stop", None))
+                conn.close()
+            except (OSError, BrokenPipeError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=10)
+            if proc.is_alive():
+                proc.terminate()
+        self._conns, self._procs = [], []
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass  # Ignoriere Cleanup-Fehler
+
+
+def create_worker_pool(model_cfg: Dict) -> GenerationWorkerPool:
+    """Pool gemäß ``workers: {n, threads, pin}`` der Modell-Konfiguration"""
+    opts = model_cfg["workers"]
+    return GenerationWorkerPool(
+        model_cfg,
+        n_workers=int(opts["n"]),
+        threads_per_worker=opts.get("threads"),
+        pin=opts.get("pin", True),
+    )
@@ -0,0 +1,241 @@
+import json
+import os
+import socket
+import time
+from typing import Callable, Dict, List, Optional
+
+from .caching import cache_variant
+from .generation import generate_cached
+from .logging_config import get_logger
+from .tasks import load_jsonl_by_ids
+from .telemetry import NULL_TELEMETRY
+
+logger = get_logger("workqueue")
+
+RUN_SPEC = "run.json"
+
+
+def _write_json_atomic(path: str, obj: Dict):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """Arbeitswarteschlange über Lease-Dateien in einem (geteilten) Verzeichnis
+
+    Jede Arbeitseinheit liegt als JSON-Datei in genau einem der Verzeichnisse
+    ``pending/``, ``leased/`` oder ``done/``. Übergänge erfolgen per atomarem
+    ``os.rename``; ein Lease gilt als abgelaufen, wenn die mtime der Datei in
+    ``leased/`` älter als ``lease_seconds`` ist. Einheiten werden mindestens
+    einmal bearbeitet – Worker müssen idempotent sein (Cache-Keys sind es).
+    """
+
+    def __init__(self, root: str, lease_seconds: float = 600.0):
+        self.root = root
+        self.lease_seconds = lease_seconds
+        self.pending_dir = os.path.join(root, "pending")
+        self.leased_dir = os.path.join(root, "leased")
+        self.done_dir = os.path.join(root, "done")
+        for d in (self.pending_dir, self.leased_dir, self.done_dir):
+            os.makedirs(d, exist_ok=True)
+
+    def _name(self, unit_id: str) -> str:
+        return f"{unit_id}.json"
+
+    def write_spec(self, spec: Dict):
+        """Speichert die Laufbeschreibung (Task, Config, Modelle) für die Worker"""
+        _write_json_atomic(os.path.join(self.root, RUN_SPEC), spec)
+
+    def read_spec(self) -> Dict:
+        with open(os.path.join(self.root, RUN_SPEC), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def publish(self, units: List[Dict]) -> int:
+        """Stellt Einheiten ein; bereits bekannte Einheiten werden übersprungen"""
+        added = 0
+        for unit in units:
+            name = self._name(unit["unit_id"])
+            if any(
+                os.path.exists(os.path.join(d, name))
+                for d in (self.pending_dir, self.leased_dir, self.done_dir)
+            ):
+                continue
+            _write_json_atomic(os.path.join(self.pending_dir, name), unit)
+            added += 1
+        return added
+
+    def claim(self, worker_id: str, prefer: Optional[Callable[[str], bool]] = None) -> Optional[Dict]:
+        """Übernimmt eine offene Einheit; ``prefer`` priorisiert Einheiten nach ID"""
+        self.reclaim_expired()
+        names = sorted(os.listdir(self.pending_dir))
+        if prefer is not None:
+            names.sort(key=lambda n: not prefer(n[: -len(".json")]))
+
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            src = os.path.join(self.pending_dir, name)
+            dst = os.path.join(self.leased_dir, name)
+            try:
+                # rename erhält die mtime: Lease vorher starten, sonst könnte ein anderer
+                # Worker die frische Einheit zwischen rename und utime als abgelaufen zurückholen
+                os.utime(src)
+                os.rename(src, dst)
+                with open(dst, "r", encoding="utf-8") as f:
+                    unit = json.load(f)
+            except FileNotFoundError:
+                continue  # ein anderer Worker war schneller
+            logger.debug(f"Worker {worker_id} übernimmt {unit['unit_id']}")
+            return unit
+        return None
+
+    def heartbeat(self, unit_id: str) -> bool:
+        """Verlängert ein Lease; False, wenn es inzwischen verloren ging"""
+        try:
+            os.utime(os.path.join(self.leased_dir, self._name(unit_id)))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, unit_id: str, result: Dict):
+        """Markiert eine Einheit als erledigt"""
+        name = self._name(unit_id)
+        _write_json_atomic(os.path.join(self.done_dir, name), result)
+        for d in (self.leased_dir, self.pending_dir):
+            try:
+                os.remove(os.path.join(d, name))
+            except FileNotFoundError:
+                pass
+
+    def release(self, unit_id: str):
+        """Gibt eine übernommene Einheit zurück (z.B. beim geordneten Beenden)"""
+        name = self._name(unit_id)
+        try:
+            os.rename(os.path.join(self.leased_dir, name), os.path.join(self.pending_dir, name))
+        except FileNotFoundError:
+            pass
+
+    def reclaim_expired(self) -> int:
+        """Stellt Einheiten mit abgelaufenem Lease (abgestürzte Worker) wieder ein"""
+        reclaimed = 0
+        deadline = time.time() - self.lease_seconds
+        for name in os.listdir(self.leased_dir):
+            path = os.path.join(self.leased_dir, name)
+            try:
+                if os.path.getmtime(path) >= deadline:
+                    continue
+                if os.path.exists(os.path.join(self.done_dir, name)):
+                    os.remove(path)
+                else:
+                    os.rename(path, os.path.join(self.pending_dir, name))
+                    reclaimed += 1
+                    logger.warning(f"Lease abgelaufen, Einheit neu eingestellt: {name[:-5]}")
+            except FileNotFoundError:
+                continue
+        return reclaimed
+
+    def status(self) -> Dict[str, int]:
+        def count(d):
+            return sum(1 for n in os.listdir(d) if n.endswith(".json"))
+
+        return {
+            "pending": count(self.pending_dir),
+            "leased": count(self.leased_dir),
+            "done": count(self.done_dir),
+        }
+
+    def is_drained(self) -> bool:
+        st = self.status()
+        return st["pending"] == 0 and st["leased"] == 0
+
+    def results(self) -> List[Dict]:
+        out = []
+        for name in sorted(os.listdir(self.done_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(self.done_dir, name), "r", encoding="utf-8") as f:
+                    out.append(json.load(f))
+        return out
+
+
+def make_units(model_ids: List[str], example_ids: List[str], batch_size: int) -> List[Dict]:
+    """Zerlegt einen Lauf in Einheiten (Beispiel-Batch × Modell)"""
+    units = []
+    for m_idx, model_id in enumerate(model_ids):
+        for b_idx, start in enumerate(range(0, len(example_ids), batch_size)):
+            units.append({
+                "unit_id": f"m{m_idx:03d}-b{b_idx:06d}",
+                "model_index": m_idx,
+                "model_id": model_id,
+                "example_ids": example_ids[start : start + batch_size],
+            })
+    return units
+
+
+def run_worker(
+    queue: WorkQueue,
+    adapter_factory: Callable[[Dict], object],
+    worker_id: Optional[str] = None,
+    poll_interval: float = 5.0,
+    max_units: Optional[int] = None,
+    telemetry=NULL_TELEMETRY,
+) -> int:
+    """Bearbeitet Einheiten, bis die Warteschlange leer ist; liefert die Anzahl Einheiten"""
+    worker_id = worker_id or default_worker_id()
+    spec = queue.read_spec()
+    task, cfg = spec["task"], spec["config"]
+    adapters: Dict[int, object] = {}
+    processed = 0
+
+    logger.info(f"Worker {worker_id} gestartet auf {queue.root}")
+    while max_units is None or processed < max_units:
+        # Einheiten für bereits geladene Modelle bevorzugen
+        loaded = tuple(f"m{i:03d}-" for i in adapters)
+        unit = queue.claim(worker_id, prefer=lambda uid: uid.startswith(loaded))
+        if unit is None:
+            if queue.is_drained():
+                break
+            time.sleep(poll_interval)
+            continue
+
+        m_idx = unit["model_index"]
+        try:
+            if m_idx not in adapters:
+                adapters[m_idx] = adapter_factory(spec["model_cfgs"][m_idx])
+            examples = load_jsonl_by_ids(task["data"]["test_file"], unit["example_ids"])
+        except Exception as e:
+            logger.error(f"Einheit {unit['unit_id']} nicht bearbeitbar: {e}")
+            queue.release(unit["unit_id"])
+            raise
+
+        failed = []
+        for ex in examples:
+            ok = True
+            try:
+                generate_cached(
+                    adapters[m_idx], unit["model_id"], ex, task, cfg, telemetry=telemetry,
+                    variant=cache_variant(spec["model_cfgs"][m_idx]),
+                )
+            except Exception as e:
+                logger.error(f"Fehler bei Beispiel {ex['id']}, Modell {unit['model_id']}: {e}")
+                failed.append(ex["id"])
+                ok = False
+            telemetry.record_example(unit["model_id"], task.get("task_name"), failed=not ok)
+            if not queue.heartbeat(unit["unit_id"]):
+                logger.warning(f"Lease für {unit['unit_id']} verloren, bearbeite trotzdem zu Ende")
+
+        queue.complete(unit["unit_id"], {
+            "unit_id": unit["unit_id"],
+            "worker": worker_id,
+            "n_examples": len(examples),
+            "failed_ids": failed,
+        })
+        processed += 1
+
+    logger.info(f"Worker {worker_id} beendet: {processed} Einheiten bearbeitet")
+    return processed
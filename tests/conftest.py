@@ -0,0 +1,31 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def tiny_hf_model(tmp_path_factory):
+    """Lokales, zufällig initialisiertes GPT-2 mit Byte-BPE-Tokenizer für ModelAdapter (ohne Download)"""
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    tokenizers = pytest.importorskip("tokenizers")
+
+    model_dir = str(tmp_path_factory.mktemp("tiny_hf"))
+    bpe = tokenizers.Tokenizer(tokenizers.models.BPE())
+    bpe.pre_tokenizer = tokenizers.pre_tokenizers.ByteLevel(add_prefix_space=False)
+    bpe.decoder = tokenizers.decoders.ByteLevel()
+    trainer = tokenizers.trainers.BpeTrainer(
+        vocab_size=320,
+        special_tokens=["<|endoftext|>"],
+        initial_alphabet=tokenizers.pre_tokenizers.ByteLevel.alphabet(),
+    )
+    texts = ["Text: Der Rat hat den neuen Plan beschlossen.\n\nVereinfachter Text: Der Rat hat entschieden."]
+    bpe.train_from_iterator(texts * 20, trainer)
+    tok = transformers.PreTrainedTokenizerFast(tokenizer_object=bpe, eos_token="<|endoftext|>")
+    tok.save_pretrained(model_dir)
+
+    config = transformers.GPT2Config(
+        vocab_size=len(tok), n_positions=256, n_embd=32, n_layer=2, n_head=2,
+        bos_token_id=tok.eos_token_id, eos_token_id=tok.eos_token_id,
+    )
+    torch.manual_seed(0)
+    transformers.GPT2LMHeadModel(config).eval().save_pretrained(model_dir)
+    return model_dir
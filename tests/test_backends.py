@@ -0,0 +1,121 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+from src.backends import (
+    BACKENDS, ByteTokenizer, RuleSimplifier, create_adapter, extract_source, register_backend,
+)
+from src.pipeline import EvaluationPipeline
+
+PROMPT = (
+    "Vereinfache den folgenden deutschen Text.\n\n"
+    "Text: Der Stadtrat (Vorsitz: Frau Müller) hat, nach langer Beratung, den Haushalt beschlossen. "
+    "Die neuen Mittel fließen vor allem in Schulen, Kindergärten und den öffentlichen Nahverkehr.\n\n"
+    "Vereinfachter Text:"
+)
+
+
+class TestRuleBackend:
+    """Tests für den regelbasierten Vereinfacher"""
+
+    def test_extract_source(self):
+        """Test Extraktion der Quelle aus dem Prompt"""
+        source = extract_source(PROMPT)
+        assert source.startswith("Der Stadtrat")
+        assert source.endswith("Nahverkehr.")
+
+    def test_simplify_is_deterministic_and_shorter(self):
+        """Test dass die Vereinfachung deterministisch und kürzer ist"""
+        adapter = create_adapter({"model_id": "r", "backend": "rule", "rule": {"max_words": 6}})
+        a = adapter.generate(PROMPT, 160, {})
+        assert a == adapter.generate(PROMPT, 160, {})
+        assert a == "Der Stadtrat hat. Die neuen Mittel fließen vor allem."
+        assert adapter.last_stats["completion_tokens"] == len(a.split())
+
+    def test_echo_mode(self):
+        """Test dass der Echo-Modus die Quelle zurückgibt"""
+        adapter = RuleSimplifier({"model_id": "e", "rule": {"mode": "echo"}})
+        assert adapter.generate(PROMPT, 160, {}) == extract_source(PROMPT)
+        assert len(adapter.generate(PROMPT, 5, {}).split()) == 5
+
+    def test_invalid_mode(self):
+        """Test ungültiger Modus"""
+        with pytest.raises(ValueError):
+            RuleSimplifier({"model_id": "x", "rule": {"mode": "zufall"}})
+
+
+class TestBackendRegistry:
+    """Tests für die Backend-Auswahl"""
+
+    def test_unknown_backend(self):
+        """Test unbekanntes Backend"""
+        with pytest.raises(ValueError, match="Unbekanntes Backend"):
+            create_adapter({"model_id": "x", "backend": "gibtsnicht"})
+
+    def test_register_backend(self):
+        """Test Registrierung eines eigenen Backends"""
+        register_backend("konstant", lambda mc: mc["model_id"])
+        try:
+            assert create_adapter({"model_id": "k", "backend": "konstant"}) == "k"
+        finally:
+            BACKENDS.pop("konstant")
+
+    def test_byte_tokenizer_roundtrip(self):
+        """Test Byte-Tokenizer mit Umlauten"""
+        tok = ByteTokenizer()
+        ids = tok.encode("Größe ändern")
+        assert ids[0] == tok.bos_token_id
+        assert tok.decode(ids) == "Größe ändern"
+
+    def test_tiny_backend(self):
+        """Test zufälliges Tiny-Modell (nur mit torch/transformers)"""
+        pytest.importorskip("torch")
+        pytest.importorskip("transformers")
+        cfg = {"model_id": "tiny", "backend": "tiny", "tiny": {"n_layer": 1, "n_embd": 32, "n_head": 2}}
+        adapter = create_adapter(cfg)
+        out = adapter.generate(PROMPT, 8, {"do_sample": False})
+        assert isinstance(out, str)
+        assert adapter.last_stats["completion_tokens"] <= 8
+        assert adapter.memory_bytes() > 0
+        # Gleicher Seed, gleiche Gewichte, gleiche greedy-Ausgabe
+        assert create_adapter(cfg).generate(PROMPT, 8, {"do_sample": False}) == out
+
+
+class TestPipelineWithBackends:
+    """Test kompletter Lauf über die Backend-Konfiguration"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_run_without_adapters(self):
+        """Test dass die Pipeline die Adapter selbst über ``backend`` lädt"""
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(4):
+                f.write(json.dumps({
+                    "id": f"ex_{i}",
+                    "source": f"Die Kommune plant, trotz hoher Kosten, Projekt {i} für den Ausbau der Radwege in der Innenstadt.",
+                    "refs": ["Die Stadt baut Radwege."],
+                }, ensure_ascii=False) + "\n")
+        task = {"task_name": "simplify_de", "data": {"test_file": data_path},
+                "prompt": {"template": "Text: {source}\n\nVereinfachter Text:"}}
+        cfg = {"seed": 42, "max_new_tokens": 64, "output_dir": os.path.join(self.temp_dir, "out"),
+               "cache_dir": os.path.join(self.temp_dir, "cache"),
+               "decoding": {"name": "greedy", "do_sample": False}}
+        model_cfgs = [{"model_id": "echo", "backend": "rule", "rule": {"mode": "echo"}},
+                      {"model_id": "simple", "backend": "rule"}]
+
+        pipe = EvaluationPipeline(task, cfg, model_cfgs, results_format="json")
+        pipe.run(plots=False)
+        assert isinstance(pipe.adapters["simple"], RuleSimplifier)
+        assert pipe.comparison_results["word_count"]["model_b_mean"] < pipe.comparison_results["word_count"]["model_a_mean"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,198 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+from src.batching import (
+    AdaptiveBatcher, BatchSizeStore, OutOfMemoryError, is_oom_error,
+)
+from src.pipeline import EvaluationPipeline
+
+
+def limited(max_size, seen=None):
+    """Hilfsfunktion: Batch-Funktion mit Speicherfehler oberhalb von max_size"""
+    def fn(batch):
+        if seen is not None:
+            seen.append(len(batch))
+        if len(batch) > max_size:
+            raise OutOfMemoryError("zu groß")
+        return [x * 10 for x in batch]
+    return fn
+
+
+class BatchAdapter:
+    """Adapter mit Batch-Generierung und Speichergrenze"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.sizes = []
+        self.last_stats = {}
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        return self.generate_batch([prompt], max_new_tokens, decoding)[0]
+
+    def generate_batch(self, prompts, max_new_tokens, decoding):
+        self.sizes.append(len(prompts))
+        if len(prompts) > self.max_size:
+            raise RuntimeError("CUDA out of memory. Tried to allocate 2.00 GiB")
+        self.last_stats = {"items": [{"completion_tokens": 3}] * len(prompts)}
+        return ["Kurzer Satz."] * len(prompts)
+
+
+class TestAdaptiveBatcher:
+    """Tests für die Batch-Steuerung"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = BatchSizeStore(os.path.join(self.temp_dir, "batch_sizes.json"), hardware="test")
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_fixed_size(self):
+        """Test feste Batch-Größe ohne Anpassung"""
+        seen = []
+        batcher = AdaptiveBatcher("m", batch_size=3)
+        out = [y for _, ys in batcher.process(list(range(7)), limited(10, seen)) for y in ys]
+        assert out == [x * 10 for x in range(7)]
+        assert seen == [3, 3, 1]
+
+    def test_probe_and_back_off(self):
+        """Test Verdoppeln bis zum Speicherfehler und Wiederholung kleiner"""
+        seen = []
+        batcher = AdaptiveBatcher("m", adaptive=True, store=self.store)
+        out = [y for _, ys in batcher.process(list(range(40)), limited(5, seen)) for y in ys]
+        assert out == [x * 10 for x in range(40)]
+        # Verdoppeln bis 8, dann Bisektion zwischen 4 (ok) und 8 bzw. 6 (Fehler)
+        assert seen[:9] == [1, 2, 4, 8, 4, 6, 4, 5, 5]
+        assert batcher.size == 5 and batcher.smallest_failed == 6
+        assert batcher.backoffs == 2
+
+    def test_persisted_size(self):
+        """Test dass spätere Läufe mit der gelernten Größe beginnen"""
+        list(AdaptiveBatcher("m", adaptive=True, store=self.store).process(list(range(40)), limited(5)))
+        with open(self.store.path, encoding="utf-8") as f:
+            state = json.load(f)
+        assert state["m@test"]["batch_size"] == 5
+
+        seen = []
+        batcher = AdaptiveBatcher("m", adaptive=True, store=self.store)
+        list(batcher.process(list(range(12)), limited(5, seen)))
+        assert seen == [5, 5, 2]
+        # Andere Hardware beginnt wieder beim Startwert
+        assert AdaptiveBatcher("m", adaptive=True, store=BatchSizeStore(self.store.path, "gpu")).size == 1
+
+    def test_size_persisted_before_run_ends(self):
+        """Test dass die zurückgenommene Größe schon vor Ende des Laufs gespeichert ist (z. B. OOM-Kill)"""
+        batcher = AdaptiveBatcher("m", batch_size=8, adaptive=True, store=self.store)
+        batches = batcher.process(list(range(40)), limited(5))
+        batch, _ = next(batches)
+        assert len(batch) == 4
+        # Der Lauf endet hier ohne weitere Iteration
+        state = BatchSizeStore(self.store.path, "test").get("m")
+        assert state["smallest_failed"] == 8
+        # Nach dem erfolgreichen Batch zwischen 4 und 8 vergrößert
+        assert state["batch_size"] == batcher.size == 6
+
+    def test_non_oom_error_retries_individually(self):
+        """Test Einzelversuche bei anderen Fehlern"""
+        def fn(batch):
+            if 3 in batch:
+                raise ValueError("kaputt")
+            return batch
+        results = list(AdaptiveBatcher("m", batch_size=4).process(list(range(6)), fn))
+        errors = [batch for batch, out in results if isinstance(out, Exception)]
+        assert errors == [[3]]
+        ok = [x for batch, out in results if not isinstance(out, Exception) for x in out]
+        assert ok == [0, 1, 2, 4, 5]
+
+    def test_oom_at_size_one(self):
+        """Test Speicherfehler bei Größe 1 wird als Fehler gemeldet"""
+        results = list(AdaptiveBatcher("m").process([1, 2], limited(0)))
+        assert all(isinstance(out, OutOfMemoryError) for _, out in results)
+
+    def test_memory_budget(self):
+        """Test Verkleinern bei RSS über dem Budget"""
+        rss = {"value": 100}
+
+        def fn(batch):
+            rss["value"] += 10 * len(batch)
+            return batch
+
+        batcher = AdaptiveBatcher("m", batch_size=8, adaptive=True, memory_budget_bytes=150,
+                                  rss_fn=lambda: rss["value"])
+        list(batcher.process(list(range(8)), fn))
+        assert batcher.size == 4 and batcher.smallest_failed == 8
+        # Vorhersage: 180 + 4 * 10 > 150 → nur noch Einzelbatches
+        seen = []
+        list(batcher.process(list(range(2)), lambda b: seen.append(len(b)) or b))
+        assert seen == [1, 1]
+
+    def test_is_oom_error(self):
+        """Test Erkennung von Speicherfehlern"""
+        assert is_oom_error(OutOfMemoryError("x"))
+        assert is_oom_error(MemoryError())
+        assert is_oom_error(RuntimeError("[enforce fail] DefaultCPUAllocator: not enough memory"))
+        assert not is_oom_error(RuntimeError("shape mismatch"))
+
+
+class TestPipelineBatching:
+    """Test Batch-Generierung in der Pipeline"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_adaptive_run(self):
+        """Test adaptiver Lauf ohne fehlgeschlagene Beispiele"""
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(40):
+                f.write(json.dumps({"id": f"ex_{i}", "source": f"Ein langer Satz {i}.",
+                                    "refs": ["Ein Satz."]}, ensure_ascii=False) + "\n")
+        task = {"task_name": "simplify_de", "data": {"test_file": data_path},
+                "prompt": {"template": "Text: {source}\n\nVereinfachter Text:"}}
+        cfg = {"seed": 42, "max_new_tokens": 32, "output_dir": os.path.join(self.temp_dir, "out"),
+               "cache_dir": os.path.join(self.temp_dir, "cache"),
+               "decoding": {"name": "greedy", "do_sample": False},
+               "adaptive_batching": {"enabled": True, "max_batch_size": 16}}
+        adapter = BatchAdapter(max_size=6)
+        pipe = EvaluationPipeline(task, cfg, [{"model_id": "m"}], adapters={"m": adapter},
+                                  results_format="json")
+        pipe.load_data()
+        results = pipe.generate()["m"]
+
+        assert [r["id"] for r in results] == [f"ex_{i}" for i in range(40)]
+        assert not any(r["failed"] for r in results)
+        assert adapter.sizes[:8] == [1, 2, 4, 8, 4, 6, 7, 6]
+        with open(os.path.join(cfg["cache_dir"], "batch_sizes.json"), encoding="utf-8") as f:
+            assert list(json.load(f).values())[0]["batch_size"] == 6
+
+
+class TestModelAdapterBatching:
+    """Tests für Batch- und Einzelgenerierung des hf-Backends (nur mit torch/transformers)"""
+
+    def test_batch_matches_single(self, tiny_hf_model):
+        """Test gleiche Hypothese, egal ob einzeln oder im (links aufgefüllten) Batch generiert"""
+        from src.models import ModelAdapter
+
+        adapter = ModelAdapter(tiny_hf_model)
+        prompts = [
+            "Text: Der Rat hat den Plan beschlossen.\n\nVereinfachter Text:",
+            "Text: Der Rat hat den neuen Plan nach langer Beratung beschlossen.\n\nVereinfachter Text:",
+            "Der Rat",
+        ]
+        decoding = {"do_sample": False}
+        batched = adapter.generate_batch(prompts, 8, decoding)
+        single = [adapter.generate(p, 8, decoding) for p in prompts]
+        assert batched == single
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,85 @@
+import pytest
+import json
+import os
+from benchmarks.corpus import GermanLikeCorpus
+from benchmarks.e2e import run_e2e
+from benchmarks.run import (
+    BASELINE_PATH, compare_results, parse_size, run_benchmarks, size_label,
+)
+
+
+class TestCorpus:
+    """Tests für das synthetische Korpus"""
+
+    def test_deterministic(self):
+        """Test dass gleicher Seed dasselbe Korpus ergibt"""
+        assert GermanLikeCorpus(seed=1).examples(5) == GermanLikeCorpus(seed=1).examples(5)
+        assert GermanLikeCorpus(seed=1).examples(5) != GermanLikeCorpus(seed=2).examples(5)
+
+    def test_example_shape(self):
+        """Test Aufbau der Beispiele"""
+        ex = GermanLikeCorpus().examples(3)[2]
+        assert set(ex) == {"id", "source", "hyp", "refs"}
+        assert len(ex["refs"]) == 2
+        assert len(ex["hyp"].split()) < len(ex["source"].split())
+        assert ex["source"][-1] in ".!?"
+
+
+class TestBenchmarks:
+    """Tests für den Benchmark-Runner"""
+
+    def test_parse_size(self):
+        """Test Größenangaben"""
+        assert parse_size("1k") == 1000
+        assert parse_size("100K") == 100000
+        assert parse_size("1m") == 1000000
+        assert parse_size("250") == 250
+        assert size_label(100000) == "100k"
+
+    def test_run_small(self):
+        """Test kleiner Lauf über alle Funktionen"""
+        result = run_benchmarks([200], max_seconds=0.5, max_cache_ops=50, bootstrap_b=100, repeat=1)
+        keys = set(result["results"])
+        for name in ("sari", "flesch_de", "basic_stats", "paired_tests", "bootstrap_ci",
+                     "cache_put", "cache_get"):
+            assert f"{name}@200" in keys
+        assert result["results"]["cache_get@200"]["n_processed"] == 50
+        assert all(r["throughput_per_s"] > 0 for r in result["results"].values())
+        assert all(r["peak_mem_kb"] >= 0 for r in result["results"].values())
+
+    def test_compare_flags_regressions(self):
+        """Test Regressionserkennung über dem Schwellwert"""
+        current = {"results": {
+            "sari@1k": {"throughput_per_s": 600.0, "peak_mem_kb": 80.0},
+            "lix@1k": {"throughput_per_s": 1000.0, "peak_mem_kb": 4000.0},
+            "neu@1k": {"throughput_per_s": 1.0, "peak_mem_kb": 1.0},
+        }}
+        baseline = {"results": {
+            "sari@1k": {"throughput_per_s": 1000.0, "peak_mem_kb": 80.0},
+            "lix@1k": {"throughput_per_s": 1000.0, "peak_mem_kb": 1000.0},
+        }}
+        rows = {row["benchmark"]: row for row in compare_results(current, baseline, threshold=0.3)}
+        assert set(rows) == {"sari@1k", "lix@1k"}
+        assert rows["sari@1k"]["regression"] and rows["sari@1k"]["reason"] == "Durchsatz"
+        assert rows["lix@1k"]["regression"] and rows["lix@1k"]["reason"] == "Speicher"
+        assert not compare_results(current, baseline, threshold=0.5)[0]["regression"]
+
+    def test_baseline_in_repo(self):
+        """Test dass die gespeicherte Baseline alle Funktionen abdeckt"""
+        assert os.path.exists(BASELINE_PATH)
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+        functions = {r["function"] for r in baseline["results"].values()}
+        assert functions == {"sari", "flesch_de", "basic_stats", "paired_tests", "bootstrap_ci",
+                             "cache_put", "cache_get"}
+
+    def test_e2e_rule_backend(self):
+        """Test End-to-End-Lauf mit dem regelbasierten Backend"""
+        result = run_e2e(n=20, backend="rule")
+        assert result["meta"]["n_models"] == 2
+        assert set(result["passes"]) == {"cold", "warm"}
+        assert all(p["examples_per_s"] > 0 for p in result["passes"].values())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,207 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+import time
+from src.backends import create_adapter
+from src.budget import TimeBudget
+from src.generation import generate_cached, generate_cached_batch
+from src.pipeline import EvaluationPipeline
+
+PROMPT = "Text: Der Rat hat den Haushalt nach langer Beratung beschlossen.\n\nVereinfachter Text:"
+
+
+class FakeClock:
+    """Uhr, die nur auf Anweisung vorrückt"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ClockAdapter:
+    """Adapter, dessen Generationen eine feste Zeit auf der Test-Uhr verbrauchen (``fail_on``: Fehler)"""
+
+    def __init__(self, clock, seconds):
+        self.clock = clock
+        self.seconds = seconds
+        self.last_stats = {}
+
+    fail_on = None
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        if self.fail_on and self.fail_on in prompt:
+            raise RuntimeError("Generation fehlgeschlagen")
+        self.clock.now += self.seconds
+        self.last_stats = {"completion_tokens": 2}
+        return "Kurzer Satz."
+
+
+class SleepAdapter:
+    """Adapter, dessen Aufrufe (einzeln oder als Batch) ``delay`` Sekunden dauern"""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.last_stats = {}
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        return self.generate_batch([prompt], max_new_tokens, decoding)[0]
+
+    def generate_batch(self, prompts, max_new_tokens, decoding):
+        time.sleep(self.delay)
+        self.last_stats = {"items": [{"completion_tokens": 2}] * len(prompts)}
+        return ["Kurz."] * len(prompts)
+
+
+class TestTimeBudget:
+    """Tests für Zeitgrenzen, Deadline und Nachzügler"""
+
+    def test_max_time(self):
+        """Test Grenzen pro Beispiel und Batch, gedeckelt durch die Deadline"""
+        clock = FakeClock()
+        budget = TimeBudget(example_seconds=10, batch_seconds=30, deadline_seconds=100, clock=clock)
+        assert budget.max_time(1) == 10 and budget.max_time(4) == 30
+        budget.start()
+        clock.now = 95
+        assert budget.max_time(4) == 5 and not budget.expired()
+        clock.now = 100
+        assert budget.expired()
+        assert TimeBudget().max_time(8) is None
+        assert TimeBudget(example_seconds=7).max_time(8) == 7
+
+    def test_stragglers(self):
+        """Test Erkennung von Ausreißern gegenüber dem Median"""
+        budget = TimeBudget(straggler_factor=3.0)
+        assert not any(budget.observe("m", f"ex_{i}", 1.0) for i in range(10))
+        assert not budget.observe("m", "normal", 2.5)
+        assert budget.observe("m", "langsam", 3.5)
+        # Eigenes Fenster pro Modell
+        assert not budget.observe("anderes", "x", 100.0)
+        assert budget.stragglers == 1
+
+    def test_batch_straggler(self):
+        """Test ein langsames Beispiel im Batch fällt gegenüber Batches gleicher Größe auf"""
+        task = {"prompt": {"template": "Text: {source}"}}
+        cfg = {"seed": 42, "max_new_tokens": 8, "decoding": {"name": "greedy", "do_sample": False}}
+        examples = [{"id": f"ex_{i}", "source": f"Satz {i}."} for i in range(4)]
+        adapter = SleepAdapter(delay=0.05)
+        budget = TimeBudget(straggler_factor=3.0)
+        # Einzelne Beispiele brauchen länger pro Beispiel als Batches; beide Fenster getrennt
+        for _ in range(10):
+            generate_cached(adapter, "m", examples[0], task, cfg, use_cache=False, budget=budget)
+        adapter.delay = 0.02
+        for _ in range(10):
+            generate_cached_batch(adapter, "m", examples, task, cfg, use_cache=False, budget=budget)
+        assert budget.stragglers == 0
+        adapter.delay = 0.2
+        generate_cached_batch(adapter, "m", examples, task, cfg, use_cache=False, budget=budget)
+        assert budget.stragglers == 1
+
+    def test_rule_backend_truncates(self):
+        """Test dass das rule-Backend beim Zeitbudget abbricht und es meldet"""
+        adapter = create_adapter({"model_id": "r", "backend": "rule", "rule": {"mode": "echo", "delay_ms": 200}})
+        text = adapter.generate(PROMPT, 160, {"max_time": 0.05})
+        assert adapter.last_stats["truncated"]
+        assert 0 < len(text.split()) < 9
+        texts = adapter.generate_batch([PROMPT, PROMPT], 160, {"max_time": 0.05})
+        assert all(item.get("truncated") for item in adapter.last_stats["items"])
+        assert len(texts) == 2
+
+
+class TestPipelineBudget:
+    """Tests für Zeitbudgets in der Pipeline"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(6):
+                f.write(json.dumps({"id": f"ex_{i}", "source": f"Der Rat hat Punkt {i} lange beraten.",
+                                    "refs": ["Der Rat hat beraten."]}, ensure_ascii=False) + "\n")
+        self.task = {"task_name": "simplify_de", "data": {"test_file": data_path},
+                     "prompt": {"template": "Text: {source}\n\nVereinfachter Text:"}}
+        self.cfg = {"seed": 42, "max_new_tokens": 32, "output_dir": os.path.join(self.temp_dir, "out"),
+                    "cache_dir": os.path.join(self.temp_dir, "cache"),
+                    "decoding": {"name": "greedy", "do_sample": False}}
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_deadline_coverage(self):
+        """Test dass nach der Deadline übersprungen und die Abdeckung berichtet wird"""
+        clock = FakeClock()
+        adapters = {"a": ClockAdapter(clock, 1.0), "b": ClockAdapter(clock, 1.0)}
+        pipe = EvaluationPipeline(self.task, self.cfg, [{"model_id": "a"}, {"model_id": "b"}],
+                                  adapters=adapters, results_format="json",
+                                  budget=TimeBudget(deadline_seconds=8.5, clock=clock))
+        pipe.load_data()
+        results = pipe.generate()
+        assert pipe.coverage == {"a": (6, 6), "b": (3, 6)}
+        assert [r["id"] for r in results["a"]] == ["ex_0", "ex_1", "ex_2"]
+        assert [r["id"] for r in results["b"]] == ["ex_0", "ex_1", "ex_2"]
+
+        pipe.score()
+        pipe.compare()
+        assert pipe.summary["n_examples"] == 3
+        assert pipe.summary["coverage"] == ["a: 6/6 (100.0%)", "b: 3/6 (50.0%)"]
+
+        # Übersprungene Beispiele stehen nicht im Journal und werden beim Fortsetzen nachgeholt
+        pipe.budget = None
+        results = pipe.generate(resume=True)
+        assert len(results["b"]) == 6 and pipe.coverage["b"] == (6, 6)
+
+    def test_shard_after_deadline(self):
+        """Test Shard-Zeilen behalten ihre globale Position, wenn die Deadline eine Lücke lässt"""
+        clock = FakeClock()
+        shard = (1, 2)
+        b = ClockAdapter(clock, 1.0)
+        pipe = EvaluationPipeline(self.task, self.cfg, [{"model_id": "a"}, {"model_id": "b"}],
+                                  adapters={"a": ClockAdapter(clock, 1.0), "b": b}, results_format="json")
+        pipe.load_data(shard=shard)
+        assert len(pipe.examples) >= 3
+        # Erster Lauf: b scheitert am zweiten Beispiel des Shards (wird beim Fortsetzen wiederholt)
+        b.fail_on = pipe.examples[1]["source"]
+        pipe.generate()
+
+        # Zweiter Lauf: Deadline vor dem Nachholen abgelaufen
+        budget = TimeBudget(deadline_seconds=1.0, clock=clock)
+        budget.start()
+        clock.now += 5.0
+        pipe = EvaluationPipeline(self.task, self.cfg, [{"model_id": "a"}, {"model_id": "b"}],
+                                  adapters={"a": ClockAdapter(clock, 1.0), "b": ClockAdapter(clock, 1.0)},
+                                  results_format="json", budget=budget)
+        pipe.load_data(shard=shard)
+        pipe.generate(resume=True)
+        assert len(pipe.results["b"]) == len(pipe.examples) - 1
+
+        rows_path = pipe.write_shard()
+        with open(rows_path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        assert len(rows) == 2 * (len(pipe.examples) - 1)
+        assert all(row["index"] == int(row["id"].split("_")[1]) for row in rows)
+        with open(rows_path[: -len(".jsonl")] + ".json", encoding="utf-8") as f:
+            manifest = json.load(f)
+        assert manifest["n_examples"] == len(pipe.examples) - 1
+        assert manifest["mode"] == "generate" and manifest["num_samples"] == 1
+
+    def test_truncated_not_cached(self):
+        """Test Markierung abgeschnittener Ausgaben, die nicht gecacht werden"""
+        self.cfg["time_budget"] = {"example_seconds": 0.02}
+        model_cfg = {"model_id": "slow", "backend": "rule", "rule": {"mode": "echo", "delay_ms": 100}}
+        pipe = EvaluationPipeline(self.task, self.cfg, [model_cfg], results_format="json")
+        pipe.load_data()
+        results = pipe.generate()["slow"]
+        assert all(r["truncated"] for r in results)
+        assert pipe.budget.truncated == 6
+        cache_files = [n for _, _, files in os.walk(self.cfg["cache_dir"]) for n in files if n.endswith(".json")
+                       and n != "batch_sizes.json"]
+        assert cache_files == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,130 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+import time
+from src import cpu_modes
+from src.comparison import default_registry
+from src.cpu_modes import compare_modes, markdown_table, model_hash, parse_variant, resolve_cpu_mode
+from src.pipeline import EvaluationPipeline
+
+
+class ModeAdapter:
+    """Test-Adapter: int8 lässt das letzte Wort weg, compile ist schneller"""
+
+    def __init__(self, model_cfg):
+        self.mode = model_cfg.get("cpu_mode") or "fp32"
+        self.delay = 0.0 if model_cfg.get("compile") else 0.002
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        time.sleep(self.delay)
+        words = prompt.split("Text: ")[-1].split("\n")[0].split()
+        if self.mode == "int8":
+            words = words[:-1]
+        return " ".join(words)
+
+
+class TestCpuModes:
+    """Tests für CPU-Inferenzmodi und den Vergleich gegen fp32"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_parse_variant(self):
+        """Test Varianten-Angaben der Kommandozeile"""
+        assert parse_variant("int8") == {"cpu_mode": "int8", "compile": None}
+        assert parse_variant("bf16+torch") == {"cpu_mode": "bf16", "compile": "torch"}
+        assert parse_variant("onnx") == {"cpu_mode": "fp32", "compile": "onnx"}
+        with pytest.raises(ValueError):
+            parse_variant("int4")
+
+    def test_resolve_cpu_mode(self, monkeypatch):
+        """Test Fallback auf fp32 ohne bf16-Hardware"""
+        assert resolve_cpu_mode(None) == "fp32"
+        monkeypatch.setattr(cpu_modes, "cpu_supports_bf16", lambda: False)
+        assert resolve_cpu_mode("bf16") == "fp32"
+        monkeypatch.setattr(cpu_modes, "cpu_supports_bf16", lambda: True)
+        assert resolve_cpu_mode("bf16") == "bf16"
+        with pytest.raises(ValueError):
+            resolve_cpu_mode("fp8")
+
+    def test_model_hash_local_dir(self):
+        """Test Hash lokaler Modelle ändert sich mit den Gewichten"""
+        weights = os.path.join(self.temp_dir, "model.safetensors")
+        with open(weights, "wb") as f:
+            f.write(b"a" * 10)
+        first = model_hash(self.temp_dir)
+        assert first == model_hash(self.temp_dir)
+        with open(weights, "wb") as f:
+            f.write(b"b" * 20)
+        assert model_hash(self.temp_dir) != first
+
+    def test_compare_modes(self):
+        """Test Speedup und Metrik-Drift gegen fp32"""
+        examples = [{"id": f"ex_{i}", "source": f"Der Rat beschließt heute den neuen Plan {i}.",
+                     "refs": ["Der Rat beschließt den Plan."]} for i in range(5)]
+        task = {"prompt": {"template": "Text: {source}\nVereinfachter Text:"}}
+        cfg = {"seed": 42, "max_new_tokens": 32, "decoding": {"name": "greedy", "do_sample": False}}
+        report = compare_modes({"model_id": "m"}, [parse_variant("int8"), parse_variant("torch")],
+                               examples, task, cfg, ModeAdapter, default_registry())
+
+        int8, compiled = report["variants"]
+        assert int8["mode"] == "int8" and compiled["mode"] == "fp32+torch"
+        assert int8["identical_hyps"] == 0.0
+        assert int8["metric_drift"]["word_count"]["mean_delta"] == pytest.approx(-1.0)
+        assert compiled["identical_hyps"] == 1.0
+        assert compiled["metric_drift"]["SARI"]["mean_abs_delta"] == 0.0
+        assert compiled["speedup"] > 1.0
+
+        text = "\n".join(markdown_table(report))
+        assert "| Δ SARI | Δ FLESCH_DE | Δ LIX | Δ WSTF |" in text
+        assert "| int8 |" in text and "| fp32+torch |" in text
+        json.dumps(report)
+
+    def test_modes_do_not_share_cache(self):
+        """Test fp32- und int8-Lauf desselben Modells verwenden getrennte Cache-Einträge"""
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(3):
+                f.write(json.dumps({"id": f"ex_{i}", "source": f"Der Rat beschließt den Plan {i}.",
+                                    "refs": ["Der Rat beschließt."]}) + "\n")
+        task = {"task_name": "simplify_de", "data": {"test_file": data_path},
+                "prompt": {"template": "Text: {source}\nVereinfachter Text:"}}
+        cfg = {"seed": 42, "max_new_tokens": 32, "batch_size": 1,
+               "output_dir": os.path.join(self.temp_dir, "out"),
+               "cache_dir": os.path.join(self.temp_dir, "cache"),
+               "decoding": {"name": "greedy", "do_sample": False}}
+
+        def run(model_cfg):
+            pipe = EvaluationPipeline(task, cfg, [model_cfg], adapters={"m": ModeAdapter(model_cfg)},
+                                      results_format="json")
+            pipe.load_data()
+            return [row["hyp"] for row in pipe.generate()["m"]]
+
+        fp32 = run({"model_id": "m"})
+        int8 = run({"model_id": "m", "cpu_mode": "int8"})
+        assert fp32[0] == "Der Rat beschließt den Plan 0."
+        assert int8[0] == "Der Rat beschließt den Plan"
+        # Zweiter fp32-Lauf: Treffer aus dem eigenen Cache, nicht aus dem int8-Lauf
+        assert run({"model_id": "m", "cpu_mode": "fp32"}) == fp32
+        assert len(os.listdir(cfg["cache_dir"])) == 6
+
+    def test_tiny_int8(self):
+        """Test int8-Quantisierung des Tiny-Modells (nur mit torch/transformers)"""
+        pytest.importorskip("torch")
+        pytest.importorskip("transformers")
+        from src.backends import create_adapter
+        adapter = create_adapter({"model_id": "tiny", "backend": "tiny", "cpu_mode": "int8",
+                                  "tiny": {"n_layer": 1, "n_embd": 32, "n_head": 2}})
+        assert adapter.cpu_mode == "int8"
+        assert isinstance(adapter.generate("Text: Ein Satz.\n\nVereinfachter Text:", 4, {}), str)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,157 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+import threading
+from src.daemon import ModelPool, EvalDaemon, submit_job, daemon_status
+
+
+class SizedAdapter:
+    """Test-Adapter mit fester Größe: kürzt die Quelle auf die ersten Wörter"""
+
+    def __init__(self, model_id, n_words, size):
+        self.model_id = model_id
+        self.n_words = n_words
+        self.size = size
+
+    def memory_bytes(self):
+        return self.size
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        words = prompt.split("Text: ")[-1].split()
+        return " ".join(words[: self.n_words]) + "."
+
+
+class CountingFactory:
+    def __init__(self):
+        self.loaded = []
+
+    def __call__(self, model_cfg):
+        self.loaded.append(model_cfg["model_id"])
+        return SizedAdapter(model_cfg["model_id"], model_cfg.get("n_words", 6), model_cfg.get("size", 100))
+
+
+class TestModelPool:
+    """Tests für den Modell-Pool mit LRU-Entladung"""
+
+    def test_reuses_loaded_adapter(self):
+        """Test dass ein geladenes Modell nicht erneut geladen wird"""
+        factory = CountingFactory()
+        pool = ModelPool(adapter_factory=factory)
+        a = pool.get({"model_id": "a"})
+        assert pool.get({"model_id": "a"}) is a
+        assert factory.loaded == ["a"]
+
+    def test_keyed_by_full_config(self):
+        """Test gleiche model_id mit anderem CPU-Modus oder LoRA-Adapter ist ein eigener Eintrag"""
+        factory = CountingFactory()
+        pool = ModelPool(adapter_factory=factory)
+        fp32 = pool.get({"model_id": "a"})
+        int8 = pool.get({"model_id": "a", "cpu_mode": "int8"})
+        lora = pool.get({"model_id": "a", "adapter": "lora/a"})
+        assert len({id(fp32), id(int8), id(lora)}) == 3
+        assert pool.get({"cpu_mode": "int8", "model_id": "a"}) is int8
+        assert factory.loaded == ["a", "a", "a"]
+        assert pool.loaded() == ["a", "a", "a"] and "a" in pool
+        assert [m["model_cfg"].get("cpu_mode") for m in pool.status()["models"]] == [None, None, "int8"]
+
+    def test_lru_eviction_under_budget(self):
+        """Test dass das am längsten ungenutzte Modell entladen wird"""
+        factory = CountingFactory()
+        pool = ModelPool(memory_budget_bytes=250, adapter_factory=factory)
+        pool.get({"model_id": "a"})
+        pool.get({"model_id": "b"})
+        pool.get({"model_id": "a"})  # a zuletzt benutzt
+        pool.get({"model_id": "c"})
+
+        assert pool.loaded() == ["a", "c"]
+        assert pool.used_bytes == 200
+        assert pool.evictions == 1
+
+    def test_pinned_models_are_kept(self):
+        """Test dass Modelle des laufenden Jobs nicht entladen werden"""
+        pool = ModelPool(memory_budget_bytes=150, adapter_factory=CountingFactory())
+        pool.get({"model_id": "a"}, pinned=["a", "b"])
+        pool.get({"model_id": "b"}, pinned=["a", "b"])
+        assert pool.loaded() == ["a", "b"]
+
+    def test_unlimited_budget(self):
+        """Test ohne Budget bleibt alles geladen"""
+        pool = ModelPool(adapter_factory=CountingFactory())
+        for mid in "abcd":
+            pool.get({"model_id": mid, "size": 10**12})
+        assert len(pool.loaded()) == 4
+
+
+class TestEvalDaemon:
+    """Tests für den Evaluationsdienst"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(5):
+                f.write(json.dumps({
+                    "id": f"ex_{i}",
+                    "source": f"Der Gemeinderat hat in seiner Sitzung Vorhaben {i} zur Sanierung der Schule genehmigt.",
+                    "refs": ["Die Schule wird repariert."],
+                }, ensure_ascii=False) + "\n")
+        self.job = {
+            "task": {
+                "task_name": "simplify_de",
+                "data": {"test_file": data_path},
+                "prompt": {"template": "Text: {source}"},
+            },
+            "config": {
+                "seed": 42,
+                "max_new_tokens": 32,
+                "output_dir": os.path.join(self.temp_dir, "out"),
+                "cache_dir": os.path.join(self.temp_dir, "cache"),
+                "decoding": {"name": "greedy", "do_sample": False},
+            },
+            "models": [{"model_id": "lang", "n_words": 12}, {"model_id": "kurz", "n_words": 4}],
+            "plots": False,
+            "results_format": "json",
+        }
+        self.factory = CountingFactory()
+        self.daemon = EvalDaemon(ModelPool(adapter_factory=self.factory), port=0)
+        self.thread = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        self.thread.start()
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        self.daemon.shutdown()
+        shutil.rmtree(self.temp_dir)
+
+    def test_job_roundtrip_keeps_models_warm(self):
+        """Test dass zwei Jobs dieselben geladenen Modelle nutzen"""
+        events = []
+        final = submit_job(self.daemon.url, self.job, events.append)
+
+        assert final["event"] == "done"
+        assert os.path.exists(final["paths"]["report"])
+        assert final["summary"]["n_examples"] == 5
+        assert any(e["event"] == "progress" and e["stage"] == "generate" for e in events)
+
+        job = {**self.job, "max_samples": 3, "output": os.path.join(self.temp_dir, "out2")}
+        final = submit_job(self.daemon.url, job)
+        assert final["event"] == "done"
+        assert final["summary"]["n_examples"] == 3
+        assert self.factory.loaded == ["lang", "kurz"]
+
+        status = daemon_status(self.daemon.url)
+        assert status["jobs_done"] == 2
+        assert [m["model_id"] for m in status["pool"]["models"]] == ["lang", "kurz"]
+
+    def test_failed_job_reports_error(self):
+        """Test dass ein fehlerhafter Job ein Fehlerereignis liefert"""
+        job = {**self.job, "task": {**self.job["task"], "data": {"test_file": "/nicht/vorhanden.jsonl"}}}
+        final = submit_job(self.daemon.url, job)
+        assert final["event"] == "error"
+        assert daemon_status(self.daemon.url)["jobs_failed"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
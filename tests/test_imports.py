@@ -0,0 +1,72 @@
+import pytest
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Schwere Abhängigkeiten, die erst bei Modell-, Plot- oder Parquet-Nutzung geladen werden
+HEAVY_MODULES = ["torch", "transformers", "matplotlib", "seaborn", "pandas", "pyarrow", "scipy"]
+
+# Großzügiges Budget für langsame CI-Maschinen, über die Umgebung anpassbar
+IMPORT_BUDGET_S = float(os.environ.get("EVAL_IMPORT_BUDGET_S", "1.5"))
+
+
+def _import_in_subprocess(statement):
+    """Führt ``statement`` in einem frischen Interpreter aus; liefert (Sekunden, geladene schwere Module)"""
+    code = (
+        "import json, sys, time\n"
+        "t = time.perf_counter()\n"
+        f"{statement}\n"
+        "dt = time.perf_counter() - t\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'seconds': dt, 'heavy': heavy}))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    return result["seconds"], result["heavy"]
+
+
+class TestImportTime:
+    """Tests für schnelle Importe ohne schwere Abhängigkeiten"""
+
+    @pytest.mark.parametrize("module", ["evaluate", "merge_shards", "eval_daemon", "src.pipeline"])
+    def test_cli_imports_are_light(self, module):
+        """Test dass CLI-Module weder torch noch Plot-Bibliotheken importieren"""
+        seconds, heavy = _import_in_subprocess(f"import {module}")
+        assert heavy == []
+        assert seconds < IMPORT_BUDGET_S
+
+    def test_src_surface_is_lazy(self):
+        """Test dass ``import src`` nichts lädt und Metriken ohne scipy nutzbar sind"""
+        seconds, heavy = _import_in_subprocess(
+            "import src\n"
+            "assert 'src.stats' not in sys.modules\n"
+            "assert src.sari('Der Hund bellt laut.', 'Der Hund bellt.', ['Der Hund bellt.']) > 0\n"
+            "assert src.basic_stats('Ein Satz.')['word_count'] == 2"
+        )
+        assert heavy == []
+        assert seconds < IMPORT_BUDGET_S
+
+    def test_stats_surface_loads_scipy_on_use(self):
+        """Test dass Statistikfunktionen über die Oberfläche erreichbar sind"""
+        _, heavy = _import_in_subprocess(
+            "import src\n"
+            "r = src.paired_tests([1.0, 2.0, 3.0, 4.0], [1.5, 2.5, 3.2, 4.9])\n"
+            "assert r['n'] == 4"
+        )
+        assert heavy == ["scipy"]
+
+    def test_unknown_attribute(self):
+        """Test dass unbekannte Namen einen AttributeError liefern"""
+        import src
+
+        with pytest.raises(AttributeError):
+            src.gibt_es_nicht
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
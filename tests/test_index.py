@@ -0,0 +1,93 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+from src.jsonl_index import JsonlIndex, build_index, load_index, index_path
+from src.tasks import load_jsonl, load_jsonl_by_ids, read_id_list
+
+
+class TestJsonlIndex:
+    """Tests für den Byte-Offset-Index"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "data.jsonl")
+        self.rows = [
+            {"id": f"ex_{i:03d}", "source": f"Satz Nummer {i} mit Ümlauten.", "refs": []}
+            for i in range(20)
+        ]
+        with open(self.path, "w", encoding="utf-8") as f:
+            for i, row in enumerate(self.rows):
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                if i == 5:
+                    f.write("\n")  # Leerzeilen werden übersprungen
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_fetch_by_id_and_position(self):
+        """Test Zugriff per ID und per Position"""
+        with JsonlIndex(self.path) as index:
+            assert len(index) == 20
+            assert index.get("ex_013") == self.rows[13]
+            assert index[7] == self.rows[7]
+            assert index[-1] == self.rows[-1]
+            assert "ex_000" in index
+            assert "ex_999" not in index
+
+    def test_fetch_many_keeps_order(self):
+        """Test dass fetch_many die angefragte Reihenfolge einhält"""
+        with JsonlIndex(self.path) as index:
+            got = index.fetch_many(["ex_010", "ex_002"])
+        assert [r["id"] for r in got] == ["ex_010", "ex_002"]
+
+    def test_unknown_id(self):
+        """Test unbekannte ID"""
+        with JsonlIndex(self.path) as index:
+            with pytest.raises(KeyError):
+                index.get("unbekannt")
+
+    def test_sidecar_written_and_reused(self):
+        """Test dass der Sidecar-Index geschrieben und wiederverwendet wird"""
+        JsonlIndex(self.path).close()
+        assert os.path.exists(index_path(self.path))
+        assert load_index(self.path) is not None
+
+    def test_sidecar_invalidated_on_change(self):
+        """Test dass Änderungen an der Datei den Index invalidieren"""
+        build_index(self.path)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"id": "ex_new", "source": "Neu."}) + "\n")
+        assert load_index(self.path) is None
+
+        with JsonlIndex(self.path) as index:
+            assert index.get("ex_new")["source"] == "Neu."
+
+    def test_duplicate_ids(self):
+        """Test dass doppelte IDs abgelehnt werden"""
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"id": "ex_001", "source": "Doppelt."}) + "\n")
+        with pytest.raises(ValueError):
+            build_index(self.path)
+
+    def test_load_jsonl_by_ids_matches_scan(self):
+        """Test dass gezieltes Laden dem vollständigen Scan entspricht"""
+        full = {r["id"]: r for r in load_jsonl(self.path)}
+        subset = load_jsonl_by_ids(self.path, ["ex_004", "ex_019"])
+        assert subset == [full["ex_004"], full["ex_019"]]
+
+    def test_read_id_list(self):
+        """Test ID-Liste aus CLI-Werten oder Datei"""
+        assert read_id_list(["a", "b"]) == ["a", "b"]
+
+        id_file = os.path.join(self.temp_dir, "ids.txt")
+        with open(id_file, "w", encoding="utf-8") as f:
+            f.write("# Fehlschläge\nex_001\n\nex_002\n")
+        assert read_id_list([id_file]) == ["ex_001", "ex_002"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,109 @@
+import pytest
+import os
+import tempfile
+import shutil
+from src.journal import ProgressJournal, replay_journal, JournalMismatchError
+
+
+HEADER = {"task": "simplify_de", "models": ["a", "b"], "seed": 42}
+
+
+def _record(model_id, ex_id, failed=False):
+    return {
+        "model_id": model_id,
+        "id": ex_id,
+        "source": "Quelle.",
+        "hyp": "" if failed else "Hyp.",
+        "refs": [],
+        "metrics": {"SARI": 0.5},
+        "failed": failed,
+    }
+
+
+class TestProgressJournal:
+    """Tests für das Fortschrittsjournal"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "journal.jsonl")
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_roundtrip(self):
+        """Test Schreiben und Wiedereinlesen"""
+        with ProgressJournal(self.path, HEADER, flush_every=2) as journal:
+            journal.append(_record("a", "ex_1"))
+            journal.append(_record("b", "ex_1"))
+            journal.append(_record("a", "ex_2"))
+
+        done = replay_journal(self.path, HEADER)
+        assert set(done) == {("a", "ex_1"), ("b", "ex_1"), ("a", "ex_2")}
+        assert done[("a", "ex_1")]["metrics"] == {"SARI": 0.5}
+
+    def test_batched_flush(self):
+        """Test dass erst nach flush_every Einträgen geschrieben wird"""
+        journal = ProgressJournal(self.path, HEADER, flush_every=3)
+        journal.append(_record("a", "ex_1"))
+        assert replay_journal(self.path) == {}
+        journal.append(_record("a", "ex_2"))
+        journal.append(_record("a", "ex_3"))
+        assert len(replay_journal(self.path)) == 3
+        journal.close()
+
+    def test_truncated_last_line(self):
+        """Test dass eine abgeschnittene letzte Zeile ignoriert wird"""
+        with ProgressJournal(self.path, HEADER, flush_every=1) as journal:
+            journal.append(_record("a", "ex_1"))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"type": "unit", "model_id": "a", "id": "ex_')
+
+        assert set(replay_journal(self.path, HEADER)) == {("a", "ex_1")}
+
+    def test_resume_after_truncated_line(self):
+        """Test dass beim Fortsetzen der erste neue Eintrag nicht an eine abgeschnittene Zeile angehängt wird"""
+        with ProgressJournal(self.path, HEADER, flush_every=1) as journal:
+            journal.append(_record("a", "ex_1"))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"type": "unit", "model_id": "a", "id": "ex_')
+        with ProgressJournal(self.path, HEADER, resume=True) as journal:
+            journal.append(_record("a", "ex_2"))
+        assert set(replay_journal(self.path, HEADER)) == {("a", "ex_1"), ("a", "ex_2")}
+
+        # Nur ein abgeschnittener Header: neues Journal mit Header
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('{"type": "header", "task"')
+        with ProgressJournal(self.path, HEADER, resume=True) as journal:
+            journal.append(_record("b", "ex_1"))
+        assert set(replay_journal(self.path, HEADER)) == {("b", "ex_1")}
+
+    def test_failed_units_are_retried(self):
+        """Test dass fehlgeschlagene Einheiten nicht als erledigt gelten"""
+        with ProgressJournal(self.path, HEADER) as journal:
+            journal.append(_record("a", "ex_1", failed=True))
+            journal.append(_record("a", "ex_2"))
+        assert set(replay_journal(self.path)) == {("a", "ex_2")}
+
+    def test_resume_appends(self):
+        """Test dass Fortsetzen anhängt statt zu überschreiben"""
+        with ProgressJournal(self.path, HEADER) as journal:
+            journal.append(_record("a", "ex_1"))
+        with ProgressJournal(self.path, HEADER, resume=True) as journal:
+            journal.append(_record("a", "ex_2"))
+        assert len(replay_journal(self.path, HEADER)) == 2
+
+        # Ohne resume beginnt ein neues Journal
+        ProgressJournal(self.path, HEADER).close()
+        assert replay_journal(self.path, HEADER) == {}
+
+    def test_header_mismatch(self):
+        """Test dass ein Journal eines anderen Laufs abgelehnt wird"""
+        ProgressJournal(self.path, HEADER).close()
+        with pytest.raises(JournalMismatchError):
+            replay_journal(self.path, {**HEADER, "seed": 1})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,213 @@
+import pytest
+import gc
+import json
+import os
+import tempfile
+import shutil
+from contextlib import contextmanager
+from src.lora import LoraModel, SharedBases, create_lora_model, lora_name, read_adapter_base
+from src.multitask import MultiTaskEvaluation
+from src.pipeline import EvaluationPipeline
+
+
+class FakeBase:
+    """Basismodell-Attrappe mit der LoRA-Schnittstelle von ModelAdapter"""
+
+    loads = []
+
+    def __init__(self, model_id):
+        FakeBase.loads.append(model_id)
+        self.model_id = model_id
+        self.adapters = {}
+        self.active = None
+        self.drafts = {}
+        self.draft_model_id = None
+        self.last_stats = {}
+
+    def attach_draft(self, draft_model_id, verify=0):
+        self.drafts[draft_model_id] = verify
+
+    def select_draft(self, draft_model_id):
+        self.draft_model_id = draft_model_id
+
+    def attach_lora(self, name, adapter_path):
+        self.adapters[name] = adapter_path
+
+    def detach_lora(self, name):
+        self.adapters.pop(name, None)
+
+    @contextmanager
+    def lora_scope(self, name):
+        self.active = name
+        try:
+            yield
+        finally:
+            self.active = None
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        return self.generate_batch([prompt], max_new_tokens, decoding)[0]
+
+    def generate_batch(self, prompts, max_new_tokens, decoding):
+        item = {"completion_tokens": 2}
+        if self.draft_model_id:
+            item.update(draft_proposed=4, draft_accepted=3, target_passes=1)
+        self.last_stats = {"items": [item] * len(prompts)}
+        return [f"{self.active or 'basis'} Satz." for _ in prompts]
+
+    def memory_bytes(self):
+        return 1000
+
+    def lora_bytes(self, name):
+        return 10
+
+
+class TestLora:
+    """Tests für geteilte Basismodelle mit LoRA-Adaptern"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        FakeBase.loads = []
+        self.bases = SharedBases(loader=FakeBase)
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_base_loaded_once(self):
+        """Test dass Basis und Fine-Tunes ein Basismodell teilen"""
+        base = create_lora_model({"model_id": "phi"}, self.bases)
+        ft_a = create_lora_model({"model_id": "ft/a", "base": "phi", "adapter": "/lora/a"}, self.bases)
+        ft_b = create_lora_model({"model_id": "ft.b", "base": "phi", "adapter": "/lora/b"}, self.bases)
+        assert FakeBase.loads == ["phi"]
+        assert base.base is ft_a.base is ft_b.base
+        assert base.base.adapters == {"ft_a": "/lora/a", "ft_b": "/lora/b"}
+
+        assert base.generate("p", 10, {}) == "basis Satz."
+        assert ft_a.generate_batch(["p", "q"], 10, {}) == ["ft_a Satz.", "ft_a Satz."]
+        assert ft_b.generate("p", 10, {}) == "ft_b Satz."
+        assert ft_a.last_stats["items"][0]["completion_tokens"] == 2
+        assert base.memory_bytes() == 1000 and ft_a.memory_bytes() == 10
+
+    def test_release(self):
+        """Test dass Adapter gelöst und das Basismodell freigegeben wird"""
+        ft = create_lora_model({"model_id": "ft", "base": "phi", "adapter": "/lora/ft"}, self.bases)
+        shared = ft.base
+        ft.close()
+        assert shared.adapters == {}
+        del ft, shared
+        gc.collect()
+        assert self.bases.loaded() == []
+        create_lora_model({"model_id": "phi"}, self.bases)
+        assert FakeBase.loads == ["phi", "phi"]
+
+    def test_base_counted_once(self):
+        """Test Basisspeicher wird ohne Basis-Sicht einmal gezählt und beim Schließen weitergereicht"""
+        ft_a = create_lora_model({"model_id": "ft/a", "base": "phi", "adapter": "/lora/a"}, self.bases)
+        ft_b = create_lora_model({"model_id": "ft/b", "base": "phi", "adapter": "/lora/b"}, self.bases)
+        assert ft_a.memory_bytes() == 1010 and ft_b.memory_bytes() == 10
+        ft_a.close()
+        assert ft_b.memory_bytes() == 1010
+        del ft_a
+        gc.collect()
+        assert ft_b.memory_bytes() == 1010
+
+    def test_pool_budget_sees_base(self):
+        """Test Speicherbudget des Daemon-Pools zählt das geteilte Basismodell"""
+        from src.daemon import ModelPool
+
+        pool = ModelPool(memory_budget_bytes=1015,
+                         adapter_factory=lambda mc: create_lora_model(mc, self.bases))
+        pool.get({"model_id": "ft/a", "base": "phi", "adapter": "/lora/a"})
+        pool.get({"model_id": "ft/b", "base": "phi", "adapter": "/lora/b"})
+        # 1010 + 10 > 1015: die älteste Sicht wird entladen, die verbleibende trägt die Basis
+        assert pool.loaded() == ["ft/b"]
+        assert pool.used_bytes == 1010
+
+    def test_base_from_adapter_config(self):
+        """Test Basismodell aus adapter_config.json"""
+        with open(os.path.join(self.temp_dir, "adapter_config.json"), "w", encoding="utf-8") as f:
+            json.dump({"base_model_name_or_path": "microsoft/phi-4-mini-instruct"}, f)
+        assert read_adapter_base(self.temp_dir) == "microsoft/phi-4-mini-instruct"
+        ft = create_lora_model({"model_id": "ft", "adapter": self.temp_dir}, self.bases)
+        assert FakeBase.loads == ["microsoft/phi-4-mini-instruct"]
+        assert ft.adapter_name == "ft"
+
+    def test_missing_base(self):
+        """Test Fehler bei Adapter ohne bekanntes Basismodell"""
+        with pytest.raises(ValueError, match="base"):
+            create_lora_model({"model_id": "ft", "adapter": "/nicht/vorhanden"}, self.bases)
+
+    def test_draft_selected_per_view(self):
+        """Test dass nur die Sicht mit draft_model_id das Entwurfsmodell nutzt"""
+        base = create_lora_model({"model_id": "phi"}, self.bases)
+        fast = create_lora_model({"model_id": "phi-fast", "base": "phi", "draft_model_id": "phi-tiny",
+                                  "draft_verify": 3}, self.bases)
+        assert fast.base.drafts == {"phi-tiny": 3}
+        fast.generate("p", 10, {})
+        assert fast.last_stats["items"][0]["draft_accepted"] == 3
+        base.generate("p", 10, {})
+        assert "draft_proposed" not in base.last_stats["items"][0]
+
+    def test_lora_name(self):
+        """Test gültige peft-Adapternamen"""
+        assert lora_name("/home/franz/phi4-mini.lora") == "_home_franz_phi4_mini_lora"
+
+    def test_pipeline_shares_base(self):
+        """Test Pipeline-Lauf mit Basis und zwei Fine-Tunes auf einem Basismodell"""
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(3):
+                f.write(json.dumps({"id": f"ex_{i}", "source": f"Ein langer Satz {i}.",
+                                    "refs": ["Ein Satz."]}, ensure_ascii=False) + "\n")
+        task = {"task_name": "simplify_de", "data": {"test_file": data_path},
+                "prompt": {"template": "Text: {source}\n\nVereinfachter Text:"}}
+        cfg = {"seed": 42, "max_new_tokens": 32, "batch_size": 2,
+               "output_dir": os.path.join(self.temp_dir, "out"),
+               "cache_dir": os.path.join(self.temp_dir, "cache"),
+               "decoding": {"name": "greedy", "do_sample": False}}
+        model_cfgs = [{"model_id": "phi"},
+                      {"model_id": "ft_a", "base": "phi", "adapter": "/lora/a"},
+                      {"model_id": "ft_b", "base": "phi", "adapter": "/lora/b"}]
+
+        pipe = EvaluationPipeline(task, cfg, model_cfgs, results_format="json",
+                                  adapter_factory=lambda mc: create_lora_model(mc, self.bases))
+        pipe.load_data()
+        results = pipe.generate()
+        assert FakeBase.loads == ["phi"]
+        assert {r["hyp"] for r in results["phi"]} == {"basis Satz."}
+        assert {r["hyp"] for r in results["ft_a"]} == {"ft_a Satz."}
+        assert {r["hyp"] for r in results["ft_b"]} == {"ft_b Satz."}
+        assert all(isinstance(a, LoraModel) for a in pipe.adapters.values())
+
+    def test_multitask_keeps_shared_base(self):
+        """Test dass der modellweise Lauf das Basismodell für den folgenden Fine-Tune nicht freigibt"""
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(2):
+                f.write(json.dumps({"id": f"ex_{i}", "source": f"Ein langer Satz {i}.",
+                                    "refs": ["Ein Satz."]}, ensure_ascii=False) + "\n")
+        tasks = [{"task_name": name, "data": {"test_file": data_path},
+                  "prompt": {"template": "Text: {source}\n\nVereinfachter Text:"}}
+                 for name in ("simplify_de", "simplify_de_kurz")]
+        cfg = {"seed": 42, "max_new_tokens": 32,
+               "output_dir": os.path.join(self.temp_dir, "out"),
+               "cache_dir": os.path.join(self.temp_dir, "cache"),
+               "decoding": {"name": "greedy", "do_sample": False}}
+        model_cfgs = [{"model_id": "phi"},
+                      {"model_id": "ft_a", "base": "phi", "adapter": "/lora/a"},
+                      {"model_id": "rule", "backend": "rule"}]
+
+        run = MultiTaskEvaluation(tasks, cfg, model_cfgs, results_format="json",
+                                  adapter_factory=lambda mc: create_lora_model(mc, self.bases))
+        run.load_data()
+        run.generate()
+        assert FakeBase.loads == ["phi", "rule"]
+        # Nach dem letzten Fine-Tune ist auch das Basismodell freigegeben
+        gc.collect()
+        assert run.adapters == {}
+        assert self.bases.loaded() == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
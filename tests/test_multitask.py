@@ -0,0 +1,111 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+from src.multitask import MultiTaskEvaluation, CROSS_TASK_JSON, CROSS_TASK_MD
+
+
+class RuleAdapter:
+    """Test-Adapter: kürzt die Quelle auf die ersten Wörter"""
+
+    def __init__(self, n_words):
+        self.n_words = n_words
+        self.calls = 0
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        self.calls += 1
+        words = prompt.split(": ")[-1].split()
+        return " ".join(words[: self.n_words]) + "."
+
+
+class TestMultiTaskEvaluation:
+    """Tests für mehrere Tasks mit geteilten Modellen"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.tasks = []
+        for name, n in (("simplify_a2", 4), ("simplify_b1", 3)):
+            data_path = os.path.join(self.temp_dir, f"{name}.jsonl")
+            with open(data_path, "w", encoding="utf-8") as f:
+                for i in range(n):
+                    f.write(json.dumps({
+                        "id": f"{name}_{i}",
+                        "source": f"Die Stadtverwaltung informiert über die geplante Erweiterung {i} des Radwegenetzes im Zentrum.",
+                        "refs": ["Die Stadt baut mehr Radwege."],
+                    }, ensure_ascii=False) + "\n")
+            self.tasks.append({
+                "task_name": name,
+                "data": {"test_file": data_path},
+                "prompt": {"template": f"{name} Text: {{source}}"},
+            })
+        self.cfg = {
+            "seed": 42,
+            "max_new_tokens": 32,
+            "output_dir": os.path.join(self.temp_dir, "out"),
+            "cache_dir": os.path.join(self.temp_dir, "cache"),
+            "decoding": {"name": "greedy", "do_sample": False},
+        }
+        self.model_cfgs = [{"model_id": "lang", "n_words": 12}, {"model_id": "kurz", "n_words": 4}]
+        self.loaded = []
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def _factory(self, model_cfg):
+        self.loaded.append(model_cfg["model_id"])
+        return RuleAdapter(model_cfg["n_words"])
+
+    def _run(self, **kwargs):
+        run = MultiTaskEvaluation(self.tasks, dict(self.cfg), self.model_cfgs,
+                                  adapter_factory=self._factory, results_format="json", **kwargs)
+        return run, run.run(plots=False)
+
+    def test_models_loaded_once_for_all_tasks(self):
+        """Test dass jedes Modell genau einmal geladen wird"""
+        run, paths = self._run()
+        assert self.loaded == ["lang", "kurz"]
+        assert [p.summary["n_examples"] for p in run.pipelines] == [4, 3]
+        # Nach Abschluss werden selbst geladene Modelle freigegeben
+        assert run.adapters == {}
+
+    def test_outputs_per_task_and_cross_task_summary(self):
+        """Test Ausgabeverzeichnisse pro Task und gemeinsame Zusammenfassung"""
+        run, paths = self._run()
+        out = self.cfg["output_dir"]
+        for name in ("simplify_a2", "simplify_b1"):
+            assert paths[name]["report"] == os.path.join(out, name, "report.md")
+            assert os.path.exists(paths[name]["report"])
+            assert os.path.exists(os.path.join(out, name, "detailed_results.json"))
+
+        with open(os.path.join(out, CROSS_TASK_JSON), encoding="utf-8") as f:
+            summary = json.load(f)
+        assert set(summary["tasks"]) == {"simplify_a2", "simplify_b1"}
+        assert summary["tasks"]["simplify_b1"]["metrics"]["word_count"]["mean_difference"] < 0
+        with open(os.path.join(out, CROSS_TASK_MD), encoding="utf-8") as f:
+            assert "| simplify_a2 | SARI |" in f.read()
+
+    def test_resume_needs_no_models(self):
+        """Test dass ein vollständiger Lauf ohne Modellladen fortgesetzt wird"""
+        self._run()
+        self.loaded = []
+        self._run(use_cache=False)  # neuer Lauf überschreibt die Journale
+        assert self.loaded == ["lang", "kurz"]
+
+        self.loaded = []
+        run = MultiTaskEvaluation(self.tasks, dict(self.cfg), self.model_cfgs,
+                                  adapter_factory=self._factory, results_format="json")
+        run.run(resume=True, plots=False)
+        assert self.loaded == []
+        assert [len(p.results["kurz"]) for p in run.pipelines] == [4, 3]
+
+    def test_duplicate_task_names_rejected(self):
+        """Test dass doppelte Task-Namen abgelehnt werden"""
+        with pytest.raises(ValueError):
+            MultiTaskEvaluation([self.tasks[0], self.tasks[0]], dict(self.cfg), self.model_cfgs)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,101 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+from src.pipeline import EvaluationPipeline
+
+
+class RuleAdapter:
+    """Test-Adapter: kürzt die Quelle auf die ersten Wörter"""
+
+    def __init__(self, n_words):
+        self.n_words = n_words
+        self.calls = 0
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        self.calls += 1
+        words = prompt.split("Text: ")[-1].split()
+        return " ".join(words[: self.n_words]) + "."
+
+
+class TestEvaluationPipeline:
+    """Tests für die importierbare Pipeline"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(6):
+                f.write(json.dumps({
+                    "id": f"ex_{i}",
+                    "source": f"Die Bundesregierung hat heute Maßnahme {i} zur Förderung erneuerbarer Energien beschlossen.",
+                    "refs": ["Die Regierung fördert Strom aus Wind und Sonne."],
+                }, ensure_ascii=False) + "\n")
+        self.task = {
+            "task_name": "simplify_de",
+            "data": {"test_file": data_path},
+            "prompt": {"template": "Text: {source}"},
+        }
+        self.cfg = {
+            "seed": 42,
+            "max_new_tokens": 32,
+            "output_dir": os.path.join(self.temp_dir, "out"),
+            "cache_dir": os.path.join(self.temp_dir, "cache"),
+            "decoding": {"name": "greedy", "do_sample": False},
+        }
+        self.model_cfgs = [{"model_id": "lang"}, {"model_id": "kurz"}]
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def _pipeline(self, adapters=None, **kwargs):
+        adapters = adapters if adapters is not None else {"lang": RuleAdapter(12), "kurz": RuleAdapter(4)}
+        return EvaluationPipeline(self.task, dict(self.cfg), self.model_cfgs, adapters=adapters,
+                                  results_format="json", **kwargs)
+
+    def test_run_with_loaded_adapters(self):
+        """Test kompletter Lauf mit übergebenen Adaptern"""
+        pipe = self._pipeline()
+        paths = pipe.run(plots=False)
+
+        assert os.path.exists(paths["report"])
+        assert os.path.exists(paths["results"])
+        assert pipe.summary["n_examples"] == 6
+        assert pipe.store.shape[:2] == (2, 6)
+        assert pipe.comparison_results["word_count"]["model_b_mean"] < pipe.comparison_results["word_count"]["model_a_mean"]
+
+    def test_adapters_reused_across_runs(self):
+        """Test dass mehrere Evaluationen dieselben Adapter teilen"""
+        adapters = {"lang": RuleAdapter(12), "kurz": RuleAdapter(4)}
+        self._pipeline(adapters, use_cache=False).run(plots=False)
+        self._pipeline(adapters, use_cache=False).run(plots=False)
+        assert adapters["lang"].calls == 12
+
+    def test_resume_skips_finished_models(self):
+        """Test dass beim Fortsetzen keine Modelle für abgeschlossene Einheiten geladen werden"""
+        self._pipeline().run(plots=False)
+
+        def fail_factory(model_cfg):
+            raise AssertionError("Modell sollte nicht geladen werden")
+
+        pipe = EvaluationPipeline(self.task, dict(self.cfg), self.model_cfgs,
+                                  adapter_factory=fail_factory, use_cache=False, results_format="json")
+        pipe.run(resume=True, plots=False)
+        assert len(pipe.results["kurz"]) == 6
+
+
+class TestMain:
+    """Tests für den CLI-Einstiegspunkt"""
+
+    def test_dry_run(self, tmp_path):
+        """Test dass main() ohne Seiteneffekte beim Import aufrufbar ist"""
+        from evaluate import main
+
+        assert main(["--dry-run", "--quiet", "--output", str(tmp_path)]) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,183 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+import time
+from src.pipeline import EvaluationPipeline
+from src.profiling import Profiler, NULL_PROFILER, PROFILE_FILE, markdown_section
+
+
+class TokenAdapter:
+    """Test-Adapter, der Token-Zahlen der letzten Generation meldet"""
+
+    def __init__(self, n_words):
+        self.n_words = n_words
+        self.last_stats = {}
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        words = prompt.split("Text: ")[-1].split()
+        self.last_stats = {"prompt_tokens": len(prompt.split()), "completion_tokens": self.n_words}
+        return " ".join(words[: self.n_words]) + "."
+
+
+class TestProfiler:
+    """Tests für den Profiler"""
+
+    def test_stages_accumulate(self):
+        """Test dass mehrfach betretene Stufen aufsummiert werden"""
+        profiler = Profiler()
+        for _ in range(3):
+            with profiler.stage("metrics"):
+                time.sleep(0.01)
+        entry = profiler.summary()["stages"]["metrics"]
+        assert entry["calls"] == 3
+        assert entry["wall_seconds"] >= 0.03
+        assert "cpu_seconds" in entry
+
+    def test_disabled_profiler_records_nothing(self):
+        """Test dass der deaktivierte Profiler nichts aufzeichnet"""
+        with NULL_PROFILER.stage("generate"):
+            NULL_PROFILER.count("cache_hit")
+            NULL_PROFILER.record_generation("m", 1.0, 10, 5)
+        assert NULL_PROFILER.stages == {}
+        assert NULL_PROFILER.counters == {}
+        assert NULL_PROFILER.generations == {}
+
+    @pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="RSS nur unter Linux messbar")
+    def test_peak_rss_per_stage(self):
+        """Test dass der Spitzen-RSS pro Stufe gilt und nicht die Prozess-Hochwassermarke ist"""
+        import numpy as np
+
+        profiler = Profiler(rss_interval=0.01)
+        with profiler.stage("generate"):
+            block = np.ones(32 * 2**20 // 8)  # 32 MiB, berührt
+            time.sleep(0.2)
+            del block
+        with profiler.stage("plots"):
+            time.sleep(0.05)
+
+        stages = profiler.summary()["stages"]
+        assert stages["generate"]["peak_rss_mb"] - stages["plots"]["peak_rss_mb"] > 16
+        assert stages["generate"]["rss_delta_mb"] < 16
+        assert "process_peak_rss_so_far_mb" in profiler.summary()
+        assert profiler._sampler is None
+
+    def test_generation_summary(self):
+        """Test Latenz und Tokens/s pro Modell"""
+        profiler = Profiler()
+        profiler.record_generation("m", 0.5, prompt_tokens=100, completion_tokens=20)
+        profiler.record_generation("m", 1.5, prompt_tokens=100, completion_tokens=60)
+        gen = profiler.summary()["generation"]["m"]
+        assert gen["n"] == 2
+        assert gen["latency_mean_s"] == pytest.approx(1.0)
+        assert gen["completion_tokens_per_s"] == pytest.approx(40.0)
+        assert gen["prompt_tokens_per_s"] == pytest.approx(100.0)
+
+    def test_markdown_section(self):
+        """Test Markdown-Abschnitt mit Stufen und Cache-Quote"""
+        profiler = Profiler()
+        with profiler.stage("generate"):
+            pass
+        profiler.count("cache_hit", 3)
+        profiler.count("cache_miss", 1)
+        text = "\n".join(markdown_section(profiler.summary()))
+        assert "## Laufzeitprofil" in text
+        assert "| generate | 1 |" in text
+        assert "75.0% Trefferquote" in text
+
+    def test_draft_summary(self):
+        """Test Akzeptanzrate der assistierten Dekodierung"""
+        profiler = Profiler()
+        profiler.record_draft("m", {"draft_proposed": 20, "draft_accepted": 15, "target_passes": 8,
+                                    "completion_tokens": 23, "draft_verified": 1})
+        profiler.record_draft("m", {"draft_proposed": 20, "draft_accepted": 5, "target_passes": 12,
+                                    "completion_tokens": 17})
+        draft = profiler.summary()["draft"]["m"]
+        assert draft["generations"] == 2
+        assert draft["acceptance_rate"] == pytest.approx(0.5)
+        assert draft["tokens_per_target_pass"] == pytest.approx(2.0)
+        assert draft["verified"] == 1 and draft["mismatches"] == 0
+        text = "\n".join(markdown_section(profiler.summary()))
+        assert "Akzeptanzrate 50.0%" in text
+
+
+class TestPipelineProfiling:
+    """Tests für --profile in der Pipeline"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(5):
+                f.write(json.dumps({
+                    "id": f"ex_{i}",
+                    "source": f"Das Landesamt veröffentlicht Bericht {i} über die Entwicklung der Luftqualität in Ballungsräumen.",
+                    "refs": ["Die Luft in Städten wird besser."],
+                }, ensure_ascii=False) + "\n")
+        self.task = {
+            "task_name": "simplify_de",
+            "data": {"test_file": data_path},
+            "prompt": {"template": "Text: {source}"},
+        }
+        self.cfg = {
+            "seed": 42,
+            "max_new_tokens": 32,
+            "output_dir": os.path.join(self.temp_dir, "out"),
+            "cache_dir": os.path.join(self.temp_dir, "cache"),
+            "decoding": {"name": "greedy", "do_sample": False},
+        }
+        self.model_cfgs = [{"model_id": "lang"}, {"model_id": "kurz"}]
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def _run(self, profiler):
+        adapters = {"lang": TokenAdapter(12), "kurz": TokenAdapter(4)}
+        pipe = EvaluationPipeline(self.task, dict(self.cfg), self.model_cfgs, adapters=adapters,
+                                  results_format="json", profiler=profiler)
+        return pipe.run(plots=False)
+
+    def test_profile_written_with_stages_and_cache_counts(self):
+        """Test profile.json neben den Detailergebnissen und Abschnitt im Report"""
+        paths = self._run(Profiler())
+        assert paths["profile"] == os.path.join(self.cfg["output_dir"], PROFILE_FILE)
+        with open(paths["profile"], encoding="utf-8") as f:
+            profile = json.load(f)
+
+        for stage in ("load_data", "generate", "metrics", "cache_io", "score", "compare",
+                      "stat_tests", "bootstrap", "write_results"):
+            assert stage in profile["stages"]
+        assert profile["stages"]["metrics"]["calls"] == 10
+        assert profile["counters"] == {"cache_miss": 10}
+        assert profile["generation"]["kurz"]["completion_tokens"] == 20
+
+        with open(paths["report"], encoding="utf-8") as f:
+            assert "## Laufzeitprofil" in f.read()
+
+        # Zweiter Lauf: alles aus dem Cache, keine Generationen
+        paths = self._run(Profiler())
+        with open(paths["profile"], encoding="utf-8") as f:
+            profile = json.load(f)
+        assert profile["counters"] == {"cache_hit": 10}
+        assert profile["cache_hit_rate"] == 1.0
+        assert profile["generation"] == {}
+
+    def test_cprofile_dumps(self):
+        """Test cProfile-Dumps der Hot-Stages"""
+        self._run(Profiler(cprofile=True))
+        cprofile_dir = os.path.join(self.cfg["output_dir"], "cprofile")
+        assert os.path.exists(os.path.join(cprofile_dir, "generate.prof"))
+        assert os.path.exists(os.path.join(cprofile_dir, "compare.prof"))
+
+    def test_no_profile_by_default(self):
+        """Test dass ohne --profile keine profile.json entsteht"""
+        paths = self._run(None)
+        assert "profile" not in paths
+        assert not os.path.exists(os.path.join(self.cfg["output_dir"], PROFILE_FILE))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,158 @@
+import pytest
+import json
+import math
+import os
+import tempfile
+import shutil
+from src.pipeline import EvaluationPipeline
+from src.reference import corpus_summary, reference_continuation, reference_metrics
+
+
+class ScoringAdapter:
+    """Adapter mit score_references: feste Log-Wahrscheinlichkeit pro Referenz-Wort"""
+
+    def __init__(self, logprob_per_word):
+        self.logprob_per_word = logprob_per_word
+        self.calls = []
+        self.last_stats = {}
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        raise AssertionError("Im Referenz-Modus wird nicht generiert")
+
+    def generate_batch(self, prompts, max_new_tokens, decoding):
+        raise AssertionError("Im Referenz-Modus wird nicht generiert")
+
+    def score_references(self, prompts, references):
+        self.calls.append(len(references))
+        return [
+            {"logprob": self.logprob_per_word * len(ref.split()), "tokens": len(ref.split())}
+            for ref in references
+        ]
+
+
+class TestReferenceHelpers:
+    """Tests für Aggregation und Fortsetzung"""
+
+    def test_metrics(self):
+        """Test NLL pro Token über mehrere Referenzen und Korpus-Perplexität"""
+        scores = [{"logprob": -6.0, "tokens": 3}, {"logprob": -2.0, "tokens": 1}]
+        metrics = reference_metrics(scores)
+        assert metrics["REF_NLL"] == pytest.approx(2.0)
+        assert metrics["REF_PPL"] == pytest.approx(math.exp(2.0))
+        assert reference_metrics([]) == {}
+
+        summary = corpus_summary({"m": [{"ref_scores": scores}, {"ref_scores": [{"logprob": -4.0, "tokens": 4}]},
+                                        {"hyp": "", "failed": True}]})
+        assert summary["m"]["tokens"] == 8 and summary["m"]["n_references"] == 3
+        assert summary["m"]["nll"] == pytest.approx(1.5)
+        assert corpus_summary({"m": [{"hyp": "x"}]}) == {}
+
+    def test_teacher_forcing_matches_full_softmax(self):
+        """Test Log-Likelihood nur über Referenz-Positionen gleicht dem vollen log_softmax"""
+        torch = pytest.importorskip("torch")
+        from types import SimpleNamespace
+        from src.reference import teacher_forced_logprobs
+
+        torch.manual_seed(0)
+        table = torch.randn(50, 50)
+
+        def model(input_ids, attention_mask):
+            return SimpleNamespace(logits=table[input_ids])
+
+        pairs = [([1, 2, 3, 4], [5, 6]), ([7], [8, 9, 10]), ([11, 12], [13])]
+        scores = teacher_forced_logprobs(model, pairs, 0, 16, torch.device("cpu"))
+        for (prompt_ids, ref_ids), score in zip(pairs, scores):
+            seq = prompt_ids + ref_ids
+            logprobs = torch.log_softmax(table[torch.tensor(seq[:-1])], dim=-1)
+            expected = sum(float(logprobs[t - 1, seq[t]]) for t in range(len(prompt_ids), len(seq)))
+            assert score["tokens"] == len(ref_ids)
+            assert score["logprob"] == pytest.approx(expected, rel=1e-5)
+
+    def test_continuation(self):
+        """Test Leerzeichen zwischen Prompt und Referenz"""
+        assert reference_continuation("Vereinfachter Text:", "Kurz.") == " Kurz."
+        assert reference_continuation("Vereinfachter Text:\n", "Kurz.") == "Kurz."
+
+
+class TestPipelineReference:
+    """Tests für den Referenz-Modus der Pipeline"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(6):
+                refs = ["Der Rat hat beraten."] + (["Der Rat hat lange beraten."] if i % 2 else [])
+                f.write(json.dumps({"id": f"ex_{i}", "source": f"Der Rat hat Punkt {i} lange beraten.",
+                                    "refs": refs}, ensure_ascii=False) + "\n")
+        self.task = {"task_name": "simplify_de", "data": {"test_file": data_path},
+                     "prompt": {"template": "Text: {source}\n\nVereinfachter Text:"}}
+        self.cfg = {"seed": 42, "max_new_tokens": 32, "batch_size": 4, "mode": "reference",
+                    "output_dir": os.path.join(self.temp_dir, "out"),
+                    "cache_dir": os.path.join(self.temp_dir, "cache"),
+                    "decoding": {"name": "greedy", "do_sample": False}}
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def run(self, adapters):
+        pipe = EvaluationPipeline(self.task, self.cfg, [{"model_id": m} for m in adapters],
+                                  adapters=adapters, results_format="json")
+        pipe.load_data()
+        pipe.generate()
+        return pipe
+
+    def test_scores_stats_and_report(self):
+        """Test gebatchtes Scoring, NLL-Metriken, Vergleich und Report-Abschnitt"""
+        adapters = {"a": ScoringAdapter(-2.0), "b": ScoringAdapter(-1.0)}
+        pipe = self.run(adapters)
+        # Batches zu 4 Beispielen, alle Referenzen eines Batches in einem Aufruf
+        assert adapters["a"].calls == [6, 3]
+        record = pipe.results["b"][1]
+        assert record["hyp"] == "" and len(record["ref_scores"]) == 2
+        assert record["metrics"]["REF_NLL"] == pytest.approx(1.0)
+
+        pipe.score()
+        assert pipe.store.metric_names == ["REF_NLL", "REF_PPL"]
+        pipe.compare()
+        assert pipe.comparison_results["REF_NLL"]["model_a_mean"] == pytest.approx(2.0)
+        assert pipe.summary["lower_is_better"] == ["REF_NLL", "REF_PPL"]
+        paths = pipe.report(plots=False)
+        with open(paths["report"], encoding="utf-8") as f:
+            report = f.read()
+        assert "## Referenz-Likelihood (Teacher-Forcing)" in report
+        assert "| b | 6 | 9 | 39 | 1.0000 | 2.7183 |" in report
+
+    def test_cached_and_separate_from_generation(self):
+        """Test Cache-Treffer im zweiten Lauf und eigenes Journal-Format"""
+        self.run({"a": ScoringAdapter(-2.0), "b": ScoringAdapter(-1.0)})
+        adapters = {"a": ScoringAdapter(-5.0), "b": ScoringAdapter(-5.0)}
+        pipe = self.run(adapters)
+        assert adapters["a"].calls == []
+        assert pipe.results["a"][0]["metrics"]["REF_NLL"] == pytest.approx(2.0)
+        assert pipe.journal_header()["mode"] == "reference"
+        del self.cfg["mode"]
+        assert "mode" not in pipe.journal_header()
+
+    def test_tiny_backend(self):
+        """Test Teacher-Forcing mit echtem Forward-Pass: Batch und Einzelaufrufe stimmen überein"""
+        pytest.importorskip("torch")
+        pytest.importorskip("transformers")
+        from src.backends import create_adapter
+
+        adapter = create_adapter({"model_id": "tiny", "backend": "tiny"})
+        prompts = ["Text: Ein Satz.\n\nVereinfachter Text:", "Kurz:"]
+        refs = ["Ein Satz.", "Ein deutlich längerer Satz mit mehr Wörtern."]
+        batched = adapter.score_references(prompts, refs)
+        single = [adapter.score_references([p], [r])[0] for p, r in zip(prompts, refs)]
+        # Byte-Tokenizer: Leerzeichen plus Bytes der Referenz
+        assert [s["tokens"] for s in batched] == [len(r.encode()) + 1 for r in refs]
+        for b, s in zip(batched, single):
+            assert b["logprob"] < 0
+            assert b["logprob"] == pytest.approx(s["logprob"], rel=1e-4)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,73 @@
+import pytest
+import numpy as np
+from src.result_store import ResultStore
+from src.comparison import compute_metrics, compare_models, default_registry, score_row
+from src.stats import paired_tests
+
+
+class TestResultStore:
+    """Tests für den Array-basierten Ergebnisspeicher"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.store = ResultStore(["a", "b"], ["ex_1", "ex_2", "ex_3"], ["SARI", "LIX"])
+
+    def test_shape_and_defaults(self):
+        """Test Form und NaN-Vorbelegung"""
+        assert self.store.shape == (2, 3, 2)
+        assert np.isnan(self.store.values).all()
+
+    def test_column_is_view(self):
+        """Test dass Spalten Views ohne Kopie sind"""
+        self.store.set_scores("a", 1, {"SARI": 0.7, "UNBEKANNT": 1.0})
+        col = self.store.column("a", "SARI")
+        assert np.shares_memory(col, self.store.values)
+        assert np.shares_memory(np.asarray(col), self.store.values)
+        assert col[1] == 0.7
+
+    def test_scores_and_lists(self):
+        """Test Rückgabe als Dict/Listen mit None für fehlende Werte"""
+        self.store.set_scores("b", 0, {"SARI": 0.5, "LIX": None})
+        assert self.store.scores("b", 0) == {"SARI": 0.5, "LIX": None}
+        assert self.store.to_lists()["b"]["SARI"] == [0.5, None, None]
+        assert self.store.statlog()["b"][0] == {"id": "ex_1", "SARI": 0.5, "LIX": None}
+
+    def test_paired_tests_on_views(self):
+        """Test dass Statistikfunktionen direkt mit Views arbeiten"""
+        for pos, (x, y) in enumerate([(1.0, 2.0), (2.0, 3.5), (3.0, 3.9)]):
+            self.store.set_scores("a", pos, {"SARI": x})
+            self.store.set_scores("b", pos, {"SARI": y})
+        result = paired_tests(self.store.column("a", "SARI"), self.store.column("b", "SARI"))
+        assert result["n"] == 3
+
+
+class TestComputeMetrics:
+    """Tests für Metrikberechnung und Vergleich auf dem Store"""
+
+    def test_compute_and_compare(self):
+        """Test Ende-zu-Ende von Rohergebnissen zum Vergleich"""
+        sources = [
+            "Die Bundesregierung hat ein umfassendes Maßnahmenpaket beschlossen.",
+            "Die Implementierung nachhaltiger Technologien erfordert Betrachtung.",
+            "Wissenschaftler untersuchen komplexe Zusammenhänge im Klimasystem.",
+            "Der Gesetzgeber verabschiedete weitreichende Regelungen zur Digitalisierung.",
+        ]
+        results = {
+            "a": [{"id": str(i), "source": s, "hyp": s, "refs": ["Kurz."]} for i, s in enumerate(sources)],
+            "b": [{"id": str(i), "source": s, "hyp": "Das ist kurz. Gut.", "refs": ["Kurz."]}
+                  for i, s in enumerate(sources)],
+        }
+        # Vorberechnete Metriken (z.B. aus dem Journal) werden übernommen
+        results["a"][0]["metrics"] = {**score_row(default_registry(), results["a"][0]), "SARI": 0.123}
+
+        store = compute_metrics(results, default_registry())
+        assert store.column("a", "SARI")[0] == 0.123
+        assert store.shape[:2] == (2, 4)
+
+        comparison, summary_stats = compare_models(store, "a", "b")
+        assert comparison["FLESCH_DE"]["model_b_mean"] > comparison["FLESCH_DE"]["model_a_mean"]
+        assert comparison["word_count"]["n_samples"] == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,76 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+
+pytest.importorskip("pyarrow")
+
+import pyarrow.parquet as pq
+from src.results_io import (
+    ColumnarResultsWriter,
+    write_columnar_results,
+    read_results,
+    resolve_results_format,
+    MANIFEST_FILE,
+)
+from src.result_store import ResultStore
+
+
+def _row(i, failed=False):
+    return {"id": f"ex_{i:03d}", "source": f"Quelle {i}.", "hyp": "" if failed else f"Hyp {i}.",
+            "refs": ["Ref."], "failed": failed}
+
+
+class TestColumnarResults:
+    """Tests für die spaltenbasierte Ergebnisausgabe"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_row_groups(self):
+        """Test dass Zeilen in Row Groups geschrieben werden"""
+        path = os.path.join(self.temp_dir, "results.parquet")
+        with ColumnarResultsWriter(path, ["SARI"], row_group_size=4) as writer:
+            for i in range(10):
+                writer.add("model_a", i, _row(i), {"SARI": i / 10})
+
+        meta = pq.ParquetFile(path).metadata
+        assert meta.num_rows == 10
+        assert meta.num_row_groups == 3
+
+    def test_write_and_read_columns(self):
+        """Test Schreiben mit Manifest und spaltenweises Lesen"""
+        results = {"a": [_row(0), _row(1, failed=True)], "b": [_row(0), _row(1)]}
+        store = ResultStore(["a", "b"], ["ex_000", "ex_001"], ["SARI", "word_count"])
+        for mid in results:
+            for pos in range(2):
+                store.set_scores(mid, pos, {"SARI": 0.5, "word_count": 3})
+        summary = {"task": "simplify_de", "n_examples": 2}
+        results_path, manifest_path = write_columnar_results(
+            self.temp_dir, results, store, summary, {}, [], {}
+        )
+
+        table = read_results(results_path, columns=["model_id", "SARI", "failed"])
+        assert table.num_rows == 4
+        assert table.column_names == ["model_id", "SARI", "failed"]
+        assert table.column("failed").to_pylist() == [False, True, False, False]
+
+        with open(os.path.join(self.temp_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        assert manifest["summary"] == summary
+        assert manifest["metric_columns"] == ["SARI", "word_count"]
+
+    def test_resolve_format(self):
+        """Test Formatauswahl"""
+        assert resolve_results_format("auto") == "parquet"
+        assert resolve_results_format("json") == "json"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
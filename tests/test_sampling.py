@@ -0,0 +1,156 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+from src.caching import make_key
+from src.comparison import METRIC_DIRECTIONS
+from src.pipeline import EvaluationPipeline
+from src.sampling import markdown_section, num_samples, sample_decoding, sampling_summary
+
+
+class SampleAdapter:
+    """Adapter mit generate_samples; Stichproben werden fortlaufend nummeriert"""
+
+    def __init__(self):
+        self.calls = []
+        self.counter = 0
+        self.last_stats = {}
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        return self.generate_samples(prompt, max_new_tokens, decoding, 1)[0]
+
+    def generate_samples(self, prompt, max_new_tokens, decoding, n):
+        self.calls.append(n)
+        texts = []
+        for _ in range(n):
+            self.counter += 1
+            texts.append(" ".join(["Ein Satz"] * (self.counter % 3 + 1)) + ".")
+        self.last_stats = {"items": [{"completion_tokens": 2}] * n}
+        return texts
+
+
+class PlainAdapter:
+    """Adapter ohne generate_samples"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        self.calls += 1
+        return f"Satz {self.calls}."
+
+
+class TestSamplingHelpers:
+    """Tests für Cache-Keys und Aggregate der Stichproben"""
+
+    def test_sample_keys(self):
+        """Test dass Stichprobe 0 den Key eines Laufs ohne num_samples hat"""
+        decoding = {"name": "sampling", "do_sample": True, "num_samples": 4, "seed": 42}
+        plain = {"name": "sampling", "do_sample": True, "seed": 42}
+        assert num_samples(decoding) == 4 and num_samples(plain) == 1
+        assert make_key("m", sample_decoding(decoding, 0), "p", "1") == make_key("m", plain, "p", "1")
+        keys = {make_key("m", sample_decoding(decoding, k), "p", "1") for k in range(4)}
+        assert len(keys) == 4
+
+    def test_summary(self):
+        """Test Mittel, Best-of-K und Streuung"""
+        results = {"m": [
+            {"id": "a", "sample_metrics": [{"SARI": 10.0}, {"SARI": 20.0}]},
+            {"id": "b", "sample_metrics": [{"SARI": 30.0}, {"SARI": 50.0}]},
+            {"id": "c", "hyp": "", "failed": True},
+        ]}
+        summary = sampling_summary(results, ["SARI"])
+        sari = summary["m"]["metrics"]["SARI"]
+        assert summary["m"]["k"] == 2 and summary["m"]["n_examples"] == 2
+        assert sari["mean"] == 27.5
+        assert sari["best_of_k"] == 35.0
+        assert sari["within_std"] == pytest.approx((7.0711 + 14.1421) / 2, abs=1e-3)
+        # Läufe: (10+30)/2 = 20 und (20+50)/2 = 35
+        assert sari["run_std"] == pytest.approx(10.6066, abs=1e-3)
+        assert "| SARI | 27.5000 | 35.0000 |" in "\n".join(markdown_section(summary))
+        assert sampling_summary({"m": [{"id": "a", "hyp": "x"}]}, ["SARI"]) == {}
+
+    def test_best_of_k_lower_is_better(self):
+        """Test Best-of-K nimmt bei LIX (niedriger ist besser) das Minimum pro Beispiel"""
+        results = {"m": [
+            {"id": "a", "sample_metrics": [{"SARI": 10.0, "LIX": 40.0}, {"SARI": 20.0, "LIX": 30.0}]},
+            {"id": "b", "sample_metrics": [{"SARI": 30.0, "LIX": 60.0}, {"SARI": 50.0, "LIX": 50.0}]},
+        ]}
+        summary = sampling_summary(results, ["SARI", "LIX"], METRIC_DIRECTIONS)
+        assert summary["m"]["metrics"]["LIX"]["best_of_k"] == 40.0
+        assert summary["m"]["metrics"]["SARI"]["best_of_k"] == 35.0
+        text = "\n".join(markdown_section(summary))
+        assert "| LIX ↓ | 45.0000 | 40.0000 |" in text
+        # Ohne Richtungen gilt weiter das Maximum
+        assert sampling_summary(results, ["LIX"])["m"]["metrics"]["LIX"]["best_of_k"] == 50.0
+
+
+class TestPipelineSampling:
+    """Tests für num_samples in der Pipeline"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(4):
+                f.write(json.dumps({"id": f"ex_{i}", "source": f"Ein langer Satz Nummer {i}.",
+                                    "refs": ["Ein Satz."]}, ensure_ascii=False) + "\n")
+        self.task = {"task_name": "simplify_de", "data": {"test_file": data_path},
+                     "prompt": {"template": "Text: {source}\n\nVereinfachter Text:"}}
+        self.cfg = {"seed": 42, "max_new_tokens": 32, "batch_size": 4,
+                    "output_dir": os.path.join(self.temp_dir, "out"),
+                    "cache_dir": os.path.join(self.temp_dir, "cache"),
+                    "decoding": {"name": "sampling", "do_sample": True, "temperature": 0.7,
+                                 "num_samples": 3}}
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def run(self, adapters):
+        pipe = EvaluationPipeline(self.task, self.cfg, [{"model_id": m} for m in adapters],
+                                  adapters=adapters, results_format="json")
+        pipe.load_data()
+        pipe.generate()
+        return pipe
+
+    def test_samples_scored_and_reported(self):
+        """Test eine Anfrage pro Beispiel, Metriken pro Stichprobe und Report-Abschnitt"""
+        adapters = {"a": SampleAdapter(), "b": SampleAdapter()}
+        pipe = self.run(adapters)
+        assert adapters["a"].calls == [3, 3, 3, 3]
+        record = pipe.results["a"][0]
+        assert len(record["samples"]) == 3 and record["hyp"] == record["samples"][0]
+        assert len(record["sample_metrics"]) == 3
+        words = [m["word_count"] for m in record["sample_metrics"]]
+        assert record["metrics"]["word_count"] == pytest.approx(sum(words) / 3)
+
+        pipe.score()
+        pipe.compare()
+        assert pipe.summary["num_samples"] == 3
+        paths = pipe.report(plots=False)
+        with open(paths["report"], encoding="utf-8") as f:
+            report = f.read()
+        assert "## Stichproben (num_samples)" in report and "### a (K = 3, 4 Beispiele)" in report
+
+    def test_cached_samples_reused(self):
+        """Test dass vorhandene Stichproben aus dem Cache kommen und nur neue generiert werden"""
+        first = self.run({"a": SampleAdapter(), "b": SampleAdapter()})
+        adapters = {"a": SampleAdapter(), "b": SampleAdapter()}
+        self.cfg["decoding"]["num_samples"] = 4
+        second = self.run(adapters)
+        assert adapters["a"].calls == [1, 1, 1, 1]
+        assert second.results["a"][0]["samples"][:3] == first.results["a"][0]["samples"]
+
+    def test_fallback_without_generate_samples(self):
+        """Test einzelne Generationen bei Adaptern ohne generate_samples"""
+        adapters = {"a": PlainAdapter(), "b": PlainAdapter()}
+        pipe = self.run(adapters)
+        assert adapters["a"].calls == 12
+        assert pipe.results["a"][1]["samples"] == ["Satz 4.", "Satz 5.", "Satz 6."]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,155 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+from src.sharding import (
+    parse_shard,
+    shard_of,
+    select_shard,
+    write_shard,
+    load_shards,
+    ShardMergeError,
+)
+from src.reference import reference_metrics
+
+
+def _examples(n):
+    return [
+        {"id": f"ex_{i:03d}", "source": f"Das ist ein langer Satz Nummer {i}.", "refs": ["Kurz."]}
+        for i in range(n)
+    ]
+
+
+class TestShardAssignment:
+    """Tests für die Shard-Zuordnung"""
+
+    def test_parse_shard(self):
+        """Test Parsen der Shard-Angabe"""
+        assert parse_shard("0/4") == (0, 4)
+        assert parse_shard("3/4") == (3, 4)
+        for spec in ["4/4", "-1/4", "1/0", "abc", "1"]:
+            with pytest.raises(ValueError):
+                parse_shard(spec)
+
+    def test_shard_of_stable(self):
+        """Test dass die Zuordnung deterministisch ist"""
+        assert shard_of("ex_001", 16) == shard_of("ex_001", 16)
+        assert 0 <= shard_of("ex_001", 16) < 16
+
+    def test_select_shard_partitions(self):
+        """Test dass alle Shards zusammen den Datensatz genau einmal abdecken"""
+        examples = _examples(100)
+        positions = []
+        for i in range(7):
+            positions.extend(pos for pos, _ in select_shard(examples, i, 7))
+        assert sorted(positions) == list(range(100))
+
+
+class TestShardMerge:
+    """Tests für das Schreiben und Zusammenführen von Shards"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.examples = _examples(30)
+        self.models = ["model_a", "model_b"]
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def _write_all(self, num_shards, skip=None, mode=None):
+        for i in range(num_shards):
+            if i == skip:
+                continue
+            selected = select_shard(self.examples, i, num_shards)
+            rows = [
+                {"model_id": mid, "index": pos, "id": ex["id"], "source": ex["source"],
+                 "hyp": f"Kurz {mid}.", "refs": ex["refs"]}
+                for mid in self.models
+                for pos, ex in selected
+            ]
+            manifest = {"task": "simplify_de", "models": self.models, "shard": i,
+                        "num_shards": num_shards, "total_examples": len(self.examples),
+                        "n_examples": len(selected)}
+            if mode == "reference":
+                for row in rows:
+                    logprob = -2.0 * (1 + self.models.index(row["model_id"]))
+                    row.update(hyp="", ref_scores=[{"logprob": logprob, "tokens": 2}],
+                               metrics=reference_metrics([{"logprob": logprob, "tokens": 2}]))
+            if mode is not None:
+                manifest.update(mode=mode, num_samples=1)
+            write_shard(self.temp_dir, manifest, rows)
+
+    def test_roundtrip(self):
+        """Test dass zusammengeführte Shards die Originalreihenfolge ergeben"""
+        self._write_all(4)
+        manifest, results = load_shards(self.temp_dir)
+        assert manifest["num_shards"] == 4
+        for mid in self.models:
+            assert [r["id"] for r in results[mid]] == [ex["id"] for ex in self.examples]
+
+    def test_missing_shard(self):
+        """Test dass fehlende Shards erkannt werden"""
+        self._write_all(4, skip=2)
+        with pytest.raises(ShardMergeError):
+            load_shards(self.temp_dir)
+
+    def test_duplicate_rows(self):
+        """Test dass doppelte Ergebnisse erkannt werden"""
+        self._write_all(2)
+        path = os.path.join(self.temp_dir, "shard-00000-of-00002.jsonl")
+        with open(path, "r", encoding="utf-8") as f:
+            first = f.readline()
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(first)
+        with pytest.raises(ShardMergeError):
+            load_shards(self.temp_dir)
+
+    def test_merge_entrypoint(self):
+        """Test dass merge_shards Report und JSON auf den Gesamtdaten erzeugt"""
+        from merge_shards import main
+
+        self._write_all(3)
+        out_dir = os.path.join(self.temp_dir, "merged")
+        assert main([self.temp_dir, "--output", out_dir, "--no-plots", "--quiet",
+                     "--results-format", "json"]) == 0
+
+        with open(os.path.join(out_dir, "detailed_results.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        assert data["summary"]["n_examples"] == 30
+        assert os.path.exists(os.path.join(out_dir, "report.md"))
+
+    def test_merge_reference_mode(self):
+        """Test dass Shards aus mode: reference mit REF_NLL/REF_PPL zusammengeführt werden"""
+        from merge_shards import main
+
+        self._write_all(3, mode="reference")
+        out_dir = os.path.join(self.temp_dir, "merged")
+        assert main([self.temp_dir, "--output", out_dir, "--no-plots", "--quiet",
+                     "--results-format", "json"]) == 0
+
+        with open(os.path.join(out_dir, "detailed_results.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        assert set(data["detailed_comparisons"]) == {"REF_NLL", "REF_PPL"}
+        # Niedrigere Perplexität ist besser: Modell B (höhere NLL) hat sich verschlechtert
+        assert "REF_NLL" in data["summary"]["significant_degradations"]
+        with open(os.path.join(out_dir, "report.md"), encoding="utf-8") as f:
+            assert "Referenz-Likelihood" in f.read()
+
+    def test_mixed_modes_rejected(self):
+        """Test dass Shards aus verschiedenen Modi nicht zusammengeführt werden"""
+        self._write_all(2, mode="reference")
+        path = os.path.join(self.temp_dir, "shard-00001-of-00002.json")
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        manifest["mode"] = "generate"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        with pytest.raises(ShardMergeError, match="mode"):
+            load_shards(self.temp_dir)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
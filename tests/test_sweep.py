@@ -0,0 +1,196 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+from src.sweep import DecodingSweep, SWEEP_JSON, expand_profiles, parse_grid, profile_cfg
+
+
+class LengthAdapter:
+    """Test-Adapter: Länge der Ausgabe hängt von der Temperatur ab"""
+
+    def __init__(self, base_words):
+        self.base_words = base_words
+        self.calls = 0
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        self.calls += 1
+        n = self.base_words + int(decoding.get("temperature", 0) * 10)
+        words = prompt.split(": ")[-1].split()
+        return " ".join(words[:n]) + "."
+
+
+class ProfileAdapter(LengthAdapter):
+    """Test-Adapter mit generate_profiles (alle Profile eines Prompts in einem Aufruf)"""
+
+    def __init__(self, base_words):
+        super().__init__(base_words)
+        self.profile_calls = []
+        self.last_stats = {}
+
+    def generate_profiles(self, prompt, runs):
+        self.profile_calls.append(len(runs))
+        texts = [LengthAdapter.generate(self, prompt, n, decoding) for n, decoding in runs]
+        self.calls -= len(runs)
+        self.last_stats = {"items": [{"completion_tokens": 3}] * len(runs)}
+        return texts
+
+
+class TestProfiles:
+    """Tests für Profil-Definitionen"""
+
+    def test_grid_and_names(self):
+        """Test kartesisches Produkt, abgeleitete Namen und Duplikate"""
+        profiles = expand_profiles({
+            "profiles": [{"name": "greedy", "do_sample": False}],
+            "grid": {"temperature": [0.3, 0.7], "top_p": [0.9, 1.0]},
+        })
+        assert [p["name"] for p in profiles] == [
+            "greedy", "t0.3_p0.9", "t0.3_p1.0", "t0.7_p0.9", "t0.7_p1.0"
+        ]
+        assert profiles[1] == {"name": "t0.3_p0.9", "temperature": 0.3, "top_p": 0.9}
+        with pytest.raises(ValueError):
+            expand_profiles({"profiles": [{"temperature": 0.3}], "grid": {"temperature": [0.3]}})
+        with pytest.raises(ValueError):
+            expand_profiles({})
+
+    def test_parse_grid(self):
+        """Test Grid-Angaben der Kommandozeile mit YAML-Typen"""
+        grid = parse_grid(["temperature=0.3,0.7", "max_new_tokens=80,160", "do_sample=true"])
+        assert grid == {"temperature": [0.3, 0.7], "max_new_tokens": [80, 160], "do_sample": [True]}
+        with pytest.raises(ValueError):
+            parse_grid(["temperature"])
+
+    def test_profile_cfg(self):
+        """Test Überschreibungen, Sampling und max_new_tokens im Cache-Key"""
+        cfg = {"output_dir": "out", "max_new_tokens": 160,
+               "decoding": {"name": "greedy", "do_sample": False, "temperature": 0.0}}
+        out = profile_cfg(cfg, {"name": "t0.7_n80", "temperature": 0.7, "max_new_tokens": 80})
+        assert out["decoding"] == {"name": "greedy", "do_sample": True, "temperature": 0.7,
+                                   "max_new_tokens": 80}
+        assert out["max_new_tokens"] == 80
+        assert out["output_dir"] == os.path.join("out", "t0.7_n80")
+        assert cfg["decoding"]["temperature"] == 0.0
+        greedy = profile_cfg(cfg, {"name": "greedy", "do_sample": False, "temperature": 0.7})
+        assert greedy["decoding"]["do_sample"] is False
+
+
+class TestDecodingSweep:
+    """Tests für Sweeps mit geteilten Modellen und Cache"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(3):
+                f.write(json.dumps({
+                    "id": f"ex_{i}",
+                    "source": f"Die Stadtverwaltung informiert heute über die geplante Erweiterung {i} "
+                              "des Radwegenetzes im gesamten Zentrum der Stadt.",
+                    "refs": ["Die Stadt baut mehr Radwege."],
+                }, ensure_ascii=False) + "\n")
+        self.task = {"task_name": "simplify_de", "data": {"test_file": data_path},
+                     "prompt": {"template": "Text: {source}"}}
+        self.cfg = {
+            "seed": 42,
+            "max_new_tokens": 32,
+            "output_dir": os.path.join(self.temp_dir, "out"),
+            "cache_dir": os.path.join(self.temp_dir, "cache"),
+            "decoding": {"name": "greedy", "do_sample": False},
+            "decoding_sweep": {"grid": {"temperature": [0.0, 0.3, 0.6]}},
+        }
+        self.loaded = []
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def _run(self, adapter_cls, model_ids=("lang", "kurz")):
+        def factory(model_cfg):
+            self.loaded.append(model_cfg["model_id"])
+            return adapter_cls(model_cfg["n_words"])
+
+        model_cfgs = [{"model_id": m, "n_words": n} for m, n in zip(model_ids, (8, 3))]
+        sweep = DecodingSweep(self.task, dict(self.cfg), model_cfgs,
+                              adapter_factory=factory, results_format="json")
+        return sweep, sweep.run(plots=False)
+
+    def test_models_loaded_once_and_reports_per_profile(self):
+        """Test einmal geladene Modelle, Reports pro Profil und Sweep-Zusammenfassung"""
+        sweep, paths = self._run(LengthAdapter)
+        assert self.loaded == ["lang", "kurz"]
+        assert sweep.profile_names == ["t0.0", "t0.3", "t0.6"]
+        for name in sweep.profile_names:
+            assert os.path.exists(os.path.join(self.cfg["output_dir"], name, "report.md"))
+        # Beispiele werden nur einmal geladen und geteilt
+        assert all(p.examples is sweep.pipelines[0].examples for p in sweep.pipelines)
+
+        with open(os.path.join(self.cfg["output_dir"], SWEEP_JSON), encoding="utf-8") as f:
+            summary = json.load(f)
+        profiles = summary["results"]["kurz"]["profiles"]
+        assert set(profiles) == {"t0.0", "t0.3", "t0.6"}
+        assert profiles["t0.0"]["n_examples"] == 3
+        # Bestes Profil: niedrigster LIX, höchster SARI
+        lix = {name: entry["metrics"]["LIX"] for name, entry in profiles.items()}
+        sari = {name: entry["metrics"]["SARI"] for name, entry in profiles.items()}
+        best = summary["results"]["kurz"]["best"]
+        assert summary["directions"]["LIX"] == "min"
+        assert best["LIX"]["profile"] == min(lix, key=lix.get)
+        assert best["SARI"]["profile"] == max(sari, key=sari.get)
+        with open(paths["sweep"]["markdown"], encoding="utf-8") as f:
+            md = f.read()
+        assert "| Profil | Parameter | n | SARI ↑ | FLESCH_DE ↑ | LIX ↓ | WSTF ↓ |" in md
+        assert f"- LIX ↓: `{best['LIX']['profile']}`" in md
+
+    def test_shared_prefill_fills_cache(self):
+        """Test dass generate_profiles alle Profile eines Beispiels in einem Aufruf erzeugt"""
+        adapters = {}
+
+        def factory(model_cfg):
+            adapters[model_cfg["model_id"]] = ProfileAdapter(model_cfg["n_words"])
+            return adapters[model_cfg["model_id"]]
+
+        sweep = DecodingSweep(self.task, dict(self.cfg), [{"model_id": "solo", "n_words": 4}],
+                              adapter_factory=factory, results_format="json")
+        paths = sweep.run(plots=False)
+        assert adapters["solo"].profile_calls == [3, 3, 3]
+        # Die Pipelines der Profile übernehmen alles aus dem Cache
+        assert adapters["solo"].calls == 0
+        hyps = [p.results["solo"][0]["hyp"] for p in sweep.pipelines]
+        assert len(hyps[0].split()) < len(hyps[1].split()) < len(hyps[2].split())
+        # Ein Modell: keine Vergleichsreports, aber die Sweep-Zusammenfassung
+        assert set(paths) == {"sweep"}
+
+        # Zweiter Lauf mit zusätzlichem Profil: nur das neue Profil wird erzeugt
+        self.cfg["decoding_sweep"] = {"grid": {"temperature": [0.0, 0.3, 0.6, 0.9]}}
+        sweep = DecodingSweep(self.task, dict(self.cfg), [{"model_id": "solo", "n_words": 4}],
+                              adapter_factory=factory, results_format="json")
+        sweep.run(plots=False)
+        assert adapters["solo"].profile_calls == [1, 1, 1]
+
+
+class TestModelAdapterProfiles:
+    """Tests für den geteilten Prefill des hf-Backends (nur mit torch/transformers)"""
+
+    def test_greedy_profiles_match_generate(self, tiny_hf_model):
+        """Test Generierung aus dem kopierten Prefix-KV-Cache gleicht generate Token für Token"""
+        from src.models import ModelAdapter
+
+        adapter = ModelAdapter(tiny_hf_model)
+        prompt = "Text: Der Rat hat den neuen Plan beschlossen.\n\nVereinfachter Text:"
+        greedy = {"do_sample": False}
+        runs = [(10, greedy), (4, greedy), (10, {"do_sample": True, "temperature": 0.7}), (10, greedy)]
+        texts = adapter.generate_profiles(prompt, runs)
+        items = adapter.last_stats["items"]
+
+        for i, max_new_tokens in ((0, 10), (1, 4)):
+            assert texts[i] == adapter.generate(prompt, max_new_tokens, greedy)
+            assert items[i]["completion_tokens"] == adapter.last_stats["completion_tokens"]
+            assert items[i]["prompt_tokens"] == adapter.last_stats["prompt_tokens"]
+        # Der Prefix wird pro Profil kopiert: spätere Profile sehen keinen veränderten Cache
+        assert texts[3] == texts[0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,134 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+import time
+from src.pipeline import EvaluationPipeline
+from src.telemetry import NULL_TELEMETRY, Telemetry
+
+
+def parse_samples(text):
+    """Hilfsfunktion: Samples der Textdatei als {name{labels}: wert}"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            key, value = line.rsplit(" ", 1)
+            samples[key] = float(value)
+    return samples
+
+
+class FailingAdapter:
+    """Adapter, der bei jedem zweiten Aufruf fehlschlägt"""
+
+    def __init__(self):
+        self.calls = 0
+        self.last_stats = {}
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        self.calls += 1
+        if self.calls % 2 == 0:
+            raise RuntimeError("kaputt")
+        self.last_stats = {"completion_tokens": 4}
+        return "Ein kurzer Satz."
+
+
+class TestTelemetry:
+    """Tests für die Telemetrie-Datei"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "textfile", "eval.prom")
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_render_format(self):
+        """Test Zähler, Histogramme und Gauges im Textformat"""
+        t = Telemetry(self.path)
+        t.record_example("m/a", "simplify_de")
+        t.record_example("m/a", "simplify_de", failed=True)
+        t.record_cache("m/a", hit=True, task="simplify_de")
+        t.record_generation("m/a", 0.2, completion_tokens=10, task="simplify_de")
+        t.record_generation("m/a", 3.0, completion_tokens=30, task="simplify_de")
+
+        text = t.render()
+        assert text.endswith("# EOF\n")
+        assert "# TYPE eval_examples_processed_total counter" in text
+        assert "# TYPE eval_generation_latency_seconds histogram" in text
+        samples = parse_samples(text)
+        labels = '{model="m/a",task="simplify_de"}'
+        assert samples[f"eval_examples_processed_total{labels}"] == 2
+        assert samples[f"eval_generation_failures_total{labels}"] == 1
+        assert samples[f"eval_cache_hits_total{labels}"] == 1
+        assert samples['eval_generation_latency_seconds_bucket{model="m/a",task="simplify_de",le="0.25"}'] == 1
+        assert samples['eval_generation_latency_seconds_bucket{model="m/a",task="simplify_de",le="+Inf"}'] == 2
+        assert samples[f"eval_generation_latency_seconds_count{labels}"] == 2
+        assert samples[f"eval_generation_latency_seconds_sum{labels}"] == pytest.approx(3.2)
+        assert samples[f"eval_generation_tokens_per_second_count{labels}"] == 2
+        assert samples["eval_process_resident_memory_bytes"] > 0
+
+    def test_label_escaping(self):
+        """Test Escaping von Anführungszeichen in Labels"""
+        t = Telemetry()
+        t.record_example('mod"el')
+        assert 'eval_examples_processed_total{model="mod\\"el"} 1' in t.render()
+
+    def test_periodic_atomic_write(self):
+        """Test periodisches Schreiben ohne temporäre Reste"""
+        with Telemetry(self.path, interval=0.05) as t:
+            assert os.path.exists(self.path)
+            t.record_example("m")
+            time.sleep(0.2)
+            with open(self.path, encoding="utf-8") as f:
+                assert 'eval_examples_processed_total{model="m"} 1' in f.read()
+            t.record_example("m")
+        with open(self.path, encoding="utf-8") as f:
+            assert 'eval_examples_processed_total{model="m"} 2' in f.read()
+        assert os.listdir(os.path.dirname(self.path)) == ["eval.prom"]
+
+    def test_disabled(self):
+        """Test dass die deaktivierte Instanz nichts sammelt oder schreibt"""
+        NULL_TELEMETRY.record_example("m")
+        assert NULL_TELEMETRY.counters == {}
+        assert NULL_TELEMETRY.write() is None
+
+    def test_pipeline_counts(self):
+        """Test Zählung über einen Pipeline-Lauf mit Fehlschlägen und Cache-Treffern"""
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(4):
+                f.write(json.dumps({"id": f"ex_{i}", "source": f"Ein langer Satz {i}.",
+                                    "refs": ["Ein Satz."]}, ensure_ascii=False) + "\n")
+        task = {"task_name": "simplify_de", "data": {"test_file": data_path},
+                "prompt": {"template": "Text: {source}\n\nVereinfachter Text:"}}
+        cfg = {"seed": 42, "max_new_tokens": 32, "output_dir": os.path.join(self.temp_dir, "out"),
+               "cache_dir": os.path.join(self.temp_dir, "cache"),
+               "decoding": {"name": "greedy", "do_sample": False}}
+        model_cfgs = [{"model_id": "flaky"}, {"model_id": "echo", "backend": "rule", "rule": {"mode": "echo"}}]
+
+        t = Telemetry(self.path)
+        for _ in range(2):
+            pipe = EvaluationPipeline(task, cfg, model_cfgs, adapters={"flaky": FailingAdapter()},
+                                      results_format="json", telemetry=t)
+            pipe.load_data()
+            pipe.generate()
+        samples = parse_samples(t.render())
+
+        flaky = '{model="flaky",task="simplify_de"}'
+        echo = '{model="echo",task="simplify_de"}'
+        assert samples[f"eval_examples_processed_total{flaky}"] == 8
+        assert samples[f"eval_examples_processed_total{echo}"] == 8
+        # Erster Lauf: 2 Fehlschläge; zweiter Lauf: die 2 Erfolge kommen aus dem Cache,
+        # die zuvor fehlgeschlagenen werden neu versucht und scheitern beim 2. Aufruf erneut
+        assert samples[f"eval_cache_hits_total{flaky}"] == 2
+        assert samples[f"eval_cache_misses_total{echo}"] == 4
+        assert samples[f"eval_cache_hits_total{echo}"] == 4
+        assert samples[f"eval_generation_failures_total{flaky}"] == 3
+        assert samples[f"eval_generation_latency_seconds_count{echo}"] == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
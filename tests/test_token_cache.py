@@ -0,0 +1,205 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+import time
+import numpy as np
+from src.pipeline import EvaluationPipeline
+from src.token_cache import PromptTokenCache, STALE_GENERATION_SECONDS, TOKENS_DIR, tokenizer_fingerprint
+
+
+class WordTokenizer:
+    """Minimaler Tokenizer: ein Token pro Wort"""
+
+    def __init__(self, vocab):
+        self.vocab = vocab
+
+    def get_vocab(self):
+        return self.vocab
+
+
+class TokenizingAdapter:
+    """Adapter mit Tokenizer-Vorstufe: ein Token pro Wort, zählt Tokenizer-Aufrufe"""
+
+    def __init__(self, vocab="de", max_prompt_length=8):
+        self.tok = WordTokenizer({vocab: 0})
+        self.max_prompt_length = max_prompt_length
+        self.tokenized = []
+        self.prompt_tokens = None
+        self.last_stats = {}
+
+    def tokenizer_fingerprint(self):
+        return tokenizer_fingerprint(self.tok)
+
+    def tokenize_prompts(self, prompts):
+        self.tokenized.extend(prompts)
+        return [[len(w) for w in p.split()] for p in prompts]
+
+    def use_prompt_tokens(self, cache):
+        self.prompt_tokens = cache
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        return "Kurz."
+
+    def generate_batch(self, prompts, max_new_tokens, decoding):
+        return ["Kurz." for _ in prompts]
+
+
+class TestPromptTokenCache:
+    """Tests für den persistenten Token-Cache"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_add_reload_and_lengths(self):
+        """Test Speichern, Neuladen per mmap, Längen und fehlende Prompts"""
+        cache = PromptTokenCache(self.temp_dir, "fp", "T: {source}")
+        cache.add(["a b", "c"], [[1, 2], [3]])
+        cache.add(["c", "d e f"], [[9], [4, 5, 6]])
+        assert len(cache) == 3
+
+        reloaded = PromptTokenCache(self.temp_dir, "fp", "T: {source}")
+        assert isinstance(reloaded._ids, np.memmap)
+        assert reloaded.ids("c").tolist() == [3]
+        assert reloaded.ids("d e f").tolist() == [4, 5, 6]
+        assert reloaded.ids("x") is None
+        assert reloaded.lengths(["d e f", "x", "a b"]).tolist() == [3, -1, 2]
+        assert reloaded.missing(["x", "a b", "x", "y"]) == ["x", "y"]
+        assert reloaded.nbytes() == 6 * 4 + 4 * 8
+
+        # Anderer Tokenizer oder anderes Template: eigener Cache
+        assert len(PromptTokenCache(self.temp_dir, "other", "T: {source}")) == 0
+        assert len(PromptTokenCache(self.temp_dir, "fp", "U: {source}")) == 0
+
+    def test_inconsistent_files_ignored(self):
+        """Test inkonsistente Dateien werden verworfen statt falsche IDs zu liefern"""
+        cache = PromptTokenCache(self.temp_dir, "fp", "T")
+        cache.add(["a b"], [[1, 2]])
+        with open(os.path.join(cache.path, cache.generation, "keys.json"), "w", encoding="utf-8") as f:
+            json.dump(["k1", "k2"], f)
+        assert len(PromptTokenCache(self.temp_dir, "fp", "T")) == 0
+
+    def test_concurrent_writers(self):
+        """Test zwei Schreiber: jede sichtbare Generation ist in sich konsistent, keine Zeile geht verloren"""
+        first = PromptTokenCache(self.temp_dir, "fp", "T")
+        second = PromptTokenCache(self.temp_dir, "fp", "T")
+        first.add(["a"], [[1, 2, 3]])
+        # second hat vor dem Schreiben von first geladen und übernimmt dessen Zeilen
+        second.add(["b"], [[7]])
+        first.add(["c"], [[8, 9]])
+
+        reader = PromptTokenCache(self.temp_dir, "fp", "T")
+        assert reader.ids("a").tolist() == [1, 2, 3]
+        assert reader.ids("b").tolist() == [7]
+        assert reader.ids("c").tolist() == [8, 9]
+        # Jeder Schreiber entfernt sofort nur seine eigene Vorgängerin
+        assert sorted(os.listdir(reader.path)) == sorted(["CURRENT", reader.generation, second.generation])
+
+    def test_foreign_generation_kept_until_stale(self):
+        """Test dass eine geladene fremde Generation erst nach der Schonfrist entfernt wird"""
+        writer = PromptTokenCache(self.temp_dir, "fp", "T")
+        writer.add(["a"], [[1]])
+        foreign = writer.generation
+        other = PromptTokenCache(self.temp_dir, "fp", "T")
+        other.add(["b"], [[2]])
+        # writer (oder ein Leser) kann die Generation noch lesen
+        assert os.path.isdir(os.path.join(other.path, foreign))
+
+        # Verwaist (z. B. nach überschneidenden Schreibern oder Absturz): nach der Schonfrist weg
+        old = time.time() - STALE_GENERATION_SECONDS - 1
+        os.utime(os.path.join(other.path, foreign), (old, old))
+        own = other.generation
+        other.add(["c"], [[3]])
+        assert sorted(os.listdir(other.path)) == sorted(["CURRENT", other.generation])
+        assert own != other.generation
+        assert PromptTokenCache(self.temp_dir, "fp", "T").ids("a").tolist() == [1]
+
+    def test_in_memory(self):
+        """Test ohne Verzeichnis bleibt der Cache im Speicher"""
+        cache = PromptTokenCache(None, "fp", "T")
+        cache.add(["a"], [[7]])
+        assert cache.path is None and cache.ids("a").tolist() == [7]
+        assert os.listdir(self.temp_dir) == []
+
+    def test_fingerprint(self):
+        """Test gleiche Vokabulare ergeben dieselbe Kennung"""
+        assert tokenizer_fingerprint(WordTokenizer({"a": 0})) == tokenizer_fingerprint(WordTokenizer({"a": 0}))
+        assert tokenizer_fingerprint(WordTokenizer({"a": 0})) != tokenizer_fingerprint(WordTokenizer({"b": 0}))
+
+
+class TestPipelineTokenization:
+    """Tests für die Tokenisierungs-Vorstufe der Pipeline"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(5):
+                source = " ".join(["Wort"] * (2 + 2 * i))
+                f.write(json.dumps({"id": f"ex_{i}", "source": source, "refs": ["Kurz."]}) + "\n")
+        self.task = {"task_name": "simplify_de", "data": {"test_file": data_path},
+                     "prompt": {"template": "Text: {source}"}}
+        self.cfg = {"seed": 42, "max_new_tokens": 16, "batch_size": 2,
+                    "output_dir": os.path.join(self.temp_dir, "out"),
+                    "cache_dir": os.path.join(self.temp_dir, "cache"),
+                    "decoding": {"name": "greedy", "do_sample": False}}
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def run(self, adapters):
+        pipe = EvaluationPipeline(self.task, self.cfg, [{"model_id": m} for m in adapters],
+                                  adapters=adapters, results_format="json")
+        pipe.load_data()
+        pipe.generate()
+        return pipe
+
+    def test_shared_across_models_and_runs(self):
+        """Test einmal tokenisiert für Modelle mit gleichem Tokenizer und über Läufe hinweg"""
+        adapters = {"a": TokenizingAdapter(), "b": TokenizingAdapter(), "c": TokenizingAdapter("en")}
+        pipe = self.run(adapters)
+        assert len(adapters["a"].tokenized) == 5
+        assert adapters["b"].tokenized == []
+        assert len(adapters["c"].tokenized) == 5
+        assert adapters["b"].prompt_tokens is not None
+        assert os.path.isdir(os.path.join(self.cfg["cache_dir"], TOKENS_DIR))
+        # "Text:" plus 2, 4, ... Wörter
+        assert pipe.prompt_lengths["a"].tolist() == [3, 5, 7, 9, 11]
+
+        self.cfg["output_dir"] = os.path.join(self.temp_dir, "out2")
+        self.cfg["max_new_tokens"] = 8  # neue Generationen, gleicher Token-Cache
+        adapters = {"a": TokenizingAdapter(), "b": TokenizingAdapter()}
+        self.run(adapters)
+        assert adapters["a"].tokenized == [] and adapters["b"].tokenized == []
+
+    def test_truncation_reported(self):
+        """Test gekürzte Prompts werden gezählt und im Summary ausgewiesen"""
+        pipe = self.run({"a": TokenizingAdapter(max_prompt_length=8),
+                         "b": TokenizingAdapter(max_prompt_length=64)})
+        assert pipe.truncated_prompts["a"] == (2, 5, 8)
+        assert pipe.truncated_prompts["b"] == (0, 5, 64)
+        pipe.score()
+        pipe.compare()
+        assert pipe.summary["truncated_prompts"] == ["a: 2/5 (> 8 Tokens)"]
+
+    def test_no_cache_in_memory(self):
+        """Test mit --no-cache wird nichts auf die Platte geschrieben"""
+        pipe = EvaluationPipeline(self.task, self.cfg, [{"model_id": "a"}],
+                                  adapters={"a": TokenizingAdapter()}, use_cache=False,
+                                  results_format="json")
+        pipe.load_data()
+        pipe.generate()
+        assert not os.path.exists(os.path.join(self.cfg["cache_dir"], TOKENS_DIR))
+        assert pipe.prompt_lengths["a"].tolist() == [3, 5, 7, 9, 11]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,143 @@
+import pytest
+import json
+import os
+import struct
+import tempfile
+import shutil
+import numpy as np
+from src.weights import mmap_safetensors, prepare_weights, read_safetensors_header, weights_cache_path
+
+
+def write_safetensors(path, tensors):
+    """Hilfsfunktion: minimale safetensors-Datei aus numpy-Arrays schreiben"""
+    names = {np.dtype(np.float32): "F32", np.dtype(np.int64): "I64", np.dtype(np.int16): "BF16"}
+    header, offset, blobs = {"__metadata__": {"format": "pt"}}, 0, []
+    for name, array in tensors.items():
+        data = np.ascontiguousarray(array).tobytes()
+        header[name] = {"dtype": names[array.dtype], "shape": list(array.shape),
+                        "data_offsets": [offset, offset + len(data)]}
+        blobs.append(data)
+        offset += len(data)
+    raw = json.dumps(header).encode()
+    raw += b" " * (-len(raw) % 8)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(raw)) + raw + b"".join(blobs))
+
+
+class TestSafetensorsMmap:
+    """Tests für das Einlesen von safetensors per mmap"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "model.safetensors")
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_roundtrip(self):
+        """Test Werte, Formen und Datentypen aus dem Mapping"""
+        weight = np.arange(12, dtype=np.float32).reshape(3, 4)
+        ids = np.array([1, 2, 3], dtype=np.int64)
+        write_safetensors(self.path, {"w": weight, "ids": ids})
+
+        header, start = read_safetensors_header(self.path)
+        assert set(header) == {"w", "ids"} and start % 8 == 0
+        tensors = mmap_safetensors(self.path)
+        dtype, array = tensors["w"]
+        assert dtype == "F32"
+        np.testing.assert_array_equal(array, weight)
+        np.testing.assert_array_equal(tensors["ids"][1], ids)
+
+    def test_shared_mapping(self):
+        """Test dass alle Tensoren Sichten auf ein copy-on-write-Mapping sind"""
+        write_safetensors(self.path, {"a": np.ones(4, dtype=np.float32), "b": np.zeros(2, dtype=np.int16)})
+        tensors = mmap_safetensors(self.path)
+        a, b = tensors["a"][1], tensors["b"][1]
+        assert isinstance(a, np.memmap) and a.base is b.base
+        assert tensors["b"][0] == "BF16"
+        # Schreiben bleibt privat und verändert die Datei nicht
+        a[0] = 5
+        assert mmap_safetensors(self.path)["a"][1][0] == 1
+
+
+class TestWeightsCache:
+    """Tests für den einmalig konvertierten Gewichts-Cache"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.model_dir = os.path.join(self.temp_dir, "model")
+        os.makedirs(self.model_dir)
+        with open(os.path.join(self.model_dir, "config.json"), "w") as f:
+            f.write("{}")
+        self.root = os.path.join(self.temp_dir, "weights")
+        self.calls = []
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def convert(self, model_id, dtype_name, out_dir):
+        self.calls.append((model_id, dtype_name))
+        os.makedirs(out_dir)
+        write_safetensors(os.path.join(out_dir, "model.safetensors"), {"w": np.ones(2, dtype=np.float32)})
+
+    def test_convert_once(self):
+        """Test dass nur beim ersten Laden konvertiert wird"""
+        path = prepare_weights(self.model_dir, "fp32", self.root, convert=self.convert)
+        assert path == weights_cache_path(self.model_dir, "fp32", self.root)
+        assert prepare_weights(self.model_dir, "fp32", self.root, convert=self.convert) == path
+        assert self.calls == [(self.model_dir, "fp32")]
+        # Anderer Datentyp, eigener Cache-Eintrag
+        assert prepare_weights(self.model_dir, "bf16", self.root, convert=self.convert) != path
+        assert os.listdir(self.root) and not any(".tmp-" in n for n in os.listdir(self.root))
+
+    def test_concurrent_conversion(self):
+        """Test dass ein gleichzeitig konvertierender Prozess gewinnt"""
+        path = weights_cache_path(self.model_dir, "fp32", self.root)
+
+        def racing(model_id, dtype_name, out_dir):
+            self.convert(model_id, dtype_name, path)
+            self.convert(model_id, dtype_name, out_dir)
+
+        assert prepare_weights(self.model_dir, "fp32", self.root, convert=racing) == path
+        assert os.listdir(self.root) == [os.path.basename(path)]
+
+    def test_revision_changes_key(self):
+        """Test neuer Cache-Eintrag bei geänderten Modelldateien"""
+        before = weights_cache_path(self.model_dir, "fp32", self.root)
+        with open(os.path.join(self.model_dir, "model.safetensors"), "wb") as f:
+            f.write(b"x")
+        assert weights_cache_path(self.model_dir, "fp32", self.root) != before
+
+
+class TestMmapModel:
+    """Test Laden eines Modells aus dem mmap-Cache"""
+
+    def test_matches_from_pretrained(self):
+        """Test gleiche Logits wie das Originalmodell"""
+        torch = pytest.importorskip("torch")
+        transformers = pytest.importorskip("transformers")
+        from src.weights import load_mmap_model
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            model_dir = os.path.join(temp_dir, "tiny")
+            config = transformers.GPT2Config(vocab_size=64, n_positions=32, n_embd=16, n_layer=1, n_head=2)
+            torch.manual_seed(0)
+            original = transformers.GPT2LMHeadModel(config).eval()
+            original.save_pretrained(model_dir)
+
+            model, path = load_mmap_model(model_dir, "fp32", os.path.join(temp_dir, "weights"))
+            ids = torch.tensor([[1, 2, 3, 4]])
+            with torch.inference_mode():
+                assert torch.allclose(model(ids).logits, original(ids).logits)
+            assert model.lm_head.weight.data_ptr() == model.transformer.wte.weight.data_ptr()
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
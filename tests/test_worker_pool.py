@@ -0,0 +1,103 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+from src.backends import create_adapter
+from src.pipeline import EvaluationPipeline
+from src.worker_pool import GenerationWorkerPool, plan_cores, split_evenly
+
+RULE_CFG = {"model_id": "rule", "backend": "rule", "rule": {"max_words": 4}}
+
+
+def prompt(i):
+    return f"Text: Satz Nummer {i} ist lang, sehr lang.\n\nVereinfachter Text:"
+
+
+class TestPlanning:
+    """Tests für Kernzuordnung und Aufteilung"""
+
+    def test_plan_cores(self):
+        """Test zusammenhängende Kernblöcke pro Worker"""
+        assert plan_cores(list(range(8)), 4) == [[0, 1], [2, 3], [4, 5], [6, 7]]
+        assert plan_cores([2, 3, 5], 2) == [[2], [3]]
+        # Überbuchung verteilt reihum
+        assert plan_cores([0, 1], 3, threads=1) == [[0], [1], [0]]
+
+    def test_split_evenly(self):
+        """Test geordnete, möglichst gleich große Teile"""
+        assert split_evenly(list(range(7)), 3) == [[0, 1, 2], [3, 4], [5, 6]]
+        assert split_evenly([1], 4) == [[1]]
+
+
+class TestWorkerPool:
+    """Tests für die Generierung in Worker-Prozessen"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_results_in_order(self):
+        """Test dass Batch-Ergebnisse in Eingabereihenfolge zurückkommen"""
+        prompts = [prompt(i) for i in range(7)]
+        expected = [create_adapter(RULE_CFG).generate(p, 32, {}) for p in prompts]
+        pool = GenerationWorkerPool(RULE_CFG, n_workers=2, threads_per_worker=1)
+        try:
+            assert pool.generate_batch(prompts, 32, {}) == expected
+            assert len(pool.last_stats["items"]) == 7
+            assert pool.last_stats["completion_tokens"] == sum(len(e.split()) for e in expected)
+            assert pool.generate(prompts[3], 32, {}) == expected[3]
+            assert pool.preferred_batch_size == 2
+        finally:
+            pool.close()
+
+    def test_dead_worker_breaks_pool(self):
+        """Test dass nach einem abgestürzten Worker keine veralteten Antworten zurückkommen"""
+        prompts = [prompt(i) for i in range(7)]
+        pool = GenerationWorkerPool(RULE_CFG, n_workers=3, threads_per_worker=1)
+        try:
+            # Wie ein OOM-Kill: die ersten Worker bekommen ihren Teil noch, der letzte nicht
+            pool._procs[2].kill()
+            pool._procs[2].join()
+            with pytest.raises(RuntimeError, match="unbrauchbar"):
+                pool.generate_batch(prompts, 32, {})
+            assert pool.broken is not None
+            with pytest.raises(RuntimeError, match="unbrauchbar"):
+                pool.generate_batch(prompts[4:6], 32, {})
+        finally:
+            pool.close()
+
+    def test_start_error(self):
+        """Test Fehler beim Laden in einem Worker"""
+        with pytest.raises(RuntimeError, match="nicht gestartet"):
+            GenerationWorkerPool({"model_id": "x", "backend": "gibtsnicht"}, n_workers=2)
+
+    def test_pipeline_with_workers(self):
+        """Test Pipeline-Lauf mit workers in der Modell-Konfiguration"""
+        data_path = os.path.join(self.temp_dir, "test.jsonl")
+        with open(data_path, "w", encoding="utf-8") as f:
+            for i in range(9):
+                f.write(json.dumps({"id": f"ex_{i}", "source": f"Satz {i} ist lang, sehr lang.",
+                                    "refs": [f"Satz {i}."]}, ensure_ascii=False) + "\n")
+        task = {"task_name": "simplify_de", "data": {"test_file": data_path},
+                "prompt": {"template": "Text: {source}\n\nVereinfachter Text:"}}
+        cfg = {"seed": 42, "max_new_tokens": 32, "output_dir": os.path.join(self.temp_dir, "out"),
+               "cache_dir": os.path.join(self.temp_dir, "cache"),
+               "decoding": {"name": "greedy", "do_sample": False}}
+        model_cfg = {**RULE_CFG, "workers": {"n": 3, "threads": 1}}
+
+        pipe = EvaluationPipeline(task, cfg, [model_cfg], use_cache=False, results_format="json")
+        pipe.load_data()
+        results = pipe.generate()["rule"]
+        assert isinstance(pipe.adapters["rule"], GenerationWorkerPool)
+        assert [r["id"] for r in results] == [f"ex_{i}" for i in range(9)]
+        assert [r["hyp"] for r in results] == [f"Satz {i} ist lang." for i in range(9)]
+        pipe.adapters["rule"].close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
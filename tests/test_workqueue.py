@@ -0,0 +1,145 @@
+import pytest
+import json
+import os
+import time
+import tempfile
+import shutil
+import threading
+from src.workqueue import WorkQueue, make_units, run_worker
+from src.generation import cache_key
+from src.caching import get
+
+
+class EchoAdapter:
+    """Test-Adapter, der die Quelle unverändert zurückgibt"""
+
+    def __init__(self, model_cfg):
+        self.model_id = model_cfg["model_id"]
+        self.calls = 0
+
+    def generate(self, prompt, max_new_tokens, decoding):
+        self.calls += 1
+        return prompt.split("Text: ")[-1]
+
+
+class TestWorkQueue:
+    """Tests für die dateibasierte Arbeitswarteschlange"""
+
+    def setup_method(self):
+        """Setup für jeden Test"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.queue_dir = os.path.join(self.temp_dir, "queue")
+        self.data_path = os.path.join(self.temp_dir, "test.jsonl")
+        self.examples = [
+            {"id": f"ex_{i:03d}", "source": f"Satz {i}.", "refs": ["Satz."]} for i in range(10)
+        ]
+        with open(self.data_path, "w", encoding="utf-8") as f:
+            for ex in self.examples:
+                f.write(json.dumps(ex) + "\n")
+        self.task = {
+            "task_name": "simplify_de",
+            "data": {"test_file": self.data_path},
+            "prompt": {"template": "Text: {source}"},
+        }
+        self.cfg = {
+            "seed": 42,
+            "max_new_tokens": 16,
+            "cache_dir": os.path.join(self.temp_dir, "cache"),
+            "decoding": {"name": "greedy", "do_sample": False},
+        }
+        self.model_cfgs = [{"model_id": "model_a"}, {"model_id": "model_b"}]
+
+    def teardown_method(self):
+        """Cleanup nach jedem Test"""
+        shutil.rmtree(self.temp_dir)
+
+    def _queue(self, lease_seconds=600.0):
+        queue = WorkQueue(self.queue_dir, lease_seconds=lease_seconds)
+        queue.write_spec({"task": self.task, "config": self.cfg, "model_cfgs": self.model_cfgs})
+        units = make_units(["model_a", "model_b"], [ex["id"] for ex in self.examples], 4)
+        queue.publish(units)
+        return queue
+
+    def test_make_units(self):
+        """Test Zerlegung in Beispiel-Batch × Modell"""
+        units = make_units(["a", "b"], [str(i) for i in range(10)], 4)
+        assert len(units) == 6
+        assert units[0]["example_ids"] == ["0", "1", "2", "3"]
+        assert units[-1]["example_ids"] == ["8", "9"]
+
+    def test_publish_idempotent(self):
+        """Test dass erneutes Einstellen keine Duplikate erzeugt"""
+        queue = self._queue()
+        units = make_units(["model_a", "model_b"], [ex["id"] for ex in self.examples], 4)
+        assert queue.publish(units) == 0
+        assert queue.status() == {"pending": 6, "leased": 0, "done": 0}
+
+    def test_claim_and_complete(self):
+        """Test Übernahme und Abschluss einer Einheit"""
+        queue = self._queue()
+        unit = queue.claim("w1")
+        assert queue.status()["leased"] == 1
+        queue.complete(unit["unit_id"], {"unit_id": unit["unit_id"]})
+        assert queue.status() == {"pending": 5, "leased": 0, "done": 1}
+
+    def test_expired_lease_reclaimed(self):
+        """Test dass Einheiten abgestürzter Worker neu eingestellt werden"""
+        queue = self._queue(lease_seconds=60)
+        unit = queue.claim("abgestuerzt")
+        leased = os.path.join(queue.leased_dir, f"{unit['unit_id']}.json")
+        old = time.time() - 120
+        os.utime(leased, (old, old))
+
+        assert queue.reclaim_expired() == 1
+        assert queue.status()["pending"] == 6
+        assert not queue.heartbeat(unit["unit_id"])
+
+    def test_fresh_lease_not_reclaimed(self, monkeypatch):
+        """Test dass ein anderer Worker eine gerade übernommene Einheit nicht als abgelaufen zurückholt"""
+        queue = self._queue(lease_seconds=60)
+        old = time.time() - 3600
+        for name in os.listdir(queue.pending_dir):
+            os.utime(os.path.join(queue.pending_dir, name), (old, old))
+
+        other = WorkQueue(self.queue_dir, lease_seconds=60)
+        rename = os.rename
+        reclaimed = []
+
+        def rename_then_reclaim(src, dst):
+            # Ein zweiter Worker prüft die Leases direkt nach dem rename
+            rename(src, dst)
+            if os.path.dirname(dst) == queue.leased_dir:
+                reclaimed.append(other.reclaim_expired())
+
+        monkeypatch.setattr(os, "rename", rename_then_reclaim)
+        unit = queue.claim("w1")
+        assert unit is not None and reclaimed == [0]
+        assert queue.status() == {"pending": 5, "leased": 1, "done": 0}
+
+    def test_workers_drain_queue(self):
+        """Test dass mehrere Worker die Warteschlange gemeinsam abarbeiten"""
+        queue = self._queue()
+        counts = []
+
+        def work(name):
+            counts.append(run_worker(WorkQueue(self.queue_dir), EchoAdapter, worker_id=name, poll_interval=0.01))
+
+        threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sum(counts) == 6
+        assert queue.is_drained()
+        assert len(queue.results()) == 6
+
+        # Ergebnisse liegen im geteilten Cache
+        for mc in self.model_cfgs:
+            for ex in self.examples:
+                row = get(self.cfg["cache_dir"], cache_key(mc["model_id"], ex, self.task, self.cfg))
+                assert row["hyp"] == ex["source"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])